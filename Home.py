@@ -27,10 +27,13 @@ sys.path.append(str(Path(__file__).parent))
 
 from ui.styles import apply_tjsp_styles
 from services.session_manager import initialize_session_state
-from services.contract_service import get_todos_contratos
-from services.alert_service import calcular_alertas
+from services.contract_service import get_todos_contratos, get_contratos_vencendo_entre
+from services.contract_index import get_contract_index
+from services.portfolio_table import get_portfolio_table
+from services.alert_scheduler import get_alert_scheduler
+from services.dual_write_service import sincronizar_alertas_em_segundo_plano
 from services.tag_service import get_tag_service
-from components.contratos_ui import filtrar_contratos, render_lista_contratos
+from components.contratos_ui import filtrar_contratos
 
 
 def exportar_para_excel(contratos):
@@ -114,19 +117,23 @@ def render_metrics():
     # Obtém todos os contratos
     contratos = get_todos_contratos()
     
-    # Calcula alertas
-    alertas = calcular_alertas(contratos)
+    # Alertas: só os contratos alterados ou que cruzaram um limite são reavaliados
+    avaliacao = get_alert_scheduler().avaliar_carteira()
+    alertas = avaliacao['alertas']
+    sincronizar_alertas_em_segundo_plano(avaliacao['adicionados'])
     alertas_criticos = len([a for a in alertas if a.get('tipo') == 'critico'])
     
-    # Calcula métricas reais
-    total_contratos = len(contratos)
-    contratos_ativos = len([c for c in contratos if c.get('status') == 'ativo'])
-    contratos_atencao = len([c for c in contratos if c.get('status') == 'atencao'])
-    contratos_criticos = len([c for c in contratos if c.get('status') == 'critico'])
-    contratos_com_pendencias = len([c for c in contratos if c.get('pendencias')])
+    # Calcula métricas reais (agregações vetorizadas na tabela colunar)
+    tabela = get_portfolio_table()
+    contagem_status = tabela.contagem_por('status')
+    total_contratos = tabela.total
+    contratos_ativos = contagem_status.get('ativo', 0)
+    contratos_atencao = contagem_status.get('atencao', 0)
+    contratos_criticos = contagem_status.get('critico', 0)
+    contratos_com_pendencias = int(tabela.pendencias.sum())
     
     # Valor total
-    valor_total = sum(c.get('valor', 0) for c in contratos)
+    valor_total = tabela.valor_total()
     
     # Taxa de conformidade (contratos sem pendências)
     taxa_conformidade = int((contratos_ativos / total_contratos * 100)) if total_contratos > 0 else 0
@@ -173,7 +180,6 @@ def render_metrics():
 
     with col5:
         st.markdown("<div style='height: 1.85rem'></div>", unsafe_allow_html=True)
-        contratos = get_todos_contratos()
         if contratos:
             excel_data = exportar_para_excel(contratos)
             st.download_button(
@@ -192,10 +198,10 @@ def render_graficos_analytics():
     
     # ...excluído subtítulo, apenas dashboards abaixo...
     
-    # Obtém dados
-    contratos = get_todos_contratos()
+    # Obtém dados (snapshot colunar da carteira)
+    tabela = get_portfolio_table()
     
-    if not contratos:
+    if tabela.total == 0:
         st.info("Nenhum contrato disponível para análise.")
         return
     
@@ -208,10 +214,7 @@ def render_graficos_analytics():
         
         with col1:
             # Gráfico de pizza: Contratos por Tipo
-            tipos = {}
-            for c in contratos:
-                tipo = c.get('tipo', 'Outros')
-                tipos[tipo] = tipos.get(tipo, 0) + 1
+            tipos = tabela.contagem_por('tipo')
             
             fig_tipo = go.Figure(data=[go.Pie(
                 labels=list(tipos.keys()),
@@ -234,11 +237,10 @@ def render_graficos_analytics():
                 'atencao': 'Atenção',
                 'critico': 'Crítico'
             }
-            status = {}
-            for c in contratos:
-                s = c.get('status', 'ativo')
-                label = status_map.get(s, s)
-                status[label] = status.get(label, 0) + 1
+            status = {
+                status_map.get(s, s): n
+                for s, n in tabela.contagem_por('status').items()
+            }
             
             fig_status = go.Figure(data=[go.Pie(
                 labels=list(status.keys()),
@@ -261,33 +263,19 @@ def render_graficos_analytics():
         # Filtra contratos com data_fim nos próximos 6 meses
         hoje = datetime.now()
         seis_meses = hoje + timedelta(days=180)
-        vencimentos = []
-        for c in contratos:
-            data_fim = c.get('data_fim')
-            if data_fim:
-                # Tenta converter para datetime se não for
-                if not isinstance(data_fim, datetime):
-                    try:
-                        data_fim_dt = datetime.strptime(str(data_fim), "%Y-%m-%d")
-                    except Exception:
-                        try:
-                            data_fim_dt = datetime.strptime(str(data_fim), "%d/%m/%Y")
-                        except Exception:
-                            continue
-                else:
-                    data_fim_dt = data_fim
-                if hoje <= data_fim_dt <= seis_meses:
-                    dias_restantes = (data_fim_dt - hoje).days
-                    vencimentos.append({
-                        'Contrato': c.get('numero', ''),
-                        'Fornecedor': c.get('fornecedor', ''),
-                        'Data de Término': data_fim_dt.strftime('%d/%m/%Y'),
-                        'Dias Restantes': dias_restantes
-                    })
+        # Índice de vigência (data_fim consolidada): já ordenado por vencimento
+        vencimentos = [
+            {
+                'Contrato': c.get('numero', ''),
+                'Fornecedor': c.get('fornecedor', ''),
+                'Data de Término': data_fim.strftime('%d/%m/%Y'),
+                'Dias Restantes': (data_fim - hoje).days
+            }
+            for data_fim, c in get_contratos_vencendo_entre(hoje, seis_meses, incluir_fim=True)
+        ]
 
         if vencimentos:
-            # Ordena por dias restantes
-            vencimentos.sort(key=lambda x: x['Dias Restantes'])
+            # Já ordenados por dias restantes
             # Gráfico de barras horizontal
             df_venc = pd.DataFrame(vencimentos[:15])  # Top 15
             fig_timeline = px.bar(
@@ -332,26 +320,15 @@ def render_graficos_analytics():
     with tab3:
         st.markdown("### 🏢 Top 10 Fornecedores por Valor Total")
         
-        # Agrupa por fornecedor
-        fornecedores = {}
-        for c in contratos:
-            forn = c.get('fornecedor', 'N/A')
-            valor = c.get('valor', 0)
-            if forn in fornecedores:
-                fornecedores[forn]['valor'] += valor
-                fornecedores[forn]['contratos'] += 1
-            else:
-                fornecedores[forn] = {'valor': valor, 'contratos': 1}
-        
-        # Ordena e pega top 10
-        top_fornecedores = sorted(fornecedores.items(), key=lambda x: x[1]['valor'], reverse=True)[:10]
+        # Agrupa por fornecedor e pega top 10 (bincount + argpartition)
+        top_fornecedores = tabela.top_por_valor('fornecedor', 10)
         
         if top_fornecedores:
             df_forn = pd.DataFrame([
                 {
-                    'Fornecedor': f[0],
-                    'Valor Total (R$)': f[1]['valor'],
-                    'Contratos': f[1]['contratos']
+                    'Fornecedor': f['categoria'],
+                    'Valor Total (R$)': f['valor'],
+                    'Contratos': f['contratos']
                 }
                 for f in top_fornecedores
             ])
@@ -388,31 +365,33 @@ def render_graficos_analytics():
         # Métricas por status
         col1, col2, col3 = st.columns(3)
         
-        ativos = [c for c in contratos if c.get('status') == 'ativo']
-        atencao = [c for c in contratos if c.get('status') == 'atencao']
-        criticos = [c for c in contratos if c.get('status') == 'critico']
+        contagem_status = tabela.contagem_por('status')
+        valor_status = tabela.soma_valor_por('status')
+        ativos = contagem_status.get('ativo', 0)
+        atencao = contagem_status.get('atencao', 0)
+        criticos = contagem_status.get('critico', 0)
         
         with col1:
-            valor_ativos = sum(c.get('valor', 0) for c in ativos)
+            valor_ativos = valor_status.get('ativo', 0.0)
             st.metric(
                 "✅ Contratos Ativos",
-                f"{len(ativos)}",
+                f"{ativos}",
                 f"R$ {valor_ativos/1_000_000:.1f}M"
             )
         
         with col2:
-            valor_atencao = sum(c.get('valor', 0) for c in atencao)
+            valor_atencao = valor_status.get('atencao', 0.0)
             st.metric(
                 "⚠️ Requerem Atenção",
-                f"{len(atencao)}",
+                f"{atencao}",
                 f"R$ {valor_atencao/1_000_000:.1f}M"
             )
         
         with col3:
-            valor_criticos = sum(c.get('valor', 0) for c in criticos)
+            valor_criticos = valor_status.get('critico', 0.0)
             st.metric(
                 "🔴 Críticos",
-                f"{len(criticos)}",
+                f"{criticos}",
                 f"R$ {valor_criticos/1_000_000:.1f}M"
             )
         
@@ -420,9 +399,9 @@ def render_graficos_analytics():
         st.markdown("#### 📊 Distribuição de Valor por Status")
         
         df_status_valor = pd.DataFrame([
-            {'Status': 'Ativos', 'Valor (Milhões)': valor_ativos/1_000_000, 'Quantidade': len(ativos)},
-            {'Status': 'Atenção', 'Valor (Milhões)': valor_atencao/1_000_000, 'Quantidade': len(atencao)},
-            {'Status': 'Críticos', 'Valor (Milhões)': valor_criticos/1_000_000, 'Quantidade': len(criticos)}
+            {'Status': 'Ativos', 'Valor (Milhões)': valor_ativos/1_000_000, 'Quantidade': ativos},
+            {'Status': 'Atenção', 'Valor (Milhões)': valor_atencao/1_000_000, 'Quantidade': atencao},
+            {'Status': 'Críticos', 'Valor (Milhões)': valor_criticos/1_000_000, 'Quantidade': criticos}
         ])
         
         fig_status_valor = px.bar(
@@ -590,8 +569,8 @@ def render_contracts_dashboard():
             st.caption("Filtra por número exato ou parcial do processo.")
         
         with col_f2:
-            contratos_temp = get_todos_contratos()
-            fornecedores = sorted(list(set([c.get('fornecedor', '') for c in contratos_temp if c.get('fornecedor')])))
+            indice_contratos = get_contract_index()
+            fornecedores = indice_contratos.facetas('fornecedor')
             filtro_fornecedor = st.selectbox(
                 "Fornecedor/Empresa",
                 ["Todos"] + fornecedores,
@@ -599,14 +578,14 @@ def render_contracts_dashboard():
                 help="Selecione para filtrar por empresa contratada."
             )
             st.caption("Filtra por empresa contratada.")
-            fiscais = sorted(list(set([c.get('fiscal_titular', '') for c in contratos_temp if c.get('fiscal_titular')])))
+            fiscais = indice_contratos.facetas('fiscal')
             filtro_fiscal = st.selectbox(
                 "Fiscal/Gestor",
                 ["Todos"] + fiscais,
                 key="filtro_fiscal",
-                help="Selecione para filtrar por fiscal titular do contrato."
+                help="Selecione para filtrar por fiscal titular, substituto ou fiscal de comarca."
             )
-            st.caption("Filtra por fiscal titular do contrato.")
+            st.caption("Filtra por fiscal do contrato (titular, substituto ou de comarca).")
         
         with col_f3:
             # Filtro por tags
@@ -663,74 +642,18 @@ def render_contracts_dashboard():
     # Lista de contratos (mock + cadastrados)
     contratos = get_todos_contratos()
     
-    # APLICA FILTROS
-    contratos_filtrados = contratos
-    
-    # Filtro por busca geral (palavra-chave)
-    if busca and busca.strip():
-        termo_busca = busca.lower().strip()
-        contratos_filtrados = [
-            c for c in contratos_filtrados
-            if termo_busca in c.get('numero', '').lower()
-            or termo_busca in c.get('objeto', '').lower()
-            or termo_busca in c.get('fornecedor', '').lower()
-            or termo_busca in str(c.get('id', '')).lower()
-        ]
-    
-    # Filtro por número do contrato (avançado)
-    if filtro_num_contrato and filtro_num_contrato.strip():
-        termo_contrato = filtro_num_contrato.lower().strip()
-        contratos_filtrados = [
-            c for c in contratos_filtrados
-            if termo_contrato in c.get('numero', '').lower()
-        ]
-    
-    # Filtro por número do processo (avançado)
-    if filtro_num_processo and filtro_num_processo.strip():
-        termo_processo = filtro_num_processo.lower().strip()
-        contratos_filtrados = [
-            c for c in contratos_filtrados
-            if termo_processo in c.get('numero', '').lower()  # Número do processo geralmente está no campo 'numero'
-        ]
-    
-    # Filtro por fornecedor (avançado)
-    if filtro_fornecedor != "Todos":
-        contratos_filtrados = [
-            c for c in contratos_filtrados
-            if c.get('fornecedor') == filtro_fornecedor
-        ]
-    
-    # Filtro por fiscal (avançado)
-    if filtro_fiscal != "Todos":
-        contratos_filtrados = [
-            c for c in contratos_filtrados
-            if c.get('fiscal_titular') == filtro_fiscal
-        ]
-    
-    # Filtro por tags
-    if filtro_tags:
-        render_lista_contratos(contratos_filtrados)
-        tag_service = get_tag_service()
-        contratos_filtrados = [
-            c for c in contratos_filtrados
-            if any(tag_id in [t['id'] for t in tag_service.obter_tags_do_contrato(c['id'])] 
-                   for tag_id in filtro_tags)
-        ]
-    
-    # Filtro por status
-    if filtro_status != "Todos":
-        status_map = {
-            "Ativos": "ativo",
-            "Atenção": "atencao",
-            "Crítico": "critico"
-        }
-        status_busca = status_map.get(filtro_status)
-        if status_busca:
-            contratos_filtrados = [c for c in contratos_filtrados if c.get('status') == status_busca]
-    
-    # Filtro por tipo
-    if filtro_tipo != "Todos":
-        contratos_filtrados = [c for c in contratos_filtrados if c.get('tipo') == filtro_tipo]
+    # APLICA FILTROS (busca textual + interseção no índice de contratos)
+    contratos_filtrados = filtrar_contratos(
+        contratos,
+        busca=busca,
+        filtro_num_contrato=filtro_num_contrato,
+        filtro_num_processo=filtro_num_processo,
+        filtro_fornecedor=filtro_fornecedor,
+        filtro_fiscal=filtro_fiscal,
+        filtro_tags=filtro_tags,
+        filtro_status=filtro_status,
+        filtro_tipo=filtro_tipo
+    )
     
     # Mostra contador de resultados
     total_original = len(contratos)
@@ -788,14 +711,7 @@ def render_sidebar():
         """)
         # Seletor rápido de fiscal (para testes)
         with st.expander("🔄 Trocar Fiscal"):
-            contratos_temp = get_todos_contratos()
-            fiscais_unicos = set()
-            for c in contratos_temp:
-                if c.get('fiscal_titular'):
-                    fiscais_unicos.add(c.get('fiscal_titular'))
-                if c.get('fiscal_substituto'):
-                    fiscais_unicos.add(c.get('fiscal_substituto'))
-            fiscais_lista = sorted(list(fiscais_unicos))
+            fiscais_lista = get_contract_index().facetas('fiscal')
             if fiscais_lista:
                 fiscal_selecionado = st.selectbox(
                     "Selecione o fiscal:",
@@ -311,12 +311,13 @@ def render_registro_acao_form(alerta: Dict, on_submit: Optional[Callable] = None
             st.rerun()
 
 
-def render_historico_alerta(alerta: Dict):
+def render_historico_alerta(alerta: Dict, subarvore: Optional[List[Dict]] = None):
     """
     Renderiza histórico completo de um alerta V2.
     
     Args:
         alerta: Alerta para exibir histórico
+        subarvore: Alerta e seus derivados em pré-ordem (get_subarvore_alertas)
     """
     st.subheader("📊 Histórico do Alerta")
     
@@ -378,6 +379,19 @@ def render_historico_alerta(alerta: Dict):
         st.write(f"Total de ações: **{num_acoes}**")
         st.caption("Para visualizar detalhes das ações, use o módulo de consulta de histórico completo.")
     
+    # Alertas derivados (encadeamento)
+    if subarvore and len(subarvore) > 1:
+        st.markdown("---")
+        st.markdown("### 🌿 Alertas Derivados")
+        
+        geracao_base = alerta.get('geracao', 1)
+        for derivado in subarvore[1:]:
+            recuo = "\u2003" * max(0, derivado.get('geracao', 1) - geracao_base - 1)
+            st.write(
+                f"{recuo}↳ **{derivado.get('titulo', 'N/A')}** "
+                f"— {derivado.get('estado', 'N/A')} (Geração {derivado.get('geracao', 1)})"
+            )
+    
     # Métricas de risco
     if alerta.get('score_risco') is not None:
         st.markdown("---")
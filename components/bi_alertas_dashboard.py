@@ -235,7 +235,11 @@ def render_analise_consumo(alertas: List[Dict]):
     st.subheader("⏰ Análise de Consumo Silencioso de Prazo")
     
     # Calcular consumo para todos os alertas ativos
-    from services.alert_lifecycle_service import ESTADO_RESOLVIDO, ESTADO_ENCERRADO
+    from services.alert_lifecycle_service import (
+        ESTADO_RESOLVIDO,
+        ESTADO_ENCERRADO,
+        calcular_tempos_por_estado
+    )
     
     alertas_ativos = [
         a for a in alertas 
@@ -246,14 +250,18 @@ def render_analise_consumo(alertas: List[Dict]):
         st.success("✅ Nenhum alerta ativo no momento")
         return
     
+    # Permanência exata por estado, a partir do log de transições
+    tempos = calcular_tempos_por_estado([a['id'] for a in alertas_ativos])
+    
     consumos = []
     for alerta in alertas_ativos:
-        consumo = calcular_consumo_silencioso(alerta)
+        consumo = calcular_consumo_silencioso(alerta, tempos.get(alerta['id']))
         consumos.append({
             'contrato': alerta.get('contrato_numero', 'N/A'),
             'titulo': alerta.get('titulo', '')[:50],
             'estado': alerta.get('estado'),
             'dias_criacao': consumo['dias_desde_criacao'],
+            'dias_estado': consumo['dias_no_estado'],
             'tempo_esperado': consumo['tempo_esperado'],
             'consumo': consumo['consumo_silencioso'],
             'percentual': consumo['percentual_extra'],
@@ -275,7 +283,7 @@ def render_analise_consumo(alertas: List[Dict]):
     df = pd.DataFrame(consumos_significativos[:10])
     
     st.dataframe(
-        df[['contrato', 'titulo', 'dias_criacao', 'tempo_esperado', 'consumo', 'percentual', 'status']],
+        df[['contrato', 'titulo', 'dias_criacao', 'dias_estado', 'tempo_esperado', 'consumo', 'percentual', 'status']],
         use_container_width=True,
         height=300
     )
@@ -316,7 +324,7 @@ def render_tendencia_temporal(alertas: List[Dict], dias: int = 30):
     
     st.subheader(f"📈 Tendência - Últimos {dias} Dias")
     
-    tendencia = analisar_tendencia_temporal(alertas, dias)
+    tendencia = analisar_tendencia_temporal(alertas, dias, incluir_arquivados=True)
     
     # KPIs da tendência
     col1, col2, col3, col4 = st.columns(4)
@@ -1,6 +1,6 @@
 import streamlit as st
 from services.contract_service import get_todos_contratos
-from services.tag_service import get_tag_service
+from services.contract_index import get_contract_index
 
 def filtrar_contratos(
     contratos,
@@ -11,9 +11,17 @@ def filtrar_contratos(
     filtro_fiscal=None,
     filtro_tags=None,
     filtro_status=None,
-    filtro_tipo=None
+    filtro_tipo=None,
+    filtro_comarca=None
 ):
-    """Aplica filtros e busca sobre lista de contratos."""
+    """
+    Aplica filtros e busca sobre lista de contratos.
+
+    Os filtros por fornecedor, fiscal, comarca, status, tipo e tags são
+    resolvidos no índice de contratos (interseção de conjuntos de IDs);
+    a lista recebida é percorrida uma única vez, preservando a ordem.
+    O filtro de fiscal abrange titular, substituto e fiscais por comarca.
+    """
     contratos_filtrados = contratos
     # Filtro por busca geral (palavra-chave)
     if busca and busca.strip():
@@ -37,34 +45,22 @@ def filtrar_contratos(
             c for c in contratos_filtrados
             if termo_processo in c.get('numero', '').lower()
         ]
-    if filtro_fornecedor and filtro_fornecedor != "Todos":
-        contratos_filtrados = [
-            c for c in contratos_filtrados
-            if c.get('fornecedor') == filtro_fornecedor
-        ]
-    if filtro_fiscal and filtro_fiscal != "Todos":
-        contratos_filtrados = [
-            c for c in contratos_filtrados
-            if c.get('fiscal_titular') == filtro_fiscal
-        ]
-    if filtro_tags:
-        tag_service = get_tag_service()
-        contratos_filtrados = [
-            c for c in contratos_filtrados
-            if any(tag_id in [t['id'] for t in tag_service.obter_tags_do_contrato(c['id'])] 
-                   for tag_id in filtro_tags)
-        ]
-    if filtro_status and filtro_status != "Todos":
-        status_map = {
-            "Ativos": "ativo",
-            "Atenção": "atencao",
-            "Crítico": "critico"
-        }
-        status_busca = status_map.get(filtro_status)
-        if status_busca:
-            contratos_filtrados = [c for c in contratos_filtrados if c.get('status') == status_busca]
-    if filtro_tipo and filtro_tipo != "Todos":
-        contratos_filtrados = [c for c in contratos_filtrados if c.get('tipo') == filtro_tipo]
+    # Filtros por dimensão: interseção no índice invertido
+    status_map = {
+        "Ativos": "ativo",
+        "Atenção": "atencao",
+        "Crítico": "critico"
+    }
+    ids = get_contract_index().filtrar(
+        fornecedor=filtro_fornecedor if filtro_fornecedor != "Todos" else None,
+        fiscal=filtro_fiscal if filtro_fiscal != "Todos" else None,
+        comarca=filtro_comarca if filtro_comarca != "Todos" else None,
+        status=status_map.get(filtro_status),
+        tipo=filtro_tipo if filtro_tipo != "Todos" else None,
+        tags=filtro_tags
+    )
+    if ids is not None:
+        contratos_filtrados = [c for c in contratos_filtrados if c.get('id') in ids]
     return contratos_filtrados
 
 def render_lista_contratos(contratos, abrir_callback=None):
@@ -989,9 +989,9 @@ def main():
                 )
                 st.caption("Filtra por número exato ou parcial do processo.")
             with col_f2:
-                from services.contract_service import get_todos_contratos
-                contratos_temp = get_todos_contratos()
-                fornecedores = sorted(list(set([c.get('fornecedor', '') for c in contratos_temp if c.get('fornecedor')])))
+                from services.contract_index import get_contract_index
+                indice_contratos = get_contract_index()
+                fornecedores = indice_contratos.facetas('fornecedor')
                 filtro_fornecedor = st.selectbox(
                     "Fornecedor/Empresa",
                     ["Todos"] + fornecedores,
@@ -999,14 +999,14 @@ def main():
                     help="Selecione para filtrar por empresa contratada."
                 )
                 st.caption("Filtra por empresa contratada.")
-                fiscais = sorted(list(set([c.get('fiscal_titular', '') for c in contratos_temp if c.get('fiscal_titular')])))
+                fiscais = indice_contratos.facetas('fiscal')
                 filtro_fiscal = st.selectbox(
                     "Fiscal/Gestor",
                     ["Todos"] + fiscais,
                     key="filtro_fiscal_central",
-                    help="Selecione para filtrar por fiscal titular do contrato."
+                    help="Selecione para filtrar por fiscal titular, substituto ou fiscal de comarca."
                 )
-                st.caption("Filtra por fiscal titular do contrato.")
+                st.caption("Filtra por fiscal do contrato (titular, substituto ou de comarca).")
             with col_f3:
                 from services.tag_service import get_tag_service
                 tag_service = get_tag_service()
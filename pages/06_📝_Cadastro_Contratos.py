@@ -12,7 +12,6 @@ Funcionalidades:
 
 import streamlit as st
 import sys
-import json
 import shutil
 from pathlib import Path
 from datetime import datetime
@@ -21,6 +20,7 @@ sys.path.append(str(Path(__file__).parent.parent))
 
 from ui.styles import apply_tjsp_styles
 from services.session_manager import initialize_session_state
+from services.contract_store import get_contract_store
 
 
 def salvar_contrato(dados_contrato: dict, arquivo_pdf, arquivos_aditivos=None, dados_aditivos=None):
@@ -34,16 +34,7 @@ def salvar_contrato(dados_contrato: dict, arquivo_pdf, arquivos_aditivos=None, d
         dados_aditivos: Lista de dicionários com dados de cada aditivo (tipo, impactos, etc)
     """
     # Define caminhos
-    data_dir = Path("data")
     contratos_dir = Path("knowledge/contratos")
-    json_path = data_dir / "contratos_cadastrados.json"
-    
-    # Carrega contratos existentes
-    if json_path.exists():
-        with open(json_path, 'r', encoding='utf-8') as f:
-            contratos = json.load(f)
-    else:
-        contratos = []
     
     # Cria subdiretório para o contrato (comporta múltiplos PDFs)
     contrato_dir = contratos_dir / dados_contrato['id']
@@ -98,25 +89,15 @@ def salvar_contrato(dados_contrato: dict, arquivo_pdf, arquivos_aditivos=None, d
     dados_contrato['data_cadastro'] = datetime.now().isoformat()
     dados_contrato['total_aditivos'] = len(dados_contrato['aditivos'])
     
-    # Adiciona à lista
-    contratos.append(dados_contrato)
-    
-    # Salva JSON
-    with open(json_path, 'w', encoding='utf-8') as f:
-        json.dump(contratos, f, ensure_ascii=False, indent=2)
+    # Grava somente este contrato (transação única no SQLite)
+    get_contract_store().inserir_contrato(dados_contrato)
     
     return True
 
 
 def listar_contratos_cadastrados():
     """Lista todos os contratos cadastrados via upload"""
-    json_path = Path("data/contratos_cadastrados.json")
-    
-    if not json_path.exists():
-        return []
-    
-    with open(json_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    return get_contract_store().listar_contratos()
 
 
 def main():
@@ -464,8 +445,7 @@ def main():
                     st.error("⚠️ A data de término deve ser posterior à data de início!")
                 else:
                     # Checa duplicidade pelo número do contrato
-                    contratos_existentes = listar_contratos_cadastrados()
-                    duplicado = any(c.get("numero", "").strip().lower() == numero.strip().lower() for c in contratos_existentes)
+                    duplicado = get_contract_store().existe_numero(numero)
                     if duplicado:
                         st.error(f"⚠️ Já existe um contrato cadastrado com o número: {numero}. Verifique antes de prosseguir.")
                     else:
@@ -7,7 +7,7 @@ Sistema automático de alertas baseado em regras de negócio.
 import streamlit as st
 import sys
 from pathlib import Path
-from datetime import datetime
+from datetime import date, datetime
 import json
 
 sys.path.append(str(Path(__file__).parent.parent))
@@ -17,20 +17,26 @@ from ui.styles import apply_tjsp_styles
 from services.session_manager import initialize_session_state
 from services.contract_service import get_todos_contratos
 from services.alert_service import (
-    calcular_alertas, 
     get_alertas_por_tipo, 
     get_alertas_por_categoria,
     registrar_resolucao_alerta,
+    gravar_alerta_resolvido,
     STATUS_ATIVO,
     STATUS_RESOLVIDO
 )
+from services.alert_scheduler import get_alert_scheduler
+from services.dual_write_service import sincronizar_alertas_em_segundo_plano
 from services.alert_lifecycle_service import (
     listar_alertas_v2,
     criar_alerta_v2,
     transicionar_estado,
     registrar_acao,
     get_alerta_v2_por_id,
+    get_subarvore_alertas,
     get_estatisticas_alertas_v2,
+    calcular_scores_risco_lote,
+    resolver_alertas_lote,
+    unidade_de_trabalho,
     TIPO_PREVENTIVO,
     TIPO_CRITICO,
     CATEGORIA_VIGENCIA,
@@ -244,16 +250,20 @@ def main():
         # Carrega contratos e calcula alertas
         with st.spinner("Calculando alertas..."):
             contratos = get_todos_contratos()
-            alertas_contratuais = calcular_alertas(contratos)
+            avaliacao = get_alert_scheduler().avaliar_carteira()
+            alertas_contratuais = avaliacao['alertas']
+            sincronizar_alertas_em_segundo_plano(avaliacao['adicionados'])
             
             # Calcula alertas de execução físico-financeira
             alertas_ff_todos = []
             try:
-                from services.ff_alert_rules import compute_ff_alerts_for_contract
+                from services.ff_alert_rules import compute_ff_alerts
                 from services.alert_service import upsert_ff_alerts, merge_alertas_contratuais_e_ff
                 
+                # Uma leitura dos registros e uma avaliação vetorizada para a carteira toda
+                alertas_ff_por_contrato = compute_ff_alerts(c['id'] for c in contratos)
                 for contrato in contratos:
-                    alertas_ff_contrato = compute_ff_alerts_for_contract(contrato['id'])
+                    alertas_ff_contrato = alertas_ff_por_contrato.get(contrato['id'])
                     if alertas_ff_contrato:
                         # Enriquece com dados do contrato
                         alertas_ff_processados = upsert_ff_alerts(alertas_ff_contrato, contrato)
@@ -269,15 +279,18 @@ def main():
             # Carrega alertas V2 se modo ativo
             alertas_v2 = []
             if usar_v2:
+                # Scores de risco recalculados em lote uma vez por dia (BI e cards)
+                if st.session_state.get('scores_risco_v2_data') != date.today():
+                    calcular_scores_risco_lote()
+                    st.session_state['scores_risco_v2_data'] = date.today()
                 alertas_v2 = listar_alertas_v2()
                 # Se não houver alertas V2, criar alguns de exemplo baseados nos V1
                 if not alertas_v2 and alertas:
                     st.info("💡 Primeira vez no modo V2. Importando alguns alertas como exemplo...")
-                    from services.alert_lifecycle_service import importar_alerta_v1_para_v2
+                    from services.alert_lifecycle_service import importar_alertas_v1_para_v2_lote
                     # Importa até 3 alertas críticos como exemplo
                     alertas_criticos = [a for a in alertas if a.get('tipo') == 'critico'][:3]
-                    for alerta_v1 in alertas_criticos:
-                        importar_alerta_v1_para_v2(alerta_v1)
+                    importar_alertas_v1_para_v2_lote(alertas_criticos)
                     alertas_v2 = listar_alertas_v2()
             
             alertas_resolvidos = load_alertas_resolvidos()
@@ -447,19 +460,21 @@ def main():
                 if alerta:
                     def on_submit_acao(dados_acao):
                         usuario = st.session_state.get('usuario_atual', 'Gestor')
-                        acao = registrar_acao(
-                            alerta_id=alerta_id,
-                            tipo_acao=dados_acao['tipo_acao'],
-                            usuario=usuario,
-                            justificativa=dados_acao['justificativa'],
-                            decisao=dados_acao.get('decisao'),
-                            prazo_novo_dias=dados_acao.get('prazo_novo_dias'),
-                            documentos=dados_acao.get('documentos', [])
-                        )
-                        
-                        # Transiciona estado se necessário
-                        if 'decisao' in dados_acao['tipo_acao']:
-                            transicionar_estado(alerta_id, ESTADO_EM_ANALISE, usuario, "Decisão registrada")
+                        # Ação e transição gravadas no mesmo commit
+                        with unidade_de_trabalho():
+                            acao = registrar_acao(
+                                alerta_id=alerta_id,
+                                tipo_acao=dados_acao['tipo_acao'],
+                                usuario=usuario,
+                                justificativa=dados_acao['justificativa'],
+                                decisao=dados_acao.get('decisao'),
+                                prazo_novo_dias=dados_acao.get('prazo_novo_dias'),
+                                documentos=dados_acao.get('documentos', [])
+                            )
+                            
+                            # Transiciona estado se necessário
+                            if 'decisao' in dados_acao['tipo_acao']:
+                                transicionar_estado(alerta_id, ESTADO_EM_ANALISE, usuario, "Decisão registrada")
                         
                         st.success("✅ Ação registrada com sucesso!")
                         st.session_state.pop('acao_alerta_v2')
@@ -472,7 +487,7 @@ def main():
                 alerta = get_alerta_v2_por_id(alerta_id)
                 
                 if alerta:
-                    render_historico_alerta(alerta)
+                    render_historico_alerta(alerta, get_subarvore_alertas(alerta_id))
                     
                     if st.button("❌ Fechar", key="fechar_historico"):
                         st.session_state.pop('historico_alerta_v2')
@@ -517,6 +532,34 @@ def main():
                 else:
                     st.info(f"📊 Exibindo **{len(alertas_v2_filtrados)}** alerta(s)")
                     
+                    # Resolução em lote (um único commit)
+                    pendentes_v2 = [
+                        a for a in alertas_v2_filtrados
+                        if a.get('estado') not in [ESTADO_RESOLVIDO, 'encerrado']
+                    ]
+                    if pendentes_v2:
+                        with st.expander("✅ Resolver alertas em lote"):
+                            with st.form("form_resolver_lote_v2"):
+                                titulos_v2 = {a['id']: a.get('titulo', a['id']) for a in pendentes_v2}
+                                selecionados_v2 = st.multiselect(
+                                    "Alertas",
+                                    options=list(titulos_v2),
+                                    format_func=lambda alerta_id: titulos_v2[alerta_id]
+                                )
+                                justificativa_lote = st.text_area(
+                                    "Justificativa de resolução",
+                                    placeholder="Descreva como os alertas foram resolvidos...",
+                                    height=100
+                                )
+                                if st.form_submit_button("✅ Resolver selecionados", type="primary"):
+                                    if selecionados_v2 and justificativa_lote:
+                                        usuario = st.session_state.get('usuario_atual', 'Gestor')
+                                        total = resolver_alertas_lote(selecionados_v2, usuario, justificativa_lote)
+                                        st.success(f"✅ {total} alerta(s) resolvido(s)!")
+                                        st.rerun()
+                                    else:
+                                        st.warning("Selecione os alertas e informe a justificativa.")
+                    
                     def handle_action(acao, alerta):
                         if acao == 'ver_contrato':
                             contratos = get_todos_contratos()
@@ -679,8 +722,6 @@ def main():
         
         Este é um ATO ADMINISTRATIVO que será rastreado permanentemente.
         """
-        from pathlib import Path
-        
         # Busca o alerta completo
         alerta_atual = next((a for a in alertas_filtrados if a["id"] == alerta_id), None)
         if not alerta_atual:
@@ -714,11 +755,10 @@ def main():
                 metadata=resolucao
             )
             
-            # Persiste nos alertas resolvidos
-            Path("data").mkdir(parents=True, exist_ok=True)
+            # Persiste nos alertas resolvidos (e nos contadores de resoluções)
             resolvidos = load_alertas_resolvidos()
             if not any(r.get("id") == alerta_id for r in resolvidos):
-                resolvidos.append({
+                gravar_alerta_resolvido(resolvidos, {
                     "id": alerta_id,
                     "status": STATUS_RESOLVIDO,
                     "justificativa": justificativa,
@@ -728,8 +768,6 @@ def main():
                     "alerta_categoria": alerta_atual.get("categoria"),
                     "contrato_numero": alerta_atual.get("contrato_numero")
                 })
-                with open("data/alertas_resolvidos.json", "w") as f:
-                    json.dump(resolvidos, f, indent=2, ensure_ascii=False)
             
             st.session_state.pop("justificando_alerta", None)
             st.rerun()
@@ -16,6 +16,8 @@ from services.session_manager import initialize_session_state
 from services.email_service import get_email_service
 from services.contract_service import get_todos_contratos
 from services.alert_service import calcular_alertas
+from services.rule_engine import estatisticas_regras
+from services.dual_write_service import obter_auditoria, obter_estatisticas_dual_write
 
 
 def main():
@@ -36,7 +38,9 @@ def main():
     )
     
     # Tabs de configurações
-    tab1, tab2, tab3 = st.tabs(["📧 Notificações Email", "🧪 Testar Email", "📊 Histórico"])
+    tab1, tab2, tab3, tab4, tab5 = st.tabs([
+        "📧 Notificações Email", "🧪 Testar Email", "📊 Histórico", "⏱️ Regras de Alerta", "🔄 Dual Write"
+    ])
     
     # ===== TAB 1: CONFIGURAÇÕES DE EMAIL =====
     with tab1:
@@ -269,6 +273,76 @@ TJSP - Tribunal de Justiça do Estado de São Paulo
                 st.rerun()
         else:
             st.info("📭 Nenhum email enviado nesta sessão")
+    
+    # ===== TAB 4: DESEMPENHO DAS REGRAS DE ALERTA =====
+    with tab4:
+        st.markdown("### ⏱️ Desempenho das Regras de Alerta")
+        st.caption("Contadores acumulados desde o início do processo, da regra mais lenta para a mais rápida.")
+        
+        estatisticas = estatisticas_regras()
+        if any(e['avaliacoes'] for e in estatisticas):
+            st.dataframe(
+                [
+                    {
+                        "Motor": e['motor'],
+                        "Regra": e['regra'],
+                        "Avaliações": e['avaliacoes'],
+                        "Linhas avaliadas": e['linhas'],
+                        "Alertas disparados": e['disparos'],
+                        "Tempo total (ms)": round(e['tempo_s'] * 1000, 2),
+                    }
+                    for e in estatisticas
+                ],
+                hide_index=True,
+                use_container_width=True
+            )
+        else:
+            st.info("Nenhuma regra avaliada ainda nesta sessão. Abra o Dashboard ou a página de Alertas.")
+    
+    # ===== TAB 5: AUDITORIA DO DUAL WRITE (V1 → V2) =====
+    with tab5:
+        st.markdown("### 🔄 Sincronização V1 → V2 (Dual Write)")
+        st.caption("Contadores incrementais da auditoria e fila de sincronização em segundo plano.")
+        
+        stats_dw = obter_estatisticas_dual_write()
+        outbox = stats_dw['outbox']
+        
+        col_d1, col_d2, col_d3, col_d4 = st.columns(4)
+        with col_d1:
+            st.metric("Mapeamentos V1 ↔ V2", stats_dw['total_mapeamentos'])
+        with col_d2:
+            st.metric("Operações com sucesso", stats_dw['operacoes_sucesso'])
+        with col_d3:
+            st.metric("Operações com falha", stats_dw['operacoes_falha'], help=f"Taxa de sucesso: {stats_dw['taxa_sucesso']}")
+        with col_d4:
+            st.metric(
+                "Fila pendente", outbox['pendentes'],
+                help=(
+                    f"Em processamento: {outbox['em_processamento']} | "
+                    f"Atraso da mais antiga: {outbox['atraso_s']}s | Falhas definitivas: {outbox['falhas']}"
+                )
+            )
+        
+        st.markdown("#### 📜 Últimos registros da auditoria")
+        registros = obter_auditoria(limite=50)
+        if registros:
+            st.dataframe(
+                [
+                    {
+                        "Data/Hora": r.get('data'),
+                        "Operação": r.get('operacao'),
+                        "Status": "✅" if r.get('sucesso') else "❌",
+                        "V1": r.get('v1_id') or r.get('chave', ''),
+                        "V2": r.get('v2_id', ''),
+                        "Erro": r.get('erro', ''),
+                    }
+                    for r in reversed(registros)
+                ],
+                hide_index=True,
+                use_container_width=True
+            )
+        else:
+            st.info("Nenhuma operação de sincronização registrada ainda.")
 
 
 if __name__ == "__main__":
@@ -15,9 +15,12 @@ sys.path.append(str(Path(__file__).parent.parent))
 
 from ui.styles import apply_tjsp_styles
 from services.session_manager import initialize_session_state
-from services.contract_service import get_todos_contratos
+from services.contract_index import get_contract_index
+from services.contract_service import get_contratos_vencendo_entre
 from services.alert_service import calcular_alertas
+from services.dual_write_service import sincronizar_alertas_em_segundo_plano
 from services.tag_service import get_tag_service
+from components.contratos_ui import filtrar_contratos
 
 
 def render_metrics_fiscal(contratos_fiscal: list, alertas_fiscal: list):
@@ -130,28 +133,20 @@ def render_performance_charts(contratos_fiscal: list):
         hoje = datetime.now()
         seis_meses = hoje + timedelta(days=180)
         
-        vencimentos = []
-        for c in contratos_fiscal:
-            data_fim = c.get('data_fim')
-            if data_fim:
-                if isinstance(data_fim, str):
-                    try:
-                        data_fim = datetime.fromisoformat(data_fim)
-                    except:
-                        continue
-                
-                if hoje <= data_fim <= seis_meses:
-                    dias_restantes = (data_fim - hoje).days
-                    vencimentos.append({
-                        'Contrato': c.get('numero', 'N/A')[:20],
-                        'Data': data_fim.strftime('%d/%m/%Y'),
-                        'Dias': dias_restantes,
-                        'Valor': c.get('valor', 0)
-                    })
+        # Janela no índice de vigência da carteira, restrita aos contratos do fiscal
+        ids_fiscal = {c.get('id') for c in contratos_fiscal}
+        vencimentos = [
+            {
+                'Contrato': c.get('numero', 'N/A')[:20],
+                'Data': data_fim.strftime('%d/%m/%Y'),
+                'Dias': (data_fim - hoje).days,
+                'Valor': c.get('valor', 0)
+            }
+            for data_fim, c in get_contratos_vencendo_entre(hoje, seis_meses, incluir_fim=True)
+            if c.get('id') in ids_fiscal
+        ]
         
         if vencimentos:
-            vencimentos.sort(key=lambda x: x['Dias'])
-            
             # Gráfico
             import pandas as pd
             df_venc = pd.DataFrame(vencimentos[:10])
@@ -284,28 +279,13 @@ def render_contratos_lista(contratos_fiscal: list):
             key="filtro_tags_fiscal"
         )
     
-    # Aplica filtros
-    contratos_filtrados = contratos_fiscal
-    
-    if filtro_status_fiscal != "Todos":
-        status_map = {"Ativos": "ativo", "Atenção": "atencao", "Crítico": "critico"}
-        contratos_filtrados = [
-            c for c in contratos_filtrados 
-            if c.get('status') == status_map.get(filtro_status_fiscal)
-        ]
-    
-    if filtro_tipo_fiscal != "Todos":
-        contratos_filtrados = [
-            c for c in contratos_filtrados 
-            if c.get('tipo') == filtro_tipo_fiscal
-        ]
-    
-    if filtro_tags_fiscal:
-        contratos_filtrados = [
-            c for c in contratos_filtrados
-            if any(tag_id in [t['id'] for t in tag_service.obter_tags_do_contrato(c['id'])] 
-                   for tag_id in filtro_tags_fiscal)
-        ]
+    # Aplica filtros (interseção no índice de contratos)
+    contratos_filtrados = filtrar_contratos(
+        contratos_fiscal,
+        filtro_tags=filtro_tags_fiscal,
+        filtro_status=filtro_status_fiscal,
+        filtro_tipo=filtro_tipo_fiscal
+    )
     
     st.caption(f"Mostrando {len(contratos_filtrados)} de {len(contratos_fiscal)} contratos")
     st.markdown("---")
@@ -405,16 +385,8 @@ def main():
     
     st.markdown("---")
     
-    # Carrega dados
-    todos_contratos = get_todos_contratos()
-    
-    # Filtra contratos do fiscal
-    # Verifica se é fiscal titular ou substituto
-    contratos_fiscal = [
-        c for c in todos_contratos
-        if c.get('fiscal_titular') == fiscal_nome 
-        or c.get('fiscal_substituto') == fiscal_nome
-    ]
+    # Contratos do fiscal: titular, substituto ou fiscal de alguma comarca
+    contratos_fiscal = get_contract_index().contratos_do_fiscal(fiscal_nome)
     
     # Se não houver contratos, mostra mensagem
     if not contratos_fiscal:
@@ -441,16 +413,12 @@ def main():
         return
     
     # Calcula alertas do fiscal
-    alertas_fiscal = []
-    todos_alertas = calcular_alertas(contratos_fiscal)
-    for alerta in todos_alertas:
-        # Verifica se o alerta é de um contrato do fiscal
-        contrato_alerta = next(
-            (c for c in contratos_fiscal if c['id'] == alerta.get('contrato_id')),
-            None
-        )
-        if contrato_alerta:
-            alertas_fiscal.append(alerta)
+    ids_fiscal = {c['id'] for c in contratos_fiscal}
+    alertas_fiscal = [
+        alerta for alerta in calcular_alertas(contratos_fiscal)
+        if alerta.get('contrato_id') in ids_fiscal
+    ]
+    sincronizar_alertas_em_segundo_plano(alertas_fiscal)
     
     # Renderiza métricas
     render_metrics_fiscal(contratos_fiscal, alertas_fiscal)
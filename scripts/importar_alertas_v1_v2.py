@@ -0,0 +1,46 @@
+"""
+Script de Importação em Lote de Alertas V1 → V2
+================================================
+Calcula os alertas V1 de todos os contratos e importa para o ciclo de
+vida V2 os que ainda não possuem correspondente no mapeamento do dual
+write, com uma única gravação dos alertas e uma do mapeamento.
+
+Uso:
+    python scripts/importar_alertas_v1_v2.py [--simular]
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from services.alert_lifecycle_service import importar_alertas_v1_para_v2_lote
+from services.alert_service import calcular_alertas
+from services.contract_service import get_todos_contratos
+
+
+def importar_alertas(simular: bool = False):
+    """Executa a importação (ou a simulação) e imprime o resumo"""
+    print("=" * 70)
+    print("IMPORTAÇÃO DE ALERTAS V1 → V2" + (" (SIMULAÇÃO)" if simular else ""))
+    print("=" * 70)
+    
+    alertas_v1 = calcular_alertas(get_todos_contratos())
+    resultado = importar_alertas_v1_para_v2_lote(alertas_v1, simular=simular)
+    
+    if simular:
+        for item in resultado['diff']:
+            if item['acao'] == 'criar':
+                print(f"  + {item['v1_id']} → {item['tipo']}/{item['criticidade']} "
+                      f"({item['prazo_resposta_dias']}d) {item['titulo']}")
+    
+    verbo = "seriam importados" if simular else "importados"
+    print(f"\n✅ {resultado['importados']} alertas {verbo}")
+    print(f"↔️  Já mapeados: {resultado['existentes']} | Repetidos no lote: {resultado['duplicados']}")
+    print(f"⏱️  {len(alertas_v1)} alertas V1 em {resultado['segundos']}s "
+          f"({resultado['alertas_por_segundo']} alertas/s)")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    importar_alertas(simular="--simular" in sys.argv)
@@ -3,14 +3,51 @@ Script de Importação de Contratos do PNCP
 ==========================================
 Importa contratos do Excel exportado do BI do PNCP para o sistema.
 
+A planilha é lida em modo streaming (openpyxl read-only), em lotes de
+linhas; cada lote é convertido de forma vetorizada (pandas) e gravado com
+upsert por controle_pncp, de modo que reimportações do export estadual só
+tocam as linhas novas ou alteradas.
+
 Uso:
-    python scripts/importar_contratos_pncp.py
+    python scripts/importar_contratos_pncp.py [--arquivo caminho.xlsx] [--lote 5000]
 """
 
-import pandas as pd
-import json
+import argparse
+import heapq
+import re
+import sys
+import time
 from pathlib import Path
 from datetime import datetime
+from typing import Dict, Iterator, List
+
+import pandas as pd
+from openpyxl import load_workbook
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from services.contract_store import get_contract_store
+
+
+ARQUIVO_PADRAO = Path("data/importacao/contratos_pncp.xlsx")
+
+# Linhas de cabeçalho do BI antes da linha com os nomes das colunas
+LINHAS_CABECALHO = 2
+
+TAMANHO_LOTE = 5000
+
+SITUACAO_VIGENTE = "Divulgada no PNCP"
+
+# Campos de origem PNCP: comparados e atualizados na reimportação.
+# Datas, vigência e tipo são estimativas ajustadas manualmente depois,
+# por isso só são preenchidos na primeira importação.
+CAMPOS_PNCP = [
+    "numero", "objeto", "valor", "modalidade", "amparo_legal",
+    "link_pncp", "comarca_detectada", "controle_pncp"
+]
+
+PADRAO_RAJ = r'RAJ\s*(\d+)'
+PADRAO_COMARCA = r'comarca[s]?\s+(?:de\s+)?([A-ZÀ-Ú][a-zà-ú\s]+)'
 
 
 def limpar_valor(valor):
@@ -23,158 +60,215 @@ def limpar_valor(valor):
 def extrair_comarca_objeto(objeto):
     """Tenta extrair comarca do objeto do contrato"""
     # Padrões comuns: "RAJ X", "comarca de X", etc
-    import re
-    
-    # Procura por RAJ
-    raj_match = re.search(r'RAJ\s*(\d+)', objeto, re.IGNORECASE)
-    if raj_match:
-        return f"RAJ {raj_match.group(1)}"
-    
-    # Procura por nome de comarca
-    comarca_match = re.search(r'comarca[s]?\s+(?:de\s+)?([A-ZÀ-Ú][a-zà-ú\s]+)', objeto, re.IGNORECASE)
-    if comarca_match:
-        return comarca_match.group(1).strip()
-    
-    return "Não especificada"
-
-
-def importar_contratos_pncp():
+    return extrair_comarcas(pd.Series([objeto])).iloc[0]
+
+
+def extrair_comarcas(objetos: pd.Series) -> pd.Series:
+    """
+    Versão vetorizada de extrair_comarca_objeto (regex sobre a coluna inteira).
+
+    Args:
+        objetos: Série com o texto do objeto da compra
+
+    Returns:
+        Série com "RAJ N", o nome da comarca ou "Não especificada"
+    """
+    objetos = objetos.fillna("").astype(str)
+    raj = objetos.str.extract(PADRAO_RAJ, flags=re.IGNORECASE)[0]
+    comarca = objetos.str.extract(PADRAO_COMARCA, flags=re.IGNORECASE)[0].str.strip()
+
+    resultado = pd.Series("Não especificada", index=objetos.index, dtype=object)
+    resultado = resultado.mask(comarca.notna(), comarca)
+    resultado = resultado.mask(raj.notna(), "RAJ " + raj)
+    return resultado
+
+
+# ========================================
+# LEITURA EM STREAMING
+# ========================================
+
+def ler_lotes(excel_path: Path, tamanho_lote: int = TAMANHO_LOTE) -> Iterator[pd.DataFrame]:
+    """
+    Lê a planilha do BI em lotes, sem carregá-la inteira em memória.
+
+    Args:
+        excel_path: Arquivo .xlsx exportado do BI do PNCP
+        tamanho_lote: Quantidade de linhas por lote
+
+    Yields:
+        DataFrames com as colunas do relatório
+    """
+    wb = load_workbook(excel_path, read_only=True, data_only=True)
+    try:
+        linhas = wb.active.iter_rows(min_row=LINHAS_CABECALHO + 1, values_only=True)
+        colunas = [str(c) if c is not None else f"coluna_{i}" for i, c in enumerate(next(linhas, ()))]
+
+        lote = []
+        for linha in linhas:
+            if not any(v is not None for v in linha):
+                continue
+            lote.append(linha)
+            if len(lote) >= tamanho_lote:
+                yield pd.DataFrame(lote, columns=colunas)
+                lote = []
+        if lote:
+            yield pd.DataFrame(lote, columns=colunas)
+    finally:
+        wb.close()
+
+
+def _coluna(df: pd.DataFrame, nome: str) -> pd.Series:
+    """Coluna do relatório (ou série vazia, se o BI não a exportou)"""
+    if nome in df.columns:
+        return df[nome]
+    return pd.Series([None] * len(df), index=df.index, dtype=object)
+
+
+# ========================================
+# CONVERSÃO VETORIZADA
+# ========================================
+
+def converter_lote(df: pd.DataFrame, agora: datetime = None) -> List[Dict]:
+    """
+    Converte um lote do relatório para o formato de contrato do sistema.
+
+    Args:
+        df: Lote lido da planilha (já filtrado por situação)
+        agora: Data de referência para ultima_atualizacao e datas ausentes
+
+    Returns:
+        Lista de contratos no formato legado (datas em ISO)
+    """
+    if df.empty:
+        return []
+    agora = agora or datetime.now()
+
+    controle = _coluna(df, "Controle PNCP").fillna("").astype(str)
+
+    # Data de publicação (ausente → agora); fim estimado em 1 ano após início
+    data_inicio = pd.to_datetime(_coluna(df, "Data Publicação PNCP"), errors="coerce").fillna(pd.Timestamp(agora))
+    data_fim = (data_inicio + pd.DateOffset(years=1)).dt.normalize()
+
+    # Valor (prioriza homologado, senão estimado)
+    homologado = pd.to_numeric(_coluna(df, "Soma de Valor Total Homologado"), errors="coerce").fillna(0.0)
+    estimado = pd.to_numeric(_coluna(df, "Soma de Valor Total Estimado"), errors="coerce").fillna(0.0)
+    valor = homologado.where(homologado > 0, estimado).astype(float)
+
+    objeto = _coluna(df, "Objeto da Compra").fillna("Não especificado").astype(str).str.slice(0, 500)
+    numero = _coluna(df, "Nº do Processo").where(lambda s: s.notna(), controle.str.replace("/", "_")).astype(str)
+    tipo = objeto.str.lower().str.contains("serviço", regex=False).map({True: "Serviços", False: "Fornecimento"})
+
+    convertido = pd.DataFrame({
+        "id": "PNCP_" + controle.str.replace("/", "_"),
+        "numero": numero,
+        "tipo": tipo,
+        "fornecedor": "A definir",  # PNCP não tem fornecedor neste relatório
+        "objeto": objeto,
+        "vigencia": data_inicio.dt.strftime("%d/%m/%Y") + " a " + data_fim.dt.strftime("%d/%m/%Y"),
+        "valor": valor,
+        "status": "ativo",
+        "data_inicio": data_inicio.dt.strftime("%Y-%m-%dT%H:%M:%S"),
+        "data_fim": data_fim.dt.strftime("%Y-%m-%dT%H:%M:%S"),
+        "fiscal_titular": "A definir",
+        "fiscal_substituto": "A definir",
+        "ultima_atualizacao": agora.isoformat(),
+
+        # Metadados do PNCP
+        "fonte": "PNCP",
+        "controle_pncp": controle,
+        "modalidade": _coluna(df, "Modalidade").fillna("Não especificada").astype(str),
+        "amparo_legal": _coluna(df, "Amparo Legal").fillna("").astype(str),
+        "link_pncp": _coluna(df, "Link Sistema Origem").fillna("").astype(str),
+        "comarca_detectada": extrair_comarcas(objeto),
+    }, index=df.index)
+
+    contratos = convertido.to_dict("records")
+    for contrato in contratos:
+        # Inicializa sem aditivos
+        contrato["aditivos"] = []
+        contrato["total_aditivos"] = 0
+    return contratos
+
+
+# ========================================
+# IMPORTAÇÃO
+# ========================================
+
+def importar_contratos_pncp(excel_path: Path = ARQUIVO_PADRAO, tamanho_lote: int = TAMANHO_LOTE) -> Dict[str, int]:
     """
     Importa contratos do Excel do PNCP para o sistema
+
+    Returns:
+        Dict com contagens da importação (lidos, vigentes, inseridos,
+        atualizados, inalterados)
     """
     print("=" * 70)
     print("IMPORTAÇÃO DE CONTRATOS DO PNCP")
     print("=" * 70)
-    
-    # Caminhos
-    excel_path = Path("data/importacao/contratos_pncp.xlsx")
-    json_path = Path("data/contratos_cadastrados.json")
-    
-    # Lê Excel (pula 2 primeiras linhas de cabeçalho)
-    print(f"\n📂 Lendo arquivo: {excel_path}")
-    df = pd.read_excel(excel_path, skiprows=2)
-    print(f"✅ {len(df)} registros encontrados")
-    
-    # Filtra apenas contratos vigentes (não revogados/anulados)
-    print("\n🔍 Filtrando contratos vigentes...")
-    df_vigentes = df[df['Situação'] == 'Divulgada no PNCP'].copy()
-    print(f"✅ {len(df_vigentes)} contratos vigentes")
-    print(f"❌ {len(df) - len(df_vigentes)} contratos excluídos (revogados/anulados)")
-    
-    # Carrega contratos já cadastrados (se existirem)
-    if json_path.exists():
-        with open(json_path, 'r', encoding='utf-8') as f:
-            contratos_existentes = json.load(f)
-        print(f"\n📋 {len(contratos_existentes)} contratos já cadastrados no sistema")
-    else:
-        contratos_existentes = []
-        print("\n📋 Nenhum contrato cadastrado anteriormente")
-    
-    # Converte para lista de contratos
-    print("\n🔄 Convertendo dados do PNCP para formato do sistema...")
-    contratos_importados = []
-    
-    for idx, row in df_vigentes.iterrows():
-        # Gera ID único
-        controle_pncp = str(row.get('Controle PNCP', '')).replace('/', '_')
-        contrato_id = f"PNCP_{controle_pncp}"
-        
-        # Extrai data de publicação
-        data_pub = row.get('Data Publicação PNCP')
-        if pd.notna(data_pub):
-            if isinstance(data_pub, str):
-                data_inicio = datetime.fromisoformat(data_pub)
-            else:
-                data_inicio = data_pub
-        else:
-            data_inicio = datetime.now()
-        
-        # Estima data fim (1 ano após início - ajustar depois manualmente)
-        data_fim = datetime(data_inicio.year + 1, data_inicio.month, data_inicio.day)
-        
-        # Valor (prioriza homologado, senão estimado)
-        valor_homologado = limpar_valor(row.get('Soma de Valor Total Homologado'))
-        valor_estimado = limpar_valor(row.get('Soma de Valor Total Estimado'))
-        valor = valor_homologado if valor_homologado > 0 else valor_estimado
-        
-        # Extrai informações
-        numero = row.get('Nº do Processo', controle_pncp)
-        objeto = str(row.get('Objeto da Compra', 'Não especificado'))[:500]  # Limita
-        modalidade = str(row.get('Modalidade', 'Não especificada'))
-        
-        # Tenta extrair comarca
-        comarca = extrair_comarca_objeto(objeto)
-        
-        # Monta contrato
-        contrato = {
-            "id": contrato_id,
-            "numero": f"{numero}",
-            "tipo": "Serviços" if "serviço" in objeto.lower() else "Fornecimento",
-            "fornecedor": "A definir",  # PNCP não tem fornecedor neste relatório
-            "objeto": objeto,
-            "vigencia": f"{data_inicio.strftime('%d/%m/%Y')} a {data_fim.strftime('%d/%m/%Y')}",
-            "valor": valor,
-            "status": "ativo",
-            "data_inicio": data_inicio.isoformat(),
-            "data_fim": data_fim.isoformat(),
-            "fiscal_titular": "A definir",
-            "fiscal_substituto": "A definir",
-            "ultima_atualizacao": datetime.now().isoformat(),
-            
-            # Metadados do PNCP
-            "fonte": "PNCP",
-            "controle_pncp": row.get('Controle PNCP', ''),
-            "modalidade": modalidade,
-            "amparo_legal": str(row.get('Amparo Legal', '')),
-            "link_pncp": str(row.get('Link Sistema Origem', '')),
-            "comarca_detectada": comarca,
-            
-            # Inicializa sem aditivos
-            "aditivos": [],
-            "total_aditivos": 0
-        }
-        
-        contratos_importados.append(contrato)
-    
-    print(f"✅ {len(contratos_importados)} contratos convertidos")
-    
-    # Combina com contratos existentes (evita duplicação)
-    print("\n🔗 Mesclando com contratos existentes...")
-    ids_existentes = {c['id'] for c in contratos_existentes}
-    novos = [c for c in contratos_importados if c['id'] not in ids_existentes]
-    
-    todos_contratos = contratos_existentes + novos
-    
-    print(f"✅ {len(novos)} contratos novos adicionados")
-    print(f"⚠️  {len(contratos_importados) - len(novos)} contratos já existiam (não duplicados)")
-    
-    # Salva JSON
-    print(f"\n💾 Salvando em: {json_path}")
-    json_path.parent.mkdir(parents=True, exist_ok=True)
-    
-    with open(json_path, 'w', encoding='utf-8') as f:
-        json.dump(todos_contratos, f, ensure_ascii=False, indent=2)
-    
-    print(f"✅ Arquivo salvo com {len(todos_contratos)} contratos")
-    
+
+    store = get_contract_store()
+    total_antes = store.total_contratos()
+    print(f"\n📋 {total_antes} contratos já cadastrados no sistema")
+
+    print(f"\n📂 Lendo arquivo em lotes de {tamanho_lote}: {excel_path}")
+    inicio = time.perf_counter()
+    agora = datetime.now()
+
+    totais = {"lidos": 0, "vigentes": 0, "inseridos": 0, "atualizados": 0, "inalterados": 0}
+    top5 = []
+
+    for n_lote, df in enumerate(ler_lotes(Path(excel_path), tamanho_lote), 1):
+        totais["lidos"] += len(df)
+
+        # Filtra apenas contratos vigentes (não revogados/anulados)
+        df_vigentes = df[_coluna(df, "Situação") == SITUACAO_VIGENTE]
+        totais["vigentes"] += len(df_vigentes)
+
+        contratos = converter_lote(df_vigentes, agora)
+        resultado = store.upsert_por_controle_pncp(contratos, CAMPOS_PNCP)
+        for chave, quantidade in resultado.items():
+            totais[chave] += quantidade
+
+        top5 = heapq.nlargest(5, top5 + contratos, key=lambda c: c["valor"])
+
+        decorrido = time.perf_counter() - inicio
+        print(
+            f"   lote {n_lote}: {totais['lidos']} linhas "
+            f"({totais['lidos'] / decorrido:,.0f} linhas/s) — "
+            f"+{resultado['inseridos']} novos, ~{resultado['atualizados']} alterados"
+        )
+
+    decorrido = time.perf_counter() - inicio
+    excluidos = totais["lidos"] - totais["vigentes"]
+
+    print(f"\n✅ {totais['lidos']} registros lidos em {decorrido:.2f}s "
+          f"({totais['lidos'] / decorrido if decorrido else 0:,.0f} linhas/s)")
+    print(f"✅ {totais['vigentes']} contratos vigentes")
+    print(f"❌ {excluidos} contratos excluídos (revogados/anulados)")
+    print(f"✅ {totais['inseridos']} contratos novos adicionados")
+    print(f"🔄 {totais['atualizados']} contratos atualizados (mudança nos dados do PNCP)")
+    print(f"⚠️  {totais['inalterados']} contratos já existiam sem alterações")
+
     # Estatísticas
     print("\n" + "=" * 70)
     print("📊 ESTATÍSTICAS DA IMPORTAÇÃO")
     print("=" * 70)
-    print(f"Total de contratos no sistema: {len(todos_contratos)}")
-    print(f"Contratos do PNCP: {len([c for c in todos_contratos if c.get('fonte') == 'PNCP'])}")
-    print(f"Contratos cadastrados manualmente: {len([c for c in todos_contratos if c.get('fonte') != 'PNCP'])}")
-    
-    # Top 5 por valor
+    print(f"Total de contratos no sistema: {store.total_contratos()}")
+
     print("\n💰 TOP 5 CONTRATOS POR VALOR:")
-    top5 = sorted(novos, key=lambda x: x['valor'], reverse=True)[:5]
     for i, c in enumerate(top5, 1):
         print(f"{i}. {c['numero']}: R$ {c['valor']:,.2f}")
         print(f"   {c['objeto'][:80]}...")
-    
+
     print("\n✅ IMPORTAÇÃO CONCLUÍDA COM SUCESSO!")
     print("=" * 70)
+    return totais
 
 
 if __name__ == "__main__":
-    importar_contratos_pncp()
+    parser = argparse.ArgumentParser(description="Importa contratos do export do BI do PNCP")
+    parser.add_argument("--arquivo", type=Path, default=ARQUIVO_PADRAO, help="Planilha .xlsx exportada do BI")
+    parser.add_argument("--lote", type=int, default=TAMANHO_LOTE, help="Linhas por lote de leitura/gravação")
+    args = parser.parse_args()
+
+    importar_contratos_pncp(args.arquivo, args.lote)
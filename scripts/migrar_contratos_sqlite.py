@@ -0,0 +1,41 @@
+"""
+Script de Migração de Contratos para SQLite
+============================================
+Copia data/contratos_cadastrados.json para o armazenamento SQLite
+(data/contratos.db). A migração também ocorre automaticamente na primeira
+abertura do banco; este script serve para reexecutá-la manualmente.
+
+Uso:
+    python scripts/migrar_contratos_sqlite.py [--forcar]
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from services.contract_store import ContractStore, CONTRATOS_JSON_LEGADO
+
+
+def migrar_contratos(forcar: bool = False):
+    """Executa a migração única do JSON legado"""
+    print("=" * 70)
+    print("MIGRAÇÃO DE CONTRATOS: JSON → SQLite")
+    print("=" * 70)
+    
+    store = ContractStore()
+    
+    if store.migracao_concluida() and not forcar:
+        print(f"\nℹ️  Migração já realizada ({store.total_contratos()} contratos em {store.db_path})")
+        print("   Use --forcar para reimportar o JSON.")
+        return
+    
+    total = store.migrar_de_json(CONTRATOS_JSON_LEGADO, forcar=forcar)
+    
+    print(f"\n✅ {total} contratos migrados de {CONTRATOS_JSON_LEGADO}")
+    print(f"💾 Banco: {store.db_path} ({store.total_contratos()} contratos)")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    migrar_contratos(forcar="--forcar" in sys.argv)
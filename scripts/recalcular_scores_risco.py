@@ -0,0 +1,55 @@
+"""
+Script de Recálculo dos Scores de Risco (Alertas V2)
+=====================================================
+Recalcula score_risco e fatores_risco de todos os alertas V2 em lote.
+Pensado para execução noturna (cron), mantendo os indicadores de risco
+do BI atualizados mesmo sem acesso à página de Alertas. Antes do cálculo,
+os snapshots de estado são reconstruídos a partir do log de transições;
+em seguida, os contadores materializados das estatísticas são conferidos
+e refeitos a partir das tabelas.
+
+Uso:
+    python scripts/recalcular_scores_risco.py
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from services.alert_lifecycle_service import (
+    calcular_scores_risco_lote,
+    reconstruir_estados_alertas_v2,
+    verificar_contadores_alertas_v2
+)
+
+
+def recalcular_scores():
+    """Executa o recálculo em lote e imprime um resumo"""
+    print("=" * 70)
+    print("RECÁLCULO DE SCORES DE RISCO - ALERTAS V2")
+    print("=" * 70)
+    
+    corrigidos = reconstruir_estados_alertas_v2()
+    print(f"\n🔁 Snapshots de estado corrigidos pelo log: {corrigidos}")
+    
+    divergencias = verificar_contadores_alertas_v2()
+    print(f"🧮 Contadores das estatísticas divergentes (reconstruídos): {len(divergencias)}")
+    for d in divergencias:
+        print(f"   - {d['dimensao']}={d['valor']}: {d['materializado']} → {d['recalculado']}")
+    
+    scores = calcular_scores_risco_lote()
+    
+    if not scores:
+        print("\nℹ️  Nenhum alerta V2 encontrado.")
+        return
+    
+    risco_alto = sum(1 for s in scores.values() if s > 0.7)
+    print(f"\n✅ {len(scores)} alertas recalculados")
+    print(f"⚠️  Risco médio: {sum(scores.values()) / len(scores):.3f}")
+    print(f"🔴 Risco alto (> 0.7): {risco_alto}")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    recalcular_scores()
@@ -0,0 +1,56 @@
+"""
+Script de Reconciliação V1 ↔ V2 do Dual Write
+==============================================
+Compara por contrato os checksums de vínculos do mapeamento e dos alertas
+V2; só os contratos alterados desde a última execução são conferidos, e
+só os divergentes são abertos ID a ID. Leve o bastante para rodar a cada
+poucos minutos (cron).
+
+Uso:
+    python scripts/reconciliar_dual_write.py [--reparar]
+
+Com --reparar, os vínculos órfãos são removidos, os alertas V2 sem
+mapeamento são registrados e os alertas V1 órfãos são recriados pelo
+caminho em lote.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from services.alert_service import calcular_alertas
+from services.contract_service import get_todos_contratos
+from services.dual_write_service import reconciliar_integridade
+
+
+def reconciliar(reparar: bool = False):
+    """Executa a reconciliação e imprime as divergências"""
+    print("=" * 70)
+    print("RECONCILIAÇÃO V1 ↔ V2" + (" (COM REPARO)" if reparar else ""))
+    print("=" * 70)
+
+    alertas_v1 = calcular_alertas(get_todos_contratos()) if reparar else None
+    resultado = reconciliar_integridade(reparar=reparar, alertas_v1=alertas_v1)
+
+    for divergencia in resultado['divergencias']:
+        print(f"\n📁 Contrato {divergencia['contrato_id'] or '(sem contrato)'}")
+        for orfao in divergencia['orfaos_no_mapeamento']:
+            print(f"  ✗ órfão: V1={orfao['v1_id']} → V2={orfao['v2_id']} (inexistente)")
+        for item in divergencia['v2_sem_mapeamento']:
+            print(f"  ✗ sem mapeamento: V2={item['v2_id']} (V1={item['v1_id']})")
+
+    print(f"\n🔎 {resultado['contratos_verificados']} de {resultado['contratos']} contratos conferidos")
+    print(f"↔️  Vínculos: {resultado['vinculos_mapeamento']} no mapeamento | {resultado['vinculos_v2']} no V2")
+    if resultado['reparo']:
+        reparo = resultado['reparo']
+        print(f"🔧 Removidos: {reparo['mapeamentos_removidos']} | Registrados: {reparo['mapeamentos_registrados']} "
+              f"| Recriados: {reparo['alertas_recriados']}")
+    print("\n✅ Integridade OK" if resultado['integridade_ok'] else "\n⚠️  Divergências encontradas")
+    print("=" * 70)
+
+    return 0 if resultado['integridade_ok'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(reconciliar(reparar="--reparar" in sys.argv))
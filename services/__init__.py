@@ -21,7 +21,12 @@ from .dual_write_service import (
     registrar_mapeamento,
     obter_estatisticas_mapeamento,
     obter_estatisticas_dual_write,
-    validar_integridade
+    validar_integridade,
+    reconciliar_integridade,
+    enfileirar_criacao_alerta,
+    enfileirar_resolucao,
+    enfileirar_acao,
+    obter_metricas_outbox
 )
 from .contract_service import (
     get_contratos_mock,
@@ -49,6 +54,11 @@ __all__ = [
         'obter_estatisticas_mapeamento',
         'obter_estatisticas_dual_write',
         'validar_integridade',
+        'reconciliar_integridade',
+        'enfileirar_criacao_alerta',
+        'enfileirar_resolucao',
+        'enfileirar_acao',
+        'obter_metricas_outbox',
         'buscar_v2_por_v1',
     'initialize_session_state',
     'reset_chat_history',
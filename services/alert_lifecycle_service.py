@@ -14,14 +14,27 @@ COMPATIBILIDADE:
 - Lê dados V1 sem modificá-los
 - Permite migração gradual
 - Mantém integridade referencial
+
+PERSISTÊNCIA:
+- SQLite via AlertLifecycleStore (services/alert_lifecycle_store.py);
+  os JSON legados são migrados na primeira abertura
+- Alertas resolvidos/encerrados há mais de DIAS_RETENCAO_QUENTE dias vão
+  automaticamente (uma vez por dia) para a camada fria mensal; listagens
+  do dia a dia só leem alertas em aberto e recentes
 """
 
-from datetime import datetime, timedelta
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
 from typing import List, Dict, Optional, Tuple
 from pathlib import Path
-import json
+import time
 import uuid
 
+import numpy as np
+
+from services.alert_lifecycle_store import get_alert_lifecycle_store
+from services.stage_durations import ModeloDuracoes
+
 # ========================================
 # CONSTANTES
 # ========================================
@@ -63,44 +76,35 @@ CRITICIDADE_MEDIA = "media"
 CRITICIDADE_ALTA = "alta"
 CRITICIDADE_URGENTE = "urgente"
 
-# Caminhos dos arquivos
+# Estados terminais e retenção na camada quente antes do arquivamento
+ESTADOS_TERMINAIS = (ESTADO_RESOLVIDO, ESTADO_ENCERRADO)
+DIAS_RETENCAO_QUENTE = 30
+
+# Arquivos JSON legados (migrados para o SQLite na primeira abertura)
 DATA_DIR = Path(__file__).parent.parent / "data"
 ALERTAS_V2_FILE = DATA_DIR / "alertas_ciclo_vida.json"
 ACOES_FILE = DATA_DIR / "acoes_alertas.json"
 
 
 # ========================================
-# FUNÇÕES DE PERSISTÊNCIA
+# UNIDADE DE TRABALHO
 # ========================================
 
-def _load_alertas_v2() -> List[Dict]:
-    """Carrega alertas V2 do arquivo JSON"""
-    if ALERTAS_V2_FILE.exists():
-        with open(ALERTAS_V2_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return []
-
-
-def _save_alertas_v2(alertas: List[Dict]):
-    """Salva alertas V2 no arquivo JSON"""
-    ALERTAS_V2_FILE.parent.mkdir(parents=True, exist_ok=True)
-    with open(ALERTAS_V2_FILE, 'w', encoding='utf-8') as f:
-        json.dump(alertas, f, indent=2, ensure_ascii=False, default=str)
-
-
-def _load_acoes() -> List[Dict]:
-    """Carrega ações registradas do arquivo JSON"""
-    if ACOES_FILE.exists():
-        with open(ACOES_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return []
-
-
-def _save_acoes(acoes: List[Dict]):
-    """Salva ações no arquivo JSON"""
-    ACOES_FILE.parent.mkdir(parents=True, exist_ok=True)
-    with open(ACOES_FILE, 'w', encoding='utf-8') as f:
-        json.dump(acoes, f, indent=2, ensure_ascii=False, default=str)
+@contextmanager
+def unidade_de_trabalho():
+    """
+    Agrupa operações do ciclo de vida em um único commit.
+    
+    Ações, transições e alertas derivados criados dentro do bloco são
+    gravados juntos ao final; se ocorrer exceção, nada é gravado.
+    
+    Exemplo:
+        with unidade_de_trabalho():
+            registrar_acao(alerta_id, ACAO_DECISAO_RENOVAR, usuario, justificativa)
+            transicionar_estado(alerta_id, ESTADO_EM_ANALISE, usuario)
+    """
+    with get_alert_lifecycle_store().unidade_de_trabalho():
+        yield
 
 
 # ========================================
@@ -141,6 +145,55 @@ def criar_alerta_v2(
     Returns:
         Dicionário com o alerta criado
     """
+    alerta = _montar_alerta_v2(
+        tipo, categoria, titulo, descricao, contrato_id, contrato_numero,
+        responsavel, prazo_resposta_dias, criticidade, alerta_origem_id,
+        geracao, metadados
+    )
+    
+    # Salva o alerta
+    get_alert_lifecycle_store().inserir_alertas([alerta])
+    
+    return alerta
+
+
+def criar_alertas_v2_lote(lista_parametros: List[Dict]) -> List[Dict]:
+    """
+    Cria vários alertas V2 em uma única transação.
+    
+    Usado pela sincronização em lote do dual write: em vez de uma
+    transação por alerta, todos os alertas novos são inseridos de uma vez.
+    
+    Args:
+        lista_parametros: Lista de dicts com os mesmos parâmetros de criar_alerta_v2()
+        
+    Returns:
+        Lista dos alertas criados, na mesma ordem dos parâmetros
+    """
+    if not lista_parametros:
+        return []
+    
+    novos = [_montar_alerta_v2(**parametros) for parametros in lista_parametros]
+    get_alert_lifecycle_store().inserir_alertas(novos)
+    
+    return novos
+
+
+def _montar_alerta_v2(
+    tipo: str,
+    categoria: str,
+    titulo: str,
+    descricao: str,
+    contrato_id: str,
+    contrato_numero: str,
+    responsavel: str,
+    prazo_resposta_dias: int,
+    criticidade: str = CRITICIDADE_MEDIA,
+    alerta_origem_id: Optional[str] = None,
+    geracao: int = 1,
+    metadados: Optional[Dict] = None
+) -> Dict:
+    """Monta o dicionário de um alerta V2 novo (sem persistir)"""
     agora = datetime.now()
     prazo_resposta = agora + timedelta(days=prazo_resposta_dias)
     
@@ -196,21 +249,12 @@ def criar_alerta_v2(
         'versao': 2
     }
     
-    # Salva o alerta
-    alertas = _load_alertas_v2()
-    alertas.append(alerta)
-    _save_alertas_v2(alertas)
-    
     return alerta
 
 
 def get_alerta_v2_por_id(alerta_id: str) -> Optional[Dict]:
     """Busca um alerta V2 pelo ID"""
-    alertas = _load_alertas_v2()
-    for alerta in alertas:
-        if alerta['id'] == alerta_id:
-            return alerta
-    return None
+    return get_alert_lifecycle_store().obter_alerta(alerta_id)
 
 
 def listar_alertas_v2(
@@ -229,24 +273,79 @@ def listar_alertas_v2(
         responsavel: Filtrar por responsável
         
     Returns:
-        Lista de alertas filtrados
+        Lista de alertas filtrados (sem 'historico_estados', lido sob
+        demanda por get_alerta_v2_por_id ou get_historico_estados).
+        Alertas arquivados na camada fria não entram; ver
+        listar_alertas_arquivados()
     """
-    alertas = _load_alertas_v2()
+    _arquivar_se_necessario()
     
-    # Aplica filtros
-    if contrato_id:
-        alertas = [a for a in alertas if a['contrato_id'] == contrato_id]
-    if estado:
-        alertas = [a for a in alertas if a['estado'] == estado]
-    if tipo:
-        alertas = [a for a in alertas if a['tipo'] == tipo]
-    if responsavel:
-        alertas = [a for a in alertas if a['responsavel'] == responsavel]
+    # Filtros aplicados no SQL (colunas indexadas)
+    alertas = get_alert_lifecycle_store().listar_alertas(
+        contrato_id=contrato_id,
+        estado=estado,
+        tipo=tipo,
+        responsavel=responsavel
+    )
     
     # Atualiza dias_restantes e ordena por criticidade
     return _ordenar_por_criticidade(_atualizar_dias_restantes(alertas))
 
 
+def listar_alertas_arquivados(
+    desde: datetime,
+    ate: Optional[datetime] = None,
+    contrato_id: Optional[str] = None
+) -> List[Dict]:
+    """
+    Lista alertas encerrados da camada fria em um intervalo de tempo.
+    
+    Só os meses de encerramento do intervalo são lidos.
+    
+    Args:
+        desde: Início do intervalo (data de encerramento)
+        ate: Fim do intervalo (padrão: sem limite)
+        contrato_id: Filtrar por contrato
+        
+    Returns:
+        Alertas arquivados encerrados no intervalo
+    """
+    alertas = get_alert_lifecycle_store().listar_arquivados(
+        desde.strftime('%Y-%m'),
+        ate.strftime('%Y-%m') if ate else None,
+        contrato_id=contrato_id
+    )
+    inicio = desde.isoformat()
+    fim = ate.isoformat() if ate else None
+    return [
+        a for a in alertas
+        if a.get('data_ultima_atualizacao', '') >= inicio
+        and (fim is None or a.get('data_ultima_atualizacao', '') <= fim)
+    ]
+
+
+def arquivar_alertas_encerrados(
+    dias_retencao: int = DIAS_RETENCAO_QUENTE,
+    agora: Optional[datetime] = None
+) -> int:
+    """
+    Move para a camada fria os alertas encerrados há mais de dias_retencao.
+    
+    Returns:
+        Quantidade de alertas arquivados
+    """
+    agora = agora or datetime.now()
+    return get_alert_lifecycle_store().arquivar_encerrados(
+        ESTADOS_TERMINAIS, agora - timedelta(days=dias_retencao)
+    )
+
+
+def _arquivar_se_necessario():
+    """Arquivamento automático, no máximo uma vez por dia por processo"""
+    if get_alert_lifecycle_store().arquivado_em != date.today():
+        arquivar_alertas_encerrados()
+
+
 def _atualizar_dias_restantes(alertas: List[Dict]) -> List[Dict]:
     """Atualiza o campo dias_restantes de cada alerta"""
     agora = datetime.now()
@@ -296,35 +395,120 @@ def transicionar_estado(
     Returns:
         True se transição foi bem-sucedida
     """
-    alertas = _load_alertas_v2()
-    alerta_encontrado = False
+    def _transicionar(alerta: Dict) -> Dict:
+        estado_anterior = alerta['estado']
+        agora = datetime.now()
+        
+        # Atualiza o alerta
+        alerta['estado_anterior'] = estado_anterior
+        alerta['estado'] = novo_estado
+        alerta['data_ultima_atualizacao'] = agora.isoformat()
+        
+        # Entrada anexada ao histórico de estados
+        return {
+            'estado': novo_estado,
+            'estado_anterior': estado_anterior,
+            'data': agora.isoformat(),
+            'usuario': usuario,
+            'observacao': observacao or f'Transição de {estado_anterior} para {novo_estado}'
+        }
+    
+    return get_alert_lifecycle_store().atualizar_alerta(alerta_id, _transicionar) is not None
+
+
+def resolver_alertas_lote(alerta_ids: List[str], usuario: str, justificativa: str) -> int:
+    """
+    Resolve vários alertas em uma única unidade de trabalho.
     
-    for alerta in alertas:
-        if alerta['id'] == alerta_id:
-            alerta_encontrado = True
-            estado_anterior = alerta['estado']
-            agora = datetime.now()
-            
-            # Atualiza o alerta
-            alerta['estado_anterior'] = estado_anterior
-            alerta['estado'] = novo_estado
-            alerta['data_ultima_atualizacao'] = agora.isoformat()
-            
-            # Adiciona entrada no histórico
-            alerta['historico_estados'].append({
-                'estado': novo_estado,
-                'estado_anterior': estado_anterior,
-                'data': agora.isoformat(),
-                'usuario': usuario,
-                'observacao': observacao or f'Transição de {estado_anterior} para {novo_estado}'
-            })
-            
-            break
+    Args:
+        alerta_ids: IDs dos alertas a resolver
+        usuario: Usuário que está resolvendo
+        justificativa: Justificativa de resolução (registrada no histórico)
+        
+    Returns:
+        Quantidade de alertas resolvidos
+    """
+    resolvidos = 0
+    with unidade_de_trabalho():
+        for alerta_id in alerta_ids:
+            if transicionar_estado(alerta_id, ESTADO_RESOLVIDO, usuario, justificativa):
+                resolvidos += 1
+    return resolvidos
+
+
+def get_historico_estados(alerta_id: str) -> List[Dict]:
+    """Retorna o histórico de estados de um alerta (log de eventos)"""
+    return get_alert_lifecycle_store().historico_estados(alerta_id)
+
+
+def calcular_tempos_por_estado(
+    alerta_ids: Optional[List[str]] = None,
+    agora: Optional[datetime] = None
+) -> Dict[str, Dict[str, float]]:
+    """
+    Tempo de permanência em cada estado, reproduzindo o log de transições.
+    
+    Cada estado dura da sua entrada até o evento seguinte; o estado atual
+    dura até 'agora'. Permanências repetidas no mesmo estado são somadas.
+    
+    Args:
+        alerta_ids: Restringe aos alertas informados (padrão: todos)
+        agora: Data de referência (padrão: datetime.now())
+        
+    Returns:
+        Dicionário alerta_id -> {estado: dias (fracionários)}
+    """
+    agora = agora or datetime.now()
+    tempos: Dict[str, Dict[str, float]] = {}
+    
+    def _acumular(alerta_id: str, estado: str, inicio: datetime, fim: datetime):
+        por_estado = tempos.setdefault(alerta_id, {})
+        dias = max(0.0, (fim - inicio).total_seconds() / 86400)
+        por_estado[estado] = por_estado.get(estado, 0.0) + dias
     
-    if alerta_encontrado:
-        _save_alertas_v2(alertas)
-        return True
-    return False
+    anterior = None
+    for evento in get_alert_lifecycle_store().eventos_estado(alerta_ids):
+        try:
+            data = datetime.fromisoformat(evento['data'])
+        except (TypeError, ValueError):
+            continue
+        
+        if anterior is not None:
+            alerta_id, estado, inicio = anterior
+            _acumular(alerta_id, estado, inicio, data if alerta_id == evento['alerta_id'] else agora)
+        anterior = (evento['alerta_id'], evento['estado'], data)
+    
+    if anterior is not None:
+        _acumular(*anterior, agora)
+    
+    return tempos
+
+
+def reconstruir_estados_alertas_v2() -> int:
+    """
+    Reconstrói os snapshots de estado a partir do log de transições.
+    
+    Returns:
+        Quantidade de alertas corrigidos
+    """
+    return get_alert_lifecycle_store().reconstruir_snapshots()
+
+
+def obter_modelo_duracoes() -> ModeloDuracoes:
+    """
+    Modelo de permanência por estado aprendido do histórico de transições
+    (histogramas mantidos incrementalmente pelo store).
+    """
+    return ModeloDuracoes(get_alert_lifecycle_store().histogramas_duracoes())
+
+
+def obter_esbocos_resolucao() -> Dict[str, Dict[str, Dict[int, tuple]]]:
+    """
+    Histogramas de tempo de resolução por responsável, categoria e total
+    ({dimensao: {valor: {faixa: (quantidade, soma_dias)}}}), mantidos pelo
+    store a cada alerta que chega a resolvido/encerrado.
+    """
+    return get_alert_lifecycle_store().esbocos_resolucao()
 
 
 # ========================================
@@ -377,27 +561,15 @@ def registrar_acao(
         'fundamentacao_legal': None
     }
     
-    # Salva a ação
-    acoes = _load_acoes()
-    acoes.append(acao)
-    _save_acoes(acoes)
-    
-    # Vincula ação ao alerta
-    alertas = _load_alertas_v2()
-    for alerta in alertas:
-        if alerta['id'] == alerta_id:
-            alerta['acoes_ids'].append(acao['id'])
-            alerta['data_ultima_atualizacao'] = agora.isoformat()
-            break
-    _save_alertas_v2(alertas)
+    # Salva a ação e vincula ao alerta (acoes_ids é derivado das ações)
+    get_alert_lifecycle_store().inserir_acao(acao, atualizado_em=agora.isoformat())
     
     return acao
 
 
 def get_acoes_por_alerta(alerta_id: str) -> List[Dict]:
-    """Retorna todas as ações de um alerta"""
-    acoes = _load_acoes()
-    return [a for a in acoes if a['alerta_id'] == alerta_id]
+    """Retorna todas as ações de um alerta (índice por alerta_id)"""
+    return get_alert_lifecycle_store().listar_acoes(alerta_id)
 
 
 # ========================================
@@ -432,30 +604,29 @@ def criar_alerta_derivado(
     if not alerta_origem:
         return None
     
-    # Cria o alerta derivado
-    alerta_derivado = criar_alerta_v2(
-        tipo=tipo,
-        categoria=alerta_origem['categoria'],
-        titulo=titulo,
-        descricao=descricao,
-        contrato_id=alerta_origem['contrato_id'],
-        contrato_numero=alerta_origem['contrato_numero'],
-        responsavel=alerta_origem['responsavel'],
-        prazo_resposta_dias=prazo_resposta_dias,
-        criticidade=criticidade,
-        alerta_origem_id=alerta_origem_id,
-        geracao=alerta_origem['geracao'] + 1,
-        metadados=metadados
-    )
-    
-    # Atualiza o alerta origem para incluir referência ao derivado
-    alertas = _load_alertas_v2()
-    for alerta in alertas:
-        if alerta['id'] == alerta_origem_id:
+    # Cria o derivado e vincula à origem no mesmo commit
+    with unidade_de_trabalho():
+        alerta_derivado = criar_alerta_v2(
+            tipo=tipo,
+            categoria=alerta_origem['categoria'],
+            titulo=titulo,
+            descricao=descricao,
+            contrato_id=alerta_origem['contrato_id'],
+            contrato_numero=alerta_origem['contrato_numero'],
+            responsavel=alerta_origem['responsavel'],
+            prazo_resposta_dias=prazo_resposta_dias,
+            criticidade=criticidade,
+            alerta_origem_id=alerta_origem_id,
+            geracao=alerta_origem['geracao'] + 1,
+            metadados=metadados
+        )
+        
+        # Atualiza o alerta origem para incluir referência ao derivado
+        def _vincular(alerta: Dict):
             alerta['alertas_derivados'].append(alerta_derivado['id'])
             alerta['data_ultima_atualizacao'] = datetime.now().isoformat()
-            break
-    _save_alertas_v2(alertas)
+        
+        get_alert_lifecycle_store().atualizar_alerta(alerta_origem_id, _vincular)
     
     return alerta_derivado
 
@@ -467,37 +638,96 @@ def get_cadeia_alertas(alerta_id: str) -> Tuple[Optional[Dict], List[Dict]]:
     Returns:
         Tupla (alerta_raiz, lista_de_alertas_na_cadeia)
     """
-    alerta = get_alerta_v2_por_id(alerta_id)
-    if not alerta:
-        return None, []
+    store = get_alert_lifecycle_store()
     
-    # Encontra a raiz
-    alerta_raiz = alerta
-    while alerta_raiz['alerta_origem_id']:
-        alerta_raiz = get_alerta_v2_por_id(alerta_raiz['alerta_origem_id'])
-        if not alerta_raiz:
-            break
-    
-    # Coleta todos os derivados recursivamente
-    def _coletar_derivados(alerta_id: str) -> List[Dict]:
-        alerta_atual = get_alerta_v2_por_id(alerta_id)
-        if not alerta_atual:
-            return []
-        
-        resultado = [alerta_atual]
-        for derivado_id in alerta_atual['alertas_derivados']:
-            resultado.extend(_coletar_derivados(derivado_id))
-        return resultado
+    # Raiz e subárvore via índice de alerta_origem_id (consultas recursivas)
+    raiz_id = store.raiz_cadeia(alerta_id)
+    if raiz_id is None:
+        return None, []
     
-    cadeia = _coletar_derivados(alerta_raiz['id']) if alerta_raiz else []
+    cadeia = store.subarvore(raiz_id)
+    return cadeia[0], cadeia
+
+
+def get_subarvore_alertas(alerta_id: str) -> List[Dict]:
+    """
+    Retorna o alerta e todos os seus derivados (diretos e indiretos).
     
-    return alerta_raiz, cadeia
+    Returns:
+        Lista em pré-ordem, começando pelo próprio alerta (vazia se não existe)
+    """
+    return get_alert_lifecycle_store().subarvore(alerta_id)
 
 
 # ========================================
 # CÁLCULO DE RISCO E MÉTRICAS
 # ========================================
 
+def _calcular_fatores_risco(alertas: List[Dict], adiamentos: np.ndarray) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    Fatores e score de risco de vários alertas em arrays NumPy.
+    
+    Args:
+        alertas: Alertas V2 (usa dias_restantes, prazo_resposta_dias,
+            criticidade e geracao)
+        adiamentos: Quantidade de justificativas de adiamento por alerta
+        
+    Returns:
+        Tupla (scores não arredondados, fatores por nome)
+    """
+    dias_restantes = np.array([a['dias_restantes'] for a in alertas], dtype=float)
+    prazo_total = np.array([a['prazo_resposta_dias'] for a in alertas], dtype=float)
+    geracao = np.array([a['geracao'] for a in alertas], dtype=float)
+    
+    # Fator 1: Urgência temporal (peso 0.35)
+    consumido = np.divide(
+        dias_restantes, prazo_total,
+        out=np.zeros_like(dias_restantes), where=prazo_total > 0
+    )
+    fator_tempo = np.where(
+        dias_restantes <= 0,
+        1.0,
+        np.where(prazo_total > 0, np.clip(1.0 - consumido, 0.0, 1.0), 0.5)
+    )
+    
+    # Fator 2: Criticidade (peso 0.30)
+    map_criticidade = {
+        CRITICIDADE_BAIXA: 0.2,
+        CRITICIDADE_MEDIA: 0.5,
+        CRITICIDADE_ALTA: 0.8,
+        CRITICIDADE_URGENTE: 1.0
+    }
+    fator_criticidade = np.array(
+        [map_criticidade.get(a['criticidade'], 0.5) for a in alertas], dtype=float
+    )
+    
+    # Fator 3: Histórico de ações (peso 0.20)
+    fator_adiamentos = np.minimum(1.0, np.asarray(adiamentos, dtype=float) * 0.25)
+    
+    # Fator 4: Profundidade no encadeamento (peso 0.15)
+    fator_geracao = np.minimum(1.0, (geracao - 1) * 0.3)
+    
+    score = fator_tempo * 0.35
+    score += fator_criticidade * 0.30
+    score += fator_adiamentos * 0.20
+    score += fator_geracao * 0.15
+    
+    fatores = {
+        'urgencia_temporal': fator_tempo,
+        'criticidade': fator_criticidade,
+        'historico_adiamentos': fator_adiamentos,
+        'geracao_alerta': fator_geracao
+    }
+    return score, fatores
+
+
+def _fatores_por_alerta(fatores: Dict[str, np.ndarray]) -> List[Dict[str, float]]:
+    """Converte os arrays de fatores em um dict por alerta"""
+    nomes = list(fatores)
+    colunas = [fatores[nome].tolist() for nome in nomes]
+    return [dict(zip(nomes, valores)) for valores in zip(*colunas)]
+
+
 def calcular_score_risco(alerta_id: str) -> float:
     """
     Calcula score de risco multifatorial para um alerta.
@@ -515,58 +745,60 @@ def calcular_score_risco(alerta_id: str) -> float:
     if not alerta:
         return 0.0
     
-    score = 0.0
-    fatores = {}
+    acoes = get_acoes_por_alerta(alerta_id)
+    adiamentos = sum(1 for a in acoes if a['tipo_acao'] == ACAO_JUSTIFICATIVA_ADIAMENTO)
     
-    # Fator 1: Urgência temporal (peso 0.35)
-    dias_restantes = alerta['dias_restantes']
-    prazo_total = alerta['prazo_resposta_dias']
+    scores, fatores = _calcular_fatores_risco([alerta], np.array([adiamentos]))
+    score = round(scores.tolist()[0], 3)
     
-    if dias_restantes <= 0:
-        fator_tempo = 1.0
-    elif prazo_total > 0:
-        fator_tempo = 1.0 - (dias_restantes / prazo_total)
-        fator_tempo = max(0.0, min(1.0, fator_tempo))
-    else:
-        fator_tempo = 0.5
+    # Atualiza o alerta com o score
+    def _gravar_score(a: Dict):
+        a['score_risco'] = score
+        a['fatores_risco'] = _fatores_por_alerta(fatores)[0]
     
-    fatores['urgencia_temporal'] = fator_tempo
-    score += fator_tempo * 0.35
+    get_alert_lifecycle_store().atualizar_alerta(alerta_id, _gravar_score)
     
-    # Fator 2: Criticidade (peso 0.30)
-    map_criticidade = {
-        CRITICIDADE_BAIXA: 0.2,
-        CRITICIDADE_MEDIA: 0.5,
-        CRITICIDADE_ALTA: 0.8,
-        CRITICIDADE_URGENTE: 1.0
-    }
-    fator_criticidade = map_criticidade.get(alerta['criticidade'], 0.5)
-    fatores['criticidade'] = fator_criticidade
-    score += fator_criticidade * 0.30
+    return score
+
+
+def calcular_scores_risco_lote(alerta_ids: Optional[List[str]] = None) -> Dict[str, float]:
+    """
+    Calcula o score de risco de todos os alertas V2 de uma vez.
     
-    # Fator 3: Histórico de ações (peso 0.20)
-    acoes = get_acoes_por_alerta(alerta_id)
-    adiamentos = sum(1 for a in acoes if a['tipo_acao'] == ACAO_JUSTIFICATIVA_ADIAMENTO)
-    fator_adiamentos = min(1.0, adiamentos * 0.25)
-    fatores['historico_adiamentos'] = fator_adiamentos
-    score += fator_adiamentos * 0.20
+    Mesmos fatores e pesos de calcular_score_risco(), com uma leitura dos
+    alertas, uma contagem agrupada de adiamentos e uma única transação de
+    gravação de score_risco e fatores_risco.
     
-    # Fator 4: Profundidade no encadeamento (peso 0.15)
-    geracao = alerta['geracao']
-    fator_geracao = min(1.0, (geracao - 1) * 0.3)
-    fatores['geracao_alerta'] = fator_geracao
-    score += fator_geracao * 0.15
+    Args:
+        alerta_ids: Restringe o cálculo a estes alertas (padrão: todos)
+        
+    Returns:
+        Dicionário alerta_id -> score (0.0 a 1.0)
+    """
+    store = get_alert_lifecycle_store()
     
-    # Atualiza o alerta com o score
-    alertas = _load_alertas_v2()
-    for a in alertas:
-        if a['id'] == alerta_id:
-            a['score_risco'] = round(score, 3)
-            a['fatores_risco'] = fatores
-            break
-    _save_alertas_v2(alertas)
+    alertas = store.listar_registros()
+    if alerta_ids is not None:
+        selecionados = set(alerta_ids)
+        alertas = [a for a in alertas if a['id'] in selecionados]
+    if not alertas:
+        return {}
+    
+    por_alerta = store.contar_acoes_por_alerta(ACAO_JUSTIFICATIVA_ADIAMENTO)
+    adiamentos = np.array([por_alerta.get(a['id'], 0) for a in alertas])
     
-    return round(score, 3)
+    scores, fatores = _calcular_fatores_risco(alertas, adiamentos)
+    
+    resultado = {}
+    alteracoes = {}
+    for alerta, score, fatores_alerta in zip(alertas, scores.tolist(), _fatores_por_alerta(fatores)):
+        score = round(score, 3)
+        resultado[alerta['id']] = score
+        alteracoes[alerta['id']] = {'score_risco': score, 'fatores_risco': fatores_alerta}
+    
+    store.atualizar_campos_lote(alteracoes)
+    
+    return resultado
 
 
 def calcular_janela_seguranca(alerta_id: str, tempo_medio_execucao_dias: int) -> int:
@@ -591,13 +823,11 @@ def calcular_janela_seguranca(alerta_id: str, tempo_medio_execucao_dias: int) ->
     janela = alerta['dias_restantes'] - tempo_medio_execucao_dias
     
     # Atualiza o alerta
-    alertas = _load_alertas_v2()
-    for a in alertas:
-        if a['id'] == alerta_id:
-            a['janela_seguranca_dias'] = janela
-            a['metadados']['tempo_medio_execucao_dias'] = tempo_medio_execucao_dias
-            break
-    _save_alertas_v2(alertas)
+    def _gravar_janela(a: Dict):
+        a['janela_seguranca_dias'] = janela
+        a['metadados']['tempo_medio_execucao_dias'] = tempo_medio_execucao_dias
+    
+    get_alert_lifecycle_store().atualizar_alerta(alerta_id, _gravar_janela)
     
     return janela
 
@@ -610,63 +840,62 @@ def get_estatisticas_alertas_v2() -> Dict:
     """
     Retorna estatísticas gerais dos alertas V2.
     
+    Lê os contadores materializados do store (mantidos a cada criação,
+    transição, score e ação), sem varrer os alertas.
+    
     Returns:
         Dicionário com métricas agregadas
     """
-    alertas = _load_alertas_v2()
-    acoes = _load_acoes()
-    
-    # Contadores por estado
-    por_estado = {}
-    for alerta in alertas:
-        estado = alerta['estado']
-        por_estado[estado] = por_estado.get(estado, 0) + 1
-    
-    # Contadores por tipo
-    por_tipo = {}
-    for alerta in alertas:
-        tipo = alerta['tipo']
-        por_tipo[tipo] = por_tipo.get(tipo, 0) + 1
+    _arquivar_se_necessario()
+    contadores = get_alert_lifecycle_store().contadores()
     
-    # Contadores por criticidade
-    por_criticidade = {}
-    for alerta in alertas:
-        crit = alerta['criticidade']
-        por_criticidade[crit] = por_criticidade.get(crit, 0) + 1
+    def _quantidades(dimensao: str) -> Dict:
+        return {valor: c['quantidade'] for valor, c in contadores.get(dimensao, {}).items()}
     
-    # Risco médio
-    scores = [a['score_risco'] for a in alertas if a['score_risco'] is not None]
-    risco_medio = sum(scores) / len(scores) if scores else 0.0
+    def _escalar(dimensao: str) -> Dict:
+        return contadores.get(dimensao, {}).get(None, {'quantidade': 0, 'soma': 0.0})
     
-    # Alertas em risco alto (score > 0.7)
-    alertas_risco_alto = len([s for s in scores if s > 0.7])
+    # Risco médio = soma / quantidade dos scores calculados
+    risco = _escalar('risco')
+    risco_medio = risco['soma'] / risco['quantidade'] if risco['quantidade'] else 0.0
     
     return {
-        'total_alertas': len(alertas),
-        'total_acoes': len(acoes),
-        'por_estado': por_estado,
-        'por_tipo': por_tipo,
-        'por_criticidade': por_criticidade,
+        'total_alertas': _escalar('total')['quantidade'],
+        'total_acoes': _escalar('acoes')['quantidade'],
+        'por_estado': _quantidades('estado'),
+        'por_tipo': _quantidades('tipo'),
+        'por_criticidade': _quantidades('criticidade'),
         'risco_medio': round(risco_medio, 3),
-        'alertas_risco_alto': alertas_risco_alto
+        # Alertas em risco alto (score > LIMITE_RISCO_ALTO)
+        'alertas_risco_alto': _escalar('risco_alto')['quantidade']
     }
 
 
-# ========================================
-# COMPATIBILIDADE COM V1
-# ========================================
+def obter_contagens_por_responsavel() -> Dict[str, Dict[str, int]]:
+    """
+    Alertas por responsável e estado, incluindo a camada fria
+    ({responsavel: {estado: quantidade}}), lidos dos contadores do store.
+    """
+    return get_alert_lifecycle_store().contagens_por_responsavel()
 
-def importar_alerta_v1_para_v2(alerta_v1: Dict) -> Dict:
+
+def verificar_contadores_alertas_v2() -> List[Dict]:
     """
-    Converte um alerta V1 para o formato V2.
-    NÃO modifica o alerta V1 original.
+    Confere os contadores materializados contra os alertas e ações
+    gravados e os reconstrói.
     
-    Args:
-        alerta_v1: Alerta no formato antigo
-        
     Returns:
-        Alerta no formato V2
+        Divergências encontradas (vazio se estavam consistentes)
     """
+    return get_alert_lifecycle_store().reconstruir_contadores()
+
+
+# ========================================
+# COMPATIBILIDADE COM V1
+# ========================================
+
+def _parametros_importacao_v1(alerta_v1: Dict) -> Dict:
+    """Parâmetros de criar_alerta_v2() para um alerta V1 importado"""
     # Mapeia tipo V1 para V2
     map_tipo = {
         'critico': TIPO_CRITICO,
@@ -688,20 +917,112 @@ def importar_alerta_v1_para_v2(alerta_v1: Dict) -> Dict:
     dias_restantes = alerta_v1.get('dias_restantes', 30)
     prazo = max(7, dias_restantes)  # Mínimo 7 dias
     
-    # Cria alerta V2
-    return criar_alerta_v2(
-        tipo=tipo_v2,
-        categoria=alerta_v1.get('categoria', CATEGORIA_VIGENCIA),
-        titulo=alerta_v1.get('titulo', 'Alerta importado'),
-        descricao=alerta_v1.get('descricao', ''),
-        contrato_id=alerta_v1.get('contrato_id', ''),
-        contrato_numero=alerta_v1.get('contrato_numero', ''),
-        responsavel='não_definido',
-        prazo_resposta_dias=prazo,
-        criticidade=criticidade,
-        metadados={
+    return {
+        'tipo': tipo_v2,
+        'categoria': alerta_v1.get('categoria', CATEGORIA_VIGENCIA),
+        'titulo': alerta_v1.get('titulo', 'Alerta importado'),
+        'descricao': alerta_v1.get('descricao', ''),
+        'contrato_id': alerta_v1.get('contrato_id', ''),
+        'contrato_numero': alerta_v1.get('contrato_numero', ''),
+        'responsavel': 'não_definido',
+        'prazo_resposta_dias': prazo,
+        'criticidade': criticidade,
+        'metadados': {
             'importado_de_v1': True,
             'id_v1': alerta_v1.get('id'),
             'data_alerta_v1': str(alerta_v1.get('data_alerta', ''))
         }
+    }
+
+
+def importar_alerta_v1_para_v2(alerta_v1: Dict) -> Dict:
+    """
+    Converte um alerta V1 para o formato V2.
+    NÃO modifica o alerta V1 original.
+    
+    Args:
+        alerta_v1: Alerta no formato antigo
+        
+    Returns:
+        Alerta no formato V2
+    """
+    return criar_alerta_v2(**_parametros_importacao_v1(alerta_v1))
+
+
+# Ação do diff de importação -> contador do resultado
+CONTADOR_IMPORTACAO = {'criar': 'importados', 'existente': 'existentes', 'duplicado': 'duplicados'}
+
+
+def importar_alertas_v1_para_v2_lote(alertas_v1: List[Dict], simular: bool = False) -> Dict:
+    """
+    Importa um lote de alertas V1 para o formato V2.
+    
+    Todos os alertas são convertidos em memória; IDs V1 já presentes no
+    mapeamento do dual write (ou repetidos no lote) são ignorados. Os
+    alertas V2 novos são gravados em uma única transação e os mapeamentos
+    V1 ↔ V2 em uma única gravação do arquivo de mapeamento.
+    NÃO modifica os alertas V1 originais.
+    
+    Args:
+        alertas_v1: Alertas no formato antigo
+        simular: Se True, não grava nada (apenas o diff do que seria feito)
+        
+    Returns:
+        Dict com 'importados', 'existentes', 'duplicados', 'simulado',
+        'segundos', 'alertas_por_segundo' e 'diff' (uma entrada por alerta
+        V1: v1_id, acao 'criar'/'existente'/'duplicado', v2_id, tipo,
+        criticidade, prazo_resposta_dias, titulo; na simulação o v2_id é
+        apenas provisório)
+    """
+    # Importação local para evitar dependência circular
+    from services.dual_write_service import (
+        metadados_mapeamento,
+        obter_ids_v1_mapeados,
+        registrar_mapeamentos_lote,
     )
+    
+    inicio = time.perf_counter()
+    mapeados = obter_ids_v1_mapeados()
+    vistos = set()
+    
+    resultado = {'importados': 0, 'existentes': 0, 'duplicados': 0, 'simulado': simular, 'diff': []}
+    novos, pares = [], []
+    for alerta_v1 in alertas_v1:
+        v1_id = alerta_v1.get('id')
+        if v1_id and v1_id in mapeados:
+            acao = 'existente'
+        elif v1_id and v1_id in vistos:
+            acao = 'duplicado'
+        else:
+            acao = 'criar'
+        
+        parametros = _parametros_importacao_v1(alerta_v1)
+        v2_id = None
+        if acao == 'criar':
+            alerta_v2 = _montar_alerta_v2(**parametros)
+            novos.append(alerta_v2)
+            v2_id = alerta_v2['id']
+            if v1_id:
+                vistos.add(v1_id)
+                pares.append((v1_id, v2_id, metadados_mapeamento(alerta_v1)))
+        resultado[CONTADOR_IMPORTACAO[acao]] += 1
+        
+        resultado['diff'].append({
+            'v1_id': v1_id,
+            'acao': acao,
+            'v2_id': v2_id,
+            'tipo': parametros['tipo'],
+            'criticidade': parametros['criticidade'],
+            'prazo_resposta_dias': parametros['prazo_resposta_dias'],
+            'titulo': parametros['titulo']
+        })
+    
+    if not simular and novos:
+        get_alert_lifecycle_store().inserir_alertas(novos)
+        registrar_mapeamentos_lote(pares)
+    
+    segundos = time.perf_counter() - inicio
+    resultado['segundos'] = round(segundos, 3)
+    resultado['alertas_por_segundo'] = round(len(alertas_v1) / segundos, 1) if segundos > 0 else 0.0
+    
+    return resultado
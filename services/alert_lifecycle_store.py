@@ -0,0 +1,1331 @@
+"""
+Armazenamento SQLite do Ciclo de Vida de Alertas V2
+===================================================
+Substitui alertas_ciclo_vida.json e acoes_alertas.json por um banco
+SQLite com tabelas de alertas, histórico de estados e ações.
+
+Motivação:
+- criar_alerta_v2, transicionar_estado, registrar_acao, calcular_score_risco
+  e calcular_janela_seguranca liam e regravavam o arquivo inteiro: com
+  meses de alertas, cada transição custava O(total de alertas) em I/O
+- listar_alertas_v2 filtrava a lista completa em Python
+
+Estratégia:
+- Mesmo padrão do ContractStore: WAL, conexão por thread e transações
+  curtas (BEGIN IMMEDIATE)
+- Unidade de trabalho: operações aninhadas viram SAVEPOINTs e o lote
+  inteiro tem um único commit
+- Colunas indexadas para os filtros (contrato_id, estado, tipo,
+  responsavel, criticidade, prazo_resposta); o restante em dados_json
+- Histórico de estados como log de eventos só de acréscimo (alerta_id,
+  ordem, estado, data, usuario; origem e observação em dados_json): a
+  linha de alertas_v2 é o snapshot do estado atual, reconstruível a
+  partir do log (reconstruir_snapshots)
+- Histórico lido sob demanda: listagens trazem só o snapshot; obter_alerta
+  (detalhe do alerta na UI) inclui o histórico completo
+- acoes_ids é derivado da tabela de ações
+- Encadeamento pela coluna indexada alerta_origem_id: raiz e subárvore de
+  uma cadeia saem de uma consulta recursiva (WITH RECURSIVE), sem uma
+  busca por alerta visitado
+- Camadas quente/fria: alertas encerrados há mais que o período de
+  retenção vão para alertas_v2_arquivo (agrupada por mês de encerramento,
+  WITHOUT ROWID); listagens, contagens por lote e replay usam só a camada
+  quente, e consultas de histórico/tendência abrem apenas os meses do
+  intervalo pedido
+- Contadores materializados (contadores_alertas): totais por estado, tipo,
+  criticidade e responsável × estado, soma/quantidade dos scores de risco
+  e total de ações, mantidos por triggers na mesma transação de cada escrita (criação,
+  transição, score, arquivamento, ações); as estatísticas do dashboard
+  viram uma leitura O(1) e reconstruir_contadores confere e refaz os
+  valores a partir das tabelas
+- Checksum de vínculos V1 por contrato (dimensão 'vinculo_v1'): soma dos
+  hashes dos pares (ID V1, ID V2) dos alertas criados a partir do V1,
+  mantida pelos mesmos triggers; a reconciliação do dual write compara
+  esse valor com o do mapeamento e só abre os contratos divergentes
+- Durações por etapa (duracoes_estados): a cada entrada no histórico de
+  estados, um trigger soma a permanência no estado anterior ao histograma
+  de faixas da chave (categoria, tipo, estado, responsável) e dos níveis
+  agregados (ver stage_durations); o motor de risco lê o modelo daí
+- Tempos de resolução (resolucoes_alertas): quando um alerta chega a
+  resolvido/encerrado vindo de um estado ativo, outro trigger soma o tempo
+  desde a criação ao histograma do responsável, da categoria e do total;
+  a eficiência por gestor lê percentis daí em memória fixa por chave
+- Migração única a partir dos JSON legados na primeira abertura
+
+Os registros devolvidos mantêm o formato do JSON legado.
+"""
+
+from contextlib import contextmanager
+from datetime import date, datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+import hashlib
+import json
+import sqlite3
+import threading
+import logging
+
+from services.stage_durations import TODOS, chaves_agregadas, faixa_duracao
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+ALERTAS_DB = DATA_DIR / "alertas_ciclo_vida.db"
+ALERTAS_JSON_LEGADO = DATA_DIR / "alertas_ciclo_vida.json"
+ACOES_JSON_LEGADO = DATA_DIR / "acoes_alertas.json"
+
+# Campos com coluna própria (filtros e agregações); o restante vai em dados_json
+COLUNAS_ALERTA = [
+    'contrato_id', 'estado', 'tipo', 'responsavel', 'criticidade',
+    'prazo_resposta', 'alerta_origem_id', 'score_risco'
+]
+
+# Campos guardados em tabelas próprias
+CAMPOS_DERIVADOS = ('historico_estados', 'acoes_ids')
+
+LOTE_PARAMETROS = 500
+
+# Limite de níveis ao subir uma cadeia (proteção contra ciclos em dados legados)
+PROFUNDIDADE_MAXIMA = 1000
+
+# Score acima do qual o alerta conta como risco alto
+LIMITE_RISCO_ALTO = 0.7
+
+# ID V1 de um alerta V2 criado pelo dual write (v1_id) ou pela importação (id_v1)
+VINCULO_V1_SQL = (
+    "COALESCE(json_extract({r}.dados_json, '$.metadados.v1_id'), "
+    "json_extract({r}.dados_json, '$.metadados.id_v1'))"
+)
+
+# Dimensão do checksum de vínculos V1 ↔ V2, com valor = contrato_id
+DIMENSAO_VINCULOS = 'vinculo_v1'
+
+# Dimensão por responsável e estado (eficiência por gestor nas duas camadas),
+# com valor = responsavel + SEPARADOR_RESPONSAVEL_ESTADO + estado
+DIMENSAO_RESPONSAVEL_ESTADO = 'responsavel_estado'
+SEPARADOR_RESPONSAVEL_ESTADO = '\x1f'
+
+# Contadores por linha de alerta: (dimensão, valor, quantidade, soma), com
+# {r} = NEW/OLD nos triggers ou o alias da consulta de reconstrução
+DIMENSOES_CONTADORES = (
+    ('total', "''", "1", "0"),
+    ('estado', "COALESCE({r}.estado, '')", "1", "0"),
+    ('tipo', "COALESCE({r}.tipo, '')", "1", "0"),
+    ('criticidade', "COALESCE({r}.criticidade, '')", "1", "0"),
+    (DIMENSAO_RESPONSAVEL_ESTADO,
+     "COALESCE({r}.responsavel, '') || char(31) || COALESCE({r}.estado, '')", "1", "0"),
+    ('risco', "''", "{r}.score_risco IS NOT NULL", "COALESCE({r}.score_risco, 0)"),
+    ('risco_alto', "''", f"COALESCE({{r}}.score_risco > {LIMITE_RISCO_ALTO}, 0)", "0"),
+    (DIMENSAO_VINCULOS, "COALESCE({r}.contrato_id, '')", f"{VINCULO_V1_SQL} IS NOT NULL",
+     f"COALESCE(hash_vinculo({VINCULO_V1_SQL}, {{r}}.id), 0)"),
+)
+
+# Contadores por linha de ação
+DIMENSOES_CONTADORES_ACOES = (
+    ('acoes', "''", "1", "0"),
+)
+
+# Tolerância na conferência das somas (acúmulo de ponto flutuante)
+TOLERANCIA_SOMA = 1e-6
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS alertas_v2 (
+    id TEXT PRIMARY KEY,
+    contrato_id TEXT,
+    estado TEXT,
+    tipo TEXT,
+    responsavel TEXT,
+    criticidade TEXT,
+    prazo_resposta TEXT,
+    alerta_origem_id TEXT,
+    score_risco REAL,
+    dados_json TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_alertas_v2_contrato ON alertas_v2(contrato_id);
+CREATE INDEX IF NOT EXISTS idx_alertas_v2_estado ON alertas_v2(estado);
+CREATE INDEX IF NOT EXISTS idx_alertas_v2_tipo ON alertas_v2(tipo);
+CREATE INDEX IF NOT EXISTS idx_alertas_v2_responsavel ON alertas_v2(responsavel);
+CREATE INDEX IF NOT EXISTS idx_alertas_v2_criticidade ON alertas_v2(criticidade);
+CREATE INDEX IF NOT EXISTS idx_alertas_v2_prazo ON alertas_v2(prazo_resposta);
+CREATE INDEX IF NOT EXISTS idx_alertas_v2_origem ON alertas_v2(alerta_origem_id);
+
+CREATE TABLE IF NOT EXISTS historico_estados (
+    alerta_id TEXT NOT NULL REFERENCES alertas_v2(id) ON DELETE CASCADE,
+    ordem INTEGER NOT NULL,
+    estado TEXT,
+    data TEXT,
+    usuario TEXT,
+    dados_json TEXT NOT NULL,
+    PRIMARY KEY (alerta_id, ordem)
+);
+
+CREATE TABLE IF NOT EXISTS acoes_alertas (
+    id TEXT PRIMARY KEY,
+    alerta_id TEXT NOT NULL,
+    tipo_acao TEXT,
+    usuario TEXT,
+    data_acao TEXT,
+    dados_json TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_acoes_alerta ON acoes_alertas(alerta_id);
+
+-- Camada fria: alertas encerrados, agrupados fisicamente por mês de encerramento
+CREATE TABLE IF NOT EXISTS alertas_v2_arquivo (
+    mes_encerramento TEXT NOT NULL,
+    id TEXT NOT NULL,
+    contrato_id TEXT,
+    estado TEXT,
+    tipo TEXT,
+    responsavel TEXT,
+    criticidade TEXT,
+    prazo_resposta TEXT,
+    alerta_origem_id TEXT,
+    score_risco REAL,
+    dados_json TEXT NOT NULL,
+    PRIMARY KEY (mes_encerramento, id)
+) WITHOUT ROWID;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_arquivo_id ON alertas_v2_arquivo(id);
+CREATE INDEX IF NOT EXISTS idx_arquivo_origem ON alertas_v2_arquivo(alerta_origem_id);
+CREATE INDEX IF NOT EXISTS idx_arquivo_contrato ON alertas_v2_arquivo(contrato_id);
+
+CREATE TABLE IF NOT EXISTS historico_estados_arquivo (
+    alerta_id TEXT NOT NULL,
+    ordem INTEGER NOT NULL,
+    estado TEXT,
+    data TEXT,
+    usuario TEXT,
+    dados_json TEXT NOT NULL,
+    PRIMARY KEY (alerta_id, ordem)
+) WITHOUT ROWID;
+
+-- Encadeamento atravessa as duas camadas
+CREATE VIEW IF NOT EXISTS alertas_v2_todos AS
+    SELECT id, alerta_origem_id FROM alertas_v2
+    UNION ALL
+    SELECT id, alerta_origem_id FROM alertas_v2_arquivo;
+
+CREATE TABLE IF NOT EXISTS store_meta (
+    chave TEXT PRIMARY KEY,
+    valor TEXT
+);
+
+-- Histograma de permanência por estado, mantido pelo trigger do histórico
+-- ('*' nas colunas de chave = nível agregado)
+CREATE TABLE IF NOT EXISTS duracoes_estados (
+    categoria TEXT NOT NULL,
+    tipo TEXT NOT NULL,
+    estado TEXT NOT NULL,
+    responsavel TEXT NOT NULL,
+    faixa INTEGER NOT NULL,
+    quantidade INTEGER NOT NULL DEFAULT 0,
+    soma REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (categoria, tipo, estado, responsavel, faixa)
+) WITHOUT ROWID;
+
+-- Histograma de tempos de resolução por dimensão (responsavel, categoria,
+-- total), mantido pelo trigger do histórico
+CREATE TABLE IF NOT EXISTS resolucoes_alertas (
+    dimensao TEXT NOT NULL,
+    valor TEXT NOT NULL,
+    faixa INTEGER NOT NULL,
+    quantidade INTEGER NOT NULL DEFAULT 0,
+    soma REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (dimensao, valor, faixa)
+) WITHOUT ROWID;
+
+-- Agregados mantidos pelos triggers (valor '' = sem valor / dimensão escalar)
+CREATE TABLE IF NOT EXISTS contadores_alertas (
+    dimensao TEXT NOT NULL,
+    valor TEXT NOT NULL,
+    quantidade INTEGER NOT NULL DEFAULT 0,
+    soma REAL NOT NULL DEFAULT 0,
+    UNIQUE (dimensao, valor)
+);
+"""
+
+
+def hash_vinculo(v1_id: Optional[str], v2_id: Optional[str]) -> Optional[int]:
+    """
+    Hash de 32 bits de um par (ID V1, ID V2).
+
+    Parcela do checksum de vínculos: somas de hashes independem da ordem e
+    admitem acréscimo/remoção incremental; com 32 bits a soma continua
+    exata no REAL dos contadores até milhões de vínculos por contrato.
+    Registrada como função SQL (usada pelos triggers).
+    """
+    if v1_id is None or v2_id is None:
+        return None
+    digest = hashlib.blake2b(f"{v1_id}\x1f{v2_id}".encode('utf-8'), digest_size=4).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def _acumular_contadores(dimensoes, linha: str, sinal: int) -> str:
+    """Upserts que somam (sinal=1) ou subtraem (sinal=-1) uma linha dos contadores"""
+    return "".join(
+        f"INSERT INTO contadores_alertas (dimensao, valor, quantidade, soma) "
+        f"VALUES ('{dimensao}', {valor.format(r=linha)}, ({quantidade.format(r=linha)}) * {sinal}, "
+        f"({soma.format(r=linha)}) * {sinal}) "
+        f"ON CONFLICT (dimensao, valor) DO UPDATE SET "
+        f"quantidade = quantidade + excluded.quantidade, soma = soma + excluded.soma;\n"
+        for dimensao, valor, quantidade, soma in dimensoes
+    )
+
+
+def _triggers_contadores() -> str:
+    """Triggers que mantêm contadores_alertas nas duas camadas e nas ações"""
+    colunas = ('estado', 'tipo', 'criticidade', 'score_risco', 'contrato_id', 'responsavel')
+    mudou = " OR ".join(f"OLD.{c} IS NOT NEW.{c}" for c in colunas)
+    mudou += f" OR {VINCULO_V1_SQL.format(r='OLD')} IS NOT {VINCULO_V1_SQL.format(r='NEW')}"
+    sql = []
+    for tabela in ('alertas_v2', 'alertas_v2_arquivo'):
+        sql.append(
+            f"CREATE TRIGGER IF NOT EXISTS trg_{tabela}_contadores_ins AFTER INSERT ON {tabela} BEGIN\n"
+            f"{_acumular_contadores(DIMENSOES_CONTADORES, 'NEW', 1)}END;\n"
+            f"CREATE TRIGGER IF NOT EXISTS trg_{tabela}_contadores_del AFTER DELETE ON {tabela} BEGIN\n"
+            f"{_acumular_contadores(DIMENSOES_CONTADORES, 'OLD', -1)}END;\n"
+            f"CREATE TRIGGER IF NOT EXISTS trg_{tabela}_contadores_upd AFTER UPDATE ON {tabela} "
+            f"WHEN {mudou} BEGIN\n"
+            f"{_acumular_contadores(DIMENSOES_CONTADORES, 'OLD', -1)}"
+            f"{_acumular_contadores(DIMENSOES_CONTADORES, 'NEW', 1)}END;\n"
+        )
+    sql.append(
+        "CREATE TRIGGER IF NOT EXISTS trg_acoes_alertas_contadores_ins AFTER INSERT ON acoes_alertas BEGIN\n"
+        f"{_acumular_contadores(DIMENSOES_CONTADORES_ACOES, 'NEW', 1)}END;\n"
+        "CREATE TRIGGER IF NOT EXISTS trg_acoes_alertas_contadores_del AFTER DELETE ON acoes_alertas BEGIN\n"
+        f"{_acumular_contadores(DIMENSOES_CONTADORES_ACOES, 'OLD', -1)}END;\n"
+    )
+    return "".join(sql)
+
+
+# Chave do histograma de durações por nível: (categoria, tipo, responsavel),
+# sobre a linha d do trigger (alerta + estado anterior); mesma ordem de
+# stage_durations.chaves_agregadas
+NIVEIS_DURACOES = (
+    ("COALESCE(json_extract(d.dados_json, '$.categoria'), '')", "COALESCE(d.tipo, '')", "COALESCE(d.responsavel, '')"),
+    ("COALESCE(json_extract(d.dados_json, '$.categoria'), '')", "COALESCE(d.tipo, '')", f"'{TODOS}'"),
+    (f"'{TODOS}'", f"'{TODOS}'", f"'{TODOS}'"),
+)
+
+
+def _triggers_duracoes() -> str:
+    """Trigger que soma a permanência no estado anterior a cada nova entrada do histórico"""
+    origem = (
+        "(SELECT MAX(julianday(NEW.data) - julianday(p.data), 0) AS dias, p.estado, "
+        "a.tipo, a.responsavel, a.dados_json "
+        "FROM historico_estados p JOIN alertas_v2 a ON a.id = p.alerta_id "
+        "WHERE p.alerta_id = NEW.alerta_id AND p.ordem = NEW.ordem - 1) d"
+    )
+    return (
+        "CREATE TRIGGER IF NOT EXISTS trg_historico_estados_duracoes AFTER INSERT ON historico_estados "
+        "WHEN NEW.ordem > 0 BEGIN\n"
+        + "".join(
+            f"INSERT INTO duracoes_estados (categoria, tipo, estado, responsavel, faixa, quantidade, soma) "
+            f"SELECT {categoria}, {tipo}, COALESCE(d.estado, ''), {responsavel}, faixa_duracao(d.dias), 1, d.dias "
+            f"FROM {origem} WHERE d.dias IS NOT NULL "
+            f"ON CONFLICT (categoria, tipo, estado, responsavel, faixa) DO UPDATE SET "
+            f"quantidade = quantidade + 1, soma = soma + excluded.soma;\n"
+            for categoria, tipo, responsavel in NIVEIS_DURACOES
+        )
+        + "END;\n"
+    )
+
+
+# Estados que encerram o ciclo do alerta (fim do tempo de resolução)
+ESTADOS_RESOLUCAO = ('resolvido', 'encerrado')
+
+# Esboços de tempo de resolução: (dimensão, valor) sobre a linha {r} do alerta
+DIMENSOES_RESOLUCAO = (
+    ('responsavel', "COALESCE({r}.responsavel, '')"),
+    ('categoria', "COALESCE(json_extract({r}.dados_json, '$.categoria'), '')"),
+    ('total', "''"),
+)
+
+# Dias entre a criação do alerta {r} e a entrada {h} no estado final
+DIAS_RESOLUCAO_SQL = "MAX(julianday({h}.data) - julianday(json_extract({r}.dados_json, '$.data_criacao')), 0)"
+
+
+def _triggers_resolucoes() -> str:
+    """Trigger que soma o tempo de resolução quando um alerta ativo chega a um estado final"""
+    finais = ", ".join(f"'{e}'" for e in ESTADOS_RESOLUCAO)
+    origem = (
+        f"(SELECT {DIAS_RESOLUCAO_SQL.format(h='NEW', r='a')} AS dias, a.responsavel, a.dados_json "
+        "FROM historico_estados p JOIN alertas_v2 a ON a.id = p.alerta_id "
+        f"WHERE p.alerta_id = NEW.alerta_id AND p.ordem = NEW.ordem - 1 "
+        f"AND COALESCE(p.estado, '') NOT IN ({finais})) d"
+    )
+    return (
+        "CREATE TRIGGER IF NOT EXISTS trg_historico_estados_resolucoes AFTER INSERT ON historico_estados "
+        f"WHEN NEW.ordem > 0 AND NEW.estado IN ({finais}) BEGIN\n"
+        + "".join(
+            f"INSERT INTO resolucoes_alertas (dimensao, valor, faixa, quantidade, soma) "
+            f"SELECT '{dimensao}', {valor.format(r='d')}, faixa_duracao(d.dias), 1, d.dias "
+            f"FROM {origem} WHERE d.dias IS NOT NULL "
+            f"ON CONFLICT (dimensao, valor, faixa) DO UPDATE SET "
+            f"quantidade = quantidade + 1, soma = soma + excluded.soma;\n"
+            for dimensao, valor in DIMENSOES_RESOLUCAO
+        )
+        + "END;\n"
+    )
+
+
+def _json(dados) -> str:
+    return json.dumps(dados, ensure_ascii=False, default=str)
+
+
+class AlertLifecycleStore:
+    """Armazenamento de alertas V2, histórico de estados e ações em SQLite"""
+
+    def __init__(self, db_path: Path = ALERTAS_DB):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        # Data do último arquivamento (controle do arquivamento diário)
+        self.arquivado_em: Optional[date] = None
+        self._inicializar()
+
+    # ========================================
+    # CONEXÃO E SCHEMA
+    # ========================================
+
+    def _conexao(self) -> sqlite3.Connection:
+        """Conexão por thread (o Streamlit atende sessões em threads distintas)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            # INSERT OR REPLACE só dispara os triggers de DELETE (contadores) com esta opção
+            conn.execute("PRAGMA recursive_triggers=ON")
+            conn.create_function("hash_vinculo", 2, hash_vinculo, deterministic=True)
+            conn.create_function("faixa_duracao", 1, faixa_duracao, deterministic=True)
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transacao(self):
+        """
+        Transação de escrita curta.
+
+        Dentro de uma unidade de trabalho aberta na mesma thread, vira um
+        SAVEPOINT: o commit fica para o fim da unidade.
+        """
+        conn = self._conexao()
+        profundidade = getattr(self._local, 'profundidade', 0)
+        ponto = f"sp_{profundidade}"
+
+        conn.execute("BEGIN IMMEDIATE" if profundidade == 0 else f"SAVEPOINT {ponto}")
+        self._local.profundidade = profundidade + 1
+        try:
+            yield conn
+            conn.execute("COMMIT" if profundidade == 0 else f"RELEASE {ponto}")
+        except Exception:
+            if profundidade == 0:
+                conn.execute("ROLLBACK")
+            else:
+                conn.execute(f"ROLLBACK TO {ponto}")
+                conn.execute(f"RELEASE {ponto}")
+            raise
+        finally:
+            self._local.profundidade = profundidade
+
+    @contextmanager
+    def unidade_de_trabalho(self):
+        """
+        Agrupa várias operações (ações, transições, derivados) em um único
+        commit; qualquer exceção desfaz todas elas.
+        """
+        with self._transacao():
+            yield self
+
+    def _inicializar(self):
+        """Cria tabelas, índices e triggers se ainda não existirem"""
+        conn = self._conexao()
+        conn.executescript(SCHEMA)
+        # Bancos anteriores aos agregados (ou a uma nova definição deles):
+        # recria os triggers e faz a carga a partir das tabelas
+        for chave_versao, triggers, padrao, carga in (
+            ('versao_contadores', _triggers_contadores(), 'trg_%_contadores_%', self.reconstruir_contadores),
+            ('versao_duracoes', _triggers_duracoes(), 'trg_%_duracoes', self.reconstruir_duracoes),
+            ('versao_resolucoes', _triggers_resolucoes(), 'trg_%_resolucoes', self.reconstruir_resolucoes),
+        ):
+            versao = hashlib.sha1(triggers.encode('utf-8')).hexdigest()
+            atual = conn.execute("SELECT valor FROM store_meta WHERE chave = ?", (chave_versao,)).fetchone()
+            if atual is not None and atual[0] == versao:
+                continue
+
+            for (nome,) in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE ?", (padrao,)
+            ).fetchall():
+                conn.execute(f"DROP TRIGGER IF EXISTS {nome}")
+            conn.executescript(triggers)
+            carga()
+            conn.execute(
+                "INSERT OR REPLACE INTO store_meta (chave, valor) VALUES (?, ?)", (chave_versao, versao)
+            )
+
+    # ========================================
+    # CONVERSÃO REGISTRO ↔ LINHAS
+    # ========================================
+
+    def _gravar_linha(self, conn: sqlite3.Connection, dados: Dict, inserir: bool):
+        """Grava colunas + dados_json de um alerta (sem histórico e ações)"""
+        dados = {k: v for k, v in dados.items() if k not in CAMPOS_DERIVADOS}
+        colunas = [dados.get(c) for c in COLUNAS_ALERTA]
+        if inserir:
+            conn.execute(
+                "INSERT INTO alertas_v2 (id, contrato_id, estado, tipo, responsavel, criticidade, "
+                "prazo_resposta, alerta_origem_id, score_risco, dados_json) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (dados['id'], *colunas, _json(dados))
+            )
+        else:
+            conn.execute(
+                "UPDATE alertas_v2 SET contrato_id = ?, estado = ?, tipo = ?, responsavel = ?, "
+                "criticidade = ?, prazo_resposta = ?, alerta_origem_id = ?, score_risco = ?, "
+                "dados_json = ? WHERE id = ?",
+                (*colunas, _json(dados), dados['id'])
+            )
+
+    def _inserir_historico(self, conn: sqlite3.Connection, alerta_id: str, entradas: List[Dict], primeira_ordem: int = 0):
+        conn.executemany(
+            "INSERT INTO historico_estados (alerta_id, ordem, estado, data, usuario, dados_json) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (alerta_id, ordem, e.get('estado'), e.get('data'), e.get('usuario'), _json(e))
+                for ordem, e in enumerate(entradas, primeira_ordem)
+            ]
+        )
+
+    def _inserir_alerta(self, conn: sqlite3.Connection, alerta: Dict):
+        self._gravar_linha(conn, alerta, inserir=True)
+        self._inserir_historico(conn, alerta['id'], alerta.get('historico_estados') or [])
+
+    def _montar_alertas(
+        self,
+        conn: sqlite3.Connection,
+        linhas: List[sqlite3.Row],
+        com_historico: bool = True,
+        arquivado: bool = False
+    ) -> List[Dict]:
+        """Reconstrói alertas no formato legado (acoes_ids e, opcionalmente, histórico)"""
+        tabela_historico = "historico_estados_arquivo" if arquivado else "historico_estados"
+        alertas = [json.loads(row['dados_json']) for row in linhas]
+        if not alertas:
+            return []
+
+        por_id = {a['id']: a for a in alertas}
+        for alerta in alertas:
+            alerta['acoes_ids'] = []
+            if com_historico:
+                alerta['historico_estados'] = []
+
+        ids = list(por_id)
+        for i in range(0, len(ids), LOTE_PARAMETROS):
+            lote = ids[i:i + LOTE_PARAMETROS]
+            marcadores = ", ".join("?" for _ in lote)
+            if com_historico:
+                for row in conn.execute(
+                    f"SELECT alerta_id, dados_json FROM {tabela_historico} "
+                    f"WHERE alerta_id IN ({marcadores}) ORDER BY alerta_id, ordem", lote
+                ):
+                    por_id[row['alerta_id']]['historico_estados'].append(json.loads(row['dados_json']))
+            for row in conn.execute(
+                f"SELECT alerta_id, id FROM acoes_alertas "
+                f"WHERE alerta_id IN ({marcadores}) ORDER BY rowid", lote
+            ):
+                por_id[row['alerta_id']]['acoes_ids'].append(row['id'])
+
+        return alertas
+
+    # ========================================
+    # ALERTAS
+    # ========================================
+
+    def inserir_alertas(self, alertas: Iterable[Dict]) -> int:
+        """Insere alertas novos (com histórico inicial) em uma única transação"""
+        total = 0
+        with self._transacao() as conn:
+            for alerta in alertas:
+                self._inserir_alerta(conn, alerta)
+                total += 1
+        return total
+
+    def _carregar_alertas(self, conn: sqlite3.Connection, ids: List[str]) -> Dict[str, Dict]:
+        """Alertas completos por ID, buscando na camada quente e depois na fria"""
+        alertas: Dict[str, Dict] = {}
+        for tabela, arquivado in (("alertas_v2", False), ("alertas_v2_arquivo", True)):
+            pendentes = [i for i in ids if i not in alertas]
+            for i in range(0, len(pendentes), LOTE_PARAMETROS):
+                lote = pendentes[i:i + LOTE_PARAMETROS]
+                marcadores = ", ".join("?" for _ in lote)
+                linhas = conn.execute(
+                    f"SELECT id, dados_json FROM {tabela} WHERE id IN ({marcadores})", lote
+                ).fetchall()
+                for alerta in self._montar_alertas(conn, linhas, arquivado=arquivado):
+                    alertas[alerta['id']] = alerta
+        return alertas
+
+    def obter_alerta(self, alerta_id: str) -> Optional[Dict]:
+        """Busca um alerta por ID (com histórico completo; inclui a camada fria)"""
+        return self._carregar_alertas(self._conexao(), [alerta_id]).get(alerta_id)
+
+    def listar_alertas(self, **filtros) -> List[Dict]:
+        """
+        Lista alertas filtrando por colunas indexadas.
+
+        Args:
+            **filtros: coluna=valor (contrato_id, estado, tipo, responsavel,
+                criticidade); valores vazios são ignorados
+
+        Returns:
+            Alertas na ordem de criação, sem 'historico_estados' (ver
+            historico_estados())
+        """
+        condicoes, parametros = [], []
+        for coluna, valor in filtros.items():
+            if coluna not in COLUNAS_ALERTA:
+                raise ValueError(f"Filtro desconhecido: {coluna}")
+            if valor:
+                condicoes.append(f"{coluna} = ?")
+                parametros.append(valor)
+
+        where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+        conn = self._conexao()
+        linhas = conn.execute(
+            f"SELECT id, dados_json FROM alertas_v2 {where} ORDER BY rowid", parametros
+        ).fetchall()
+        return self._montar_alertas(conn, linhas, com_historico=False)
+
+    def atualizar_alerta(self, alerta_id: str, alterar: Callable[[Dict], Optional[Dict]]) -> Optional[Dict]:
+        """
+        Altera um alerta em uma transação pequena (leitura + gravação de uma linha).
+
+        Args:
+            alerta_id: ID do alerta
+            alterar: Função que modifica o dicionário do alerta (sem histórico
+                e ações) e, opcionalmente, devolve uma entrada de histórico
+                de estados a anexar
+
+        Returns:
+            Snapshot atualizado (sem histórico e ações) ou None se não existe
+        """
+        with self._transacao() as conn:
+            row = conn.execute(
+                "SELECT dados_json FROM alertas_v2 WHERE id = ?", (alerta_id,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            dados = json.loads(row['dados_json'])
+            entrada = alterar(dados)
+            self._gravar_linha(conn, dados, inserir=False)
+
+            if entrada is not None:
+                proxima_ordem = conn.execute(
+                    "SELECT COALESCE(MAX(ordem), -1) + 1 FROM historico_estados WHERE alerta_id = ?",
+                    (alerta_id,)
+                ).fetchone()[0]
+                self._inserir_historico(conn, alerta_id, [entrada], proxima_ordem)
+
+            return dados
+
+    # ========================================
+    # LOG DE EVENTOS DE ESTADO
+    # ========================================
+
+    def historico_estados(self, alerta_id: str) -> List[Dict]:
+        """Entradas do histórico de estados de um alerta, em ordem"""
+        return [
+            json.loads(row['dados_json'])
+            for row in self._conexao().execute(
+                "SELECT dados_json FROM historico_estados WHERE alerta_id = ? ORDER BY ordem", (alerta_id,)
+            )
+        ]
+
+    def eventos_estado(self, alerta_ids: Optional[List[str]] = None) -> List[sqlite3.Row]:
+        """
+        Log de eventos (alerta_id, estado, data) para replay.
+
+        Returns:
+            Eventos agrupados por alerta, em ordem de ocorrência
+        """
+        conn = self._conexao()
+        consulta = "SELECT alerta_id, estado, data FROM historico_estados"
+        if alerta_ids is None:
+            return conn.execute(f"{consulta} ORDER BY alerta_id, ordem").fetchall()
+
+        eventos = []
+        ids = list(alerta_ids)
+        for i in range(0, len(ids), LOTE_PARAMETROS):
+            lote = ids[i:i + LOTE_PARAMETROS]
+            marcadores = ", ".join("?" for _ in lote)
+            eventos.extend(conn.execute(
+                f"{consulta} WHERE alerta_id IN ({marcadores}) ORDER BY alerta_id, ordem", lote
+            ).fetchall())
+        return eventos
+
+    def reconstruir_snapshots(self) -> int:
+        """
+        Reaplica o último evento de cada alerta sobre o snapshot.
+
+        Corrige estado/estado_anterior de snapshots divergentes do log
+        (ex.: JSON legado editado à mão ou gravação interrompida).
+
+        Returns:
+            Quantidade de snapshots corrigidos
+        """
+        corrigidos = 0
+        with self._transacao() as conn:
+            divergentes = conn.execute(
+                """
+                SELECT a.dados_json, h.estado, h.dados_json AS evento_json
+                FROM alertas_v2 a
+                JOIN historico_estados h ON h.alerta_id = a.id
+                WHERE h.ordem = (SELECT MAX(ordem) FROM historico_estados WHERE alerta_id = a.id)
+                  AND a.estado IS NOT h.estado
+                """
+            ).fetchall()
+            for row in divergentes:
+                dados = json.loads(row['dados_json'])
+                evento = json.loads(row['evento_json'])
+                dados['estado_anterior'] = evento.get('estado_anterior', dados.get('estado'))
+                dados['estado'] = row['estado']
+                self._gravar_linha(conn, dados, inserir=False)
+                corrigidos += 1
+
+        if corrigidos:
+            logger.info(f"Snapshots de alertas V2 reconstruídos a partir do log: {corrigidos}")
+        return corrigidos
+
+    def listar_registros(self) -> List[Dict]:
+        """Todos os alertas sem histórico e ações (para cálculos em lote)"""
+        return [
+            json.loads(row['dados_json'])
+            for row in self._conexao().execute("SELECT dados_json FROM alertas_v2 ORDER BY rowid")
+        ]
+
+    def atualizar_campos_lote(self, campos_por_alerta: Dict[str, Dict]) -> int:
+        """
+        Atualiza campos de vários alertas em uma única transação.
+
+        Args:
+            campos_por_alerta: alerta_id -> {campo: novo valor}
+
+        Returns:
+            Quantidade de alertas atualizados
+        """
+        ids = list(campos_por_alerta)
+        total = 0
+        with self._transacao() as conn:
+            for i in range(0, len(ids), LOTE_PARAMETROS):
+                lote = ids[i:i + LOTE_PARAMETROS]
+                marcadores = ", ".join("?" for _ in lote)
+                for row in conn.execute(
+                    f"SELECT id, dados_json FROM alertas_v2 WHERE id IN ({marcadores})", lote
+                ).fetchall():
+                    dados = json.loads(row['dados_json'])
+                    dados.update(campos_por_alerta[row['id']])
+                    self._gravar_linha(conn, dados, inserir=False)
+                    total += 1
+        return total
+
+    # ========================================
+    # ENCADEAMENTO
+    # ========================================
+
+    def raiz_cadeia(self, alerta_id: str) -> Optional[str]:
+        """
+        ID do alerta raiz da cadeia (subindo por alerta_origem_id).
+
+        Returns:
+            ID da raiz, ou None se o alerta não existe ou se a cadeia aponta
+            para uma origem inexistente
+        """
+        linhas = self._conexao().execute(
+            """
+            WITH RECURSIVE ancestrais(id, alerta_origem_id, nivel) AS (
+                SELECT id, alerta_origem_id, 0 FROM alertas_v2_todos WHERE id = ?
+                UNION
+                SELECT a.id, a.alerta_origem_id, anc.nivel + 1
+                FROM alertas_v2_todos a JOIN ancestrais anc ON a.id = anc.alerta_origem_id
+                WHERE anc.nivel < ?
+            )
+            SELECT id, alerta_origem_id FROM ancestrais ORDER BY nivel DESC LIMIT 1
+            """,
+            (alerta_id, PROFUNDIDADE_MAXIMA)
+        ).fetchall()
+        if not linhas or linhas[0]['alerta_origem_id']:
+            return None
+        return linhas[0]['id']
+
+    def subarvore(self, alerta_id: str) -> List[Dict]:
+        """
+        Alerta e todos os seus derivados, em pré-ordem.
+
+        Os filhos de cada alerta seguem a ordem de 'alertas_derivados'.
+        Inclui alertas já movidos para a camada fria.
+        """
+        conn = self._conexao()
+        ids = [
+            row['id'] for row in conn.execute(
+                """
+                WITH RECURSIVE sub(id) AS (
+                    SELECT id FROM alertas_v2_todos WHERE id = ?
+                    UNION
+                    SELECT a.id FROM alertas_v2_todos a JOIN sub ON a.alerta_origem_id = sub.id
+                )
+                SELECT id FROM sub
+                """,
+                (alerta_id,)
+            )
+        ]
+        if not ids:
+            return []
+
+        alertas = self._carregar_alertas(conn, ids)
+        filhos: Dict[str, List[str]] = {}
+        for id_ in ids:
+            if id_ in alertas:
+                filhos.setdefault(alertas[id_].get('alerta_origem_id'), []).append(id_)
+
+        def _ordem_filhos(pai_id: str) -> List[str]:
+            encontrados = filhos.get(pai_id, [])
+            declarados = [d for d in alertas[pai_id].get('alertas_derivados', []) if d in encontrados]
+            return declarados + [f for f in encontrados if f not in declarados]
+
+        # Percurso iterativo em pré-ordem
+        ordem, pilha, visitados = [], [alerta_id], set()
+        while pilha:
+            atual = pilha.pop()
+            if atual in visitados or atual not in alertas:
+                continue
+            visitados.add(atual)
+            ordem.append(alertas[atual])
+            pilha.extend(reversed(_ordem_filhos(atual)))
+        return ordem
+
+    # ========================================
+    # AÇÕES
+    # ========================================
+
+    def inserir_acao(self, acao: Dict, atualizado_em: Optional[str] = None):
+        """
+        Registra uma ação e marca a atualização do alerta na mesma transação.
+
+        Args:
+            acao: Ação no formato legado (com 'id' e 'alerta_id')
+            atualizado_em: Nova data_ultima_atualizacao do alerta (ISO)
+        """
+        with self._transacao() as conn:
+            conn.execute(
+                "INSERT INTO acoes_alertas (id, alerta_id, tipo_acao, usuario, data_acao, dados_json) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (acao['id'], acao['alerta_id'], acao.get('tipo_acao'), acao.get('usuario'),
+                 acao.get('data_acao'), _json(acao))
+            )
+            if atualizado_em:
+                row = conn.execute(
+                    "SELECT dados_json FROM alertas_v2 WHERE id = ?", (acao['alerta_id'],)
+                ).fetchone()
+                if row is not None:
+                    dados = json.loads(row['dados_json'])
+                    dados['data_ultima_atualizacao'] = atualizado_em
+                    self._gravar_linha(conn, dados, inserir=False)
+
+    def contar_acoes_por_alerta(self, tipo_acao: Optional[str] = None) -> Dict[str, int]:
+        """Quantidade de ações por alerta (opcionalmente de um tipo)"""
+        where = "WHERE tipo_acao = ?" if tipo_acao else ""
+        return {
+            row[0]: row[1]
+            for row in self._conexao().execute(
+                f"SELECT alerta_id, COUNT(*) FROM acoes_alertas {where} GROUP BY alerta_id",
+                (tipo_acao,) if tipo_acao else ()
+            )
+        }
+
+    def listar_acoes(self, alerta_id: str) -> List[Dict]:
+        """Ações de um alerta, na ordem de registro"""
+        return [
+            json.loads(row['dados_json'])
+            for row in self._conexao().execute(
+                "SELECT dados_json FROM acoes_alertas WHERE alerta_id = ? ORDER BY rowid", (alerta_id,)
+            )
+        ]
+
+    # ========================================
+    # AGREGAÇÕES
+    # ========================================
+
+    def contagens_por(self, coluna: str) -> Dict[str, int]:
+        """Quantidade de alertas por valor de uma coluna indexada (camadas quente e fria)"""
+        if coluna not in COLUNAS_ALERTA:
+            raise ValueError(f"Coluna desconhecida: {coluna}")
+        contagens: Dict[str, int] = {}
+        conn = self._conexao()
+        for consulta in (
+            f"SELECT {coluna}, COUNT(*) FROM alertas_v2 GROUP BY {coluna} ORDER BY MIN(rowid)",
+            f"SELECT {coluna}, COUNT(*) FROM alertas_v2_arquivo GROUP BY {coluna}",
+        ):
+            for valor, quantidade in conn.execute(consulta):
+                contagens[valor] = contagens.get(valor, 0) + quantidade
+        return contagens
+
+    def total_alertas(self, incluir_arquivo: bool = True) -> int:
+        conn = self._conexao()
+        total = conn.execute("SELECT COUNT(*) FROM alertas_v2").fetchone()[0]
+        if incluir_arquivo:
+            total += conn.execute("SELECT COUNT(*) FROM alertas_v2_arquivo").fetchone()[0]
+        return total
+
+    def total_acoes(self) -> int:
+        return self._conexao().execute("SELECT COUNT(*) FROM acoes_alertas").fetchone()[0]
+
+    def resumo_risco(self, limite_alto: float) -> Dict:
+        """Média dos scores calculados e quantidade acima do limite"""
+        row = self._conexao().execute(
+            """
+            SELECT AVG(score_risco), SUM(score_risco > ?) FROM (
+                SELECT score_risco FROM alertas_v2 WHERE score_risco IS NOT NULL
+                UNION ALL
+                SELECT score_risco FROM alertas_v2_arquivo WHERE score_risco IS NOT NULL
+            )
+            """,
+            (limite_alto,)
+        ).fetchone()
+        return {'risco_medio': row[0] or 0.0, 'alertas_risco_alto': row[1] or 0}
+
+    # ========================================
+    # CONTADORES MATERIALIZADOS
+    # ========================================
+
+    def contadores(self) -> Dict[str, Dict[Optional[str], Dict]]:
+        """
+        Contadores materializados, em ordem de primeira ocorrência.
+
+        Returns:
+            {dimensao: {valor: {'quantidade': int, 'soma': float}}}; valor
+            None para alertas sem a coluna preenchida
+        """
+        contadores: Dict[str, Dict[Optional[str], Dict]] = {}
+        for row in self._conexao().execute(
+            "SELECT dimensao, valor, quantidade, soma FROM contadores_alertas "
+            "WHERE quantidade > 0 ORDER BY rowid"
+        ):
+            contadores.setdefault(row['dimensao'], {})[row['valor'] or None] = {
+                'quantidade': row['quantidade'], 'soma': row['soma']
+            }
+        return contadores
+
+    def contagens_por_responsavel(self) -> Dict[str, Dict[str, int]]:
+        """
+        Alertas por responsável e estado nas duas camadas, lidos dos
+        contadores: {responsavel: {estado: quantidade}} ('' = sem valor)
+        """
+        contagens: Dict[str, Dict[str, int]] = {}
+        for valor, contador in self.contadores().get(DIMENSAO_RESPONSAVEL_ESTADO, {}).items():
+            responsavel, _, estado = valor.partition(SEPARADOR_RESPONSAVEL_ESTADO)
+            contagens.setdefault(responsavel, {})[estado] = contador['quantidade']
+        return contagens
+
+    def _recalcular_contadores(self, conn: sqlite3.Connection) -> Dict[tuple, tuple]:
+        """Agregados recalculados a partir das tabelas: (dimensao, valor) -> (quantidade, soma)"""
+        consultas = []
+        for dimensoes, origem in (
+            (DIMENSOES_CONTADORES,
+             "(SELECT id, contrato_id, estado, tipo, responsavel, criticidade, score_risco, dados_json "
+             "FROM alertas_v2 UNION ALL SELECT id, contrato_id, estado, tipo, responsavel, criticidade, "
+             "score_risco, dados_json FROM alertas_v2_arquivo)"),
+            (DIMENSOES_CONTADORES_ACOES, "acoes_alertas"),
+        ):
+            for dimensao, valor, quantidade, soma in dimensoes:
+                consultas.append(
+                    f"SELECT '{dimensao}', {valor.format(r='r')}, SUM({quantidade.format(r='r')}), "
+                    f"SUM({soma.format(r='r')}) FROM {origem} r GROUP BY 2"
+                )
+        return {
+            (row[0], row[1]): (row[2], row[3])
+            for row in conn.execute(" UNION ALL ".join(consultas))
+            if row[2]
+        }
+
+    def reconstruir_contadores(self) -> List[Dict]:
+        """
+        Confere os contadores materializados contra as tabelas e os refaz.
+
+        Returns:
+            Divergências encontradas (dimensao, valor, materializado,
+            recalculado), vazio se os contadores estavam consistentes
+        """
+        with self._transacao() as conn:
+            atuais = {
+                (row['dimensao'], row['valor']): (row['quantidade'], row['soma'])
+                for row in conn.execute(
+                    "SELECT dimensao, valor, quantidade, soma FROM contadores_alertas WHERE quantidade != 0"
+                )
+            }
+            recalculados = self._recalcular_contadores(conn)
+
+            divergencias = []
+            for chave in list(recalculados) + [c for c in atuais if c not in recalculados]:
+                atual = atuais.get(chave, (0, 0.0))
+                esperado = recalculados.get(chave, (0, 0.0))
+                if atual[0] != esperado[0] or abs(atual[1] - esperado[1]) > TOLERANCIA_SOMA:
+                    divergencias.append({
+                        'dimensao': chave[0],
+                        'valor': chave[1] or None,
+                        'materializado': {'quantidade': atual[0], 'soma': atual[1]},
+                        'recalculado': {'quantidade': esperado[0], 'soma': esperado[1]},
+                    })
+
+            conn.execute("DELETE FROM contadores_alertas")
+            conn.executemany(
+                "INSERT INTO contadores_alertas (dimensao, valor, quantidade, soma) VALUES (?, ?, ?, ?)",
+                [(*chave, *valores) for chave, valores in recalculados.items()]
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO store_meta (chave, valor) VALUES ('contadores_inicializados', ?)",
+                (datetime.now().isoformat(),)
+            )
+
+        if divergencias:
+            logger.warning(f"Contadores de alertas V2 divergentes reconstruídos: {len(divergencias)}")
+        return divergencias
+
+    # ========================================
+    # DURAÇÕES POR ETAPA
+    # ========================================
+
+    def histogramas_duracoes(self) -> Dict[tuple, Dict[int, tuple]]:
+        """
+        Histogramas de permanência mantidos pelo trigger do histórico.
+
+        Returns:
+            {(categoria, tipo, estado, responsavel): {faixa: (quantidade, soma_dias)}}
+        """
+        histogramas: Dict[tuple, Dict[int, tuple]] = {}
+        for row in self._conexao().execute(
+            "SELECT categoria, tipo, estado, responsavel, faixa, quantidade, soma "
+            "FROM duracoes_estados WHERE quantidade > 0"
+        ):
+            chave = (row['categoria'], row['tipo'], row['estado'], row['responsavel'])
+            histogramas.setdefault(chave, {})[row['faixa']] = (row['quantidade'], row['soma'])
+        return histogramas
+
+    def reconstruir_duracoes(self) -> int:
+        """
+        Carga dos histogramas de permanência a partir do histórico das duas
+        camadas (bancos anteriores ao trigger); depois disso, só o trigger
+        os atualiza.
+
+        Returns:
+            Quantidade de permanências carregadas
+        """
+        consultas = [
+            "SELECT json_extract(a.dados_json, '$.categoria'), a.tipo, p.estado, a.responsavel, "
+            "MAX(julianday(h.data) - julianday(p.data), 0) "
+            f"FROM {historico} h JOIN {historico} p ON p.alerta_id = h.alerta_id AND p.ordem = h.ordem - 1 "
+            f"JOIN {alertas} a ON a.id = h.alerta_id"
+            for historico, alertas in (
+                ('historico_estados', 'alertas_v2'),
+                ('historico_estados_arquivo', 'alertas_v2_arquivo'),
+            )
+        ]
+        with self._transacao() as conn:
+            acumulado: Dict[tuple, List] = {}
+            total = 0
+            for categoria, tipo, estado, responsavel, dias in conn.execute(" UNION ALL ".join(consultas)):
+                if dias is None:
+                    continue
+                total += 1
+                faixa = faixa_duracao(dias)
+                for chave in chaves_agregadas(categoria or '', tipo or '', estado or '', responsavel or ''):
+                    valores = acumulado.setdefault((*chave, faixa), [0, 0.0])
+                    valores[0] += 1
+                    valores[1] += dias
+
+            conn.execute("DELETE FROM duracoes_estados")
+            conn.executemany(
+                "INSERT INTO duracoes_estados (categoria, tipo, estado, responsavel, faixa, quantidade, soma) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(*chave, *valores) for chave, valores in acumulado.items()]
+            )
+        return total
+
+    # ========================================
+    # TEMPOS DE RESOLUÇÃO
+    # ========================================
+
+    def esbocos_resolucao(self) -> Dict[str, Dict[str, Dict[int, tuple]]]:
+        """
+        Histogramas de tempo de resolução mantidos pelo trigger do histórico.
+
+        Returns:
+            {dimensao: {valor: {faixa: (quantidade, soma_dias)}}}
+        """
+        esbocos: Dict[str, Dict[str, Dict[int, tuple]]] = {d: {} for d, _ in DIMENSOES_RESOLUCAO}
+        for row in self._conexao().execute(
+            "SELECT dimensao, valor, faixa, quantidade, soma FROM resolucoes_alertas WHERE quantidade > 0"
+        ):
+            esbocos.setdefault(row['dimensao'], {}).setdefault(row['valor'], {})[row['faixa']] = (
+                row['quantidade'], row['soma']
+            )
+        return esbocos
+
+    def reconstruir_resolucoes(self) -> int:
+        """
+        Carga dos histogramas de resolução a partir do histórico das duas
+        camadas (bancos anteriores ao trigger); depois disso, só o trigger
+        os atualiza.
+
+        Returns:
+            Quantidade de resoluções carregadas
+        """
+        finais = ", ".join(f"'{e}'" for e in ESTADOS_RESOLUCAO)
+        valores = ", ".join(valor.format(r='a') for _, valor in DIMENSOES_RESOLUCAO)
+        consultas = [
+            f"SELECT {DIAS_RESOLUCAO_SQL.format(h='h', r='a')}, {valores} "
+            f"FROM {historico} h JOIN {historico} p ON p.alerta_id = h.alerta_id AND p.ordem = h.ordem - 1 "
+            f"JOIN {alertas} a ON a.id = h.alerta_id "
+            f"WHERE h.ordem > 0 AND h.estado IN ({finais}) AND COALESCE(p.estado, '') NOT IN ({finais})"
+            for historico, alertas in (
+                ('historico_estados', 'alertas_v2'),
+                ('historico_estados_arquivo', 'alertas_v2_arquivo'),
+            )
+        ]
+        with self._transacao() as conn:
+            acumulado: Dict[tuple, List] = {}
+            total = 0
+            for dias, *chaves in conn.execute(" UNION ALL ".join(consultas)):
+                if dias is None:
+                    continue
+                total += 1
+                faixa = faixa_duracao(dias)
+                for (dimensao, _), valor in zip(DIMENSOES_RESOLUCAO, chaves):
+                    valores_faixa = acumulado.setdefault((dimensao, valor, faixa), [0, 0.0])
+                    valores_faixa[0] += 1
+                    valores_faixa[1] += dias
+
+            conn.execute("DELETE FROM resolucoes_alertas")
+            conn.executemany(
+                "INSERT INTO resolucoes_alertas (dimensao, valor, faixa, quantidade, soma) VALUES (?, ?, ?, ?, ?)",
+                [(*chave, *valores_faixa) for chave, valores_faixa in acumulado.items()]
+            )
+        return total
+
+    # ========================================
+    # VÍNCULOS V1 (RECONCILIAÇÃO DO DUAL WRITE)
+    # ========================================
+
+    def checksums_vinculos(self) -> Dict[str, Dict]:
+        """Checksum de vínculos V1 por contrato_id ('' = sem contrato): {'quantidade', 'soma'}"""
+        return {
+            contrato or '': valores
+            for contrato, valores in self.contadores().get(DIMENSAO_VINCULOS, {}).items()
+        }
+
+    def vinculos_v1(self, contrato_ids: Iterable[str]) -> Dict[str, Dict[str, str]]:
+        """
+        Alertas vinculados a um ID V1 nos contratos informados (camadas
+        quente e fria), pelo índice de contrato_id.
+
+        Returns:
+            {contrato_id: {id_v2: id_v1}} ('' = sem contrato)
+        """
+        contrato_ids = list(dict.fromkeys(contrato_ids))
+        vinculo = VINCULO_V1_SQL.format(r='r')
+        vinculos: Dict[str, Dict[str, str]] = {c: {} for c in contrato_ids}
+        conn = self._conexao()
+        for i in range(0, len(contrato_ids), LOTE_PARAMETROS):
+            lote = contrato_ids[i:i + LOTE_PARAMETROS]
+            marcadores = ",".join("?" * len(lote))
+            # contrato_id NULL cai no balde '' (mesma regra dos triggers)
+            sem_contrato = " OR r.contrato_id IS NULL" if '' in lote else ""
+            for tabela in ('alertas_v2', 'alertas_v2_arquivo'):
+                for row in conn.execute(
+                    f"SELECT COALESCE(r.contrato_id, ''), r.id, {vinculo} FROM {tabela} r "
+                    f"WHERE (r.contrato_id IN ({marcadores}){sem_contrato}) AND {vinculo} IS NOT NULL",
+                    lote
+                ):
+                    vinculos[row[0]][row[1]] = row[2]
+        return vinculos
+
+    def contratos_dos_alertas(self, alerta_ids: Iterable[str]) -> Dict[str, str]:
+        """contrato_id de cada alerta existente (camadas quente e fria); ausentes ficam de fora"""
+        alerta_ids = list(alerta_ids)
+        contratos: Dict[str, str] = {}
+        conn = self._conexao()
+        for i in range(0, len(alerta_ids), LOTE_PARAMETROS):
+            lote = alerta_ids[i:i + LOTE_PARAMETROS]
+            marcadores = ",".join("?" * len(lote))
+            for tabela in ('alertas_v2', 'alertas_v2_arquivo'):
+                for row in conn.execute(
+                    f"SELECT id, COALESCE(contrato_id, '') FROM {tabela} WHERE id IN ({marcadores})", lote
+                ):
+                    contratos[row[0]] = row[1]
+        return contratos
+
+    # ========================================
+    # CAMADA FRIA (ARQUIVO MENSAL)
+    # ========================================
+
+    def arquivar_encerrados(self, estados: Iterable[str], encerrados_antes_de: datetime) -> int:
+        """
+        Move para a camada fria os alertas nos estados informados cuja
+        última atualização é anterior à data de corte.
+
+        Snapshot e histórico de estados mudam de tabela na mesma transação;
+        as ações permanecem em acoes_alertas (indexadas por alerta_id).
+
+        Returns:
+            Quantidade de alertas arquivados
+        """
+        estados = list(estados)
+        corte = encerrados_antes_de.isoformat()
+        marcadores = ", ".join("?" for _ in estados)
+
+        with self._transacao() as conn:
+            mover = []
+            for row in conn.execute(
+                f"SELECT id, dados_json FROM alertas_v2 WHERE estado IN ({marcadores})", estados
+            ).fetchall():
+                dados = json.loads(row['dados_json'])
+                encerramento = dados.get('data_ultima_atualizacao') or dados.get('data_criacao') or ''
+                if encerramento < corte:
+                    mover.append((encerramento[:7], row['id']))
+
+            for i in range(0, len(mover), LOTE_PARAMETROS):
+                lote = mover[i:i + LOTE_PARAMETROS]
+                ids = [id_ for _, id_ in lote]
+                marcadores_ids = ", ".join("?" for _ in ids)
+                conn.executemany(
+                    "INSERT OR REPLACE INTO alertas_v2_arquivo (mes_encerramento, id, contrato_id, estado, "
+                    "tipo, responsavel, criticidade, prazo_resposta, alerta_origem_id, score_risco, dados_json) "
+                    "SELECT ?, id, contrato_id, estado, tipo, responsavel, criticidade, prazo_resposta, "
+                    "alerta_origem_id, score_risco, dados_json FROM alertas_v2 WHERE id = ?",
+                    lote
+                )
+                conn.execute(
+                    f"INSERT OR REPLACE INTO historico_estados_arquivo "
+                    f"SELECT alerta_id, ordem, estado, data, usuario, dados_json FROM historico_estados "
+                    f"WHERE alerta_id IN ({marcadores_ids})", ids
+                )
+                # ON DELETE CASCADE remove o histórico da camada quente
+                conn.execute(f"DELETE FROM alertas_v2 WHERE id IN ({marcadores_ids})", ids)
+
+        self.arquivado_em = date.today()
+        if mover:
+            logger.info(f"Alertas V2 movidos para a camada fria: {len(mover)}")
+        return len(mover)
+
+    def listar_arquivados(self, mes_inicio: str, mes_fim: Optional[str] = None, **filtros) -> List[Dict]:
+        """
+        Alertas da camada fria encerrados entre dois meses (AAAA-MM, inclusive).
+
+        Args:
+            mes_inicio: Primeiro mês do intervalo
+            mes_fim: Último mês (padrão: sem limite)
+            **filtros: coluna=valor, como em listar_alertas
+
+        Returns:
+            Alertas sem 'historico_estados', por mês de encerramento
+        """
+        condicoes, parametros = ["mes_encerramento >= ?"], [mes_inicio]
+        if mes_fim:
+            condicoes.append("mes_encerramento <= ?")
+            parametros.append(mes_fim)
+        for coluna, valor in filtros.items():
+            if coluna not in COLUNAS_ALERTA:
+                raise ValueError(f"Filtro desconhecido: {coluna}")
+            if valor:
+                condicoes.append(f"{coluna} = ?")
+                parametros.append(valor)
+
+        conn = self._conexao()
+        linhas = conn.execute(
+            f"SELECT id, dados_json FROM alertas_v2_arquivo WHERE {' AND '.join(condicoes)} "
+            f"ORDER BY mes_encerramento, id", parametros
+        ).fetchall()
+        return self._montar_alertas(conn, linhas, com_historico=False, arquivado=True)
+
+    # ========================================
+    # MIGRAÇÃO DOS JSON LEGADOS
+    # ========================================
+
+    def migracao_concluida(self) -> bool:
+        """Indica se a migração única dos JSON já foi executada"""
+        row = self._conexao().execute(
+            "SELECT valor FROM store_meta WHERE chave = 'migrado_de_json'"
+        ).fetchone()
+        return row is not None
+
+    def migrar_de_json(
+        self,
+        alertas_path: Path = ALERTAS_JSON_LEGADO,
+        acoes_path: Path = ACOES_JSON_LEGADO,
+        forcar: bool = False
+    ) -> int:
+        """
+        Importa alertas e ações dos JSON legados (execução única).
+
+        Com forcar=True os alertas do JSON substituem os existentes nas duas
+        camadas e os histogramas de permanência e de resolução são
+        recarregados do histórico, já que os triggers contariam de novo o
+        histórico reinserido.
+
+        Returns:
+            Quantidade de alertas migrados (0 se nada a fazer)
+        """
+        if self.migracao_concluida() and not forcar:
+            return 0
+
+        def _ler(caminho: Path) -> List[Dict]:
+            if Path(caminho).exists():
+                with open(caminho, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            return []
+
+        alertas = _ler(alertas_path)
+        acoes = _ler(acoes_path)
+
+        with self._transacao() as conn:
+            for alerta in alertas:
+                for tabela in ('alertas_v2', 'alertas_v2_arquivo'):
+                    conn.execute(f"DELETE FROM {tabela} WHERE id = ?", (alerta['id'],))
+                conn.execute("DELETE FROM historico_estados_arquivo WHERE alerta_id = ?", (alerta['id'],))
+                self._inserir_alerta(conn, alerta)
+            for acao in acoes:
+                conn.execute(
+                    "INSERT OR REPLACE INTO acoes_alertas (id, alerta_id, tipo_acao, usuario, data_acao, dados_json) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (acao['id'], acao['alerta_id'], acao.get('tipo_acao'), acao.get('usuario'),
+                     acao.get('data_acao'), _json(acao))
+                )
+            conn.execute(
+                "INSERT OR REPLACE INTO store_meta (chave, valor) VALUES ('migrado_de_json', ?)",
+                (datetime.now().isoformat(),)
+            )
+
+        logger.info(f"Migração JSON → SQLite concluída: {len(alertas)} alertas V2, {len(acoes)} ações")
+        self.reconstruir_snapshots()
+        if forcar:
+            self.reconstruir_duracoes()
+            self.reconstruir_resolucoes()
+        return len(alertas)
+
+
+# Instância singleton
+_alert_lifecycle_store = None
+_alert_lifecycle_store_lock = threading.Lock()
+
+def get_alert_lifecycle_store() -> AlertLifecycleStore:
+    """Retorna instância singleton do armazenamento (migrando os JSON na primeira abertura)"""
+    global _alert_lifecycle_store
+    if _alert_lifecycle_store is None:
+        with _alert_lifecycle_store_lock:
+            if _alert_lifecycle_store is None:
+                store = AlertLifecycleStore()
+                store.migrar_de_json()
+                _alert_lifecycle_store = store
+    return _alert_lifecycle_store
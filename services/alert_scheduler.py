@@ -0,0 +1,251 @@
+"""
+Agendador Incremental de Alertas
+================================
+Mantém o último conjunto de alertas V1 calculado e reavalia apenas os
+contratos que mudaram ou que cruzaram um limite de vigência.
+
+Motivação:
+- calcular_alertas percorre a carteira inteira a cada rerun, mas os alertas
+  de um contrato só mudam quando ele cruza 120/60/0 dias do fim da vigência
+  ou quando status, pendências ou valor são alterados
+
+Estratégia:
+- Estado por contrato: assinatura dos campos usados pelas regras, alertas
+  atuais e próxima data em que o resultado pode mudar
+- Min-heap de (próxima data, contrato_id), com invalidação preguiçosa:
+  a cada avaliação só saem do heap os contratos vencidos
+- Varredura de assinaturas apenas quando muda a versão do repositório;
+  com a versão igual, o custo é proporcional aos contratos que venceram
+- Cada avaliação devolve o diff (alertas adicionados e removidos) em
+  relação à anterior
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import heapq
+import threading
+import logging
+
+from services.alert_service import (
+    avaliar_regras_contratos,
+    motor_contratos,
+    ordenar_alertas,
+)
+from services.vigencia_index import para_datetime
+
+logger = logging.getLogger(__name__)
+
+
+def _assinatura(contrato: Dict) -> Tuple:
+    """Campos que influenciam as regras de alerta do contrato"""
+    return (
+        contrato.get('numero'),
+        contrato.get('data_fim'),
+        contrato.get('status'),
+        tuple(contrato.get('pendencias') or ()),
+        contrato.get('valor', 0),
+    )
+
+
+class AlertScheduler:
+    """Avaliação incremental dos alertas V1 de uma carteira"""
+
+    def __init__(self, atualizar_dias: bool = True):
+        """
+        Args:
+            atualizar_dias: Reavalia diariamente os contratos com alerta de
+                vigência, para manter 'dias_restantes' e o título em dia.
+                Com False, só os cruzamentos de 120/60/0 dias disparam
+                reavaliação.
+        """
+        self.atualizar_dias = atualizar_dias
+
+        self._lock = threading.Lock()
+        self._versao = None
+        self._contratos: Dict[str, Dict] = {}
+        self._assinaturas: Dict[str, Tuple] = {}
+        self._alertas: Dict[str, List[Dict]] = {}
+        self._vencimentos: Dict[str, datetime] = {}
+        self._heap: List[Tuple[datetime, str]] = []
+        self._lista: Optional[List[Dict]] = None
+
+    # ========================================
+    # AGENDAMENTO
+    # ========================================
+
+    def _proxima_mudanca(self, contrato: Dict, agora: datetime) -> Optional[datetime]:
+        """
+        Instante a partir do qual os alertas do contrato podem mudar.
+
+        dias_restantes = (data_fim - agora).days passa de d para d-1 logo
+        após data_fim - d dias. Assim, a entrada na janela de 120 dias
+        ocorre após data_fim - 121 dias, a passagem para crítico após
+        data_fim - 60 dias e o vencimento após data_fim.
+        """
+        data_fim = para_datetime(contrato.get('data_fim'))
+        if data_fim is None:
+            return None
+
+        limite_atencao = motor_contratos.limiar('limite_atencao_dias')
+        limite_critico = motor_contratos.limiar('limite_critico_dias')
+
+        dias = (data_fim - agora).days
+        if dias > limite_atencao:
+            return data_fim - timedelta(days=limite_atencao + 1)
+        if self.atualizar_dias:
+            return data_fim - timedelta(days=dias)
+        if dias >= limite_critico:
+            return data_fim - timedelta(days=limite_critico)
+        if dias >= 0:
+            return data_fim
+        return None
+
+    def _reavaliar(self, contrato_id: str, atuais: List[Dict], agora: datetime, adicionados: List, removidos: List):
+        """Substitui os alertas de um contrato e reagenda sua próxima mudança"""
+        contrato = self._contratos[contrato_id]
+        anteriores = {a['id']: a for a in self._alertas.get(contrato_id, [])}
+
+        ids_atuais = {a['id'] for a in atuais}
+
+        adicionados.extend(a for a in atuais if a['id'] not in anteriores)
+        removidos.extend(a for id_, a in anteriores.items() if id_ not in ids_atuais)
+
+        self._alertas[contrato_id] = atuais
+        self._lista = None
+
+        vencimento = self._proxima_mudanca(contrato, agora)
+        if vencimento is None:
+            self._vencimentos.pop(contrato_id, None)
+        else:
+            self._vencimentos[contrato_id] = vencimento
+            heapq.heappush(self._heap, (vencimento, contrato_id))
+
+    def _remover(self, contrato_id: str, removidos: List):
+        """Descarta um contrato que saiu da carteira"""
+        removidos.extend(self._alertas.pop(contrato_id, []))
+        self._contratos.pop(contrato_id, None)
+        self._assinaturas.pop(contrato_id, None)
+        self._vencimentos.pop(contrato_id, None)
+        self._lista = None
+
+    # ========================================
+    # AVALIAÇÃO
+    # ========================================
+
+    def avaliar(
+        self,
+        contratos: Optional[List[Dict]] = None,
+        agora: Optional[datetime] = None,
+        versao: Optional[int] = None
+    ) -> Dict:
+        """
+        Atualiza os alertas em relação à avaliação anterior.
+
+        Args:
+            contratos: Carteira atual. None (ou versão igual à anterior) =
+                carteira não mudou; só os contratos agendados são reavaliados
+            agora: Data de referência (padrão: datetime.now())
+            versao: Versão da carteira (ex.: ContractRepository.versao)
+
+        Returns:
+            Dict com 'alertas' (lista completa, ordenada como em
+            calcular_alertas), 'adicionados', 'removidos' e 'reavaliados'
+        """
+        agora = agora or datetime.now()
+        adicionados: List[Dict] = []
+        removidos: List[Dict] = []
+        reavaliar = set()
+
+        with self._lock:
+            # 1) Contratos novos, alterados ou removidos (só se a carteira mudou)
+            if contratos is not None and (versao is None or versao != self._versao):
+                presentes = set()
+                alertas_ordenados = {}
+                for contrato in contratos:
+                    contrato_id = contrato.get('id')
+                    if contrato_id is None:
+                        continue
+                    presentes.add(contrato_id)
+                    assinatura = _assinatura(contrato)
+                    if self._assinaturas.get(contrato_id) != assinatura:
+                        self._assinaturas[contrato_id] = assinatura
+                        reavaliar.add(contrato_id)
+                    self._contratos[contrato_id] = contrato
+                    alertas_ordenados[contrato_id] = self._alertas.get(contrato_id, [])
+
+                for contrato_id in [c for c in self._alertas if c not in presentes]:
+                    self._remover(contrato_id, removidos)
+
+                # Mantém a ordem da carteira (desempate na ordenação final)
+                self._alertas = alertas_ordenados
+                self._lista = None
+                self._versao = versao
+
+            # 2) Contratos cuja próxima mudança já passou
+            while self._heap and self._heap[0][0] < agora:
+                vencimento, contrato_id = heapq.heappop(self._heap)
+                if self._vencimentos.get(contrato_id) == vencimento:
+                    reavaliar.add(contrato_id)
+
+            # Uma única avaliação vetorizada das regras para todos os contratos
+            ordem = sorted(reavaliar)
+            por_posicao: Dict[int, List[Dict]] = {}
+            for posicao, alerta in avaliar_regras_contratos(
+                [self._contratos[c] for c in ordem], agora
+            ):
+                por_posicao.setdefault(posicao, []).append(alerta)
+
+            for posicao, contrato_id in enumerate(ordem):
+                self._reavaliar(contrato_id, por_posicao.get(posicao, []), agora, adicionados, removidos)
+
+            # Heap só com entradas válidas quando acumular lixo demais
+            if len(self._heap) > 2 * len(self._vencimentos) + 64:
+                self._heap = [(v, c) for c, v in self._vencimentos.items()]
+                heapq.heapify(self._heap)
+
+            if self._lista is None:
+                self._lista = ordenar_alertas(
+                    [a for alertas in self._alertas.values() for a in alertas]
+                )
+
+            if reavaliar:
+                logger.info(
+                    f"Alertas reavaliados: {len(reavaliar)} contratos, "
+                    f"+{len(adicionados)} / -{len(removidos)}"
+                )
+
+            return {
+                'alertas': [dict(a) for a in self._lista],
+                'adicionados': [dict(a) for a in adicionados],
+                'removidos': [dict(a) for a in removidos],
+                'reavaliados': len(reavaliar),
+            }
+
+    def avaliar_carteira(self, agora: Optional[datetime] = None) -> Dict:
+        """
+        Avalia a carteira do ContractRepository.
+
+        A lista de contratos só é copiada do repositório quando sua versão
+        muda desde a última avaliação.
+        """
+        # Importação local para evitar dependência circular
+        from services.contract_repository import get_contract_repository
+
+        repositorio = get_contract_repository()
+        versao = repositorio.versao
+        contratos = repositorio.listar() if versao != self._versao else None
+        return self.avaliar(contratos, agora, versao)
+
+
+# Instância singleton
+_alert_scheduler = None
+_alert_scheduler_lock = threading.Lock()
+
+def get_alert_scheduler() -> AlertScheduler:
+    """Retorna instância singleton do agendador de alertas da carteira"""
+    global _alert_scheduler
+    if _alert_scheduler is None:
+        with _alert_scheduler_lock:
+            if _alert_scheduler is None:
+                _alert_scheduler = AlertScheduler()
+    return _alert_scheduler
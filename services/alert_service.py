@@ -14,22 +14,188 @@ Estados do alerta:
 - ARQUIVADO: Alerta não mais relevante (uso futuro)
 """
 
-from datetime import datetime, timedelta
-from typing import List, Dict
+from datetime import datetime
+from typing import List, Dict, Optional, Tuple
 import json
 from pathlib import Path
 
-# Importação condicional para evitar dependência circular
-try:
-    from services.dual_write_service import criar_alerta_dual
-except ImportError:
-    criar_alerta_dual = None
+import numpy as np
+
+from services.rule_engine import Limiar, MotorRegras, Regra, Tabela
+from services.vigencia_index import para_datetime
 
 # Estados possíveis do alerta
 STATUS_ATIVO = "ATIVO"
 STATUS_RESOLVIDO = "RESOLVIDO"
 STATUS_ARQUIVADO = "ARQUIVADO"
 
+# Janelas de vigência (dias até data_fim)
+LIMITE_CRITICO_DIAS = 60
+LIMITE_ATENCAO_DIAS = 120
+
+
+# Contrato de alto valor (R$)
+LIMITE_VALOR_ALTO = 50_000_000
+
+MICROSSEGUNDOS_POR_DIA = 86_400_000_000
+
+
+# ========================================
+# REGRAS DE ALERTA (DECLARATIVAS)
+# ========================================
+
+REGRAS_CONTRATO = [
+    Regra(
+        codigo='VIG_CRIT',
+        tipo='critico',
+        categoria='Vigência',
+        condicoes=(
+            ('tem_data_fim', '==', True),
+            ('dias_restantes', '>=', 0),
+            ('dias_restantes', '<', Limiar('limite_critico_dias')),
+        ),
+        id_modelo='VIG_CRIT_{contrato_id}',
+        titulo='Vigência crítica: {dias_restantes} dias',
+        descricao="Contrato {numero} vence em {dias_restantes} dias. Providenciar prorrogação ou nova licitação urgentemente.",
+        acao_sugerida='prorrogacao',
+        campos={'dias_restantes': 'dias_restantes'},
+        fixos={'status': STATUS_ATIVO},
+    ),
+    Regra(
+        codigo='VIG_ATEN',
+        tipo='atencao',
+        categoria='Vigência',
+        condicoes=(
+            ('tem_data_fim', '==', True),
+            ('dias_restantes', '>=', Limiar('limite_critico_dias')),
+            ('dias_restantes', '<=', Limiar('limite_atencao_dias')),
+        ),
+        id_modelo='VIG_ATEN_{contrato_id}',
+        titulo='Vigência requer atenção: {dias_restantes} dias',
+        descricao="Contrato {numero} vence em {dias_restantes} dias. Planejar renovação ou nova contratação.",
+        acao_sugerida='planejamento',
+        campos={'dias_restantes': 'dias_restantes'},
+        fixos={'status': STATUS_ATIVO},
+    ),
+    Regra(
+        codigo='VIG_VENC',
+        tipo='critico',
+        categoria='Vigência',
+        condicoes=(
+            ('tem_data_fim', '==', True),
+            ('dias_restantes', '<', 0),
+        ),
+        id_modelo='VIG_VENC_{contrato_id}',
+        titulo='Contrato VENCIDO há {dias_vencido} dias',
+        descricao="Contrato {numero} está VENCIDO. Verificar situação imediatamente.",
+        acao_sugerida='verificacao',
+        campos={'dias_restantes': 'dias_restantes'},
+        fixos={'status': STATUS_ATIVO},
+    ),
+    Regra(
+        codigo='STATUS_CRIT',
+        tipo='critico',
+        categoria='Status',
+        condicoes=(('status', '==', 'critico'),),
+        id_modelo='STATUS_CRIT_{contrato_id}',
+        titulo='Contrato com status CRÍTICO',
+        descricao="Contrato {numero} está marcado como crítico. Requer atenção imediata.",
+        fixos={'status': STATUS_ATIVO},
+    ),
+    Regra(
+        codigo='PEND',
+        tipo='atencao',
+        categoria='Pendências',
+        condicoes=(('total_pendencias', '>', 0),),
+        id_modelo='PEND_{contrato_id}',
+        titulo='{total_pendencias} pendência(s) identificada(s)',
+        descricao="Contrato {numero}: {pendencias_resumo}",
+        acao_sugerida='resolucao',
+        campos={'total_pendencias': 'total_pendencias'},
+        fixos={'status': STATUS_ATIVO},
+    ),
+    Regra(
+        codigo='VALOR_ALTO',
+        tipo='info',
+        categoria='Valor',
+        condicoes=(('valor_num', '>', Limiar('limite_valor_alto')),),
+        id_modelo='VALOR_ALTO_{contrato_id}',
+        titulo='Contrato de alto valor: R$ {valor_milhoes:.1f}M',
+        descricao="Contrato {numero} possui valor elevado. Acompanhamento especial recomendado.",
+        acao_sugerida='acompanhamento',
+        campos={'valor': 'valor'},
+        fixos={'status': STATUS_ATIVO},
+    ),
+]
+
+# Compiladas uma única vez na importação
+motor_contratos = MotorRegras(
+    'contratos',
+    REGRAS_CONTRATO,
+    {
+        'limite_critico_dias': LIMITE_CRITICO_DIAS,
+        'limite_atencao_dias': LIMITE_ATENCAO_DIAS,
+        'limite_valor_alto': LIMITE_VALOR_ALTO,
+    }
+)
+
+
+def _resumo_pendencias(pendencias: List[str]) -> str:
+    """Duas primeiras pendências, com reticências se houver mais"""
+    return f"{', '.join(pendencias[:2])}{'...' if len(pendencias) > 2 else ''}"
+
+
+def _tabela_contratos(contratos: List[Dict], hoje: datetime) -> Tabela:
+    """Monta a tabela colunar usada pelas regras de contrato"""
+    datas_fim = np.array(
+        [para_datetime(c.get('data_fim')) for c in contratos], dtype='datetime64[us]'
+    )
+    tem_data_fim = ~np.isnat(datas_fim)
+    # Mesma semântica de timedelta.days (arredonda para baixo)
+    diferenca = (datas_fim - np.datetime64(hoje, 'us')).astype(np.int64)
+    dias_restantes = np.where(tem_data_fim, diferenca // MICROSSEGUNDOS_POR_DIA, 0)
+
+    pendencias = [c.get('pendencias') or [] for c in contratos]
+    valores = [c.get('valor', 0) for c in contratos]
+    valor_num = np.array([float(v or 0) for v in valores], dtype=np.float64)
+
+    return Tabela(
+        colunas={
+            'contrato_id': np.array([c.get('id') for c in contratos], dtype=object),
+            'numero': np.array([c.get('numero') for c in contratos], dtype=object),
+            'status': np.array([c.get('status') for c in contratos], dtype=object),
+            'tem_data_fim': tem_data_fim,
+            'dias_restantes': dias_restantes,
+            'dias_vencido': -dias_restantes,
+            'total_pendencias': np.array([len(p) for p in pendencias], dtype=np.int64),
+            'pendencias_resumo': np.array(
+                [_resumo_pendencias(p) if p else '' for p in pendencias], dtype=object
+            ),
+            'valor': np.array(valores, dtype=object),
+            'valor_num': valor_num,
+            'valor_milhoes': valor_num / 1_000_000,
+        },
+        campos_base={'contrato_id': 'contrato_id', 'contrato_numero': 'numero'},
+        constantes={'data_alerta': hoje},
+    )
+
+
+def avaliar_regras_contratos(contratos: List[Dict], hoje: Optional[datetime] = None) -> List[Tuple[int, Dict]]:
+    """
+    Avalia as regras de contrato sobre uma lista de contratos.
+    
+    Args:
+        contratos: Contratos a avaliar
+        hoje: Data de referência (padrão: agora)
+        
+    Returns:
+        Pares (posição do contrato na lista, alerta), na ordem dos
+        contratos e, para cada contrato, na ordem das regras
+    """
+    if not contratos:
+        return []
+    return motor_contratos.avaliar(_tabela_contratos(contratos, hoje or datetime.now()))
+
 
 def calcular_alertas(contratos: List[Dict]) -> List[Dict]:
     """
@@ -38,138 +204,26 @@ def calcular_alertas(contratos: List[Dict]) -> List[Dict]:
     IMPORTANTE: Esta função APENAS APONTA alertas com base em regras.
     A resolução é sempre uma DECISÃO ADMINISTRATIVA HUMANA.
     
+    A função é pura (não grava nada). A criação dos alertas V2
+    correspondentes é feita à parte, em lote, por
+    dual_write_service.sincronizar_alertas_lote().
+    
+    As regras estão declaradas em REGRAS_CONTRATO e são avaliadas de forma
+    vetorizada pelo motor de regras (ver rule_engine).
+    
     Args:
         contratos: Lista de contratos
         
     Returns:
         Lista de alertas ordenados por criticidade, todos com status ATIVO
     """
-    alertas = []
-    hoje = datetime.now()
-    
-    for contrato in contratos:
-        # Verifica vigência
-        data_fim = contrato.get('data_fim')
-        if isinstance(data_fim, str):
-            data_fim = datetime.fromisoformat(data_fim)
-        
-        if data_fim:
-            dias_restantes = (data_fim - hoje).days
-            
-            # ALERTA CRÍTICO: Vigência < 60 dias
-            if dias_restantes < 60 and dias_restantes >= 0:
-                alertas.append({
-                    'id': f"VIG_CRIT_{contrato['id']}",
-                    'status': STATUS_ATIVO,
-                    'tipo': 'critico',
-                    'categoria': 'Vigência',
-                    'titulo': f'Vigência crítica: {dias_restantes} dias',
-                    'descricao': f"Contrato {contrato['numero']} vence em {dias_restantes} dias. Providenciar prorrogação ou nova licitação urgentemente.",
-                    'contrato_id': contrato['id'],
-                    'contrato_numero': contrato['numero'],
-                    'dias_restantes': dias_restantes,
-                    'data_alerta': hoje,
-                    'acao_sugerida': 'prorrogacao'
-                })
-            
-            elif dias_restantes >= 60 and dias_restantes <= 120:
-                alerta = {
-                    'id': f"VIG_ATEN_{contrato['id']}",
-                    'status': STATUS_ATIVO,
-                    'tipo': 'atencao',
-                    'categoria': 'Vigência',
-                    'titulo': f'Vigência requer atenção: {dias_restantes} dias',
-                    'descricao': f"Contrato {contrato['numero']} vence em {dias_restantes} dias. Planejar renovação ou nova contratação.",
-                    'contrato_id': contrato['id'],
-                    'contrato_numero': contrato['numero'],
-                    'dias_restantes': dias_restantes,
-                    'data_alerta': hoje,
-                    'acao_sugerida': 'planejamento'
-                }
-                alertas.append(alerta)
-                if criar_alerta_dual:
-                    criar_alerta_dual(alerta)
-            
-            # ALERTA VENCIDO
-            elif dias_restantes < 0:
-                alerta = {
-                    'id': f"VIG_VENC_{contrato['id']}",
-                    'status': STATUS_ATIVO,
-                    'tipo': 'critico',
-                    'categoria': 'Vigência',
-                    'titulo': f'Contrato VENCIDO há {abs(dias_restantes)} dias',
-                    'descricao': f"Contrato {contrato['numero']} está VENCIDO. Verificar situação imediatamente.",
-                    'contrato_id': contrato['id'],
-                    'contrato_numero': contrato['numero'],
-                    'dias_restantes': dias_restantes,
-                    'data_alerta': hoje,
-                    'acao_sugerida': 'verificacao'
-                }
-                alertas.append(alerta)
-                if criar_alerta_dual:
-                    criar_alerta_dual(alerta)
-        
-        # ALERTA STATUS CRÍTICO
-        if contrato.get('status') == 'critico':
-            alerta = {
-                'id': f"STATUS_CRIT_{contrato['id']}",
-                'status': STATUS_ATIVO,
-                'tipo': 'critico',
-                'categoria': 'Status',
-                'titulo': 'Contrato com status CRÍTICO',
-                'descricao': f"Contrato {contrato['numero']} está marcado como crítico. Requer atenção imediata.",
-                'contrato_id': contrato['id'],
-                'contrato_numero': contrato['numero'],
-                'data_alerta': hoje
-            }
-            alertas.append(alerta)
-            if criar_alerta_dual:
-                criar_alerta_dual(alerta)
-        
-        # ALERTA PENDÊNCIAS
-        pendencias = contrato.get('pendencias', [])
-        if pendencias:
-            alerta = {
-                'id': f"PEND_{contrato['id']}",
-                'status': STATUS_ATIVO,
-                'tipo': 'atencao',
-                'categoria': 'Pendências',
-                'titulo': f'{len(pendencias)} pendência(s) identificada(s)',
-                'descricao': f"Contrato {contrato['numero']}: {', '.join(pendencias[:2])}{'...' if len(pendencias) > 2 else ''}",
-                'contrato_id': contrato['id'],
-                'contrato_numero': contrato['numero'],
-                'total_pendencias': len(pendencias),
-                'data_alerta': hoje,
-                'acao_sugerida': 'resolucao'
-            }
-            alertas.append(alerta)
-            if criar_alerta_dual:
-                criar_alerta_dual(alerta)
-        
-        # ALERTA VALOR ALTO (> R$ 50M)
-        valor = contrato.get('valor', 0)
-        if valor > 50_000_000:
-            alerta = {
-                'id': f"VALOR_ALTO_{contrato['id']}",
-                'status': STATUS_ATIVO,
-                'tipo': 'info',
-                'categoria': 'Valor',
-                'titulo': f'Contrato de alto valor: R$ {valor/1_000_000:.1f}M',
-                'descricao': f"Contrato {contrato['numero']} possui valor elevado. Acompanhamento especial recomendado.",
-                'contrato_id': contrato['id'],
-                'contrato_numero': contrato['numero'],
-                'valor': valor,
-                'data_alerta': hoje,
-                'acao_sugerida': 'acompanhamento'
-            }
-            alertas.append(alerta)
-            if criar_alerta_dual:
-                criar_alerta_dual(alerta)
-    
-    # Ordena por criticidade e dias restantes
+    return ordenar_alertas([alerta for _, alerta in avaliar_regras_contratos(contratos)])
+
+
+def ordenar_alertas(alertas: List[Dict]) -> List[Dict]:
+    """Ordena alertas por criticidade e dias restantes (ordenação estável)"""
     prioridade = {'critico': 0, 'atencao': 1, 'info': 2}
     alertas.sort(key=lambda x: (prioridade.get(x['tipo'], 3), x.get('dias_restantes', 999)))
-    
     return alertas
 
 
@@ -343,17 +397,72 @@ def carregar_alertas_resolvidos(contrato_id: str = None) -> List[Dict]:
         return []
 
 
-def obter_estatisticas_resolucoes() -> Dict:
+# Contadores materializados das resoluções (derivados de alertas_resolvidos.json)
+ESTATISTICAS_RESOLUCOES_FILE = Path("data/alertas_resolvidos_estatisticas.json")
+
+# Quantidade de resoluções recentes mantidas nas estatísticas
+ULTIMAS_RESOLUCOES = 10
+
+
+def _assinatura_resolvidos() -> Optional[List[int]]:
+    """mtime e tamanho de alertas_resolvidos.json (detecta edições fora do app)"""
+    arquivo = Path("data/alertas_resolvidos.json")
+    if not arquivo.exists():
+        return None
+    info = arquivo.stat()
+    return [info.st_mtime_ns, info.st_size]
+
+
+def _acumular_resolucao(stats: Dict, alerta: Dict):
+    """Soma uma resolução aos contadores e às últimas resoluções"""
+    stats["total"] += 1
+    
+    # Contagem por tipo
+    tipo = alerta.get("alerta_tipo", "Desconhecido")
+    stats["por_tipo"][tipo] = stats["por_tipo"].get(tipo, 0) + 1
+    
+    # Contagem por categoria
+    categoria = alerta.get("alerta_categoria", "Desconhecido")
+    stats["por_categoria"][categoria] = stats["por_categoria"].get(categoria, 0) + 1
+    
+    # Contagem por usuário
+    usuario = alerta.get("usuario", "Desconhecido")
+    stats["por_usuario"][usuario] = stats["por_usuario"].get(usuario, 0) + 1
+
+
+def _salvar_estatisticas_resolucoes(stats: Dict):
+    ESTATISTICAS_RESOLUCOES_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(ESTATISTICAS_RESOLUCOES_FILE, "w") as f:
+        json.dump(
+            {"assinatura": _assinatura_resolvidos(), "estatisticas": stats},
+            f, indent=2, ensure_ascii=False, default=str
+        )
+
+
+def _carregar_estatisticas_resolucoes() -> Optional[Dict]:
+    """Contadores materializados, ou None se ausentes ou defasados em relação ao JSON"""
+    try:
+        with open(ESTATISTICAS_RESOLUCOES_FILE, "r") as f:
+            dados = json.load(f)
+    except Exception:
+        return None
+    if dados.get("assinatura") != _assinatura_resolvidos():
+        return None
+    return dados.get("estatisticas")
+
+
+def reconstruir_estatisticas_resolucoes() -> Dict:
     """
-    Gera estatísticas de alertas resolvidos para relatórios.
+    Recalcula os contadores de resoluções a partir de alertas_resolvidos.json
+    e regrava a versão materializada.
     
     Returns:
         Dicionário com estatísticas agregadas
     """
-    resolvidos = carregar_alertas_resolvidos()
+    resolvidos = [a for a in carregar_alertas_resolvidos() if isinstance(a, dict)]
     
     stats = {
-        "total": len(resolvidos),
+        "total": 0,
         "por_tipo": {},
         "por_categoria": {},
         "por_usuario": {},
@@ -361,17 +470,7 @@ def obter_estatisticas_resolucoes() -> Dict:
     }
     
     for alerta in resolvidos:
-        # Contagem por tipo
-        tipo = alerta.get("alerta_tipo", "Desconhecido")
-        stats["por_tipo"][tipo] = stats["por_tipo"].get(tipo, 0) + 1
-        
-        # Contagem por categoria
-        categoria = alerta.get("alerta_categoria", "Desconhecido")
-        stats["por_categoria"][categoria] = stats["por_categoria"].get(categoria, 0) + 1
-        
-        # Contagem por usuário
-        usuario = alerta.get("usuario", "Desconhecido")
-        stats["por_usuario"][usuario] = stats["por_usuario"].get(usuario, 0) + 1
+        _acumular_resolucao(stats, alerta)
     
     # Ordena por data (mais recentes primeiro)
     resolvidos_ordenados = sorted(
@@ -379,6 +478,59 @@ def obter_estatisticas_resolucoes() -> Dict:
         key=lambda x: x.get("data", ""), 
         reverse=True
     )
-    stats["ultimas_resolucoes"] = resolvidos_ordenados[:10]
+    stats["ultimas_resolucoes"] = resolvidos_ordenados[:ULTIMAS_RESOLUCOES]
+    
+    _salvar_estatisticas_resolucoes(stats)
+    return stats
+
+
+def gravar_alerta_resolvido(resolvidos: List[Dict], resolucao: Dict) -> Dict:
+    """
+    Acrescenta uma resolução a alertas_resolvidos.json e soma-a aos
+    contadores materializados.
     
+    Se os contadores já estavam defasados em relação ao arquivo (edição
+    fora do app), são reconstruídos em vez de incrementados.
+    
+    Args:
+        resolvidos: Resoluções já gravadas (como carregadas pela página)
+        resolucao: Novo registro (id, data, usuario, alerta_tipo, ...)
+        
+    Returns:
+        Estatísticas atualizadas
+    """
+    stats = _carregar_estatisticas_resolucoes()
+    
+    arquivo = Path("data/alertas_resolvidos.json")
+    arquivo.parent.mkdir(parents=True, exist_ok=True)
+    with open(arquivo, "w") as f:
+        json.dump(resolvidos + [resolucao], f, indent=2, ensure_ascii=False)
+    
+    if stats is None:
+        return reconstruir_estatisticas_resolucoes()
+    
+    _acumular_resolucao(stats, resolucao)
+    stats["ultimas_resolucoes"] = sorted(
+        [resolucao] + stats["ultimas_resolucoes"],
+        key=lambda x: x.get("data", ""),
+        reverse=True
+    )[:ULTIMAS_RESOLUCOES]
+    
+    _salvar_estatisticas_resolucoes(stats)
+    return stats
+
+
+def obter_estatisticas_resolucoes() -> Dict:
+    """
+    Gera estatísticas de alertas resolvidos para relatórios.
+    
+    Lê os contadores materializados (atualizados a cada resolução); só
+    percorre alertas_resolvidos.json se estiverem ausentes ou defasados.
+    
+    Returns:
+        Dicionário com estatísticas agregadas
+    """
+    stats = _carregar_estatisticas_resolucoes()
+    if stats is None:
+        stats = reconstruir_estatisticas_resolucoes()
     return stats
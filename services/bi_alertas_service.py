@@ -13,6 +13,12 @@ FUNCIONALIDADES:
 - Previsão de rupturas
 - Análise de gargalos
 - Tendências temporais
+- Motor de risco da carteira: uma passada vetorizada (NumPy) alimenta os
+  KPIs e a previsão de rupturas
+- Tempos de etapa aprendidos do histórico de estados (ModeloDuracoes),
+  com os TEMPO_MEDIO_* como padrão enquanto não há amostras suficientes
+- Percentis de resolução lidos de histogramas de faixas fixas (esboços
+  mantidos pelo store, mescláveis), sem guardar e ordenar os tempos
 """
 
 from datetime import datetime, timedelta
@@ -21,10 +27,18 @@ from pathlib import Path
 import json
 from collections import defaultdict
 import statistics
+import math
+
+import numpy as np
 
 # Imports internos
 from services.alert_lifecycle_service import (
     listar_alertas_v2,
+    listar_alertas_arquivados,
+    calcular_tempos_por_estado,
+    obter_modelo_duracoes,
+    obter_esbocos_resolucao,
+    obter_contagens_por_responsavel,
     ESTADO_NOVO,
     ESTADO_EM_ANALISE,
     ESTADO_PROVIDENCIA_EM_CURSO,
@@ -33,6 +47,7 @@ from services.alert_lifecycle_service import (
     ESTADO_ENCERRADO,
     ESTADO_ESCALONADO
 )
+from services.stage_durations import ModeloDuracoes, faixa_duracao, mesclar_histogramas, resumir_histograma
 
 
 # ========================================
@@ -51,6 +66,25 @@ TEMPO_MEDIO_FORMALIZACAO = 10  # Tempo de formalização
 BUFFER_SEGURANCA_CRITICO = 15  # 15 dias de buffer para críticos
 BUFFER_SEGURANCA_NORMAL = 30  # 30 dias de buffer para normais
 
+# Contratos a menos deste prazo do fim precisam de processo de renovação
+HORIZONTE_RENOVACAO_DIAS = 180
+
+# Etapas do processo de um alerta crítico: (rótulo, estados do ciclo de vida
+# cuja permanência aprendida mede a etapa, tempo padrão sem histórico suficiente)
+ETAPAS_PROCESSO_CRITICO = (
+    ("Processo prorrogação", (ESTADO_PROVIDENCIA_EM_CURSO,), TEMPO_MEDIO_PROCESSO_PRORROGACAO),
+    ("Aprovação", (ESTADO_AGUARDANDO_PRAZO,), TEMPO_MEDIO_APROVACAO),
+    ("Formalização", (), TEMPO_MEDIO_FORMALIZACAO),  # Sem estado próprio: sempre o padrão
+)
+
+# Nível de risco -> (status, cor)
+NIVEIS_RISCO = {
+    "urgente": ("⛔ RUPTURA IMINENTE", "red"),
+    "alto": ("⚠️ JANELA DE SEGURANÇA VIOLADA", "orange"),
+    "medio": ("⚡ ATENÇÃO NECESSÁRIA", "yellow"),
+    "baixo": ("✅ DENTRO DA MARGEM", "green"),
+}
+
 # Thresholds de performance
 THRESHOLD_EFICIENCIA_BOA = 5  # <= 5 dias = eficiente
 THRESHOLD_EFICIENCIA_MEDIA = 15  # <= 15 dias = média
@@ -61,23 +95,61 @@ THRESHOLD_EFICIENCIA_MEDIA = 15  # <= 15 dias = média
 # INDICADOR 1: RISCO REAL DE RUPTURA
 # ========================================
 
-def calcular_risco_ruptura(contrato: Dict, alertas: List[Dict]) -> Dict[str, any]:
+def _etapas_alerta(alerta: Dict, modelo: ModeloDuracoes) -> List[Tuple[str, int]]:
+    """
+    Etapas pendentes de um alerta ativo com a duração em dias (permanência
+    aprendida do histórico, arredondada para cima, ou o tempo padrão)
+    """
+    estado = alerta.get('estado')
+    chave = {
+        'categoria': alerta.get('categoria'),
+        'tipo': alerta.get('tipo'),
+        'responsavel': alerta.get('responsavel'),
+    }
+    etapas = []
+    
+    if estado == ESTADO_NOVO or estado == ESTADO_EM_ANALISE:
+        estados_analise = (ESTADO_NOVO, ESTADO_EM_ANALISE) if estado == ESTADO_NOVO else (ESTADO_EM_ANALISE,)
+        etapas.append(("Análise", math.ceil(modelo.tempo_etapa(estados_analise, TEMPO_MEDIO_ANALISE, **chave))))
+    
+    if alerta.get('tipo') == 'critico':
+        # Alertas críticos geralmente requerem processo completo
+        for rotulo, estados, padrao in ETAPAS_PROCESSO_CRITICO:
+            etapas.append((rotulo, math.ceil(modelo.tempo_etapa(estados, padrao, **chave))))
+    
+    return etapas
+
+
+def _tempo_renovacao(modelo: ModeloDuracoes) -> int:
+    """Processo completo de renovação (nível geral do modelo)"""
+    return sum(math.ceil(modelo.tempo_etapa(estados, padrao)) for _, estados, padrao in ETAPAS_PROCESSO_CRITICO)
+
+
+def calcular_risco_ruptura(
+    contrato: Dict,
+    alertas: List[Dict],
+    modelo: Optional[ModeloDuracoes] = None
+) -> Dict[str, any]:
     """
     Calcula o risco real de ruptura considerando tempo histórico necessário
     
     Lógica:
     - Tempo Nominal: Dias até o fim da vigência
-    - Tempo Necessário: Soma dos tempos médios das etapas pendentes
+    - Tempo Necessário: Soma dos tempos das etapas pendentes (P75 da
+      permanência aprendida do histórico de estados; TEMPO_MEDIO_* sem
+      histórico suficiente)
     - Tempo Real Restante: Tempo Nominal - Tempo Necessário
     - Risco: Violação quando Tempo Real Restante < Janela de Segurança
     
     Args:
         contrato: Dados do contrato
         alertas: Lista de alertas relacionados
+        modelo: Modelo de durações (padrão: obter_modelo_duracoes())
         
     Returns:
         Dicionário com análise de risco
     """
+    modelo = modelo if modelo is not None else obter_modelo_duracoes()
     hoje = datetime.now()
     data_fim = contrato.get('data_fim')
     
@@ -98,27 +170,13 @@ def calcular_risco_ruptura(contrato: Dict, alertas: List[Dict]) -> Dict[str, any
     etapas_pendentes = []
     
     for alerta in alertas_ativos:
-        estado = alerta.get('estado')
-        tipo = alerta.get('tipo')
-        
-        if estado == ESTADO_NOVO or estado == ESTADO_EM_ANALISE:
-            tempo_necessario += TEMPO_MEDIO_ANALISE
-            etapas_pendentes.append(f"Análise ({TEMPO_MEDIO_ANALISE}d)")
-        
-        if tipo == 'critico':
-            # Alertas críticos geralmente requerem processo completo
-            tempo_necessario += TEMPO_MEDIO_PROCESSO_PRORROGACAO
-            tempo_necessario += TEMPO_MEDIO_APROVACAO
-            tempo_necessario += TEMPO_MEDIO_FORMALIZACAO
-            etapas_pendentes.extend([
-                f"Processo prorrogação ({TEMPO_MEDIO_PROCESSO_PRORROGACAO}d)",
-                f"Aprovação ({TEMPO_MEDIO_APROVACAO}d)",
-                f"Formalização ({TEMPO_MEDIO_FORMALIZACAO}d)"
-            ])
+        for rotulo, dias in _etapas_alerta(alerta, modelo):
+            tempo_necessario += dias
+            etapas_pendentes.append(f"{rotulo} ({dias}d)")
     
     # Se não há alertas ativos mas contrato está próximo do fim
-    if not alertas_ativos and dias_nominais < 180:
-        tempo_necessario = TEMPO_MEDIO_PROCESSO_PRORROGACAO + TEMPO_MEDIO_APROVACAO + TEMPO_MEDIO_FORMALIZACAO
+    if not alertas_ativos and dias_nominais < HORIZONTE_RENOVACAO_DIAS:
+        tempo_necessario = _tempo_renovacao(modelo)
         etapas_pendentes = ["Processo completo de renovação"]
     
     # Tempo real restante
@@ -130,20 +188,13 @@ def calcular_risco_ruptura(contrato: Dict, alertas: List[Dict]) -> Dict[str, any
     # Determinar risco
     if tempo_real_restante < 0:
         nivel_risco = "urgente"
-        status = "⛔ RUPTURA IMINENTE"
-        cor = "red"
     elif tempo_real_restante < janela_seguranca:
         nivel_risco = "alto"
-        status = "⚠️ JANELA DE SEGURANÇA VIOLADA"
-        cor = "orange"
     elif tempo_real_restante < janela_seguranca * 2:
         nivel_risco = "medio"
-        status = "⚡ ATENÇÃO NECESSÁRIA"
-        cor = "yellow"
     else:
         nivel_risco = "baixo"
-        status = "✅ DENTRO DA MARGEM"
-        cor = "green"
+    status, cor = NIVEIS_RISCO[nivel_risco]
     
     return {
         "contrato_id": contrato.get('id'),
@@ -161,11 +212,146 @@ def calcular_risco_ruptura(contrato: Dict, alertas: List[Dict]) -> Dict[str, any
     }
 
 
+# ========================================
+# MOTOR DE RISCO DA CARTEIRA (VETORIZADO)
+# ========================================
+
+def _data_fim(contrato: Dict) -> Optional[datetime]:
+    data_fim = contrato.get('data_fim')
+    if isinstance(data_fim, str):
+        data_fim = datetime.fromisoformat(data_fim)
+    return data_fim or None
+
+
+def calcular_riscos_carteira(
+    contratos: List[Dict],
+    alertas_por_contrato: Dict[str, List[Dict]],
+    hoje: Optional[datetime] = None,
+    modelo: Optional[ModeloDuracoes] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Risco de ruptura de todos os contratos em uma única passada
+    
+    Mesma regra de calcular_risco_ruptura, calculada em arrays: cada
+    alerta ativo vira uma linha (tempo e quantidade de etapas, consultados
+    no modelo de durações uma vez por combinação de estado, tipo,
+    categoria e responsável) e as linhas são agrupadas por contrato com
+    np.bincount; tempo necessário, tempo real restante, janela de
+    segurança e nível saem de operações sobre as colunas.
+    
+    Args:
+        contratos: Lista de contratos
+        alertas_por_contrato: Mapa contrato_id -> lista de alertas
+        hoje: Data de referência (padrão: agora)
+        modelo: Modelo de durações (padrão: obter_modelo_duracoes())
+        
+    Returns:
+        Dict de arrays na ordem de `contratos`: data_fim (datetime ou
+        None), dias_nominais, tempo_necessario, tempo_real_restante,
+        janela_seguranca, etapas_pendentes e nivel_risco ('indeterminado'
+        sem data de fim)
+    """
+    hoje = hoje or datetime.now()
+    modelo = modelo if modelo is not None else obter_modelo_duracoes()
+    
+    datas_fim = [_data_fim(c) for c in contratos]
+    com_data = np.array([d is not None for d in datas_fim], dtype=bool)
+    fins = np.array(
+        [np.datetime64(d, 'us') if d is not None else np.datetime64('NaT', 'us') for d in datas_fim],
+        dtype='datetime64[us]'
+    )
+    # (data_fim - hoje).days: divisão inteira (arredonda para baixo, como timedelta)
+    delta = (fins - np.datetime64(hoje, 'us')).astype(np.int64)
+    dias_nominais = np.where(com_data, np.floor_divide(delta, 86_400_000_000), 0)
+    
+    # Alertas agrupados pelo código do contrato (IDs repetidos compartilham os alertas)
+    codigo_por_id: Dict[str, int] = {}
+    codigo_contrato = np.array(
+        [codigo_por_id.setdefault(c.get('id'), len(codigo_por_id)) for c in contratos], dtype=np.int64
+    )
+    # Uma linha por alerta ativo: (código do contrato, dias, quantidade de etapas)
+    codigos, tempos, etapas = [], [], []
+    etapas_por_chave: Dict[tuple, Tuple[int, int]] = {}
+    for contrato_id, codigo in codigo_por_id.items():
+        for alerta in alertas_por_contrato.get(contrato_id, ()):
+            if alerta['estado'] in (ESTADO_RESOLVIDO, ESTADO_ENCERRADO):
+                continue
+            chave = (alerta['estado'], alerta.get('tipo'), alerta.get('categoria'), alerta.get('responsavel'))
+            if chave not in etapas_por_chave:
+                etapas_alerta = _etapas_alerta(alerta, modelo)
+                etapas_por_chave[chave] = (sum(d for _, d in etapas_alerta), len(etapas_alerta))
+            codigos.append(codigo)
+            tempos.append(etapas_por_chave[chave][0])
+            etapas.append(etapas_por_chave[chave][1])
+    codigos = np.array(codigos, dtype=np.int64)
+    
+    def _por_contrato(pesos: Optional[List[int]] = None) -> np.ndarray:
+        somas = np.bincount(codigos, weights=pesos, minlength=len(codigo_por_id))
+        return somas.astype(np.int64)[codigo_contrato]
+    
+    n_ativos = _por_contrato()
+    renovacao = (n_ativos == 0) & (dias_nominais < HORIZONTE_RENOVACAO_DIAS)
+    tempo_necessario = np.where(renovacao, _tempo_renovacao(modelo), _por_contrato(tempos))
+    etapas_pendentes = np.where(renovacao, 1, _por_contrato(etapas))
+    tempo_real_restante = dias_nominais - tempo_necessario
+    janela_seguranca = np.where(n_ativos > 0, BUFFER_SEGURANCA_CRITICO, BUFFER_SEGURANCA_NORMAL)
+    
+    nivel_risco = np.select(
+        [
+            ~com_data,
+            tempo_real_restante < 0,
+            tempo_real_restante < janela_seguranca,
+            tempo_real_restante < janela_seguranca * 2,
+        ],
+        ["indeterminado", "urgente", "alto", "medio"],
+        default="baixo"
+    ).astype(object)
+    
+    return {
+        "data_fim": datas_fim,
+        "dias_nominais": dias_nominais,
+        "tempo_necessario": tempo_necessario,
+        "tempo_real_restante": tempo_real_restante,
+        "janela_seguranca": janela_seguranca,
+        "etapas_pendentes": etapas_pendentes,
+        "nivel_risco": nivel_risco,
+    }
+
+
+def _previsoes_de_riscos(contratos: List[Dict], riscos: Dict[str, np.ndarray], limite: Optional[int] = None) -> List[Dict]:
+    """Contratos de risco médio ou superior, mais urgentes primeiro (ordem estável)"""
+    em_risco = np.flatnonzero(np.isin(riscos["nivel_risco"], ["medio", "alto", "urgente"]))
+    ordem = em_risco[np.argsort(riscos["tempo_real_restante"][em_risco], kind='stable')]
+    if limite is not None:
+        ordem = ordem[:limite]
+    
+    previsoes = []
+    for i in ordem:
+        contrato = contratos[i]
+        data_fim = riscos["data_fim"][i]
+        nivel = riscos["nivel_risco"][i]
+        status, cor = NIVEIS_RISCO[nivel]
+        tempo_real_restante = int(riscos["tempo_real_restante"][i])
+        previsoes.append({
+            "contrato": contrato.get('numero'),
+            "objeto": contrato.get('objeto', '')[:60] + '...',
+            "data_fim": data_fim.strftime('%d/%m/%Y') if data_fim else 'N/A',
+            "dias_nominais": int(riscos["dias_nominais"][i]),
+            "tempo_real_restante": tempo_real_restante,
+            "nivel_risco": nivel,
+            "status": status,
+            "cor": cor,
+            "etapas_pendentes": int(riscos["etapas_pendentes"][i]),
+            "urgencia_score": -tempo_real_restante  # Para ordenação
+        })
+    return previsoes
+
+
 # ========================================
 # INDICADOR 2: CONSUMO SILENCIOSO DE PRAZO
 # ========================================
 
-def calcular_consumo_silencioso(alerta: Dict) -> Dict[str, any]:
+def calcular_consumo_silencioso(alerta: Dict, tempos_por_estado: Optional[Dict[str, float]] = None) -> Dict[str, any]:
     """
     Identifica tempo gasto além do esperado em cada estado
     
@@ -176,6 +362,9 @@ def calcular_consumo_silencioso(alerta: Dict) -> Dict[str, any]:
     
     Args:
         alerta: Alerta V2
+        tempos_por_estado: Dias em cada estado, do replay do log de
+            transições (calcular_tempos_por_estado). Sem ele, o tempo no
+            estado atual é aproximado pelos dias desde a criação.
         
     Returns:
         Análise de consumo silencioso
@@ -200,8 +389,14 @@ def calcular_consumo_silencioso(alerta: Dict) -> Dict[str, any]:
     
     tempo_esperado = tempo_esperado_map.get(estado_atual, 7)
     
+    # Tempo efetivo no estado atual (exato quando há log de transições)
+    if tempos_por_estado and estado_atual in tempos_por_estado:
+        dias_no_estado = int(tempos_por_estado[estado_atual])
+    else:
+        dias_no_estado = dias_desde_criacao
+    
     # Calcular consumo silencioso
-    consumo_silencioso = max(0, dias_desde_criacao - tempo_esperado)
+    consumo_silencioso = max(0, dias_no_estado - tempo_esperado)
     percentual_extra = round((consumo_silencioso / tempo_esperado * 100) if tempo_esperado > 0 else 0, 1)
     
     # Determinar severidade
@@ -222,6 +417,7 @@ def calcular_consumo_silencioso(alerta: Dict) -> Dict[str, any]:
         "alerta_id": alerta.get('id'),
         "estado": estado_atual,
         "dias_desde_criacao": dias_desde_criacao,
+        "dias_no_estado": dias_no_estado,
         "tempo_esperado": tempo_esperado,
         "consumo_silencioso": consumo_silencioso,
         "percentual_extra": percentual_extra,
@@ -235,7 +431,36 @@ def calcular_consumo_silencioso(alerta: Dict) -> Dict[str, any]:
 # INDICADOR 3: EFICIÊNCIA POR GESTOR
 # ========================================
 
-def calcular_eficiencia_gestores(alertas: List[Dict]) -> Dict[str, Dict]:
+def _esbocos_da_lista(alertas: List[Dict]) -> Dict[str, Dict[int, Tuple[int, float]]]:
+    """
+    Histogramas de tempo de resolução por gestor a partir de uma lista de
+    alertas (data de criação até a última atualização dos resolvidos)
+    """
+    esbocos: Dict[str, Dict[int, Tuple[int, float]]] = defaultdict(dict)
+    
+    for alerta in alertas:
+        if alerta.get('estado') not in (ESTADO_RESOLVIDO, ESTADO_ENCERRADO):
+            continue
+        
+        data_criacao = alerta.get('data_criacao')
+        data_atualizacao = alerta.get('data_ultima_atualizacao')
+        if not (data_criacao and data_atualizacao):
+            continue
+        if isinstance(data_criacao, str):
+            data_criacao = datetime.fromisoformat(data_criacao)
+        if isinstance(data_atualizacao, str):
+            data_atualizacao = datetime.fromisoformat(data_atualizacao)
+        
+        dias = max((data_atualizacao - data_criacao).total_seconds() / 86400, 0.0)
+        faixa = faixa_duracao(dias)
+        histograma = esbocos[alerta.get('responsavel') or '']
+        quantidade, soma = histograma.get(faixa, (0, 0.0))
+        histograma[faixa] = (quantidade + 1, soma + dias)
+    
+    return esbocos
+
+
+def calcular_eficiencia_gestores(alertas: Optional[List[Dict]] = None) -> Dict[str, Dict]:
     """
     Analisa eficiência de cada gestor na resolução de alertas
     
@@ -245,62 +470,49 @@ def calcular_eficiencia_gestores(alertas: List[Dict]) -> Dict[str, Dict]:
     - Taxa de resolução
     - Alertas escalonados
     
+    Contagens por estado e tempos de resolução vêm sempre da mesma
+    população: da lista informada ou, sem lista, do store (contadores por
+    responsável e esboços de resolução, cobrindo as camadas quente e
+    fria). Os tempos são histogramas de faixas fixas por gestor: média
+    exata e percentis com erro relativo limitado pela razão entre faixas,
+    em memória constante por gestor.
+    
     Args:
-        alertas: Lista de alertas V2
+        alertas: Lista de alertas V2 (padrão: dados persistidos no store)
         
     Returns:
         Dicionário com métricas por gestor
     """
-    gestores_stats = defaultdict(lambda: {
-        "total_alertas": 0,
-        "resolvidos": 0,
-        "escalonados": 0,
-        "tempos_resolucao": [],
-        "alertas_ativos": 0
-    })
-    
-    hoje = datetime.now()
-    
-    for alerta in alertas:
-        responsavel = alerta.get('responsavel', 'desconhecido')
-        estado = alerta.get('estado')
-        
-        stats = gestores_stats[responsavel]
-        stats["total_alertas"] += 1
-        
-        if estado == ESTADO_RESOLVIDO or estado == ESTADO_ENCERRADO:
-            stats["resolvidos"] += 1
-            
-            # Calcular tempo de resolução
-            data_criacao = alerta.get('data_criacao')
-            data_atualizacao = alerta.get('data_ultima_atualizacao')
-            
-            if data_criacao and data_atualizacao:
-                if isinstance(data_criacao, str):
-                    data_criacao = datetime.fromisoformat(data_criacao)
-                if isinstance(data_atualizacao, str):
-                    data_atualizacao = datetime.fromisoformat(data_atualizacao)
-                
-                tempo_resolucao = (data_atualizacao - data_criacao).days
-                stats["tempos_resolucao"].append(tempo_resolucao)
-        
-        elif estado == ESTADO_ESCALONADO:
-            stats["escalonados"] += 1
-        
-        elif estado in [ESTADO_NOVO, ESTADO_EM_ANALISE, ESTADO_PROVIDENCIA_EM_CURSO]:
-            stats["alertas_ativos"] += 1
+    if alertas is None:
+        contagens = obter_contagens_por_responsavel()
+        esbocos = obter_esbocos_resolucao().get('responsavel', {})
+    else:
+        esbocos = _esbocos_da_lista(alertas)
+        contagens = defaultdict(lambda: defaultdict(int))
+        for alerta in alertas:
+            contagens[alerta.get('responsavel') or ''][alerta.get('estado')] += 1
     
     # Calcular métricas agregadas
     resultado = {}
     
-    for gestor, stats in gestores_stats.items():
-        tempos = stats["tempos_resolucao"]
+    for gestor in list(contagens) + [g for g in esbocos if g not in contagens]:
+        resumo = resumir_histograma(esbocos.get(gestor, {}))
+        # Gestor só nos esboços: cada amostra é uma resolução
+        por_estado = contagens.get(gestor) or {ESTADO_RESOLVIDO: resumo['quantidade'] if resumo else 0}
+        stats = {
+            "total_alertas": sum(por_estado.values()),
+            "resolvidos": por_estado.get(ESTADO_RESOLVIDO, 0) + por_estado.get(ESTADO_ENCERRADO, 0),
+            "escalonados": por_estado.get(ESTADO_ESCALONADO, 0),
+            "alertas_ativos": sum(
+                por_estado.get(e, 0) for e in (ESTADO_NOVO, ESTADO_EM_ANALISE, ESTADO_PROVIDENCIA_EM_CURSO)
+            )
+        }
         
-        if tempos:
-            tempo_medio = statistics.mean(tempos)
-            p50 = statistics.median(tempos)
-            p75 = statistics.quantiles(tempos, n=4)[2] if len(tempos) >= 4 else p50
-            p90 = statistics.quantiles(tempos, n=10)[8] if len(tempos) >= 10 else p75
+        if resumo:
+            tempo_medio = resumo['media']
+            p50 = resumo['p50']
+            p75 = resumo['p75']
+            p90 = resumo['p90']
         else:
             tempo_medio = 0
             p50 = 0
@@ -321,7 +533,7 @@ def calcular_eficiencia_gestores(alertas: List[Dict]) -> Dict[str, Dict]:
             classificacao = "⚠️ Requer atenção"
             cor = "orange"
         
-        resultado[gestor] = {
+        resultado[gestor or 'desconhecido'] = {
             "total_alertas": stats["total_alertas"],
             "resolvidos": stats["resolvidos"],
             "escalonados": stats["escalonados"],
@@ -339,64 +551,94 @@ def calcular_eficiencia_gestores(alertas: List[Dict]) -> Dict[str, Dict]:
     return resultado
 
 
+def calcular_tempos_resolucao(
+    dimensao: str = 'categoria',
+    esbocos: Optional[Dict[str, Dict[str, Dict[int, Tuple[int, float]]]]] = None
+) -> Dict[str, Dict]:
+    """
+    Tempos de resolução por valor de uma dimensão dos esboços
+    ('responsavel', 'categoria' ou 'total')
+    
+    Args:
+        dimensao: Dimensão dos esboços
+        esbocos: Esboços {dimensao: {valor: histograma}}, possivelmente
+            mesclados de várias bases (padrão: obter_esbocos_resolucao())
+        
+    Returns:
+        Dicionário valor -> {quantidade, tempo_medio, p50, p75, p90}
+    """
+    esbocos = esbocos if esbocos is not None else obter_esbocos_resolucao()
+    resultado = {}
+    
+    for valor, histograma in esbocos.get(dimensao, {}).items():
+        resumo = resumir_histograma(histograma)
+        if resumo:
+            resultado[valor] = {
+                "quantidade": resumo['quantidade'],
+                "tempo_medio": round(resumo['media'], 1),
+                "p50": round(resumo['p50'], 1),
+                "p75": round(resumo['p75'], 1),
+                "p90": round(resumo['p90'], 1)
+            }
+    
+    return resultado
+
+
+def mesclar_esbocos_resolucao(*esbocos: Dict[str, Dict[str, Dict[int, Tuple[int, float]]]]) -> Dict[str, Dict]:
+    """
+    Soma esboços de resolução de várias bases (ex.: uma por RAJ) em um só,
+    dimensão a dimensão e valor a valor
+    """
+    mesclado: Dict[str, Dict[str, Dict[int, Tuple[int, float]]]] = defaultdict(dict)
+    for esboco in esbocos:
+        for dimensao, por_valor in esboco.items():
+            for valor, histograma in por_valor.items():
+                mesclado[dimensao][valor] = mesclar_histogramas(mesclado[dimensao].get(valor, {}), histograma)
+    return dict(mesclado)
+
+
 # ========================================
 # INDICADOR 4: PREVISÃO DE RUPTURAS
 # ========================================
 
-def prever_rupturas(contratos: List[Dict], alertas_por_contrato: Dict[str, List[Dict]]) -> List[Dict]:
+def prever_rupturas(
+    contratos: List[Dict],
+    alertas_por_contrato: Dict[str, List[Dict]],
+    modelo: Optional[ModeloDuracoes] = None
+) -> List[Dict]:
     """
     Identifica contratos com alto risco de ruptura nos próximos N dias
     
     Args:
         contratos: Lista de contratos
         alertas_por_contrato: Mapa contrato_id -> lista de alertas
+        modelo: Modelo de durações (padrão: obter_modelo_duracoes())
         
     Returns:
         Lista de contratos em risco, ordenados por urgência
     """
-    previsoes = []
-    hoje = datetime.now()
-    
-    for contrato in contratos:
-        contrato_id = contrato.get('id')
-        alertas = alertas_por_contrato.get(contrato_id, [])
-        
-        # Calcular risco
-        risco = calcular_risco_ruptura(contrato, alertas)
-        
-        # Incluir apenas se risco médio ou superior
-        if risco.get('nivel_risco') in ['medio', 'alto', 'urgente']:
-            data_fim = contrato.get('data_fim')
-            if isinstance(data_fim, str):
-                data_fim = datetime.fromisoformat(data_fim)
-            
-            previsoes.append({
-                "contrato": contrato.get('numero'),
-                "objeto": contrato.get('objeto', '')[:60] + '...',
-                "data_fim": data_fim.strftime('%d/%m/%Y') if data_fim else 'N/A',
-                "dias_nominais": risco['dias_nominais'],
-                "tempo_real_restante": risco['tempo_real_restante'],
-                "nivel_risco": risco['nivel_risco'],
-                "status": risco['status'],
-                "cor": risco['cor'],
-                "etapas_pendentes": len(risco['etapas_pendentes']),
-                "urgencia_score": -risco['tempo_real_restante']  # Para ordenação
-            })
-    
-    # Ordenar por urgência (menor tempo real restante primeiro)
-    previsoes.sort(key=lambda x: x['urgencia_score'], reverse=True)
-    
-    return previsoes
+    return _previsoes_de_riscos(
+        contratos, calcular_riscos_carteira(contratos, alertas_por_contrato, modelo=modelo)
+    )
 
 
 # ========================================
 # DASHBOARD: KPIs CONSOLIDADOS
 # ========================================
 
-def obter_kpis_dashboard(contratos: List[Dict], alertas: List[Dict]) -> Dict[str, any]:
+def obter_kpis_dashboard(
+    contratos: List[Dict],
+    alertas: List[Dict],
+    modelo: Optional[ModeloDuracoes] = None
+) -> Dict[str, any]:
     """
     Retorna KPIs consolidados para dashboard executivo
     
+    Args:
+        contratos: Lista de contratos
+        alertas: Lista de alertas V2
+        modelo: Modelo de durações (padrão: obter_modelo_duracoes())
+    
     Returns:
         Dicionário com KPIs principais
     """
@@ -407,51 +649,44 @@ def obter_kpis_dashboard(contratos: List[Dict], alertas: List[Dict]) -> Dict[str
     for alerta in alertas:
         alertas_por_contrato[alerta.get('contrato_id')].append(alerta)
     
-    # KPI 1: Contratos em risco
-    contratos_risco_alto = []
-    contratos_risco_medio = []
-    contratos_ok = []
-    
-    for contrato in contratos:
-        risco = calcular_risco_ruptura(contrato, alertas_por_contrato.get(contrato.get('id'), []))
-        nivel = risco.get('nivel_risco')
-        
-        if nivel in ['urgente', 'alto']:
-            contratos_risco_alto.append(contrato)
-        elif nivel == 'medio':
-            contratos_risco_medio.append(contrato)
-        else:
-            contratos_ok.append(contrato)
+    # KPI 1: Contratos em risco (uma passada do motor de risco, reaproveitada no KPI 4)
+    riscos = calcular_riscos_carteira(contratos, alertas_por_contrato, hoje, modelo)
+    niveis = riscos["nivel_risco"]
+    contratos_risco_alto = int(np.isin(niveis, ["urgente", "alto"]).sum())
+    contratos_risco_medio = int((niveis == "medio").sum())
     
     # KPI 2: Alertas com consumo silencioso
     alertas_consumo_excessivo = []
     alertas_consumo_moderado = []
     
-    for alerta in alertas:
-        if alerta.get('estado') not in [ESTADO_RESOLVIDO, ESTADO_ENCERRADO]:
-            consumo = calcular_consumo_silencioso(alerta)
-            if consumo['severidade'] == 'critico':
-                alertas_consumo_excessivo.append(alerta)
-            elif consumo['severidade'] == 'atencao':
-                alertas_consumo_moderado.append(alerta)
+    alertas_ativos = [a for a in alertas if a.get('estado') not in [ESTADO_RESOLVIDO, ESTADO_ENCERRADO]]
+    tempos = calcular_tempos_por_estado([a.get('id') for a in alertas_ativos]) if alertas_ativos else {}
+    
+    for alerta in alertas_ativos:
+        consumo = calcular_consumo_silencioso(alerta, tempos.get(alerta.get('id')))
+        if consumo['severidade'] == 'critico':
+            alertas_consumo_excessivo.append(alerta)
+        elif consumo['severidade'] == 'atencao':
+            alertas_consumo_moderado.append(alerta)
     
     # KPI 3: Eficiência geral
-    eficiencia_gestores = calcular_eficiencia_gestores(alertas)
+    # Eficiência é histórica: contagens e esboços do store cobrem a camada fria
+    eficiencia_gestores = calcular_eficiencia_gestores()
     tempos_validos = [g['tempo_medio'] for g in eficiencia_gestores.values() if g['tempo_medio'] > 0]
     tempo_medio_geral = statistics.mean(tempos_validos) if tempos_validos else 0
     
-    # KPI 4: Previsões
-    previsoes_ruptura = prever_rupturas(contratos, alertas_por_contrato)
+    # KPI 4: Previsões (top 10)
+    previsoes_ruptura = _previsoes_de_riscos(contratos, riscos, limite=10)
     
     return {
         "total_contratos": len(contratos),
-        "contratos_risco_alto": len(contratos_risco_alto),
-        "contratos_risco_medio": len(contratos_risco_medio),
-        "contratos_ok": len(contratos_ok),
+        "contratos_risco_alto": contratos_risco_alto,
+        "contratos_risco_medio": contratos_risco_medio,
+        "contratos_ok": len(contratos) - contratos_risco_alto - contratos_risco_medio,
         "alertas_consumo_excessivo": len(alertas_consumo_excessivo),
         "alertas_consumo_moderado": len(alertas_consumo_moderado),
         "tempo_medio_resolucao_geral": round(tempo_medio_geral, 1),
-        "previsoes_ruptura": previsoes_ruptura[:10],  # Top 10
+        "previsoes_ruptura": previsoes_ruptura,
         "total_gestores": len(eficiencia_gestores),
         "eficiencia_gestores": eficiencia_gestores,
         "data_atualizacao": hoje.isoformat()
@@ -462,13 +697,19 @@ def obter_kpis_dashboard(contratos: List[Dict], alertas: List[Dict]) -> Dict[str
 # ANÁLISE TEMPORAL
 # ========================================
 
-def analisar_tendencia_temporal(alertas: List[Dict], dias: int = 30) -> Dict[str, any]:
+def analisar_tendencia_temporal(
+    alertas: List[Dict],
+    dias: int = 30,
+    incluir_arquivados: bool = False
+) -> Dict[str, any]:
     """
     Analisa tendências nos últimos N dias
     
     Args:
         alertas: Lista de alertas
         dias: Número de dias para análise
+        incluir_arquivados: Soma os alertas da camada fria encerrados no
+            período (só os meses do período são lidos)
         
     Returns:
         Análise de tendências
@@ -476,6 +717,12 @@ def analisar_tendencia_temporal(alertas: List[Dict], dias: int = 30) -> Dict[str
     hoje = datetime.now()
     data_inicio = hoje - timedelta(days=dias)
     
+    if incluir_arquivados:
+        ids = {a.get('id') for a in alertas}
+        alertas = list(alertas) + [
+            a for a in listar_alertas_arquivados(desde=data_inicio) if a['id'] not in ids
+        ]
+    
     # Filtrar alertas no período
     alertas_periodo = [
         a for a in alertas
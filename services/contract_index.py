@@ -0,0 +1,264 @@
+"""
+Índice Secundário de Contratos
+==============================
+Índices invertidos (valor → conjunto de IDs) para as dimensões usadas nos
+filtros do dashboard, da consulta central e de Meus Contratos.
+
+Motivação:
+- Cada filtro era uma list comprehension sobre todos os contratos
+- As listas de opções (fornecedores, fiscais) eram refeitas com
+  sorted(set(...)) a cada rerun do Streamlit
+- O filtro de tags lia contract_tags.json uma vez por contrato
+
+Estratégia:
+- Um índice invertido por dimensão: fiscal, fornecedor, comarca, status,
+  tipo e tag
+- O índice de fiscais cobre fiscal_titular, fiscal_substituto e todos os
+  titulares/suplentes de fiscais_por_comarca (via obter_fiscais_do_contrato)
+- Filtros viram interseção de conjuntos (tags: união, como na interface)
+- Facetas (listas ordenadas de valores) pré-calculadas junto com o índice
+- Invalidação por escrita: a parte de contratos é refeita quando muda a
+  versão do repositório; a de tags quando muda a versão dos vínculos no
+  TagService
+"""
+
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Dimensões indexadas
+DIMENSOES = ("fiscal", "fornecedor", "comarca", "status", "tipo", "tag")
+
+# Valor de preenchimento usado por obter_fiscais_do_contrato em contratos
+# sem comarca definida (não é uma comarca real)
+COMARCA_PADRAO = "(Comarca Única)"
+
+
+def _adicionar(indice: Dict[str, Set[str]], valor, contrato_id: str):
+    """Registra contrato_id sob valor, ignorando valores vazios"""
+    if not valor:
+        return
+    valor = str(valor).strip()
+    if valor:
+        indice.setdefault(valor, set()).add(contrato_id)
+
+
+def _congelar(indice: Dict[str, Set[str]]) -> Dict[str, FrozenSet[str]]:
+    """Converte os conjuntos em frozenset (o índice é compartilhado)"""
+    return {valor: frozenset(ids) for valor, ids in indice.items()}
+
+
+class ContractIndex:
+    """Índices invertidos sobre a carteira do ContractRepository"""
+
+    def __init__(self, repository=None, tag_service=None):
+        self._repository = repository
+        self._tag_service = tag_service
+
+        self._lock = threading.RLock()
+        self._versao_contratos: Optional[int] = None
+        self._versao_tags = None
+
+        self._indices: Dict[str, Dict[str, FrozenSet[str]]] = {d: {} for d in DIMENSOES}
+        self._facetas: Dict[str, List[str]] = {d: [] for d in DIMENSOES}
+        self._todos: FrozenSet[str] = frozenset()
+
+    # ========================================
+    # FONTES
+    # ========================================
+
+    @property
+    def repository(self):
+        """Repositório de contratos (singleton por padrão)"""
+        if self._repository is None:
+            from services.contract_repository import get_contract_repository
+            self._repository = get_contract_repository()
+        return self._repository
+
+    @property
+    def tag_service(self):
+        """Serviço de tags (singleton por padrão)"""
+        if self._tag_service is None:
+            from services.tag_service import get_tag_service
+            self._tag_service = get_tag_service()
+        return self._tag_service
+
+    # ========================================
+    # CONSTRUÇÃO E INVALIDAÇÃO
+    # ========================================
+
+    def _garantir_atualizado(self):
+        """Refaz as partes do índice cuja fonte mudou desde a última carga"""
+        versao_contratos = self.repository.versao
+        versao_tags = self.tag_service.versao_vinculos()
+        if versao_contratos == self._versao_contratos and versao_tags == self._versao_tags:
+            return
+
+        with self._lock:
+            if versao_contratos != self._versao_contratos:
+                self._indexar_contratos()
+                self._versao_contratos = versao_contratos
+                # IDs podem ter mudado: o índice de tags é filtrado por eles
+                self._versao_tags = None
+            if versao_tags != self._versao_tags:
+                self._indexar_tags()
+                self._versao_tags = versao_tags
+
+    def _indexar_contratos(self):
+        """Constrói os índices das dimensões que vêm dos próprios contratos"""
+        # Importação local para evitar dependência circular
+        from services.contract_service import obter_fiscais_do_contrato
+
+        indices: Dict[str, Dict[str, Set[str]]] = {
+            d: {} for d in DIMENSOES if d != "tag"
+        }
+        todos = set()
+
+        for contrato in self.repository.listar():
+            contrato_id = contrato.get("id")
+            if not contrato_id:
+                continue
+            todos.add(contrato_id)
+
+            _adicionar(indices["fornecedor"], contrato.get("fornecedor"), contrato_id)
+            _adicionar(indices["status"], contrato.get("status"), contrato_id)
+            _adicionar(indices["tipo"], contrato.get("tipo"), contrato_id)
+
+            _adicionar(indices["fiscal"], contrato.get("fiscal_titular"), contrato_id)
+            _adicionar(indices["fiscal"], contrato.get("fiscal_substituto"), contrato_id)
+            for fiscal in obter_fiscais_do_contrato(contrato):
+                _adicionar(indices["fiscal"], fiscal.get("titular"), contrato_id)
+                _adicionar(indices["fiscal"], fiscal.get("suplente"), contrato_id)
+                if fiscal.get("comarca") != COMARCA_PADRAO:
+                    _adicionar(indices["comarca"], fiscal.get("comarca"), contrato_id)
+            _adicionar(indices["comarca"], contrato.get("comarca_detectada"), contrato_id)
+
+        for dimensao, indice in indices.items():
+            self._indices[dimensao] = _congelar(indice)
+            self._facetas[dimensao] = sorted(indice)
+        self._todos = frozenset(todos)
+
+        logger.info(f"Índice de contratos reconstruído: {len(todos)} contratos")
+
+    def _indexar_tags(self):
+        """Constrói o índice de tags a partir do mapeamento do TagService"""
+        indice: Dict[str, Set[str]] = {}
+        for contrato_id, tag_ids in self.tag_service.obter_mapa_tags().items():
+            if contrato_id not in self._todos:
+                continue
+            for tag_id in tag_ids:
+                _adicionar(indice, tag_id, contrato_id)
+
+        self._indices["tag"] = _congelar(indice)
+        self._facetas["tag"] = sorted(indice)
+
+    def invalidar(self):
+        """Força reconstrução completa na próxima consulta"""
+        with self._lock:
+            self._versao_contratos = None
+            self._versao_tags = None
+
+    # ========================================
+    # CONSULTAS
+    # ========================================
+
+    def ids(self, dimensao: str, valor: str) -> FrozenSet[str]:
+        """
+        IDs dos contratos com determinado valor em uma dimensão.
+
+        Args:
+            dimensao: Uma de DIMENSOES
+            valor: Valor exato (ex: nome do fiscal, status 'ativo')
+
+        Returns:
+            Conjunto (imutável) de IDs, vazio se não houver contratos
+        """
+        if dimensao not in DIMENSOES:
+            raise ValueError(f"Dimensão desconhecida: {dimensao}")
+        self._garantir_atualizado()
+        return self._indices[dimensao].get(valor, frozenset())
+
+    def facetas(self, dimensao: str) -> List[str]:
+        """
+        Valores distintos de uma dimensão, em ordem alfabética.
+
+        Substitui sorted(set(...)) sobre a carteira nas listas de opções.
+        """
+        if dimensao not in DIMENSOES:
+            raise ValueError(f"Dimensão desconhecida: {dimensao}")
+        self._garantir_atualizado()
+        return list(self._facetas[dimensao])
+
+    def filtrar(
+        self,
+        fiscal: Optional[str] = None,
+        fornecedor: Optional[str] = None,
+        comarca: Optional[str] = None,
+        status: Optional[str] = None,
+        tipo: Optional[str] = None,
+        tags: Optional[Iterable[str]] = None
+    ) -> Optional[FrozenSet[str]]:
+        """
+        Interseção dos critérios informados.
+
+        Critérios None/vazios são ignorados. Para tags, basta o contrato
+        possuir qualquer uma das informadas.
+
+        Returns:
+            Conjunto de IDs que atendem a todos os critérios, ou None se
+            nenhum critério foi informado (sem restrição)
+        """
+        self._garantir_atualizado()
+
+        conjuntos = []
+        for dimensao, valor in (
+            ("fiscal", fiscal),
+            ("fornecedor", fornecedor),
+            ("comarca", comarca),
+            ("status", status),
+            ("tipo", tipo),
+        ):
+            if valor:
+                conjuntos.append(self._indices[dimensao].get(valor, frozenset()))
+
+        if tags:
+            indice_tags = self._indices["tag"]
+            conjuntos.append(frozenset().union(
+                *(indice_tags.get(tag_id, frozenset()) for tag_id in tags)
+            ))
+
+        if not conjuntos:
+            return None
+
+        # Começa pelo menor conjunto para reduzir o custo das interseções
+        conjuntos.sort(key=len)
+        resultado = conjuntos[0]
+        for conjunto in conjuntos[1:]:
+            if not resultado:
+                break
+            resultado = resultado & conjunto
+        return frozenset(resultado)
+
+    def contratos_do_fiscal(self, nome: str) -> List[Dict]:
+        """
+        Contratos em que a pessoa atua como fiscal (titular, substituto ou
+        fiscal de alguma comarca), na ordem de exibição do repositório.
+        """
+        ids = self.ids("fiscal", nome)
+        if not ids:
+            return []
+        return [c for c in self.repository.listar() if c.get("id") in ids]
+
+
+# Instância singleton
+_contract_index = None
+
+def get_contract_index() -> ContractIndex:
+    """Retorna instância singleton do índice de contratos"""
+    global _contract_index
+    if _contract_index is None:
+        _contract_index = ContractIndex()
+    return _contract_index
@@ -0,0 +1,142 @@
+"""
+Repositório de Contratos em Memória
+===================================
+Mantém, por processo, a carteira completa de contratos (mock + cadastrados)
+já convertida, com índice por ID e ordem de exibição pré-calculada.
+
+Motivação:
+- get_todos_contratos() é chamado várias vezes a cada rerun do Streamlit
+- Reler o JSON e reconverter datas a cada chamada custa O(N) por widget
+- A fonte só muda quando há cadastro, aditivo ou importação PNCP
+
+Estratégia:
+- Carrega a fonte uma única vez e guarda os contratos já convertidos
+- Índice hash id → contrato para get_contrato_by_id em O(1)
+- Lista pré-ordenada por última atualização (mais recentes primeiro)
+- Recarrega apenas quando a fonte muda: desde a migração para SQLite
+  (ver contract_store), a assinatura é o contador de versão do banco,
+  incrementado a cada transação de escrita
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional
+import threading
+import logging
+
+from services.contract_store import ContractStore, get_contract_store
+
+logger = logging.getLogger(__name__)
+
+
+class ContractRepository:
+    """Cache de contratos por processo, validado pela versão do armazenamento"""
+
+    def __init__(self, store: Optional[ContractStore] = None):
+        self._store = store
+
+        self._lock = threading.RLock()
+        self._assinatura: Optional[int] = None
+        self._carregado = False
+        self._ordenados: List[Dict] = []
+        self._por_id: Dict[str, Dict] = {}
+        self._versao = 0
+
+    # ========================================
+    # CONTROLE DE VALIDADE
+    # ========================================
+
+    @property
+    def store(self) -> ContractStore:
+        """Armazenamento de origem (singleton por padrão)"""
+        if self._store is None:
+            self._store = get_contract_store()
+        return self._store
+
+    def _assinatura_fonte(self) -> int:
+        """Retorna a versão atual dos dados no armazenamento"""
+        return self.store.versao()
+
+    def _garantir_atualizado(self):
+        """Recarrega a carteira se a fonte mudou desde a última carga"""
+        assinatura = self._assinatura_fonte()
+        if self._carregado and assinatura == self._assinatura:
+            return
+
+        with self._lock:
+            # Outra thread pode ter recarregado enquanto aguardávamos o lock
+            if self._carregado and assinatura == self._assinatura:
+                return
+            self._recarregar(assinatura)
+
+    def _recarregar(self, assinatura: int):
+        """Lê a fonte, converte datas e reconstrói índice e ordenação"""
+        # Importação local para evitar dependência circular
+        from services.contract_service import get_contratos_mock, get_contratos_cadastrados
+
+        contratos = get_contratos_mock() + get_contratos_cadastrados(self.store)
+
+        agora = datetime.now()
+        contratos.sort(
+            key=lambda x: x.get('ultima_atualizacao') or agora,
+            reverse=True
+        )
+
+        self._ordenados = contratos
+        self._por_id = {c['id']: c for c in contratos if 'id' in c}
+        self._assinatura = assinatura
+        self._carregado = True
+        self._versao += 1
+
+        logger.info(f"Repositório de contratos recarregado: {len(contratos)} contratos (versão {self._versao})")
+
+    def invalidar(self):
+        """Força recarga na próxima leitura (usar após escritas na fonte)"""
+        with self._lock:
+            self._carregado = False
+
+    @property
+    def versao(self) -> int:
+        """Contador incrementado a cada recarga (útil para caches derivados)"""
+        self._garantir_atualizado()
+        return self._versao
+
+    # ========================================
+    # CONSULTAS
+    # ========================================
+
+    def listar(self) -> List[Dict]:
+        """
+        Retorna todos os contratos, mais recentes primeiro.
+
+        Returns:
+            Cópias rasas dos contratos (o chamador pode alterá-las livremente)
+        """
+        self._garantir_atualizado()
+        return [dict(c) for c in self._ordenados]
+
+    def obter(self, contrato_id: str) -> Optional[Dict]:
+        """
+        Busca contrato por ID em O(1).
+
+        Returns:
+            Cópia rasa do contrato ou None se não encontrado
+        """
+        self._garantir_atualizado()
+        contrato = self._por_id.get(contrato_id)
+        return dict(contrato) if contrato is not None else None
+
+    def total(self) -> int:
+        """Quantidade de contratos na carteira"""
+        self._garantir_atualizado()
+        return len(self._ordenados)
+
+
+# Instância singleton
+_contract_repository = None
+
+def get_contract_repository() -> ContractRepository:
+    """Retorna instância singleton do repositório de contratos"""
+    global _contract_repository
+    if _contract_repository is None:
+        _contract_repository = ContractRepository()
+    return _contract_repository
@@ -12,30 +12,36 @@ EVOLUÇÃO FASE 3 - Contratos Regionais com Fiscais por Comarca:
 - Compatibilidade total com contratos simples (modelo antigo)
 """
 
-from datetime import datetime, timedelta
-from typing import List, Dict, Optional
-import json
+from datetime import date, datetime, timedelta
+from typing import List, Dict, Optional, Tuple
 from pathlib import Path
+import hashlib
+import json
+import threading
 import logging
 
+from services.contract_repository import get_contract_repository
+from services.contract_store import ContractStore, get_contract_store
+from services.vigencia_index import get_vigencia_index
+
 logger = logging.getLogger(__name__)
 
 
-def get_contratos_cadastrados() -> List[Dict]:
+def get_contratos_cadastrados(store: Optional[ContractStore] = None) -> List[Dict]:
     """
     Retorna contratos cadastrados via upload (sistema de gestão).
     
+    Lê sempre do armazenamento SQLite; para consultas use
+    get_todos_contratos(), que passa pelo repositório em memória.
+    
+    Args:
+        store: Armazenamento de contratos (padrão: singleton)
+    
     Returns:
         Lista de contratos cadastrados pelos usuários
     """
-    json_path = Path("data/contratos_cadastrados.json")
-    
-    if not json_path.exists():
-        return []
-    
     try:
-        with open(json_path, 'r', encoding='utf-8') as f:
-            contratos = json.load(f)
+        contratos = (store or get_contract_store()).listar_contratos()
         
         # Converte strings ISO de data para datetime
         for contrato in contratos:
@@ -194,22 +200,14 @@ def get_todos_contratos() -> List[Dict]:
     Esta é a função principal para listar contratos no sistema.
     Combina contratos de exemplo (mock) com contratos reais cadastrados.
     
+    Os dados vêm do repositório em memória (ver contract_repository), que
+    só relê o arquivo quando ele muda. A lista já vem ordenada por data de
+    atualização (mais recentes primeiro).
+    
     Returns:
         Lista completa de contratos disponíveis
     """
-    contratos_mock = get_contratos_mock()
-    contratos_cadastrados = get_contratos_cadastrados()
-    
-    # Combina as duas listas
-    todos_contratos = contratos_mock + contratos_cadastrados
-    
-    # Ordena por data de atualização (mais recentes primeiro)
-    todos_contratos.sort(
-        key=lambda x: x.get('ultima_atualizacao', datetime.now()),
-        reverse=True
-    )
-    
-    return todos_contratos
+    return get_contract_repository().listar()
 
 
 def get_contrato_by_id(contrato_id: str) -> Optional[Dict]:
@@ -222,11 +220,30 @@ def get_contrato_by_id(contrato_id: str) -> Optional[Dict]:
     Returns:
         Dados do contrato ou None se não encontrado
     """
-    contratos = get_todos_contratos()
-    for contrato in contratos:
-        if contrato["id"] == contrato_id:
-            return contrato
-    return None
+    return get_contract_repository().obter(contrato_id)
+
+
+def get_contratos_vencendo_entre(
+    inicio: Optional[datetime],
+    fim: Optional[datetime],
+    incluir_fim: bool = False
+) -> List[Tuple[datetime, Dict]]:
+    """
+    Contratos da carteira cuja vigência (consolidada com aditivos) termina
+    na janela [inicio, fim), via índice de vigência (bisect).
+    
+    Args:
+        inicio: Início da janela (None inclui todos os já vencidos)
+        fim: Fim da janela (None = sem limite)
+        incluir_fim: Considera a janela fechada [inicio, fim]
+        
+    Returns:
+        Pares (data_fim consolidada, contrato), ordenados por data_fim
+    """
+    return [
+        (data_fim, dict(contrato))
+        for data_fim, contrato in get_vigencia_index().vencendo_entre(inicio, fim, incluir_fim)
+    ]
 
 
 def get_contrato_detalhes(contrato_id: str) -> Optional[Dict]:
@@ -331,6 +348,169 @@ def get_contrato_detalhes(contrato_id: str) -> Optional[Dict]:
     return contrato
 
 
+# ============================================================================
+# CONSOLIDAÇÃO DE ADITIVOS (MEMOIZADA E INCREMENTAL)
+# ============================================================================
+
+# Cache de consolidação: contrato_id -> estado consolidado
+# Aditivos normalmente são só anexados (adicionar_aditivo_contrato), então um
+# estado com N aditivos aplicados pode ser estendido aplicando só os novos;
+# a impressão digital cobre o conteúdo de todos os aditivos, então edições
+# (reimportação, inserir_contrato sobre um id existente) invalidam o cache.
+_cache_consolidacao: Dict[str, Dict] = {}
+_cache_consolidacao_lock = threading.Lock()
+
+
+def _impressoes_lista(aditivos: List[dict], n: int) -> Tuple[str, str]:
+    """
+    Impressões digitais (hash encadeado do conteúdo) dos n primeiros
+    aditivos e da lista completa, em uma única passada.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    prefixo = h.hexdigest() if n == 0 else None
+    for i, aditivo in enumerate(aditivos, 1):
+        h.update(json.dumps(aditivo, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8'))
+        h.update(b'\x1e')
+        if i == n:
+            prefixo = h.hexdigest()
+    return prefixo, h.hexdigest()
+
+
+def _aplicar_aditivo(valor_atual: float, data_fim_atual, aditivo: dict) -> tuple:
+    """
+    Aplica um único aditivo sobre o estado acumulado.
+    
+    Returns:
+        Tupla (novo_valor, nova_data_fim, modificacao_para_historico)
+    """
+    tipos = aditivo.get('tipo_modificacao', [])
+    modificacao = {
+        'numero': aditivo.get('numero'),
+        'data': aditivo.get('data_aditivo', ''),
+        'tipos': tipos,
+        'alteracoes': []
+    }
+    
+    # Aplica prorrogação de prazo
+    if 'Prorrogação de Prazo' in tipos:
+        nova_data = aditivo.get('nova_data_fim', '')
+        if nova_data:
+            # Converte string ISO para datetime se necessário
+            if isinstance(nova_data, str):
+                nova_data = datetime.fromisoformat(nova_data)
+            elif isinstance(nova_data, date) and not isinstance(nova_data, datetime):
+                nova_data = datetime.combine(nova_data, datetime.min.time())
+            
+            dias_prorrogados = aditivo.get('prorrogacao_dias', 0)
+            data_fim_atual = nova_data
+            
+            modificacao['alteracoes'].append({
+                'tipo': 'Prorrogação de Prazo',
+                'descricao': f'Prazo prorrogado em {dias_prorrogados} dias',
+                'nova_data_fim': nova_data.strftime('%d/%m/%Y') if hasattr(nova_data, 'strftime') else str(nova_data)
+            })
+    
+    # Aplica acréscimo de valor
+    if 'Acréscimo de Valor' in tipos:
+        valor_acrescimo = aditivo.get('valor_acrescimo', 0.0)
+        percentual = aditivo.get('percentual_acrescimo', 0.0)
+        
+        if valor_acrescimo > 0:
+            valor_atual += valor_acrescimo
+            
+            modificacao['alteracoes'].append({
+                'tipo': 'Acréscimo de Valor',
+                'descricao': f'Acréscimo de {percentual:.1f}%',
+                'valor': valor_acrescimo,
+                'novo_valor_total': valor_atual
+            })
+    
+    # Aplica supressão de valor
+    if 'Supressão de Valor' in tipos:
+        valor_supressao = aditivo.get('valor_supressao', 0.0)
+        percentual = aditivo.get('percentual_supressao', 0.0)
+        
+        if valor_supressao > 0:
+            valor_atual -= valor_supressao
+            
+            modificacao['alteracoes'].append({
+                'tipo': 'Supressão de Valor',
+                'descricao': f'Supressão de {percentual:.1f}%',
+                'valor': -valor_supressao,
+                'novo_valor_total': valor_atual
+            })
+    
+    # Registra alterações qualitativas
+    if 'Alteração Qualitativa' in tipos:
+        alteracoes = aditivo.get('alteracoes_qualitativas', '')
+        if alteracoes:
+            modificacao['alteracoes'].append({
+                'tipo': 'Alteração Qualitativa',
+                'descricao': alteracoes[:200] + ('...' if len(alteracoes) > 200 else '')
+            })
+    
+    # Adiciona justificativa
+    if aditivo.get('justificativa'):
+        modificacao['justificativa'] = aditivo['justificativa']
+    
+    return valor_atual, data_fim_atual, modificacao
+
+
+def _consolidar_estado(base: tuple, aditivos: List[dict], estado: Optional[Dict]) -> Dict:
+    """
+    Calcula o estado consolidado, reaproveitando o estado em cache.
+    
+    - Mesma base e mesma lista (hash do conteúdo de todos os aditivos):
+      reaproveita
+    - Lista estendida (hash dos N primeiros igual ao do cache) com aditivos
+      de número maior: aplica só o delta
+    - Qualquer outro caso (inclusive aditivo editado): recalcula do zero
+    """
+    n = estado['total'] if estado else 0
+    impressao_prefixo, impressao_lista = _impressoes_lista(aditivos, n)
+    
+    if estado and estado['base'] == base:
+        if estado['impressao'] == impressao_lista:
+            return estado
+        
+        novos = aditivos[n:]
+        if (
+            0 < n < len(aditivos)
+            and impressao_prefixo == estado['impressao']
+            and all((a.get('numero', 0) or 0) > estado['ultimo_numero'] for a in novos)
+        ):
+            aditivos_aplicar = sorted(novos, key=lambda x: x.get('numero', 0))
+            valor_atual, data_fim_atual = estado['valor'], estado['data_fim']
+            historico = list(estado['historico'])
+        else:
+            estado = None
+    else:
+        estado = None
+    
+    if estado is None:
+        # Ordena aditivos por número (aplicação sequencial)
+        aditivos_aplicar = sorted(aditivos, key=lambda x: x.get('numero', 0))
+        valor_atual, data_fim_atual = base
+        historico = []
+    
+    for aditivo in aditivos_aplicar:
+        valor_atual, data_fim_atual, modificacao = _aplicar_aditivo(valor_atual, data_fim_atual, aditivo)
+        historico.append(modificacao)
+    
+    return {
+        'base': base,
+        'impressao': impressao_lista,
+        'total': len(aditivos),
+        'ultimo_numero': max(
+            (estado or {}).get('ultimo_numero', 0),
+            max((a.get('numero', 0) or 0) for a in aditivos_aplicar) if aditivos_aplicar else 0
+        ),
+        'valor': valor_atual,
+        'data_fim': data_fim_atual,
+        'historico': historico
+    }
+
+
 def consolidar_contrato_com_aditivos(contrato: dict) -> dict:
     """
     Aplica aditivos sequencialmente sobre dados originais do contrato.
@@ -340,109 +520,40 @@ def consolidar_contrato_com_aditivos(contrato: dict) -> dict:
     - Acréscimos/supressões alteram valor total
     - Alterações qualitativas são registradas no histórico
     
+    O resultado é memoizado por contrato, com chave na impressão da lista de
+    aditivos; quando um novo aditivo é anexado, apenas ele é aplicado sobre
+    o estado em cache.
+    
     Args:
         contrato: Dados originais do contrato
         
     Returns:
         Contrato consolidado com todas as modificações dos aditivos aplicadas
     """
-    # Se não tem aditivos, retorna contrato original
-    if 'aditivos' not in contrato or not contrato['aditivos']:
-        contrato['valor_original'] = contrato.get('valor', 0.0)
-        contrato['data_fim_original'] = contrato.get('data_fim')
-        return contrato
-    
     # Salva valores originais
     contrato['valor_original'] = contrato.get('valor', 0.0)
     contrato['data_fim_original'] = contrato.get('data_fim')
     
-    # Ordena aditivos por número (aplicação sequencial)
-    aditivos_ordenados = sorted(
-        contrato['aditivos'],
-        key=lambda x: x.get('numero', 0)
-    )
-    
-    # Valores acumulados
-    valor_atual = contrato['valor_original']
-    data_fim_atual = contrato['data_fim_original']
-    
-    # Histórico de modificações
-    contrato['historico_aditivos'] = []
-    
-    # Aplica cada aditivo sequencialmente
-    for aditivo in aditivos_ordenados:
-        modificacao = {
-            'numero': aditivo.get('numero'),
-            'data': aditivo.get('data_aditivo', ''),
-            'tipos': aditivo.get('tipo_modificacao', []),
-            'alteracoes': []
-        }
-        
-        # Aplica prorrogação de prazo
-        if 'Prorrogação de Prazo' in aditivo.get('tipo_modificacao', []):
-            nova_data = aditivo.get('nova_data_fim', '')
-            if nova_data:
-                # Converte string ISO para datetime se necessário
-                if isinstance(nova_data, str):
-                    from datetime import date
-                    nova_data = datetime.fromisoformat(nova_data)
-                elif isinstance(nova_data, date):
-                    nova_data = datetime.combine(nova_data, datetime.min.time())
-                
-                dias_prorrogados = aditivo.get('prorrogacao_dias', 0)
-                data_fim_atual = nova_data
-                
-                modificacao['alteracoes'].append({
-                    'tipo': 'Prorrogação de Prazo',
-                    'descricao': f'Prazo prorrogado em {dias_prorrogados} dias',
-                    'nova_data_fim': nova_data.strftime('%d/%m/%Y') if hasattr(nova_data, 'strftime') else str(nova_data)
-                })
-        
-        # Aplica acréscimo de valor
-        if 'Acréscimo de Valor' in aditivo.get('tipo_modificacao', []):
-            valor_acrescimo = aditivo.get('valor_acrescimo', 0.0)
-            percentual = aditivo.get('percentual_acrescimo', 0.0)
-            
-            if valor_acrescimo > 0:
-                valor_atual += valor_acrescimo
-                
-                modificacao['alteracoes'].append({
-                    'tipo': 'Acréscimo de Valor',
-                    'descricao': f'Acréscimo de {percentual:.1f}%',
-                    'valor': valor_acrescimo,
-                    'novo_valor_total': valor_atual
-                })
-        
-        # Aplica supressão de valor
-        if 'Supressão de Valor' in aditivo.get('tipo_modificacao', []):
-            valor_supressao = aditivo.get('valor_supressao', 0.0)
-            percentual = aditivo.get('percentual_supressao', 0.0)
-            
-            if valor_supressao > 0:
-                valor_atual -= valor_supressao
-                
-                modificacao['alteracoes'].append({
-                    'tipo': 'Supressão de Valor',
-                    'descricao': f'Supressão de {percentual:.1f}%',
-                    'valor': -valor_supressao,
-                    'novo_valor_total': valor_atual
-                })
-        
-        # Registra alterações qualitativas
-        if 'Alteração Qualitativa' in aditivo.get('tipo_modificacao', []):
-            alteracoes = aditivo.get('alteracoes_qualitativas', '')
-            if alteracoes:
-                modificacao['alteracoes'].append({
-                    'tipo': 'Alteração Qualitativa',
-                    'descricao': alteracoes[:200] + ('...' if len(alteracoes) > 200 else '')
-                })
-        
-        # Adiciona justificativa
-        if aditivo.get('justificativa'):
-            modificacao['justificativa'] = aditivo['justificativa']
-        
-        # Adiciona ao histórico
-        contrato['historico_aditivos'].append(modificacao)
+    # Se não tem aditivos, retorna contrato original
+    aditivos = contrato.get('aditivos') or []
+    if not aditivos:
+        return contrato
+    
+    base = (contrato['valor_original'], contrato['data_fim_original'])
+    contrato_id = contrato.get('id')
+    
+    with _cache_consolidacao_lock:
+        estado_cache = _cache_consolidacao.get(contrato_id) if contrato_id else None
+    
+    estado = _consolidar_estado(base, aditivos, estado_cache)
+    
+    if contrato_id and estado is not estado_cache:
+        with _cache_consolidacao_lock:
+            _cache_consolidacao[contrato_id] = estado
+    
+    valor_atual = estado['valor']
+    data_fim_atual = estado['data_fim']
+    contrato['historico_aditivos'] = list(estado['historico'])
     
     # Atualiza valores consolidados no contrato
     contrato['valor'] = valor_atual
@@ -463,7 +574,7 @@ def consolidar_contrato_com_aditivos(contrato: dict) -> dict:
     
     # Marca que o contrato foi consolidado
     contrato['consolidado_com_aditivos'] = True
-    contrato['total_aditivos_aplicados'] = len(aditivos_ordenados)
+    contrato['total_aditivos_aplicados'] = estado['total']
     
     return contrato
 
@@ -472,6 +583,9 @@ def adicionar_aditivo_contrato(contrato_id: str, arquivo_pdf, dados_aditivo: dic
     """
     Adiciona um novo aditivo a um contrato existente.
     
+    A gravação é uma única transação no armazenamento SQLite: apenas a
+    linha do aditivo é inserida, sem regravar a carteira inteira.
+    
     Args:
         contrato_id: ID do contrato
         arquivo_pdf: Arquivo PDF do aditivo
@@ -480,49 +594,20 @@ def adicionar_aditivo_contrato(contrato_id: str, arquivo_pdf, dados_aditivo: dic
     Returns:
         True se sucesso, False caso contrário
     """
-    try:
-        # Carrega contratos cadastrados
-        json_path = Path("data/contratos_cadastrados.json")
-        
-        if not json_path.exists():
-            return False
-        
-        with open(json_path, 'r', encoding='utf-8') as f:
-            contratos = json.load(f)
-        
-        # Encontra o contrato
-        contrato = None
-        indice_contrato = None
-        for i, c in enumerate(contratos):
-            if c.get('id') == contrato_id:
-                contrato = c
-                indice_contrato = i
-                break
-        
-        if not contrato:
-            return False
-        
-        # Garante que aditivos existe
-        if 'aditivos' not in contrato:
-            contrato['aditivos'] = []
-        
-        # Define próximo número do aditivo
-        proximo_numero = len(contrato['aditivos']) + 1
-        
+    def _montar_aditivo(numero: int) -> dict:
         # Salva PDF do aditivo
         contratos_dir = Path("knowledge/contratos")
         contrato_dir = contratos_dir / contrato_id
         contrato_dir.mkdir(exist_ok=True)
         
-        aditivo_filename = f"{contrato_id}_ADITIVO_{proximo_numero:02d}.pdf"
+        aditivo_filename = f"{contrato_id}_ADITIVO_{numero:02d}.pdf"
         aditivo_path = contrato_dir / aditivo_filename
         
         with open(aditivo_path, 'wb') as f:
             f.write(arquivo_pdf.getbuffer())
         
-        # Adiciona aditivo ao contrato
-        novo_aditivo = {
-            'numero': proximo_numero,
+        return {
+            'numero': numero,
             'filename': aditivo_filename,
             'path': str(aditivo_path),
             'data_upload': datetime.now().isoformat(),
@@ -538,19 +623,10 @@ def adicionar_aditivo_contrato(contrato_id: str, arquivo_pdf, dados_aditivo: dic
             'valor_supressao': dados_aditivo.get('valor_supressao', 0.0),
             'alteracoes_qualitativas': dados_aditivo.get('alteracoes_qualitativas', '')
         }
-        
-        contrato['aditivos'].append(novo_aditivo)
-        contrato['total_aditivos'] = len(contrato['aditivos'])
-        contrato['ultima_atualizacao'] = datetime.now().isoformat()
-        
-        # Atualiza contrato na lista
-        contratos[indice_contrato] = contrato
-        
-        # Salva de volta no JSON
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(contratos, f, ensure_ascii=False, indent=2, default=str)
-        
-        return True
+    
+    try:
+        aditivo = get_contract_store().adicionar_aditivo(contrato_id, _montar_aditivo)
+        return aditivo is not None
         
     except Exception as e:
         print(f"Erro ao adicionar aditivo: {e}")
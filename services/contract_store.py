@@ -0,0 +1,530 @@
+"""
+Armazenamento SQLite de Contratos
+=================================
+Substitui a regravação integral de data/contratos_cadastrados.json por um
+banco SQLite com tabelas separadas para contratos, aditivos e fiscais por
+comarca.
+
+Motivação:
+- Cadastrar contrato ou aditivo regravava o JSON inteiro (custo O(N))
+- Sessões concorrentes perdiam atualizações (última gravação vencia)
+
+Estratégia:
+- WAL mode: leitores não bloqueiam o escritor
+- Cada escrita é uma transação pequena (BEGIN IMMEDIATE)
+- Índices em id, numero, status e data_fim
+- Contador de versão em store_meta, usado pelo repositório em memória
+- Migração única a partir do JSON legado na primeira abertura
+
+Os registros devolvidos mantêm o mesmo formato do JSON legado (datas como
+strings ISO), para que o restante do sistema não perceba a troca.
+"""
+
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+import json
+import sqlite3
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+CONTRATOS_DB = Path("data/contratos.db")
+CONTRATOS_JSON_LEGADO = Path("data/contratos_cadastrados.json")
+
+# Campos com coluna própria (indexáveis); o restante vai em dados_json
+COLUNAS_CONTRATO = [
+    'numero', 'tipo', 'fornecedor', 'status', 'valor',
+    'data_inicio', 'data_fim', 'controle_pncp', 'ultima_atualizacao'
+]
+
+# Limite de parâmetros por consulta IN (...) (SQLITE_MAX_VARIABLE_NUMBER antigo = 999)
+LOTE_PARAMETROS = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS contratos (
+    id TEXT PRIMARY KEY,
+    numero TEXT,
+    tipo TEXT,
+    fornecedor TEXT,
+    status TEXT,
+    valor REAL,
+    data_inicio TEXT,
+    data_fim TEXT,
+    controle_pncp TEXT,
+    ultima_atualizacao TEXT,
+    dados_json TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_contratos_numero ON contratos(numero COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_contratos_status ON contratos(status);
+CREATE INDEX IF NOT EXISTS idx_contratos_data_fim ON contratos(data_fim);
+CREATE INDEX IF NOT EXISTS idx_contratos_controle_pncp ON contratos(controle_pncp);
+
+CREATE TABLE IF NOT EXISTS aditivos (
+    contrato_id TEXT NOT NULL REFERENCES contratos(id) ON DELETE CASCADE,
+    numero INTEGER NOT NULL,
+    dados_json TEXT NOT NULL,
+    PRIMARY KEY (contrato_id, numero)
+);
+
+-- Números de aditivo reservados enquanto o PDF é gravado (fora da transação)
+CREATE TABLE IF NOT EXISTS aditivos_reservados (
+    contrato_id TEXT NOT NULL,
+    numero INTEGER NOT NULL,
+    PRIMARY KEY (contrato_id, numero)
+);
+
+CREATE TABLE IF NOT EXISTS fiscais_por_comarca (
+    contrato_id TEXT NOT NULL REFERENCES contratos(id) ON DELETE CASCADE,
+    ordem INTEGER NOT NULL,
+    comarca TEXT,
+    titular TEXT,
+    suplente TEXT,
+    dados_json TEXT NOT NULL,
+    PRIMARY KEY (contrato_id, ordem)
+);
+CREATE INDEX IF NOT EXISTS idx_fiscais_comarca ON fiscais_por_comarca(comarca);
+
+CREATE TABLE IF NOT EXISTS store_meta (
+    chave TEXT PRIMARY KEY,
+    valor TEXT
+);
+"""
+
+
+def _serializar(valor):
+    """Normaliza datas para string ISO (mesmo formato do JSON legado)"""
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    if hasattr(valor, 'isoformat'):
+        return valor.isoformat()
+    return valor
+
+
+def _numerar_aditivos(contrato_id: str, aditivos: List[Dict]) -> List[int]:
+    """
+    Números dos aditivos de um contrato, únicos por contrato.
+
+    Usa o 'numero' do registro quando é um inteiro válido e ainda livre;
+    os demais (ausente, não numérico ou repetido) recebem a posição na
+    lista ou o próximo número livre a partir dela, com aviso no log.
+    """
+    numeros: List[Optional[int]] = []
+    usados = set()
+    for a in aditivos:
+        try:
+            numero = int(a.get('numero'))
+        except (TypeError, ValueError):
+            numero = None
+        if numero is not None and numero in usados:
+            numero = None
+        if numero is not None:
+            usados.add(numero)
+        numeros.append(numero)
+
+    for i, (a, numero) in enumerate(zip(aditivos, numeros)):
+        if numero is not None:
+            continue
+        numero = i + 1
+        while numero in usados:
+            numero += 1
+        usados.add(numero)
+        numeros[i] = numero
+        logger.warning(
+            "Aditivo de %s com número inválido ou repetido (%r); gravado como %d",
+            contrato_id, a.get('numero'), numero
+        )
+    return numeros
+
+
+class ContractStore:
+    """Armazenamento de contratos, aditivos e fiscais em SQLite"""
+
+    def __init__(self, db_path: Path = CONTRATOS_DB):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._inicializar()
+
+    # ========================================
+    # CONEXÃO E SCHEMA
+    # ========================================
+
+    def _conexao(self) -> sqlite3.Connection:
+        """Conexão por thread (o Streamlit atende sessões em threads distintas)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transacao(self):
+        """Transação de escrita curta; incrementa a versão ao confirmar"""
+        conn = self._conexao()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute(
+                "INSERT INTO store_meta (chave, valor) VALUES ('versao', '1') "
+                "ON CONFLICT(chave) DO UPDATE SET valor = CAST(valor AS INTEGER) + 1"
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _inicializar(self):
+        """Cria tabelas e índices se ainda não existirem"""
+        self._conexao().executescript(SCHEMA)
+
+    def versao(self) -> int:
+        """Versão dos dados (incrementada a cada transação de escrita)"""
+        row = self._conexao().execute(
+            "SELECT valor FROM store_meta WHERE chave = 'versao'"
+        ).fetchone()
+        return int(row['valor']) if row else 0
+
+    # ========================================
+    # CONVERSÃO REGISTRO ↔ LINHAS
+    # ========================================
+
+    def _gravar_contrato(self, conn: sqlite3.Connection, contrato: Dict):
+        """Insere ou substitui um contrato com seus aditivos e fiscais"""
+        dados = {k: _serializar(v) for k, v in contrato.items()}
+        aditivos = dados.pop('aditivos', None) or []
+        fiscais = dados.pop('fiscais_por_comarca', None) or []
+
+        conn.execute(
+            "INSERT INTO contratos (id, numero, tipo, fornecedor, status, valor, "
+            "data_inicio, data_fim, controle_pncp, ultima_atualizacao, dados_json) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET numero = excluded.numero, tipo = excluded.tipo, "
+            "fornecedor = excluded.fornecedor, status = excluded.status, valor = excluded.valor, "
+            "data_inicio = excluded.data_inicio, data_fim = excluded.data_fim, "
+            "controle_pncp = excluded.controle_pncp, ultima_atualizacao = excluded.ultima_atualizacao, "
+            "dados_json = excluded.dados_json",
+            (
+                dados['id'],
+                str(dados.get('numero', '')).strip(),
+                *[dados.get(c) for c in COLUNAS_CONTRATO[1:]],
+                json.dumps(dados, ensure_ascii=False, default=str)
+            )
+        )
+
+        conn.execute("DELETE FROM aditivos WHERE contrato_id = ?", (dados['id'],))
+        conn.executemany(
+            "INSERT INTO aditivos (contrato_id, numero, dados_json) VALUES (?, ?, ?)",
+            [
+                (dados['id'], numero, json.dumps(a, ensure_ascii=False, default=str))
+                for numero, a in zip(_numerar_aditivos(dados['id'], aditivos), aditivos)
+            ]
+        )
+
+        conn.execute("DELETE FROM fiscais_por_comarca WHERE contrato_id = ?", (dados['id'],))
+        conn.executemany(
+            "INSERT INTO fiscais_por_comarca (contrato_id, ordem, comarca, titular, suplente, dados_json) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    dados['id'], i, f.get('comarca'), f.get('titular'), f.get('suplente'),
+                    json.dumps(f, ensure_ascii=False, default=str)
+                )
+                for i, f in enumerate(fiscais)
+            ]
+        )
+
+    def _atualizar_dados(self, conn: sqlite3.Connection, contrato_id: str, dados: Dict):
+        """Atualiza colunas e dados_json de um contrato, sem tocar aditivos e fiscais"""
+        dados = {k: v for k, v in dados.items() if k not in ('aditivos', 'fiscais_por_comarca')}
+        conn.execute(
+            "UPDATE contratos SET numero = ?, tipo = ?, fornecedor = ?, status = ?, valor = ?, "
+            "data_inicio = ?, data_fim = ?, controle_pncp = ?, ultima_atualizacao = ?, "
+            "dados_json = ? WHERE id = ?",
+            (
+                str(dados.get('numero', '')).strip(),
+                *[dados.get(c) for c in COLUNAS_CONTRATO[1:]],
+                json.dumps(dados, ensure_ascii=False, default=str),
+                contrato_id
+            )
+        )
+
+    def _montar_contratos(self, conn: sqlite3.Connection, linhas: List[sqlite3.Row]) -> List[Dict]:
+        """Reconstrói registros no formato do JSON legado"""
+        contratos = [json.loads(row['dados_json']) for row in linhas]
+        if not contratos:
+            return []
+
+        por_id = {c['id']: c for c in contratos}
+        for c in contratos:
+            c['aditivos'] = []
+
+        filtro, params = self._filtro_ids(por_id, len(linhas))
+
+        for row in conn.execute(
+            f"SELECT contrato_id, dados_json FROM aditivos {filtro} ORDER BY contrato_id, numero", params
+        ):
+            if row['contrato_id'] in por_id:
+                por_id[row['contrato_id']]['aditivos'].append(json.loads(row['dados_json']))
+
+        for row in conn.execute(
+            f"SELECT contrato_id, dados_json FROM fiscais_por_comarca {filtro} ORDER BY contrato_id, ordem", params
+        ):
+            if row['contrato_id'] in por_id:
+                por_id[row['contrato_id']].setdefault('fiscais_por_comarca', []).append(json.loads(row['dados_json']))
+
+        return contratos
+
+    def _filtro_ids(self, por_id: Dict, total_linhas: int):
+        """Filtra tabelas filhas por ID quando a consulta é pontual"""
+        if total_linhas > 50:
+            return "", ()
+        marcadores = ", ".join("?" for _ in por_id)
+        return f"WHERE contrato_id IN ({marcadores})", tuple(por_id)
+
+    # ========================================
+    # CONSULTAS
+    # ========================================
+
+    def listar_contratos(self) -> List[Dict]:
+        """Retorna todos os contratos (com aditivos e fiscais por comarca)"""
+        conn = self._conexao()
+        linhas = conn.execute("SELECT id, dados_json FROM contratos").fetchall()
+        return self._montar_contratos(conn, linhas)
+
+    def obter_contrato(self, contrato_id: str) -> Optional[Dict]:
+        """Busca um contrato por ID"""
+        conn = self._conexao()
+        linhas = conn.execute(
+            "SELECT id, dados_json FROM contratos WHERE id = ?", (contrato_id,)
+        ).fetchall()
+        contratos = self._montar_contratos(conn, linhas)
+        return contratos[0] if contratos else None
+
+    def existe_numero(self, numero: str) -> bool:
+        """Verifica duplicidade pelo número do contrato (sem diferenciar maiúsculas)"""
+        row = self._conexao().execute(
+            "SELECT 1 FROM contratos WHERE numero = ? COLLATE NOCASE LIMIT 1",
+            (numero.strip(),)
+        ).fetchone()
+        return row is not None
+
+    def total_contratos(self) -> int:
+        """Quantidade de contratos armazenados"""
+        return self._conexao().execute("SELECT COUNT(*) FROM contratos").fetchone()[0]
+
+    # ========================================
+    # ESCRITAS
+    # ========================================
+
+    def inserir_contrato(self, contrato: Dict):
+        """Insere (ou substitui) um contrato em uma única transação"""
+        with self._transacao() as conn:
+            self._gravar_contrato(conn, contrato)
+
+    def inserir_contratos(self, contratos: Iterable[Dict]) -> int:
+        """Insere vários contratos em uma única transação"""
+        total = 0
+        with self._transacao() as conn:
+            for contrato in contratos:
+                self._gravar_contrato(conn, contrato)
+                total += 1
+        return total
+
+    def upsert_por_controle_pncp(self, contratos: Sequence[Dict], campos: Sequence[str]) -> Dict[str, int]:
+        """
+        Insere ou atualiza contratos do PNCP identificados por controle_pncp.
+
+        Contratos já existentes só são regravados se algum dos campos
+        informados mudou; os demais dados (fiscais, aditivos, ajustes
+        manuais) são preservados. Sem mudanças, nenhuma transação é aberta
+        e a versão do armazenamento não muda.
+
+        Args:
+            contratos: Contratos no formato legado, com 'controle_pncp'
+            campos: Campos de origem PNCP comparados/atualizados na reimportação
+
+        Returns:
+            Dict com contagens 'inseridos', 'atualizados' e 'inalterados'
+        """
+        resultado = {'inseridos': 0, 'atualizados': 0, 'inalterados': 0}
+        contratos = [c for c in contratos if c.get('controle_pncp')]
+        if not contratos:
+            return resultado
+
+        conn = self._conexao()
+        controles = list({str(c['controle_pncp']) for c in contratos})
+        existentes = {}
+        for i in range(0, len(controles), LOTE_PARAMETROS):
+            lote = controles[i:i + LOTE_PARAMETROS]
+            marcadores = ", ".join("?" for _ in lote)
+            for row in conn.execute(
+                f"SELECT id, controle_pncp, dados_json FROM contratos WHERE controle_pncp IN ({marcadores})",
+                lote
+            ):
+                existentes[row['controle_pncp']] = row
+
+        novos = {}
+        alterados = {}
+        for contrato in contratos:
+            controle = str(contrato['controle_pncp'])
+            row = existentes.get(controle)
+            if row is None:
+                # Controle repetido na mesma carga: prevalece a última linha
+                novos[controle] = contrato
+                continue
+
+            dados = alterados.get(row['id']) or json.loads(row['dados_json'])
+            mudancas = {
+                campo: _serializar(contrato[campo])
+                for campo in campos
+                if campo in contrato and dados.get(campo) != _serializar(contrato[campo])
+            }
+            if not mudancas:
+                resultado['inalterados'] += 1
+                continue
+
+            dados.update(mudancas)
+            dados['ultima_atualizacao'] = _serializar(
+                contrato.get('ultima_atualizacao') or datetime.now()
+            )
+            alterados[row['id']] = dados
+
+        if novos or alterados:
+            with self._transacao() as conn:
+                for contrato in novos.values():
+                    self._gravar_contrato(conn, contrato)
+                for contrato_id, dados in alterados.items():
+                    self._atualizar_dados(conn, contrato_id, dados)
+
+        resultado['inseridos'] = len(novos)
+        resultado['atualizados'] = len(alterados)
+        return resultado
+
+    def adicionar_aditivo(self, contrato_id: str, montar_aditivo: Callable[[int], Dict]) -> Optional[Dict]:
+        """
+        Anexa um aditivo ao contrato em duas transações pequenas.
+
+        O número do aditivo é reservado (aditivos_reservados) em uma
+        transação, evitando que duas sessões concorrentes gerem o mesmo
+        número; montar_aditivo (que grava o PDF) roda fora da transação e o
+        aditivo é inserido em seguida, liberando a reserva.
+
+        Args:
+            contrato_id: ID do contrato
+            montar_aditivo: Função que recebe o número reservado e devolve o
+                dicionário do aditivo (ex.: após gravar o PDF correspondente)
+
+        Returns:
+            Aditivo gravado ou None se o contrato não existe
+        """
+        with self._transacao() as conn:
+            if conn.execute("SELECT 1 FROM contratos WHERE id = ?", (contrato_id,)).fetchone() is None:
+                return None
+
+            proximo_numero = conn.execute(
+                "SELECT MAX(COALESCE((SELECT MAX(numero) FROM aditivos WHERE contrato_id = ?), 0), "
+                "COALESCE((SELECT MAX(numero) FROM aditivos_reservados WHERE contrato_id = ?), 0)) + 1",
+                (contrato_id, contrato_id)
+            ).fetchone()[0]
+            conn.execute(
+                "INSERT INTO aditivos_reservados (contrato_id, numero) VALUES (?, ?)",
+                (contrato_id, proximo_numero)
+            )
+
+        try:
+            aditivo = montar_aditivo(proximo_numero)
+            aditivo['numero'] = proximo_numero
+
+            with self._transacao() as conn:
+                row = conn.execute(
+                    "SELECT dados_json FROM contratos WHERE id = ?", (contrato_id,)
+                ).fetchone()
+                if row is None:
+                    return None
+
+                conn.execute(
+                    "INSERT INTO aditivos (contrato_id, numero, dados_json) VALUES (?, ?, ?)",
+                    (contrato_id, proximo_numero, json.dumps(aditivo, ensure_ascii=False, default=str))
+                )
+
+                agora = datetime.now().isoformat()
+                dados = json.loads(row['dados_json'])
+                dados['total_aditivos'] = conn.execute(
+                    "SELECT COUNT(*) FROM aditivos WHERE contrato_id = ?", (contrato_id,)
+                ).fetchone()[0]
+                dados['ultima_atualizacao'] = agora
+                conn.execute(
+                    "UPDATE contratos SET ultima_atualizacao = ?, dados_json = ? WHERE id = ?",
+                    (agora, json.dumps(dados, ensure_ascii=False, default=str), contrato_id)
+                )
+        finally:
+            self._conexao().execute(
+                "DELETE FROM aditivos_reservados WHERE contrato_id = ? AND numero = ?",
+                (contrato_id, proximo_numero)
+            )
+
+        return aditivo
+
+    # ========================================
+    # MIGRAÇÃO DO JSON LEGADO
+    # ========================================
+
+    def migracao_concluida(self) -> bool:
+        """Indica se a migração única do JSON já foi executada"""
+        row = self._conexao().execute(
+            "SELECT valor FROM store_meta WHERE chave = 'migrado_de_json'"
+        ).fetchone()
+        return row is not None
+
+    def migrar_de_json(self, json_path: Path = CONTRATOS_JSON_LEGADO, forcar: bool = False) -> int:
+        """
+        Importa contratos do JSON legado (execução única).
+
+        Args:
+            json_path: Arquivo JSON de origem
+            forcar: Reimporta mesmo se a migração já tiver sido feita
+
+        Returns:
+            Quantidade de contratos migrados (0 se nada a fazer)
+        """
+        if self.migracao_concluida() and not forcar:
+            return 0
+
+        contratos = []
+        if Path(json_path).exists():
+            with open(json_path, 'r', encoding='utf-8') as f:
+                contratos = json.load(f)
+
+        with self._transacao() as conn:
+            for contrato in contratos:
+                self._gravar_contrato(conn, contrato)
+            conn.execute(
+                "INSERT OR REPLACE INTO store_meta (chave, valor) VALUES ('migrado_de_json', ?)",
+                (datetime.now().isoformat(),)
+            )
+
+        logger.info(f"Migração JSON → SQLite concluída: {len(contratos)} contratos de {json_path}")
+        return len(contratos)
+
+
+# Instância singleton
+_contract_store = None
+_contract_store_lock = threading.Lock()
+
+def get_contract_store() -> ContractStore:
+    """Retorna instância singleton do armazenamento (migrando o JSON na primeira abertura)"""
+    global _contract_store
+    if _contract_store is None:
+        with _contract_store_lock:
+            if _contract_store is None:
+                store = ContractStore()
+                store.migrar_de_json()
+                _contract_store = store
+    return _contract_store
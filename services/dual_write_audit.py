@@ -0,0 +1,166 @@
+"""
+Auditoria do Dual Write
+=======================
+Registro estruturado (JSONL) das operações de sincronização V1 → V2, com
+contadores incrementais e leitura das últimas linhas pelo fim do arquivo.
+
+Motivação:
+- obter_estatisticas_dual_write relia o log textual inteiro a cada
+  chamada para contar linhas com "✓ DualWrite" / "✗ DualWrite", e
+  obter_auditoria carregava todas as linhas para devolver as últimas N:
+  o custo da página crescia com o tamanho do log
+
+Estratégia:
+- Um registro JSON por linha (data, operação, sucesso, detalhes), só
+  acrescentado ao fim do arquivo
+- Contadores persistidos junto com o byte até onde já foram contados:
+  cada consulta lê apenas o trecho novo (inclusive o escrito por outros
+  processos); arquivo menor que o deslocamento salvo (rotação ou
+  truncamento) recomeça a contagem do zero
+- Últimos N registros: leitura em blocos a partir do fim do arquivo até
+  reunir N quebras de linha
+"""
+
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+import json
+import os
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+LOGS_DIR = Path("logs")
+AUDITORIA_PATH = LOGS_DIR / "dual_write_auditoria.jsonl"
+CONTADORES_PATH = LOGS_DIR / "dual_write_auditoria_contadores.json"
+
+# Tamanho dos blocos lidos a partir do fim do arquivo
+BLOCO_LEITURA = 8192
+
+
+def _contadores_vazios() -> Dict[str, Any]:
+    return {"deslocamento": 0, "sucessos": 0, "falhas": 0, "por_operacao": {}}
+
+
+class AuditoriaDualWrite:
+    """Registro JSONL das operações do dual write, com contadores incrementais"""
+
+    def __init__(self, caminho: Path = AUDITORIA_PATH, caminho_contadores: Path = CONTADORES_PATH):
+        self.caminho = Path(caminho)
+        self.caminho_contadores = Path(caminho_contadores)
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    # ========================================
+    # ESCRITA
+    # ========================================
+
+    def registrar(self, operacao: str, sucesso: bool, **detalhes):
+        """Acrescenta um registro de operação ao arquivo de auditoria"""
+        registro = {
+            "data": datetime.now().isoformat(timespec="seconds"),
+            "operacao": operacao,
+            "sucesso": sucesso,
+            **detalhes,
+        }
+        linha = json.dumps(registro, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            with open(self.caminho, "a", encoding="utf-8") as f:
+                f.write(linha)
+
+    # ========================================
+    # CONTADORES
+    # ========================================
+
+    def _carregar_contadores(self) -> Dict[str, Any]:
+        try:
+            with open(self.caminho_contadores, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return _contadores_vazios()
+
+    def contadores(self) -> Dict[str, Any]:
+        """
+        Sucessos e falhas (total e por operação), lendo só o trecho do
+        arquivo ainda não contado.
+        """
+        with self._lock:
+            contadores = self._carregar_contadores()
+            try:
+                tamanho = self.caminho.stat().st_size
+            except OSError:
+                tamanho = 0
+            if tamanho < contadores["deslocamento"]:
+                contadores = _contadores_vazios()
+            if tamanho == contadores["deslocamento"]:
+                return contadores
+
+            with open(self.caminho, "rb") as f:
+                f.seek(contadores["deslocamento"])
+                for linha in f:
+                    # Linha ainda sendo escrita por outro processo: conta na próxima leitura
+                    if not linha.endswith(b"\n"):
+                        break
+                    contadores["deslocamento"] += len(linha)
+                    try:
+                        registro = json.loads(linha)
+                    except ValueError:
+                        continue
+                    chave = "sucessos" if registro.get("sucesso") else "falhas"
+                    contadores[chave] += 1
+                    por_operacao = contadores["por_operacao"].setdefault(
+                        registro.get("operacao", "desconhecida"), {"sucessos": 0, "falhas": 0}
+                    )
+                    por_operacao[chave] += 1
+
+            with open(self.caminho_contadores, "w", encoding="utf-8") as f:
+                json.dump(contadores, f, ensure_ascii=False, indent=2)
+            return contadores
+
+    # ========================================
+    # LEITURA DAS ÚLTIMAS LINHAS
+    # ========================================
+
+    def ultimos(self, limite: int = 100) -> List[Dict]:
+        """Últimos registros, do mais antigo para o mais recente"""
+        if limite <= 0 or not self.caminho.exists():
+            return []
+
+        with open(self.caminho, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            posicao = f.tell()
+            dados = b""
+            # +1: a última linha termina em quebra de linha
+            while posicao > 0 and dados.count(b"\n") <= limite:
+                tamanho = min(BLOCO_LEITURA, posicao)
+                posicao -= tamanho
+                f.seek(posicao)
+                dados = f.read(tamanho) + dados
+
+        linhas = dados.splitlines()
+        if posicao > 0:
+            # Primeira linha do trecho pode estar incompleta
+            linhas = linhas[1:]
+
+        registros = []
+        for linha in linhas[-limite:]:
+            try:
+                registros.append(json.loads(linha))
+            except ValueError:
+                continue
+        return registros
+
+
+# Instância singleton
+_auditoria = None
+_auditoria_lock = threading.Lock()
+
+def get_auditoria_dual_write() -> AuditoriaDualWrite:
+    """Retorna instância singleton da auditoria do dual write"""
+    global _auditoria
+    if _auditoria is None:
+        with _auditoria_lock:
+            if _auditoria is None:
+                _auditoria = AuditoriaDualWrite()
+    return _auditoria
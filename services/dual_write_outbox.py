@@ -0,0 +1,382 @@
+"""
+Outbox do Dual Write (V1 → V2)
+==============================
+Fila durável de intenções de sincronização V1 → V2, drenada em segundo
+plano por um worker com novas tentativas.
+
+Motivação:
+- criar_alerta_dual, sincronizar_resolucao, sincronizar_acao_dual e a
+  sincronização em lote rodavam dentro da requisição V1: a latência da
+  página incluía a gravação V2 e uma falha só era registrada no log, sem
+  nova tentativa (V2 divergia em silêncio)
+
+Estratégia:
+- Tabela SQLite (mesmo padrão do ContractStore: WAL, conexão por thread,
+  BEGIN IMMEDIATE) com uma linha por intenção: operação, payload JSON e
+  chave de idempotência única (INSERT OR IGNORE: a mesma intenção não
+  entra duas vezes na fila, nem depois de concluída)
+- Worker em thread daemon: reserva lotes de intenções vencidas, entrega
+  ao processador e marca concluídas ou agenda nova tentativa com atraso
+  exponencial; após MAX_TENTATIVAS a intenção fica como 'falhou' (visível
+  nas métricas e reprocessável)
+- Reserva atômica: o lote passa a 'processando' com prazo (lease_ate) na
+  mesma transação que o seleciona (UPDATE ... RETURNING), então workers
+  de outras threads ou processos nunca recebem a mesma intenção; reservas
+  com prazo vencido (worker interrompido) voltam a ser elegíveis
+- Intenções concluídas há mais de RETENCAO_CONCLUIDAS_DIAS são apagadas
+  pelo worker (a idempotência por chave vale dentro desse período)
+- Métricas: profundidade da fila, falhas definitivas e atraso da
+  intenção pendente mais antiga
+"""
+
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import json
+import sqlite3
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+OUTBOX_DB = DATA_DIR / "dual_write_outbox.db"
+
+STATUS_PENDENTE = "pendente"
+STATUS_PROCESSANDO = "processando"
+STATUS_CONCLUIDO = "concluido"
+STATUS_FALHOU = "falhou"
+
+# Novas tentativas: atraso = ATRASO_BASE_S * 2^(tentativas - 1), limitado a ATRASO_MAXIMO_S
+ATRASO_BASE_S = 2.0
+ATRASO_MAXIMO_S = 600.0
+MAX_TENTATIVAS = 8
+
+TAMANHO_LOTE = 200
+INTERVALO_WORKER_S = 5.0
+
+# Prazo de uma reserva: depois disso o lote volta a ser elegível para outro worker
+PRAZO_RESERVA_S = 300.0
+
+# Intenções concluídas são mantidas por este período e depois apagadas
+RETENCAO_CONCLUIDAS_DIAS = 7
+INTERVALO_LIMPEZA_S = 3600.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    chave TEXT NOT NULL UNIQUE,
+    operacao TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pendente',
+    tentativas INTEGER NOT NULL DEFAULT 0,
+    criado_em REAL NOT NULL,
+    proxima_tentativa REAL NOT NULL,
+    concluido_em REAL,
+    ultimo_erro TEXT,
+    lease_ate REAL
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_fila ON outbox(status, proxima_tentativa);
+"""
+
+
+def calcular_atraso(tentativas: int) -> float:
+    """Atraso até a próxima tentativa após N falhas (exponencial, com teto)"""
+    return min(ATRASO_BASE_S * (2 ** max(tentativas - 1, 0)), ATRASO_MAXIMO_S)
+
+
+class DualWriteOutbox:
+    """Fila durável de intenções de sincronização V1 → V2 em SQLite"""
+
+    def __init__(self, db_path: Path = OUTBOX_DB):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._inicializar()
+
+    def _conexao(self) -> sqlite3.Connection:
+        """Conexão por thread (páginas e worker usam threads distintas)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _inicializar(self):
+        """Cria a tabela; bancos anteriores à reserva ganham a coluna lease_ate"""
+        conn = self._conexao()
+        conn.executescript(SCHEMA)
+        colunas = {row['name'] for row in conn.execute("PRAGMA table_info(outbox)")}
+        if 'lease_ate' not in colunas:
+            conn.execute("ALTER TABLE outbox ADD COLUMN lease_ate REAL")
+
+    @contextmanager
+    def _transacao(self):
+        conn = self._conexao()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    # ========================================
+    # ENFILEIRAMENTO
+    # ========================================
+
+    def enfileirar(self, intencoes: Iterable[Tuple[str, str, Dict]], agora: Optional[float] = None) -> int:
+        """
+        Enfileira intenções em uma única transação.
+
+        Args:
+            intencoes: Tuplas (chave de idempotência, operação, payload)
+            agora: Instante do enfileiramento (epoch; padrão: agora)
+
+        Returns:
+            Quantidade de intenções novas (chaves já conhecidas são ignoradas)
+        """
+        agora = time.time() if agora is None else agora
+        with self._transacao() as conn:
+            antes = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO outbox (chave, operacao, payload, criado_em, proxima_tentativa) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    (chave, operacao, json.dumps(payload, ensure_ascii=False, default=str), agora, agora)
+                    for chave, operacao, payload in intencoes
+                ]
+            )
+            return conn.total_changes - antes
+
+    # ========================================
+    # DRENAGEM
+    # ========================================
+
+    def reservar_lote(
+        self,
+        limite: int = TAMANHO_LOTE,
+        agora: Optional[float] = None,
+        prazo_s: float = PRAZO_RESERVA_S
+    ) -> List[Dict]:
+        """
+        Reserva intenções vencidas, na ordem de chegada.
+
+        Na mesma transação, as intenções pendentes (ou em processamento com
+        reserva vencida) passam a 'processando' até agora + prazo_s: outro
+        worker, em qualquer thread ou processo, não as recebe enquanto a
+        reserva vale.
+        """
+        agora = time.time() if agora is None else agora
+        with self._transacao() as conn:
+            linhas = conn.execute(
+                "UPDATE outbox SET status = ?, lease_ate = ? WHERE id IN ("
+                "SELECT id FROM outbox WHERE (status = ? AND proxima_tentativa <= ?) "
+                "OR (status = ? AND lease_ate <= ?) ORDER BY id LIMIT ?"
+                ") RETURNING id, chave, operacao, payload, tentativas",
+                (STATUS_PROCESSANDO, agora + prazo_s, STATUS_PENDENTE, agora, STATUS_PROCESSANDO, agora, limite)
+            ).fetchall()
+        return sorted(
+            (
+                {
+                    'id': row['id'],
+                    'chave': row['chave'],
+                    'operacao': row['operacao'],
+                    'payload': json.loads(row['payload']),
+                    'tentativas': row['tentativas'],
+                }
+                for row in linhas
+            ),
+            key=lambda item: item['id']
+        )
+
+    def registrar_resultados(self, resultados: Dict[int, Optional[str]], agora: Optional[float] = None):
+        """
+        Marca intenções concluídas (erro None) ou agenda nova tentativa.
+
+        Args:
+            resultados: id da intenção -> mensagem de erro (None = sucesso)
+        """
+        agora = time.time() if agora is None else agora
+        with self._transacao() as conn:
+            for intencao_id, erro in resultados.items():
+                if erro is None:
+                    conn.execute(
+                        "UPDATE outbox SET status = ?, concluido_em = ?, ultimo_erro = NULL, lease_ate = NULL "
+                        "WHERE id = ?",
+                        (STATUS_CONCLUIDO, agora, intencao_id)
+                    )
+                    continue
+                row = conn.execute("SELECT tentativas FROM outbox WHERE id = ?", (intencao_id,)).fetchone()
+                if row is None:
+                    continue
+                tentativas = row['tentativas'] + 1
+                status = STATUS_FALHOU if tentativas >= MAX_TENTATIVAS else STATUS_PENDENTE
+                conn.execute(
+                    "UPDATE outbox SET status = ?, tentativas = ?, proxima_tentativa = ?, ultimo_erro = ?, "
+                    "lease_ate = NULL WHERE id = ?",
+                    (status, tentativas, agora + calcular_atraso(tentativas), erro, intencao_id)
+                )
+
+    def reprocessar_falhas(self, agora: Optional[float] = None) -> int:
+        """Devolve à fila as intenções que esgotaram as tentativas"""
+        agora = time.time() if agora is None else agora
+        with self._transacao() as conn:
+            return conn.execute(
+                "UPDATE outbox SET status = ?, tentativas = 0, proxima_tentativa = ? WHERE status = ?",
+                (STATUS_PENDENTE, agora, STATUS_FALHOU)
+            ).rowcount
+
+    def purgar_concluidas(self, dias: float = RETENCAO_CONCLUIDAS_DIAS, agora: Optional[float] = None) -> int:
+        """Apaga intenções concluídas há mais de `dias`; retorna a quantidade apagada"""
+        agora = time.time() if agora is None else agora
+        with self._transacao() as conn:
+            return conn.execute(
+                "DELETE FROM outbox WHERE status = ? AND concluido_em < ?",
+                (STATUS_CONCLUIDO, agora - dias * 86400)
+            ).rowcount
+
+    # ========================================
+    # MÉTRICAS
+    # ========================================
+
+    def metricas(self, agora: Optional[float] = None) -> Dict:
+        """Profundidade da fila, reservas em curso, falhas definitivas e atraso da intenção mais antiga"""
+        agora = time.time() if agora is None else agora
+        contagens = {
+            row['status']: row['total']
+            for row in self._conexao().execute(
+                "SELECT status, COUNT(*) AS total FROM outbox GROUP BY status"
+            )
+        }
+        mais_antiga = self._conexao().execute(
+            "SELECT MIN(criado_em) FROM outbox WHERE status IN (?, ?)", (STATUS_PENDENTE, STATUS_PROCESSANDO)
+        ).fetchone()[0]
+        return {
+            'pendentes': contagens.get(STATUS_PENDENTE, 0),
+            'em_processamento': contagens.get(STATUS_PROCESSANDO, 0),
+            'concluidas': contagens.get(STATUS_CONCLUIDO, 0),
+            'falhas': contagens.get(STATUS_FALHOU, 0),
+            'atraso_s': round(agora - mais_antiga, 1) if mais_antiga is not None else 0.0,
+        }
+
+    def listar_falhas(self, limite: int = 50) -> List[Dict]:
+        """Intenções com erro (pendentes de nova tentativa ou esgotadas), mais recentes primeiro"""
+        return [
+            dict(row)
+            for row in self._conexao().execute(
+                "SELECT chave, operacao, status, tentativas, ultimo_erro FROM outbox "
+                "WHERE ultimo_erro IS NOT NULL AND status != ? ORDER BY id DESC LIMIT ?",
+                (STATUS_CONCLUIDO, limite)
+            )
+        ]
+
+
+# ========================================
+# WORKER DE DRENAGEM
+# ========================================
+
+class OutboxWorker:
+    """
+    Thread daemon que drena a outbox em lotes.
+
+    O processador recebe o lote reservado e devolve {id: erro ou None};
+    exceções do processador valem como falha de todo o lote.
+    """
+
+    def __init__(
+        self,
+        outbox: DualWriteOutbox,
+        processar: Callable[[List[Dict]], Dict[int, Optional[str]]],
+        intervalo_s: float = INTERVALO_WORKER_S
+    ):
+        self.outbox = outbox
+        self.processar = processar
+        self.intervalo_s = intervalo_s
+        self._acordar = threading.Event()
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def drenar(self, limite: int = TAMANHO_LOTE) -> Dict[str, int]:
+        """
+        Processa os lotes vencidos até esvaziar a parte elegível da fila.
+
+        Returns:
+            Dict com 'processadas', 'concluidas' e 'falhas'
+        """
+        resumo = {'processadas': 0, 'concluidas': 0, 'falhas': 0}
+        while True:
+            lote = self.outbox.reservar_lote(limite)
+            if not lote:
+                return resumo
+            try:
+                resultados = self.processar(lote)
+            except Exception as e:
+                logger.error(f"Outbox: falha ao processar lote: {e}", exc_info=True)
+                resultados = {item['id']: str(e) for item in lote}
+            # Intenção sem resultado devolvido conta como falha
+            for item in lote:
+                resultados.setdefault(item['id'], "sem resultado do processador")
+            self.outbox.registrar_resultados(resultados)
+
+            falhas = sum(1 for erro in resultados.values() if erro is not None)
+            resumo['processadas'] += len(lote)
+            resumo['falhas'] += falhas
+            resumo['concluidas'] += len(lote) - falhas
+            if falhas:
+                # Itens com falha só voltam após o atraso: não insiste no mesmo ciclo
+                return resumo
+
+    def _executar(self):
+        ultima_limpeza = 0.0
+        while not self._parar.is_set():
+            try:
+                self.drenar()
+                if time.time() - ultima_limpeza >= INTERVALO_LIMPEZA_S:
+                    self.outbox.purgar_concluidas()
+                    ultima_limpeza = time.time()
+            except Exception as e:
+                logger.error(f"Outbox: erro no worker: {e}", exc_info=True)
+            self._acordar.wait(self.intervalo_s)
+            self._acordar.clear()
+
+    def iniciar(self):
+        """Inicia a thread (idempotente)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._executar, name="dual-write-outbox", daemon=True)
+        self._thread.start()
+
+    def acordar(self):
+        """Antecipa a próxima drenagem (após enfileirar)"""
+        self._acordar.set()
+
+    def parar(self, timeout: float = 5.0):
+        self._parar.set()
+        self._acordar.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    @property
+    def ativo(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+
+# Instância singleton
+_outbox = None
+_outbox_lock = threading.Lock()
+
+def get_dual_write_outbox() -> DualWriteOutbox:
+    """Retorna instância singleton da outbox"""
+    global _outbox
+    if _outbox is None:
+        with _outbox_lock:
+            if _outbox is None:
+                _outbox = DualWriteOutbox()
+    return _outbox
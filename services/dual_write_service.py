@@ -14,17 +14,40 @@ FUNCIONALIDADES:
 - Auditoria completa de operações
 - Tratamento de erros robusto
 - Logs estruturados
+- Outbox: as páginas enfileiram intenções (criação, resolução, ação) e
+  um worker em segundo plano as executa com novas tentativas
+- Mapeamento V1 ↔ V2 em memória (IndiceMapeamento), relido do arquivo
+  apenas quando ele muda
+- Auditoria estruturada em JSONL (dual_write_audit), com contadores
+  incrementais
+- Reconciliação V1 ↔ V2 por contrato: checksums de vínculos mantidos dos
+  dois lados (mapeamento e store V2); só os contratos cujo checksum mudou
+  desde a última verificação são comparados ID a ID
 """
 
+import hashlib
 import logging
 import json
+import os
+import tempfile
+import threading
 from datetime import datetime
 from typing import Dict, Any, Optional, List, Tuple
 from pathlib import Path
 
+from services.alert_lifecycle_store import hash_vinculo
+from services.dual_write_audit import get_auditoria_dual_write
+from services.dual_write_outbox import OutboxWorker, get_dual_write_outbox
+
+# Operações sincronizadas (outbox e auditoria)
+OPERACAO_CRIAR_ALERTA = "criar_alerta"
+OPERACAO_RESOLUCAO = "resolucao"
+OPERACAO_ACAO = "acao"
+
 # Configuração de log dedicado
 LOG_PATH = Path("logs/dual_write.log")
 MAPPING_FILE = Path("data/dual_write_mapping.json")
+RECONCILIACAO_FILE = Path("data/dual_write_reconciliacao.json")
 
 # Configurar logging estruturado
 LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
@@ -36,23 +59,203 @@ logging.basicConfig(
 )
 
 
+def _auditar(operacao: str, sucesso: bool, **detalhes):
+    """Registra a operação na auditoria JSONL (falha na auditoria não interrompe a sincronização)"""
+    try:
+        get_auditoria_dual_write().registrar(operacao, sucesso, **detalhes)
+    except Exception as e:
+        logging.error(f"Auditoria do dual write indisponível: {e}")
+
+
 # ========================================
 # GERENCIAMENTO DE REFERÊNCIA CRUZADA
 # ========================================
 
-def _load_mapping() -> Dict[str, Dict]:
-    """Carrega mapeamento ID V1 ↔ ID V2"""
-    if MAPPING_FILE.exists():
-        with open(MAPPING_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {"v1_to_v2": {}, "v2_to_v1": {}}
+class IndiceMapeamento:
+    """
+    Mapeamento ID V1 ↔ ID V2 mantido em memória (dois dicts), com o
+    arquivo JSON como armazenamento persistente.
+    
+    O arquivo só é relido quando seu mtime/tamanho muda (escrita por outro
+    processo ou remoção); as buscas são consultas O(1) aos dicts. Cada
+    registro grava o arquivo a partir da memória, sem releitura, em um
+    temporário no mesmo diretório trocado com os.replace: leitores nunca
+    veem um JSON pela metade, e um arquivo ilegível mantém a cópia em
+    memória (nova tentativa na próxima consulta).
+    
+    Também agrupa os vínculos por contrato_id (metadados do mapeamento) e
+    mantém, por contrato, a quantidade e a soma de hash_vinculo dos pares:
+    o mesmo checksum que o store V2 mantém do seu lado.
+    """
+    
+    def __init__(self, arquivo: Path):
+        self.arquivo = arquivo
+        self._lock = threading.RLock()
+        self._dados: Dict[str, Dict] = {"v1_to_v2": {}, "v2_to_v1": {}}
+        # contrato_id -> {v1_id: v2_id} e contrato_id -> [quantidade, soma]
+        self._por_contrato: Dict[str, Dict[str, str]] = {}
+        self._checksums: Dict[str, List[int]] = {}
+        # Assinatura do arquivo refletida em _dados (False = nunca carregado)
+        self._assinatura: Any = False
+        # Quantidade de leituras do arquivo (diagnóstico)
+        self.leituras = 0
+    
+    def _assinatura_arquivo(self) -> Optional[Tuple[int, int]]:
+        try:
+            info = self.arquivo.stat()
+        except OSError:
+            return None
+        return (info.st_mtime_ns, info.st_size)
+    
+    def _indexar(self, v1_id: str, registro: Dict, sinal: int):
+        """Soma (sinal=1) ou subtrai (sinal=-1) um vínculo do balde do seu contrato"""
+        contrato = registro.get("metadados", {}).get("contrato_id") or ''
+        balde = self._por_contrato.setdefault(contrato, {})
+        checksum = self._checksums.setdefault(contrato, [0, 0])
+        if sinal > 0:
+            balde[v1_id] = registro["v2_id"]
+        else:
+            balde.pop(v1_id, None)
+        checksum[0] += sinal
+        checksum[1] += sinal * hash_vinculo(v1_id, registro["v2_id"])
+        if not balde:
+            del self._por_contrato[contrato]
+            del self._checksums[contrato]
+    
+    def dados(self) -> Dict[str, Dict]:
+        """Mapeamento atual (relido do arquivo apenas se ele mudou)"""
+        assinatura = self._assinatura_arquivo()
+        with self._lock:
+            if assinatura != self._assinatura:
+                if assinatura is None:
+                    self._dados = {"v1_to_v2": {}, "v2_to_v1": {}}
+                else:
+                    try:
+                        with open(self.arquivo, 'r', encoding='utf-8') as f:
+                            dados = json.load(f)
+                    except (OSError, ValueError) as e:
+                        # Assinatura não é atualizada: relê na próxima consulta
+                        logging.error(f"Mapeamento V1 ↔ V2 ilegível, mantendo a cópia em memória: {e}")
+                        return self._dados
+                    self._dados = dados
+                    self.leituras += 1
+                self._por_contrato, self._checksums = {}, {}
+                for v1_id, registro in self._dados["v1_to_v2"].items():
+                    self._indexar(v1_id, registro, 1)
+                self._assinatura = assinatura
+            return self._dados
+    
+    def v2_por_v1(self, v1_id: str) -> Optional[str]:
+        registro = self.dados()["v1_to_v2"].get(v1_id)
+        return registro.get("v2_id") if registro else None
+    
+    def v1_por_v2(self, v2_id: str) -> Optional[str]:
+        registro = self.dados()["v2_to_v1"].get(v2_id)
+        return registro.get("v1_id") if registro else None
+    
+    def checksums(self) -> Dict[str, Dict[str, int]]:
+        """Checksum de vínculos por contrato_id ('' = sem contrato): {'quantidade', 'soma'}"""
+        with self._lock:
+            self.dados()
+            return {
+                contrato: {"quantidade": quantidade, "soma": soma}
+                for contrato, (quantidade, soma) in self._checksums.items()
+            }
+    
+    def vinculos(self, contratos: List[str]) -> Dict[str, Dict[str, str]]:
+        """Vínculos {v1_id: v2_id} dos contratos informados"""
+        with self._lock:
+            self.dados()
+            return {contrato: dict(self._por_contrato.get(contrato, {})) for contrato in contratos}
+    
+    def sem_contrato(self) -> Dict[str, str]:
+        """Vínculos {v1_id: v2_id} gravados antes de o contrato_id entrar nos metadados"""
+        return {
+            v1_id: registro["v2_id"]
+            for v1_id, registro in self.dados()["v1_to_v2"].items()
+            if "contrato_id" not in registro.get("metadados", {})
+        }
+    
+    def _gravar(self, mapping: Dict[str, Dict]):
+        """Grava o mapeamento de forma atômica (temporário + os.replace)"""
+        self.arquivo.parent.mkdir(parents=True, exist_ok=True)
+        fd, temporario = tempfile.mkstemp(
+            dir=self.arquivo.parent, prefix=f".{self.arquivo.name}.", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(mapping, f, indent=2, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporario, self.arquivo)
+        except BaseException:
+            try:
+                os.unlink(temporario)
+            except OSError:
+                pass
+            raise
+        self._assinatura = self._assinatura_arquivo()
+    
+    def registrar(self, pares: List[Tuple[str, str, Optional[Dict]]]):
+        """Acrescenta mapeamentos e grava o arquivo uma vez"""
+        timestamp = datetime.now().isoformat()
+        with self._lock:
+            mapping = self.dados()
+            for v1_id, v2_id, metadados in pares:
+                anterior = mapping["v1_to_v2"].get(v1_id)
+                if anterior:
+                    self._indexar(v1_id, anterior, -1)
+                mapping["v1_to_v2"][v1_id] = {
+                    "v2_id": v2_id,
+                    "timestamp": timestamp,
+                    "metadados": metadados or {}
+                }
+                mapping["v2_to_v1"][v2_id] = {
+                    "v1_id": v1_id,
+                    "timestamp": timestamp,
+                    "metadados": metadados or {}
+                }
+                self._indexar(v1_id, mapping["v1_to_v2"][v1_id], 1)
+            
+            self._gravar(mapping)
+    
+    def remover(self, v1_ids: List[str]) -> int:
+        """Remove mapeamentos (os dois sentidos) e grava o arquivo uma vez"""
+        with self._lock:
+            mapping = self.dados()
+            removidos = 0
+            for v1_id in v1_ids:
+                registro = mapping["v1_to_v2"].pop(v1_id, None)
+                if registro is None:
+                    continue
+                self._indexar(v1_id, registro, -1)
+                reverso = mapping["v2_to_v1"].get(registro["v2_id"])
+                if reverso and reverso.get("v1_id") == v1_id:
+                    del mapping["v2_to_v1"][registro["v2_id"]]
+                removidos += 1
+            if removidos:
+                self._gravar(mapping)
+            return removidos
+    
+    def definir_contratos(self, contratos: Dict[str, str]):
+        """Grava o contrato_id nos metadados de vínculos existentes (move de balde)"""
+        with self._lock:
+            mapping = self.dados()
+            for v1_id, contrato in contratos.items():
+                registro = mapping["v1_to_v2"].get(v1_id)
+                if registro is None:
+                    continue
+                self._indexar(v1_id, registro, -1)
+                registro.setdefault("metadados", {})["contrato_id"] = contrato
+                reverso = mapping["v2_to_v1"].get(registro["v2_id"])
+                if reverso is not None:
+                    reverso.setdefault("metadados", {})["contrato_id"] = contrato
+                self._indexar(v1_id, registro, 1)
+            if contratos:
+                self._gravar(mapping)
 
 
-def _save_mapping(mapping: Dict[str, Dict]):
-    """Salva mapeamento ID V1 ↔ ID V2"""
-    MAPPING_FILE.parent.mkdir(parents=True, exist_ok=True)
-    with open(MAPPING_FILE, 'w', encoding='utf-8') as f:
-        json.dump(mapping, f, indent=2, ensure_ascii=False)
+_indice_mapeamento = IndiceMapeamento(MAPPING_FILE)
 
 
 def registrar_mapeamento(v1_id: str, v2_id: str, metadados: Optional[Dict] = None):
@@ -64,23 +267,22 @@ def registrar_mapeamento(v1_id: str, v2_id: str, metadados: Optional[Dict] = Non
         v2_id: ID do alerta V2
         metadados: Informações adicionais (timestamp, tipo, etc.)
     """
-    mapping = _load_mapping()
-    
-    registro = {
-        "v2_id": v2_id,
-        "timestamp": datetime.now().isoformat(),
-        "metadados": metadados or {}
-    }
+    _indice_mapeamento.registrar([(v1_id, v2_id, metadados)])
+    logging.info(f"Mapeamento registrado: V1={v1_id} ↔ V2={v2_id}")
+
+
+def registrar_mapeamentos_lote(pares: List[Tuple[str, str, Optional[Dict]]]):
+    """
+    Registra vários mapeamentos V1 ↔ V2 com uma única gravação do arquivo
     
-    mapping["v1_to_v2"][v1_id] = registro
-    mapping["v2_to_v1"][v2_id] = {
-        "v1_id": v1_id,
-        "timestamp": registro["timestamp"],
-        "metadados": metadados or {}
-    }
+    Args:
+        pares: Lista de tuplas (v1_id, v2_id, metadados)
+    """
+    if not pares:
+        return
     
-    _save_mapping(mapping)
-    logging.info(f"Mapeamento registrado: V1={v1_id} ↔ V2={v2_id}")
+    _indice_mapeamento.registrar(pares)
+    logging.info(f"Mapeamentos registrados em lote: {len(pares)}")
 
 
 def buscar_v2_por_v1(v1_alert_id: str) -> Optional[str]:
@@ -93,11 +295,7 @@ def buscar_v2_por_v1(v1_alert_id: str) -> Optional[str]:
     Returns:
         ID do alerta V2 ou None se não encontrado
     """
-    mapping = _load_mapping()
-    registro = mapping["v1_to_v2"].get(v1_alert_id)
-    if registro:
-        return registro.get("v2_id")
-    return None
+    return _indice_mapeamento.v2_por_v1(v1_alert_id)
 
 
 def buscar_v1_por_v2(v2_alert_id: str) -> Optional[str]:
@@ -110,16 +308,17 @@ def buscar_v1_por_v2(v2_alert_id: str) -> Optional[str]:
     Returns:
         ID do alerta V1 ou None se não encontrado
     """
-    mapping = _load_mapping()
-    registro = mapping["v2_to_v1"].get(v2_alert_id)
-    if registro:
-        return registro.get("v1_id")
-    return None
+    return _indice_mapeamento.v1_por_v2(v2_alert_id)
+
+
+def obter_ids_v1_mapeados() -> set:
+    """IDs V1 que já possuem alerta V2 correspondente (uma única leitura do arquivo)"""
+    return set(_indice_mapeamento.dados()["v1_to_v2"])
 
 
 def obter_estatisticas_mapeamento() -> Dict[str, Any]:
     """Retorna estatísticas do mapeamento"""
-    mapping = _load_mapping()
+    mapping = _indice_mapeamento.dados()
     return {
         "total_mapeamentos": len(mapping["v1_to_v2"]),
         "primeiro_mapeamento": min(
@@ -137,6 +336,16 @@ def obter_estatisticas_mapeamento() -> Dict[str, Any]:
 # MAPEAMENTO DE CAMPOS V1 → V2
 # ========================================
 
+def metadados_mapeamento(alerta_v1: Dict[str, Any]) -> Dict[str, Any]:
+    """Metadados gravados com o vínculo V1 ↔ V2 (contrato_id define o balde da reconciliação)"""
+    return {
+        "tipo": alerta_v1.get('tipo'),
+        "categoria": alerta_v1.get('categoria'),
+        "contrato": alerta_v1.get('contrato_numero'),
+        "contrato_id": alerta_v1.get('contrato_id', '')
+    }
+
+
 def mapear_v1_para_v2(alerta_v1: Dict[str, Any]) -> Dict[str, Any]:
     """
     Mapeia campos do alerta V1 para estrutura V2 completa
@@ -213,9 +422,10 @@ def criar_alerta_dual(v1_alert_data: Dict[str, Any]) -> Tuple[bool, Optional[str
         v1_id = v1_alert_data.get('id')
         
         # Verificar se já existe mapeamento
-        if v1_id and buscar_v2_por_v1(v1_id):
+        v2_existente = buscar_v2_por_v1(v1_id) if v1_id else None
+        if v2_existente:
             logging.warning(f"DualWrite: Alerta V1={v1_id} já possui V2 mapeado. Ignorando.")
-            return (True, v1_id, buscar_v2_por_v1(v1_id))
+            return (True, v1_id, v2_existente)
         
         # Mapear campos
         v2_params = mapear_v1_para_v2(v1_alert_data)
@@ -229,48 +439,123 @@ def criar_alerta_dual(v1_alert_data: Dict[str, Any]) -> Tuple[bool, Optional[str
             registrar_mapeamento(
                 v1_id, 
                 v2_id,
-                metadados={
-                    "tipo": v1_alert_data.get('tipo'),
-                    "categoria": v1_alert_data.get('categoria'),
-                    "contrato": v1_alert_data.get('contrato_numero')
-                }
+                metadados=metadados_mapeamento(v1_alert_data)
             )
         
         logging.info(f"✓ DualWrite criar_alerta: V1={v1_id} → V2={v2_id}")
+        _auditar(OPERACAO_CRIAR_ALERTA, True, v1_id=v1_id, v2_id=v2_id)
         return (True, v1_id, v2_id)
         
     except Exception as e:
         logging.error(f"✗ DualWrite criar_alerta FALHOU: {e}", exc_info=True)
+        _auditar(OPERACAO_CRIAR_ALERTA, False, v1_id=v1_alert_data.get('id'), erro=str(e))
         return (False, v1_alert_data.get('id'), None)
 
 
-def sincronizar_resolucao(v1_alert_id: str, justificativa: str, usuario: str) -> bool:
+def _criar_alertas_v2_pendentes(alertas_v1: List[Dict[str, Any]]) -> Dict[str, int]:
     """
-    Sincroniza resolução de alerta V1 → V2
+    Cria os alertas V2 ainda sem correspondente (exceções são propagadas)
+    
+    Returns:
+        Dict com 'criados' e 'existentes'
+    """
+    # Importação local para evitar dependência circular
+    from services.alert_lifecycle_service import criar_alertas_v2_lote
+    
+    resultado = {"criados": 0, "existentes": 0}
+    mapeados = _indice_mapeamento.dados()["v1_to_v2"]
+    
+    pendentes = {}
+    for alerta in alertas_v1:
+        v1_id = alerta.get('id')
+        if not v1_id:
+            continue
+        if v1_id in mapeados:
+            resultado["existentes"] += 1
+        else:
+            pendentes.setdefault(v1_id, alerta)
+    
+    if not pendentes:
+        return resultado
+    
+    alertas_pendentes = list(pendentes.values())
+    criados = criar_alertas_v2_lote([mapear_v1_para_v2(a) for a in alertas_pendentes])
+    
+    registrar_mapeamentos_lote([
+        (
+            alerta['id'],
+            alerta_v2['id'],
+            metadados_mapeamento(alerta)
+        )
+        for alerta, alerta_v2 in zip(alertas_pendentes, criados)
+    ])
+    
+    resultado["criados"] = len(criados)
+    return resultado
+
+
+def sincronizar_alertas_lote(alertas_v1: List[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    Sincroniza V1 → V2 todos os alertas calculados em uma única etapa
+    
+    Substitui as chamadas a criar_alerta_dual() feitas alerta a alerta
+    durante o cálculo: o mapeamento é lido uma vez, os IDs V1 ainda sem
+    correspondente são identificados por diferença de conjuntos e todos os
+    alertas V2 que faltam são criados com uma única gravação de cada arquivo.
+    
+    Execução síncrona; as páginas usam enfileirar_alertas_lote() (outbox).
     
     Args:
-        v1_alert_id: ID do alerta V1
-        justificativa: Justificativa da resolução
-        usuario: Usuário que resolveu
+        alertas_v1: Alertas calculados por calcular_alertas()
         
     Returns:
-        True se sincronizado com sucesso
+        Dict com 'criados', 'existentes' e 'falhas'
     """
+    resultado = {"criados": 0, "existentes": 0, "falhas": 0}
     try:
-        from services.alert_lifecycle_service import (
-            transicionar_estado, 
-            registrar_acao,
-            ESTADO_RESOLVIDO,
-            ACAO_VERIFICACAO_REALIZADA
-        )
-        
-        # Buscar V2 correspondente
-        v2_id = buscar_v2_por_v1(v1_alert_id)
-        if not v2_id:
-            logging.warning(f"DualWrite: V1={v1_alert_id} sem V2 mapeado. Criando...")
-            # Tentar criar V2 retroativamente seria complexo aqui
-            return False
+        resultado.update(_criar_alertas_v2_pendentes(alertas_v1))
+        if resultado["criados"]:
+            logging.info(f"✓ DualWrite lote: {resultado['criados']} alertas V2 criados, {resultado['existentes']} já mapeados")
+            _auditar("lote", True, criados=resultado['criados'], existentes=resultado['existentes'])
         
+    except Exception as e:
+        logging.error(f"✗ DualWrite lote FALHOU: {e}", exc_info=True)
+        _auditar("lote", False, alertas=len(alertas_v1), erro=str(e))
+        resultado["falhas"] = len(alertas_v1) - resultado["existentes"]
+    
+    return resultado
+
+
+def _executar_resolucao(v1_alert_id: str, justificativa: str, usuario: str) -> str:
+    """
+    Resolve no V2 o alerta correspondente ao V1 (transição + ação na mesma
+    unidade de trabalho; idempotente se o V2 já está resolvido)
+    
+    Returns:
+        ID do alerta V2
+    
+    Raises:
+        LookupError: V1 ainda sem V2 mapeado
+    """
+    from services.alert_lifecycle_service import (
+        get_alerta_v2_por_id,
+        transicionar_estado, 
+        registrar_acao,
+        unidade_de_trabalho,
+        ESTADO_RESOLVIDO,
+        ACAO_VERIFICACAO_REALIZADA
+    )
+    
+    # Buscar V2 correspondente
+    v2_id = buscar_v2_por_v1(v1_alert_id)
+    if not v2_id:
+        raise LookupError(f"V1={v1_alert_id} sem V2 mapeado")
+    
+    alerta_v2 = get_alerta_v2_por_id(v2_id)
+    if alerta_v2 and alerta_v2.get('estado') == ESTADO_RESOLVIDO:
+        return v2_id
+    
+    with unidade_de_trabalho():
         # Transicionar para RESOLVIDO
         transicionar_estado(
             alerta_id=v2_id,
@@ -285,17 +570,82 @@ def sincronizar_resolucao(v1_alert_id: str, justificativa: str, usuario: str) ->
             tipo_acao=ACAO_VERIFICACAO_REALIZADA,
             usuario=usuario,
             justificativa=justificativa,
-            metadados={"origem": "dual_write_v1"}
+            metadados_acao={"origem": "dual_write_v1"}
         )
+    
+    return v2_id
+
+
+def sincronizar_resolucao(v1_alert_id: str, justificativa: str, usuario: str) -> bool:
+    """
+    Sincroniza resolução de alerta V1 → V2
+    
+    Args:
+        v1_alert_id: ID do alerta V1
+        justificativa: Justificativa da resolução
+        usuario: Usuário que resolveu
         
+    Returns:
+        True se sincronizado com sucesso
+    """
+    try:
+        v2_id = _executar_resolucao(v1_alert_id, justificativa, usuario)
         logging.info(f"✓ DualWrite sincronizar_resolucao: V1={v1_alert_id} → V2={v2_id}")
+        _auditar(OPERACAO_RESOLUCAO, True, v1_id=v1_alert_id, v2_id=v2_id)
         return True
         
+    except LookupError:
+        logging.warning(f"DualWrite: V1={v1_alert_id} sem V2 mapeado. Criando...")
+        # Tentar criar V2 retroativamente seria complexo aqui
+        return False
+        
     except Exception as e:
         logging.error(f"✗ DualWrite sincronizar_resolucao FALHOU: V1={v1_alert_id}, erro={e}", exc_info=True)
+        _auditar(OPERACAO_RESOLUCAO, False, v1_id=v1_alert_id, erro=str(e))
         return False
 
 
+def _executar_acao(v1_action_data: Dict[str, Any]) -> str:
+    """
+    Registra no V2 a ação V1 (idempotente pelo ID da ação V1)
+    
+    Returns:
+        ID do alerta V2
+    
+    Raises:
+        LookupError: V1 ainda sem V2 mapeado
+    """
+    from services.alert_lifecycle_service import get_acoes_por_alerta, registrar_acao
+    
+    v1_alert_id = v1_action_data.get('alerta_id')
+    v2_id = buscar_v2_por_v1(v1_alert_id)
+    
+    if not v2_id:
+        raise LookupError(f"V1={v1_alert_id} sem V2 mapeado")
+    
+    v1_action_id = v1_action_data.get('id')
+    if v1_action_id and any(
+        a.get('metadados', {}).get('v1_action_id') == v1_action_id
+        for a in get_acoes_por_alerta(v2_id)
+    ):
+        return v2_id
+    
+    # Registrar ação no V2
+    registrar_acao(
+        alerta_id=v2_id,
+        tipo_acao=v1_action_data.get('tipo', 'acao_generica'),
+        usuario=v1_action_data.get('usuario', 'sistema'),
+        justificativa=v1_action_data.get('justificativa', ''),
+        metadados_acao={
+            "origem": "dual_write_v1",
+            "v1_action_id": v1_action_id,
+            **v1_action_data.get('metadados', {})
+        }
+    )
+    
+    return v2_id
+
+
 def sincronizar_acao_dual(v1_action_data: Dict[str, Any]) -> bool:
     """
     Sincroniza ação administrativa V1 → V2
@@ -306,112 +656,422 @@ def sincronizar_acao_dual(v1_action_data: Dict[str, Any]) -> bool:
     Returns:
         True se sincronizado com sucesso
     """
+    v1_alert_id = v1_action_data.get('alerta_id')
     try:
-        from services.alert_lifecycle_service import registrar_acao
-        
-        v1_alert_id = v1_action_data.get('alerta_id')
-        v2_id = buscar_v2_por_v1(v1_alert_id)
-        
-        if not v2_id:
-            logging.warning(f"DualWrite sincronizar_acao: V1={v1_alert_id} sem V2 mapeado")
-            return False
-        
-        # Registrar ação no V2
-        registrar_acao(
-            alerta_id=v2_id,
-            tipo_acao=v1_action_data.get('tipo', 'acao_generica'),
-            usuario=v1_action_data.get('usuario', 'sistema'),
-            justificativa=v1_action_data.get('justificativa', ''),
-            metadados={
-                "origem": "dual_write_v1",
-                "v1_action_id": v1_action_data.get('id'),
-                **v1_action_data.get('metadados', {})
-            }
-        )
-        
+        v2_id = _executar_acao(v1_action_data)
         logging.info(f"✓ DualWrite sincronizar_acao: V1={v1_alert_id} → V2={v2_id}")
+        _auditar(OPERACAO_ACAO, True, v1_id=v1_alert_id, v2_id=v2_id)
         return True
         
+    except LookupError:
+        logging.warning(f"DualWrite sincronizar_acao: V1={v1_alert_id} sem V2 mapeado")
+        return False
+        
     except Exception as e:
         logging.error(f"✗ DualWrite sincronizar_acao FALHOU: {e}", exc_info=True)
+        _auditar(OPERACAO_ACAO, False, v1_id=v1_alert_id, erro=str(e))
         return False
 
 
+# ========================================
+# OUTBOX (SINCRONIZAÇÃO ASSÍNCRONA)
+# ========================================
+
+_worker_outbox = None
+_worker_outbox_lock = threading.Lock()
+
+# Serializa a execução de lotes (worker e drenagem síncrona no mesmo processo)
+_processamento_lock = threading.Lock()
+
+
+def _chave_idempotencia(operacao: str, identificador: str) -> str:
+    return f"{operacao}:{identificador}"
+
+
+def _acordar_worker():
+    if _worker_outbox is not None:
+        _worker_outbox.acordar()
+
+
+def enfileirar_alertas_lote(alertas_v1: List[Dict[str, Any]]) -> int:
+    """
+    Enfileira a criação V2 dos alertas V1 ainda sem correspondente
+    
+    Substitui sincronizar_alertas_lote() no caminho das páginas: a
+    requisição só grava as intenções na outbox; o worker cria os alertas V2.
+    
+    Returns:
+        Quantidade de intenções novas
+    """
+    mapeados = _indice_mapeamento.dados()["v1_to_v2"]
+    intencoes = [
+        (_chave_idempotencia(OPERACAO_CRIAR_ALERTA, alerta['id']), OPERACAO_CRIAR_ALERTA, alerta)
+        for alerta in alertas_v1
+        if alerta.get('id') and alerta['id'] not in mapeados
+    ]
+    if not intencoes:
+        return 0
+    
+    novas = get_dual_write_outbox().enfileirar(intencoes)
+    if novas:
+        logging.info(f"DualWrite outbox: {novas} criações enfileiradas")
+        _acordar_worker()
+    return novas
+
+
+def enfileirar_criacao_alerta(v1_alert_data: Dict[str, Any]) -> bool:
+    """Enfileira a criação V2 de um alerta V1 (False se já enfileirada/mapeada)"""
+    return enfileirar_alertas_lote([v1_alert_data]) > 0
+
+
+def enfileirar_resolucao(v1_alert_id: str, justificativa: str, usuario: str) -> bool:
+    """Enfileira a resolução V2 de um alerta V1 (False se já enfileirada)"""
+    novas = get_dual_write_outbox().enfileirar([(
+        _chave_idempotencia(OPERACAO_RESOLUCAO, v1_alert_id),
+        OPERACAO_RESOLUCAO,
+        {"v1_alert_id": v1_alert_id, "justificativa": justificativa, "usuario": usuario}
+    )])
+    _acordar_worker()
+    return novas > 0
+
+
+def enfileirar_acao(v1_action_data: Dict[str, Any]) -> bool:
+    """Enfileira o registro V2 de uma ação V1 (False se já enfileirada)"""
+    identificador = v1_action_data.get('id') or hashlib.sha1(
+        json.dumps(v1_action_data, sort_keys=True, default=str).encode('utf-8')
+    ).hexdigest()
+    novas = get_dual_write_outbox().enfileirar([
+        (_chave_idempotencia(OPERACAO_ACAO, identificador), OPERACAO_ACAO, v1_action_data)
+    ])
+    _acordar_worker()
+    return novas > 0
+
+
+def processar_lote_outbox(lote: List[Dict]) -> Dict[int, Optional[str]]:
+    """
+    Executa um lote de intenções da outbox
+    
+    Criações do lote viram uma única criação em lote (uma transação V2 e
+    uma gravação do mapeamento); resoluções e ações são executadas uma a
+    uma, na ordem de chegada, depois das criações.
+    
+    Returns:
+        id da intenção -> erro (None = sucesso)
+    """
+    with _processamento_lock:
+        return _processar_lote(lote)
+
+
+def _processar_lote(lote: List[Dict]) -> Dict[int, Optional[str]]:
+    resultados: Dict[int, Optional[str]] = {}
+    
+    criacoes = [item for item in lote if item['operacao'] == OPERACAO_CRIAR_ALERTA]
+    if criacoes:
+        try:
+            criados = _criar_alertas_v2_pendentes([item['payload'] for item in criacoes])
+            for item in criacoes:
+                resultados[item['id']] = None
+            logging.info(f"✓ DualWrite outbox criar_alerta: {criados['criados']} alertas V2 criados")
+            _auditar(OPERACAO_CRIAR_ALERTA, True, origem="outbox", intencoes=len(criacoes), criados=criados['criados'])
+        except Exception as e:
+            logging.error(f"✗ DualWrite outbox criar_alerta FALHOU: {e}", exc_info=True)
+            _auditar(OPERACAO_CRIAR_ALERTA, False, origem="outbox", intencoes=len(criacoes), erro=str(e))
+            for item in criacoes:
+                resultados[item['id']] = str(e)
+    
+    for item in lote:
+        if item['operacao'] == OPERACAO_CRIAR_ALERTA:
+            continue
+        try:
+            payload = item['payload']
+            if item['operacao'] == OPERACAO_RESOLUCAO:
+                v2_id = _executar_resolucao(payload['v1_alert_id'], payload['justificativa'], payload['usuario'])
+            elif item['operacao'] == OPERACAO_ACAO:
+                v2_id = _executar_acao(payload)
+            else:
+                raise ValueError(f"Operação desconhecida: {item['operacao']}")
+            resultados[item['id']] = None
+            logging.info(f"✓ DualWrite outbox {item['operacao']}: {item['chave']} → V2={v2_id}")
+            _auditar(item['operacao'], True, origem="outbox", chave=item['chave'], v2_id=v2_id)
+        except Exception as e:
+            logging.error(f"✗ DualWrite outbox {item['operacao']} FALHOU: {item['chave']}, erro={e}")
+            _auditar(item['operacao'], False, origem="outbox", chave=item['chave'], erro=str(e))
+            resultados[item['id']] = str(e)
+    
+    return resultados
+
+
+def get_outbox_worker() -> OutboxWorker:
+    """Retorna o worker singleton da outbox (sem iniciá-lo)"""
+    global _worker_outbox
+    if _worker_outbox is None:
+        with _worker_outbox_lock:
+            if _worker_outbox is None:
+                _worker_outbox = OutboxWorker(get_dual_write_outbox(), processar_lote_outbox)
+    return _worker_outbox
+
+
+def iniciar_worker_outbox():
+    """Inicia (uma vez por processo) a drenagem da outbox em segundo plano"""
+    get_outbox_worker().iniciar()
+
+
+def sincronizar_alertas_em_segundo_plano(alertas_v1: List[Dict[str, Any]]) -> int:
+    """
+    Sincronização V2 assíncrona usada pelas páginas
+    
+    Garante o worker da outbox em execução e só enfileira as criações dos
+    alertas V1 ainda sem correspondente; nada é gravado no V2 na requisição.
+    
+    Returns:
+        Quantidade de intenções novas
+    """
+    iniciar_worker_outbox()
+    return enfileirar_alertas_lote(alertas_v1)
+
+
+def drenar_outbox() -> Dict[str, int]:
+    """Drena a outbox de forma síncrona (scripts e testes)"""
+    return OutboxWorker(get_dual_write_outbox(), processar_lote_outbox).drenar()
+
+
+def obter_metricas_outbox() -> Dict[str, Any]:
+    """Profundidade da fila, falhas definitivas, atraso e estado do worker"""
+    metricas = get_dual_write_outbox().metricas()
+    metricas["worker_ativo"] = _worker_outbox is not None and _worker_outbox.ativo
+    return metricas
+
+
 # ========================================
 # AUDITORIA E RELATÓRIOS
 # ========================================
 
-def obter_auditoria(limite: int = 100) -> List[str]:
+def obter_auditoria(limite: int = 100) -> List[Dict[str, Any]]:
     """
-    Obtém últimas N linhas do log de auditoria
+    Obtém os últimos N registros da auditoria (lidos a partir do fim do arquivo)
     
     Args:
-        limite: Número de linhas a retornar
+        limite: Número de registros a retornar
         
     Returns:
-        Lista de linhas do log
+        Registros (data, operacao, sucesso, detalhes), do mais antigo ao mais recente
     """
-    if not LOG_PATH.exists():
-        return []
-    
-    with open(LOG_PATH, 'r', encoding='utf-8') as f:
-        linhas = f.readlines()
-    
-    return linhas[-limite:]
+    return get_auditoria_dual_write().ultimos(limite)
 
 
 def obter_estatisticas_dual_write() -> Dict[str, Any]:
     """Retorna estatísticas gerais do dual write"""
     stats_mapping = obter_estatisticas_mapeamento()
     
-    # Contar sucessos/falhas no log
-    sucessos = 0
-    falhas = 0
-    
-    if LOG_PATH.exists():
-        with open(LOG_PATH, 'r', encoding='utf-8') as f:
-            for linha in f:
-                if '✓ DualWrite' in linha:
-                    sucessos += 1
-                elif '✗ DualWrite' in linha:
-                    falhas += 1
+    # Contadores incrementais da auditoria (só o trecho novo do arquivo é lido)
+    contadores = get_auditoria_dual_write().contadores()
+    sucessos = contadores["sucessos"]
+    falhas = contadores["falhas"]
     
     return {
         **stats_mapping,
+        "outbox": obter_metricas_outbox(),
         "operacoes_sucesso": sucessos,
         "operacoes_falha": falhas,
+        "operacoes_por_tipo": contadores["por_operacao"],
         "taxa_sucesso": f"{sucessos / (sucessos + falhas) * 100:.1f}%" if (sucessos + falhas) > 0 else "N/A"
     }
 
 
-def validar_integridade() -> Dict[str, Any]:
+# ========================================
+# RECONCILIAÇÃO V1 ↔ V2
+# ========================================
+
+_reconciliacao_lock = threading.Lock()
+
+
+def _carregar_reconciliacao() -> Dict[str, List[int]]:
+    """Checksums (V1 e V2) de cada contrato na última verificação consistente"""
+    try:
+        with open(RECONCILIACAO_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _salvar_reconciliacao(estado: Dict[str, List[int]]):
+    RECONCILIACAO_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(RECONCILIACAO_FILE, 'w', encoding='utf-8') as f:
+        json.dump(estado, f, indent=2, ensure_ascii=False)
+
+
+def _completar_contratos_mapeamento(store) -> int:
+    """
+    Vínculos gravados antes do contrato_id nos metadados: busca o contrato
+    do alerta V2 uma única vez (V2 inexistente vai para o balde '')
     """
-    Valida integridade da sincronização V1 ↔ V2
+    pendentes = _indice_mapeamento.sem_contrato()
+    if not pendentes:
+        return 0
+    contratos = store.contratos_dos_alertas(pendentes.values())
+    _indice_mapeamento.definir_contratos({
+        v1_id: contratos.get(v2_id, '') for v1_id, v2_id in pendentes.items()
+    })
+    return len(pendentes)
+
+
+def reconciliar_integridade(reparar: bool = False, alertas_v1: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """
+    Reconcilia mapeamento e alertas V2 por contrato, sem varredura completa
+    
+    Cada lado mantém por contrato_id a quantidade e a soma dos hashes dos
+    pares (ID V1, ID V2): o mapeamento em memória e o store V2 nos
+    contadores materializados. Contratos cujos checksums não mudaram desde
+    a última verificação consistente são ignorados; dos que mudaram, só os
+    divergentes são comparados ID a ID.
     
+    Args:
+        reparar: Remove do mapeamento os vínculos órfãos e registra os
+            alertas V2 vinculados a um ID V1 ainda não mapeado
+        alertas_v1: Alertas V1 calculados; com reparar, os órfãos
+            presentes na lista são recriados pelo caminho em lote
+        
     Returns:
-        Relatório de validação
+        Dict com 'contratos', 'contratos_verificados', 'divergencias'
+        (contrato_id, orfaos_no_mapeamento e v2_sem_mapeamento com os IDs
+        V1/V2), totais 'orfaos_no_mapeamento'/'v2_sem_mapeamento',
+        'vinculos_mapeamento', 'vinculos_v2', 'integridade_ok' e 'reparo'
     """
-    from services.alert_lifecycle_service import listar_alertas_v2
+    from services.alert_lifecycle_store import get_alert_lifecycle_store
     
-    mapping = _load_mapping()
-    alertas_v2 = listar_alertas_v2()
+    store = get_alert_lifecycle_store()
+    with _reconciliacao_lock:
+        _completar_contratos_mapeamento(store)
+        lado_v1 = _indice_mapeamento.checksums()
+        lado_v2 = store.checksums_vinculos()
+        estado = _carregar_reconciliacao()
+        
+        def _checksum(lado: Dict[str, Dict], contrato: str) -> List[int]:
+            valores = lado.get(contrato)
+            return [valores['quantidade'], int(valores['soma'])] if valores else [0, 0]
+        
+        alterados, divergentes = [], []
+        for contrato in sorted(set(lado_v1) | set(lado_v2) | set(estado)):
+            assinatura = _checksum(lado_v1, contrato) + _checksum(lado_v2, contrato)
+            if estado.get(contrato) == assinatura:
+                continue
+            alterados.append(contrato)
+            if assinatura[:2] == assinatura[2:]:
+                if assinatura[0]:
+                    estado[contrato] = assinatura
+                else:
+                    estado.pop(contrato, None)
+            else:
+                # Divergente: conferido de novo a cada execução até ser corrigido
+                divergentes.append(contrato)
+                estado.pop(contrato, None)
+        
+        mapeados = _indice_mapeamento.vinculos(divergentes)
+        existentes = store.vinculos_v1(divergentes)
+        divergencias = []
+        for contrato in divergentes:
+            orfaos = [
+                {"v1_id": v1_id, "v2_id": v2_id}
+                for v1_id, v2_id in sorted(mapeados[contrato].items())
+                if existentes[contrato].get(v2_id) != v1_id
+            ]
+            sem_mapeamento = [
+                {"v2_id": v2_id, "v1_id": v1_id}
+                for v2_id, v1_id in sorted(existentes[contrato].items())
+                if mapeados[contrato].get(v1_id) != v2_id
+            ]
+            divergencias.append({
+                "contrato_id": contrato,
+                "orfaos_no_mapeamento": orfaos,
+                "v2_sem_mapeamento": sem_mapeamento
+            })
+        
+        if alterados:
+            _salvar_reconciliacao(estado)
+        
+        resultado = {
+            "contratos": len(set(lado_v1) | set(lado_v2)),
+            "contratos_verificados": len(alterados),
+            "divergencias": divergencias,
+            "orfaos_no_mapeamento": sum(len(d["orfaos_no_mapeamento"]) for d in divergencias),
+            "v2_sem_mapeamento": sum(len(d["v2_sem_mapeamento"]) for d in divergencias),
+            "vinculos_mapeamento": sum(v["quantidade"] for v in lado_v1.values()),
+            "vinculos_v2": sum(v["quantidade"] for v in lado_v2.values()),
+            "reparo": None
+        }
+        resultado["integridade_ok"] = not divergencias
+        
+        if reparar and divergencias:
+            resultado["reparo"] = _reparar_divergencias(divergencias, alertas_v1 or [])
     
-    # Verificar órfãos
-    v2_ids_mapeados = set(mapping["v2_to_v1"].keys())
-    v2_ids_existentes = {a['id'] for a in alertas_v2}
+    if divergencias:
+        logging.warning(
+            f"Reconciliação V1 ↔ V2: {len(divergencias)} contratos divergentes "
+            f"({resultado['orfaos_no_mapeamento']} órfãos, {resultado['v2_sem_mapeamento']} V2 sem mapeamento)"
+        )
+    return resultado
+
+
+def _reparar_divergencias(divergencias: List[Dict], alertas_v1: List[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    Corrige o mapeamento a partir das divergências (órfãos removidos;
+    V2 vinculados a IDs V1 sem mapeamento registrados) e recria pelo
+    caminho em lote os alertas V1 órfãos presentes em alertas_v1
+    """
+    from services.alert_lifecycle_store import get_alert_lifecycle_store
     
-    orfaos_mapeamento = v2_ids_mapeados - v2_ids_existentes
-    v2_sem_mapeamento = [
-        a['id'] for a in alertas_v2 
-        if a.get('metadados', {}).get('origem') == 'dual_write_v1' 
-        and a['id'] not in v2_ids_mapeados
-    ]
+    orfaos = [o["v1_id"] for d in divergencias for o in d["orfaos_no_mapeamento"]]
+    removidos = _indice_mapeamento.remover(orfaos)
+    
+    # V1 já mapeado para outro V2 (duplicata) continua divergente: exige análise manual
+    mapeados = _indice_mapeamento.dados()["v1_to_v2"]
+    sem_mapeamento = {
+        s["v2_id"]: (s["v1_id"], d["contrato_id"])
+        for d in divergencias for s in d["v2_sem_mapeamento"]
+        if s["v1_id"] not in mapeados
+    }
+    pares = []
+    for v2_id, (v1_id, contrato) in sem_mapeamento.items():
+        alerta = get_alert_lifecycle_store().obter_alerta(v2_id) or {}
+        pares.append((v1_id, v2_id, {
+            "contrato": alerta.get('contrato_numero'),
+            "contrato_id": contrato
+        }))
+    # Um único V2 por V1 (o primeiro encontrado)
+    pares = list({v1_id: (v1_id, v2_id, meta) for v1_id, v2_id, meta in reversed(pares)}.values())
+    if pares:
+        registrar_mapeamentos_lote(pares)
+    
+    orfaos_v1 = set(orfaos)
+    recriados = _criar_alertas_v2_pendentes([a for a in alertas_v1 if a.get('id') in orfaos_v1])
+    
+    reparo = {
+        "mapeamentos_removidos": removidos,
+        "mapeamentos_registrados": len(pares),
+        "alertas_recriados": recriados["criados"]
+    }
+    logging.info(f"✓ DualWrite reconciliação: {reparo}")
+    _auditar("reconciliacao", True, **reparo)
+    return reparo
+
+
+def validar_integridade() -> Dict[str, Any]:
+    """
+    Valida integridade da sincronização V1 ↔ V2 (via reconciliar_integridade:
+    só os contratos com checksum alterado são conferidos)
+    
+    Returns:
+        Relatório de validação
+    """
+    from services.alert_lifecycle_store import get_alert_lifecycle_store
+    
+    resultado = reconciliar_integridade()
     
     return {
-        "total_mapeamentos": len(mapping["v1_to_v2"]),
-        "alertas_v2_total": len(alertas_v2),
-        "alertas_v2_dual_write": len([a for a in alertas_v2 if a.get('metadados', {}).get('origem') == 'dual_write_v1']),
-        "orfaos_no_mapeamento": len(orfaos_mapeamento),
-        "v2_sem_mapeamento": len(v2_sem_mapeamento),
-        "integridade_ok": len(orfaos_mapeamento) == 0 and len(v2_sem_mapeamento) == 0
+        "total_mapeamentos": len(_indice_mapeamento.dados()["v1_to_v2"]),
+        "alertas_v2_total": get_alert_lifecycle_store().total_alertas(),
+        "alertas_v2_dual_write": resultado["vinculos_v2"],
+        "orfaos_no_mapeamento": resultado["orfaos_no_mapeamento"],
+        "v2_sem_mapeamento": resultado["v2_sem_mapeamento"],
+        "integridade_ok": resultado["integridade_ok"]
     }
@@ -14,6 +14,8 @@ from datetime import datetime
 from typing import List, Dict, Optional
 import os
 
+from services.vigencia_index import para_datetime
+
 
 class EmailService:
     """Serviço de envio de emails SMTP"""
@@ -300,16 +302,16 @@ CONTRATOS A VENCER:
 
 """
         
-        # Ordena por data de vencimento
+        # Ordena por data de vencimento; sem data ficam no fim
         contratos_ordenados = sorted(
-            contratos_vencendo,
-            key=lambda x: x.get('data_fim', datetime.now())
+            ((para_datetime(c.get('data_fim')), c) for c in contratos_vencendo),
+            key=lambda par: (par[0] is None, par[0] or datetime.min)
         )
         
-        for c in contratos_ordenados:
-            data_fim = c.get('data_fim')
-            if isinstance(data_fim, datetime):
-                dias_restantes = (data_fim - datetime.now()).days
+        agora = datetime.now()
+        for data_fim, c in contratos_ordenados:
+            if data_fim is not None:
+                dias_restantes = (data_fim - agora).days
                 data_formatada = data_fim.strftime('%d/%m/%Y')
             else:
                 dias_restantes = 0
@@ -7,9 +7,14 @@ baseados nos registros de execution_financial_service.
 GOVERNANÇA: Sistema aponta, gestor decide, histórico registra.
 """
 
-from datetime import datetime, timedelta
-from typing import List, Dict, Optional
-from services.execution_financial_service import listar_por_contrato
+from datetime import datetime
+from typing import List, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from services.execution_financial_service import listar_por_contrato, filtrar
+from services.rule_engine import Limiar, MotorRegras, Regra, Tabela
 
 # ========================================
 # PARÂMETROS CONFIGURÁVEIS
@@ -22,11 +27,103 @@ DIAS_ALERTA_STATUS_PARADO = 15  # Dias sem mudança de status
 STATUS_FINAIS = ["Pago", "Cancelado", "Glosado"]
 
 
+MICROSSEGUNDOS_POR_DIA = 86_400_000_000
+
+CATEGORIA_FF = 'Execução Físico-Financeira'
+
+
+# ========================================
+# REGRAS DE ALERTA (DECLARATIVAS)
+# ========================================
+
+REGRAS_FF = [
+    Regra(
+        codigo='ATESTE_PENDENTE',
+        tipo='critico',
+        categoria=CATEGORIA_FF,
+        condicoes=(
+            ('ateste_pendente', '==', True),
+            ('tem_emissao', '==', True),
+            ('dias_pendente', '>', Limiar('dias_ateste_pendente')),
+        ),
+        id_modelo='FF_ATESTE_PEND_{contrato_id}_{nf_numero}',
+        titulo='Ateste pendente: NF {nf_numero}',
+        descricao="Nota Fiscal {nf_numero} (competência {competencia}) aguarda ateste há {dias_pendente} dias.",
+        acao_sugerida='ateste_nf',
+        metadados={'nf_numero': 'nf_numero', 'competencia': 'competencia', 'dias_pendente': 'dias_pendente'},
+    ),
+    Regra(
+        codigo='PAGAMENTO_ATRASADO',
+        tipo='atencao',
+        categoria=CATEGORIA_FF,
+        condicoes=(
+            ('atestado', '==', True),
+            ('tem_ateste', '==', True),
+            ('dias_apos_ateste', '>', Limiar('dias_pagamento_atrasado')),
+        ),
+        id_modelo='FF_PGTO_ATRAS_{contrato_id}_{nf_numero}',
+        titulo='Pagamento atrasado: NF {nf_numero}',
+        descricao="Nota Fiscal {nf_numero} foi atestada há {dias_apos_ateste} dias, mas pagamento não foi registrado.",
+        acao_sugerida='verificar_pagamento',
+        metadados={
+            'nf_numero': 'nf_numero', 'competencia': 'competencia',
+            'dias_apos_ateste': 'dias_apos_ateste', 'data_ateste': 'data_ateste'
+        },
+    ),
+    Regra(
+        codigo='STATUS_PARADO',
+        tipo='atencao',
+        categoria=CATEGORIA_FF,
+        condicoes=(
+            ('status_final', '==', False),
+            ('tem_criacao', '==', True),
+            ('dias_sem_evolucao', '>', Limiar('dias_status_parado')),
+        ),
+        id_modelo='FF_STATUS_PARADO_{contrato_id}_{nf_numero}',
+        titulo='Status sem evolução: NF {nf_numero}',
+        descricao="Nota Fiscal {nf_numero} está com status '{status_fluxo}' há {dias_sem_evolucao} dias sem evolução.",
+        acao_sugerida='verificar_status',
+        metadados={
+            'nf_numero': 'nf_numero', 'competencia': 'competencia',
+            'status_atual': 'status_fluxo', 'dias_sem_evolucao': 'dias_sem_evolucao'
+        },
+    ),
+    Regra(
+        codigo='ISS_INCONSISTENTE',
+        tipo='info',
+        categoria=CATEGORIA_FF,
+        condicoes=(
+            ('iss_incide', '==', True),
+            ('iss_retido', '==', 0),
+        ),
+        id_modelo='FF_ISS_INCONS_{contrato_id}_{nf_numero}',
+        titulo='ISS inconsistente: NF {nf_numero}',
+        descricao="Nota Fiscal {nf_numero} tem incidência de ISS, mas valor retido é zero. Verificar se é correto.",
+        acao_sugerida='verificar_iss',
+        metadados={
+            'nf_numero': 'nf_numero', 'competencia': 'competencia',
+            'incidencia_iss': 'incidencia_iss', 'iss_retido': 'iss_retido'
+        },
+    ),
+]
+
+# Compiladas uma única vez na importação
+motor_ff = MotorRegras(
+    'execucao_ff',
+    REGRAS_FF,
+    {
+        'dias_ateste_pendente': DIAS_ALERTA_ATESTE_PENDENTE,
+        'dias_pagamento_atrasado': DIAS_ALERTA_PAGAMENTO_ATRASADO,
+        'dias_status_parado': DIAS_ALERTA_STATUS_PARADO,
+    }
+)
+
+
 def compute_ff_alerts_for_contract(contrato_id: str) -> List[Dict]:
     """
     Calcula alertas de execução físico-financeira para um contrato.
     
-    Regras implementadas:
+    Regras implementadas (declaradas em REGRAS_FF):
     1. FF_CRITICO: Ateste pendente há mais de X dias
     2. FF_ATENCAO: Pagamento atrasado após ateste
     3. FF_ATENCAO: Status parado (sem evolução)
@@ -39,137 +136,99 @@ def compute_ff_alerts_for_contract(contrato_id: str) -> List[Dict]:
         Lista de alertas com estrutura compatível com alert_service
     """
     registros = listar_por_contrato(contrato_id)
-    alertas = []
-    hoje = datetime.now()
+    return [alerta for _, alerta in _avaliar_registros(registros)]
+
+
+def compute_ff_alerts(contrato_ids: Optional[Iterable[str]] = None) -> Dict[str, List[Dict]]:
+    """
+    Calcula alertas FF de vários contratos com uma única leitura dos
+    registros e uma única avaliação vetorizada das regras.
     
-    for registro in registros:
-        # Converte datas string para datetime
-        nf_data_emissao = _parse_date(registro.get('nf_data_emissao'))
-        data_ateste = _parse_date(registro.get('data_ateste'))
-        created_at = _parse_datetime(registro.get('created_at'))
-        
-        nf_numero = registro.get('nf_numero', 'N/A')
-        competencia = registro.get('competencia', 'N/A')
-        status_fluxo = registro.get('status_fluxo', 'Desconhecido')
-        
-        # REGRA 1: Ateste pendente há mais de X dias
-        if _is_ateste_pendente(status_fluxo):
-            if nf_data_emissao:
-                dias_pendente = (hoje - nf_data_emissao).days
-                if dias_pendente > DIAS_ALERTA_ATESTE_PENDENTE:
-                    alertas.append({
-                        'id': f"FF_ATESTE_PEND_{contrato_id}_{nf_numero}",
-                        'tipo': 'critico',
-                        'categoria': 'Execução Físico-Financeira',
-                        'titulo': f'Ateste pendente: NF {nf_numero}',
-                        'descricao': f"Nota Fiscal {nf_numero} (competência {competencia}) aguarda ateste há {dias_pendente} dias.",
-                        'contrato_id': contrato_id,
-                        'contrato_numero': contrato_id,  # Será atualizado no upsert
-                        'data_alerta': hoje,
-                        'acao_sugerida': 'ateste_nf',
-                        'metadados_ff': {
-                            'nf_numero': nf_numero,
-                            'competencia': competencia,
-                            'dias_pendente': dias_pendente,
-                            'regra': 'ATESTE_PENDENTE'
-                        }
-                    })
-        
-        # REGRA 2: Pagamento atrasado após ateste
-        if _is_status_atestado(status_fluxo) and data_ateste:
-            dias_apos_ateste = (hoje - data_ateste).days
-            if dias_apos_ateste > DIAS_ALERTA_PAGAMENTO_ATRASADO:
-                alertas.append({
-                    'id': f"FF_PGTO_ATRAS_{contrato_id}_{nf_numero}",
-                    'tipo': 'atencao',
-                    'categoria': 'Execução Físico-Financeira',
-                    'titulo': f'Pagamento atrasado: NF {nf_numero}',
-                    'descricao': f"Nota Fiscal {nf_numero} foi atestada há {dias_apos_ateste} dias, mas pagamento não foi registrado.",
-                    'contrato_id': contrato_id,
-                    'contrato_numero': contrato_id,
-                    'data_alerta': hoje,
-                    'acao_sugerida': 'verificar_pagamento',
-                    'metadados_ff': {
-                        'nf_numero': nf_numero,
-                        'competencia': competencia,
-                        'dias_apos_ateste': dias_apos_ateste,
-                        'data_ateste': str(data_ateste),
-                        'regra': 'PAGAMENTO_ATRASADO'
-                    }
-                })
-        
-        # REGRA 3: Status parado (sem evolução)
-        if not _is_status_final(status_fluxo) and created_at:
-            dias_sem_evolucao = (hoje - created_at).days
-            if dias_sem_evolucao > DIAS_ALERTA_STATUS_PARADO:
-                alertas.append({
-                    'id': f"FF_STATUS_PARADO_{contrato_id}_{nf_numero}",
-                    'tipo': 'atencao',
-                    'categoria': 'Execução Físico-Financeira',
-                    'titulo': f'Status sem evolução: NF {nf_numero}',
-                    'descricao': f"Nota Fiscal {nf_numero} está com status '{status_fluxo}' há {dias_sem_evolucao} dias sem evolução.",
-                    'contrato_id': contrato_id,
-                    'contrato_numero': contrato_id,
-                    'data_alerta': hoje,
-                    'acao_sugerida': 'verificar_status',
-                    'metadados_ff': {
-                        'nf_numero': nf_numero,
-                        'competencia': competencia,
-                        'status_atual': status_fluxo,
-                        'dias_sem_evolucao': dias_sem_evolucao,
-                        'regra': 'STATUS_PARADO'
-                    }
-                })
-        
-        # REGRA 4: ISS retido inconsistente (informativo)
-        incidencia_iss = registro.get('incidencia_iss', False)
-        iss_retido = registro.get('iss_retido', 0.0)
+    Args:
+        contrato_ids: Contratos a considerar (None = todos)
         
-        if incidencia_iss and iss_retido == 0:
-            alertas.append({
-                'id': f"FF_ISS_INCONS_{contrato_id}_{nf_numero}",
-                'tipo': 'info',
-                'categoria': 'Execução Físico-Financeira',
-                'titulo': f'ISS inconsistente: NF {nf_numero}',
-                'descricao': f"Nota Fiscal {nf_numero} tem incidência de ISS, mas valor retido é zero. Verificar se é correto.",
-                'contrato_id': contrato_id,
-                'contrato_numero': contrato_id,
-                'data_alerta': hoje,
-                'acao_sugerida': 'verificar_iss',
-                'metadados_ff': {
-                    'nf_numero': nf_numero,
-                    'competencia': competencia,
-                    'incidencia_iss': incidencia_iss,
-                    'iss_retido': iss_retido,
-                    'regra': 'ISS_INCONSISTENTE'
-                }
-            })
+    Returns:
+        Dicionário contrato_id -> alertas (apenas contratos com alertas)
+    """
+    registros = filtrar(None, None, None)
+    if contrato_ids is not None:
+        ids = set(contrato_ids)
+        registros = [r for r in registros if r.get('contrato_id') in ids]
     
-    return alertas
+    por_contrato: Dict[str, List[Dict]] = {}
+    for _, alerta in _avaliar_registros(registros):
+        por_contrato.setdefault(alerta['contrato_id'], []).append(alerta)
+    return por_contrato
+
+
+def _avaliar_registros(registros: List[Dict]) -> List[Tuple[int, Dict]]:
+    """Avalia as regras FF sobre registros de execution_financial_service"""
+    if not registros:
+        return []
+    return motor_ff.avaliar(_tabela_registros(registros, datetime.now()))
 
 
 # ========================================
 # FUNÇÕES AUXILIARES
 # ========================================
 
-def _parse_date(date_str: Optional[str]) -> Optional[datetime]:
-    """Converte string YYYY-MM-DD para datetime."""
-    if not date_str:
-        return None
-    try:
-        return datetime.strptime(date_str, '%Y-%m-%d')
-    except Exception:
-        return None
-
-
-def _parse_datetime(datetime_str: Optional[str]) -> Optional[datetime]:
-    """Converte string YYYY-MM-DD HH:MM:SS para datetime."""
-    if not datetime_str:
-        return None
-    try:
-        return datetime.strptime(datetime_str, '%Y-%m-%d %H:%M:%S')
-    except Exception:
-        return None
+def _dias_desde(datas: pd.Series, hoje: datetime) -> Tuple[np.ndarray, np.ndarray]:
+    """(data válida?, dias completos desde a data) — semântica de timedelta.days"""
+    valores = datas.to_numpy(dtype='datetime64[us]')
+    validas = ~np.isnat(valores)
+    diferenca = (np.datetime64(hoje, 'us') - valores).astype(np.int64)
+    return validas, np.where(validas, diferenca // MICROSSEGUNDOS_POR_DIA, 0)
+
+
+def _flags_status(status: np.ndarray, predicado) -> np.ndarray:
+    """Aplica o predicado uma vez por status distinto e espalha o resultado"""
+    distintos, inversos = np.unique(status.astype(str), return_inverse=True)
+    return np.array([predicado(s) for s in distintos], dtype=bool)[inversos]
+
+
+def _tabela_registros(registros: List[Dict], hoje: datetime) -> Tabela:
+    """Monta a tabela colunar usada pelas regras FF"""
+    def coluna(nome, padrao=None):
+        return np.array([r.get(nome, padrao) for r in registros], dtype=object)
+    
+    def datas(nome, formato):
+        return pd.to_datetime(pd.Series(coluna(nome)), format=formato, errors='coerce')
+    
+    status = coluna('status_fluxo', 'Desconhecido')
+    ateste = datas('data_ateste', '%Y-%m-%d')
+    
+    tem_emissao, dias_pendente = _dias_desde(datas('nf_data_emissao', '%Y-%m-%d'), hoje)
+    tem_ateste, dias_apos_ateste = _dias_desde(ateste, hoje)
+    tem_criacao, dias_sem_evolucao = _dias_desde(datas('created_at', '%Y-%m-%d %H:%M:%S'), hoje)
+    
+    incidencia = coluna('incidencia_iss', False)
+    
+    return Tabela(
+        colunas={
+            'contrato_id': coluna('contrato_id'),
+            'nf_numero': coluna('nf_numero', 'N/A'),
+            'competencia': coluna('competencia', 'N/A'),
+            'status_fluxo': status,
+            'ateste_pendente': _flags_status(status, _is_ateste_pendente),
+            'atestado': _flags_status(status, _is_status_atestado),
+            'status_final': _flags_status(status, _is_status_final),
+            'tem_emissao': tem_emissao,
+            'dias_pendente': dias_pendente,
+            'tem_ateste': tem_ateste,
+            'dias_apos_ateste': dias_apos_ateste,
+            'data_ateste': np.array(
+                [str(d.to_pydatetime()) if valida else '' for d, valida in zip(ateste, tem_ateste)],
+                dtype=object
+            ),
+            'tem_criacao': tem_criacao,
+            'dias_sem_evolucao': dias_sem_evolucao,
+            'incidencia_iss': incidencia,
+            'iss_incide': np.array([bool(v) for v in incidencia], dtype=bool),
+            'iss_retido': coluna('iss_retido', 0.0),
+        },
+        campos_base={'contrato_id': 'contrato_id', 'contrato_numero': 'contrato_id'},
+        constantes={'data_alerta': hoje},
+    )
 
 
 def _is_ateste_pendente(status: str) -> bool:
@@ -0,0 +1,203 @@
+"""
+Tabela Colunar da Carteira de Contratos
+=======================================
+Snapshot em arrays NumPy da carteira servida pelo ContractRepository,
+usado pelos KPIs e gráficos do dashboard (Home).
+
+Motivação:
+- render_metrics e render_graficos_analytics percorriam a lista de dicts
+  várias vezes por rerun (contagens por status, somas, top fornecedores)
+- Com dezenas de milhares de contratos esses laços dominam o tempo da Home
+
+Estratégia:
+- Uma coluna por campo: valor (float64), data_inicio/data_fim
+  (datetime64[s], NaT quando ausente), pendências (bool)
+- status, tipo, fornecedor e comarca como códigos categóricos (int) +
+  lista de categorias, para agregações com np.bincount
+- Snapshot imutável, reconstruído apenas quando muda a versão do
+  repositório (mesmo gatilho dos demais caches derivados)
+"""
+
+from datetime import date, datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+import threading
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+# Valores usados quando o campo está ausente (mesmos padrões da Home)
+PADRAO_STATUS = "ativo"
+PADRAO_TIPO = "Outros"
+PADRAO_FORNECEDOR = "N/A"
+
+COLUNAS_CATEGORICAS = ("status", "tipo", "fornecedor", "comarca")
+
+
+def _para_datetime64(valor) -> np.datetime64:
+    """Converte datetime/date/str (ISO ou dd/mm/aaaa) em datetime64[s]"""
+    if isinstance(valor, datetime):
+        if valor.tzinfo is not None:
+            valor = valor.replace(tzinfo=None)
+        return np.datetime64(valor, "s")
+    if isinstance(valor, date):
+        return np.datetime64(datetime(valor.year, valor.month, valor.day), "s")
+    if isinstance(valor, str) and valor:
+        for conversor in (
+            datetime.fromisoformat,
+            lambda v: datetime.strptime(v, "%d/%m/%Y"),
+        ):
+            try:
+                return np.datetime64(conversor(valor), "s")
+            except ValueError:
+                continue
+    return np.datetime64("NaT", "s")
+
+
+def _coluna_datas(valores: Sequence) -> np.ndarray:
+    """Monta coluna datetime64[s]; datetimes sem fuso e None (NaT) vão direto ao NumPy"""
+    if all(v is None or (isinstance(v, datetime) and v.tzinfo is None) for v in valores):
+        return np.array(valores, dtype="datetime64[s]")
+    return np.array([_para_datetime64(v) for v in valores], dtype="datetime64[s]")
+
+
+def _codificar(valores: Sequence[str]) -> Tuple[np.ndarray, List[str]]:
+    """Codifica strings como (códigos, categorias ordenadas)"""
+    if not valores:
+        return np.zeros(0, dtype=np.int64), []
+    categorias, codigos = np.unique(np.asarray(valores, dtype=object), return_inverse=True)
+    return codigos.astype(np.int64), [str(c) for c in categorias]
+
+
+def _comarca_principal(contrato: Dict) -> str:
+    """Primeira comarca do contrato, ou a comarca detectada no objeto"""
+    for fiscal in contrato.get("fiscais_por_comarca") or []:
+        if fiscal.get("comarca"):
+            return fiscal["comarca"]
+    return contrato.get("comarca_detectada") or contrato.get("comarca") or ""
+
+
+class PortfolioTable:
+    """Snapshot colunar (somente leitura) da carteira de contratos"""
+
+    def __init__(self, contratos: List[Dict], versao: Optional[int] = None):
+        self.versao = versao
+        self.total = len(contratos)
+
+        self.ids = np.array([c.get("id", "") for c in contratos], dtype=object)
+        self.numeros = np.array([c.get("numero", "") for c in contratos], dtype=object)
+        self.valor = np.array(
+            [float(c.get("valor") or 0) for c in contratos], dtype=np.float64
+        )
+        self.data_inicio = _coluna_datas([c.get("data_inicio") for c in contratos])
+        self.data_fim = _coluna_datas([c.get("data_fim") for c in contratos])
+        self.pendencias = np.array([bool(c.get("pendencias")) for c in contratos], dtype=bool)
+
+        self._codigos: Dict[str, np.ndarray] = {}
+        self._categorias: Dict[str, List[str]] = {}
+        brutos = {
+            "status": [str(c.get("status") or PADRAO_STATUS) for c in contratos],
+            "tipo": [str(c.get("tipo") or PADRAO_TIPO) for c in contratos],
+            "fornecedor": [str(c.get("fornecedor") or PADRAO_FORNECEDOR) for c in contratos],
+            "comarca": [str(_comarca_principal(c)) for c in contratos],
+        }
+        for coluna, valores in brutos.items():
+            self._codigos[coluna], self._categorias[coluna] = _codificar(valores)
+
+    # ========================================
+    # COLUNAS CATEGÓRICAS
+    # ========================================
+
+    def codigos(self, coluna: str) -> np.ndarray:
+        """Códigos inteiros da coluna categórica (índices em categorias())"""
+        if coluna not in COLUNAS_CATEGORICAS:
+            raise ValueError(f"Coluna categórica desconhecida: {coluna}")
+        return self._codigos[coluna]
+
+    def categorias(self, coluna: str) -> List[str]:
+        """Categorias distintas da coluna, em ordem alfabética"""
+        if coluna not in COLUNAS_CATEGORICAS:
+            raise ValueError(f"Coluna categórica desconhecida: {coluna}")
+        return list(self._categorias[coluna])
+
+    # ========================================
+    # AGREGAÇÕES
+    # ========================================
+
+    def valor_total(self) -> float:
+        """Soma de valor de todos os contratos"""
+        return float(self.valor.sum())
+
+    def contagem_por(self, coluna: str) -> Dict[str, int]:
+        """Quantidade de contratos por categoria (np.bincount)"""
+        categorias = self.categorias(coluna)
+        contagens = np.bincount(self._codigos[coluna], minlength=len(categorias))
+        return {cat: int(n) for cat, n in zip(categorias, contagens)}
+
+    def soma_valor_por(self, coluna: str) -> Dict[str, float]:
+        """Soma de valor por categoria (np.bincount com pesos)"""
+        categorias = self.categorias(coluna)
+        somas = np.bincount(
+            self._codigos[coluna], weights=self.valor, minlength=len(categorias)
+        )
+        return {cat: float(v) for cat, v in zip(categorias, somas)}
+
+    def top_por_valor(self, coluna: str, n: int = 10) -> List[Dict]:
+        """
+        Categorias com maior valor somado.
+
+        Returns:
+            Lista de dicts {'categoria', 'valor', 'contratos'}, em ordem
+            decrescente de valor
+        """
+        categorias = self.categorias(coluna)
+        if not categorias:
+            return []
+        codigos = self._codigos[coluna]
+        somas = np.bincount(codigos, weights=self.valor, minlength=len(categorias))
+        contagens = np.bincount(codigos, minlength=len(categorias))
+
+        n = min(n, len(categorias))
+        # argpartition seleciona o top-n em O(k); só ele é ordenado
+        candidatos = np.argpartition(-somas, n - 1)[:n]
+        ordem = candidatos[np.argsort(-somas[candidatos], kind="stable")]
+        return [
+            {
+                "categoria": categorias[i],
+                "valor": float(somas[i]),
+                "contratos": int(contagens[i]),
+            }
+            for i in ordem
+        ]
+
+
+# ========================================
+# SNAPSHOT DA CARTEIRA
+# ========================================
+
+_portfolio_table = None
+_portfolio_lock = threading.Lock()
+
+def get_portfolio_table() -> PortfolioTable:
+    """
+    Retorna o snapshot colunar da carteira atual.
+
+    Reconstruído apenas quando a versão do ContractRepository muda.
+    """
+    global _portfolio_table
+    # Importação local para evitar dependência circular
+    from services.contract_repository import get_contract_repository
+
+    repositorio = get_contract_repository()
+    versao = repositorio.versao
+    tabela = _portfolio_table
+    if tabela is not None and tabela.versao == versao:
+        return tabela
+
+    with _portfolio_lock:
+        if _portfolio_table is None or _portfolio_table.versao != versao:
+            _portfolio_table = PortfolioTable(repositorio.listar(), versao)
+            logger.info(f"Tabela colunar da carteira reconstruída: {_portfolio_table.total} contratos")
+        return _portfolio_table
@@ -0,0 +1,243 @@
+"""
+Motor de Regras de Alerta
+=========================
+Regras de alerta declaradas como dados e avaliadas de forma vetorizada
+sobre tabelas colunares (NumPy).
+
+Motivação:
+- As regras de contrato (alert_service) e de execução FF (ff_alert_rules)
+  eram cadeias de if dentro de laços Python: cada regra nova era mais uma
+  passada por registro e não havia como saber qual regra pesava mais
+
+Estratégia:
+- Regra = dados: condições (coluna, operador, valor ou Limiar), severidade,
+  categoria e modelos de id/título/descrição (str.format)
+- Compilação única: limiares resolvidos, operadores e colunas usadas pelos
+  modelos identificados; cada condição vira uma comparação NumPy sobre a
+  coluna inteira
+- Laço Python só na montagem dos alertas efetivamente disparados
+- Estatísticas por regra: avaliações, linhas, disparos e tempo acumulado
+"""
+
+from dataclasses import dataclass, field
+from string import Formatter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import operator
+import threading
+import time
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+OPERADORES = {
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le,
+    '==': operator.eq,
+    '!=': operator.ne,
+}
+
+
+@dataclass(frozen=True)
+class Limiar:
+    """Referência a um limiar configurável do motor (resolvido na compilação)"""
+    nome: str
+
+
+@dataclass(frozen=True)
+class Regra:
+    """Declaração de uma regra de alerta"""
+    codigo: str
+    tipo: str
+    categoria: str
+    condicoes: Tuple[Tuple[str, str, Any], ...]
+    id_modelo: str
+    titulo: str
+    descricao: str
+    acao_sugerida: Optional[str] = None
+    # Campo do alerta -> coluna da tabela
+    campos: Dict[str, str] = field(default_factory=dict)
+    # Campo de metadados_ff -> coluna da tabela ('regra' é acrescentado)
+    metadados: Dict[str, str] = field(default_factory=dict)
+    # Campos com valor constante
+    fixos: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class Tabela:
+    """Tabela colunar sobre a qual as regras são avaliadas"""
+    colunas: Dict[str, np.ndarray]
+    # Campos comuns a todos os alertas da tabela -> coluna
+    campos_base: Dict[str, str] = field(default_factory=dict)
+    # Valores comuns a todos os alertas (ex.: data_alerta)
+    constantes: Dict[str, Any] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        for coluna in self.colunas.values():
+            return len(coluna)
+        return 0
+
+
+def _campos_modelo(modelo: str) -> List[str]:
+    """Colunas referenciadas em um modelo str.format"""
+    return [nome for _, nome, _, _ in Formatter().parse(modelo) if nome]
+
+
+class RegraCompilada:
+    """Regra com limiares resolvidos e colunas pré-calculadas"""
+
+    def __init__(self, regra: Regra, limiares: Dict[str, Any]):
+        self.regra = regra
+        self.condicoes = []
+        for coluna, op, valor in regra.condicoes:
+            if op not in OPERADORES:
+                raise ValueError(f"Operador desconhecido na regra {regra.codigo}: {op}")
+            if isinstance(valor, Limiar):
+                if valor.nome not in limiares:
+                    raise ValueError(f"Limiar não configurado na regra {regra.codigo}: {valor.nome}")
+                valor = limiares[valor.nome]
+            self.condicoes.append((coluna, OPERADORES[op], valor))
+
+        colunas = set()
+        for modelo in (regra.id_modelo, regra.titulo, regra.descricao):
+            colunas.update(_campos_modelo(modelo))
+        colunas.update(regra.campos.values())
+        colunas.update(regra.metadados.values())
+        self.colunas_montagem = sorted(colunas)
+
+    def posicoes(self, tabela: Tabela) -> np.ndarray:
+        """Linhas que satisfazem todas as condições (E lógico vetorizado)"""
+        mascara = np.ones(len(tabela), dtype=bool)
+        for coluna, funcao, valor in self.condicoes:
+            mascara &= np.asarray(funcao(tabela.colunas[coluna], valor), dtype=bool)
+            if not mascara.any():
+                break
+        return np.flatnonzero(mascara)
+
+    def montar(self, tabela: Tabela, posicoes: np.ndarray) -> List[Dict]:
+        """Monta os dicts de alerta das linhas disparadas"""
+        regra = self.regra
+        nomes = sorted(set(self.colunas_montagem) | set(tabela.campos_base.values()))
+        valores = [tabela.colunas[nome][posicoes].tolist() for nome in nomes]
+
+        alertas = []
+        for linha in zip(*valores):
+            contexto = dict(zip(nomes, linha))
+            alerta = {'id': regra.id_modelo.format(**contexto)}
+            alerta.update(regra.fixos)
+            alerta['tipo'] = regra.tipo
+            alerta['categoria'] = regra.categoria
+            alerta['titulo'] = regra.titulo.format(**contexto)
+            alerta['descricao'] = regra.descricao.format(**contexto)
+            for campo, coluna in tabela.campos_base.items():
+                alerta[campo] = contexto[coluna]
+            for campo, coluna in regra.campos.items():
+                alerta[campo] = contexto[coluna]
+            alerta.update(tabela.constantes)
+            if regra.acao_sugerida:
+                alerta['acao_sugerida'] = regra.acao_sugerida
+            if regra.metadados:
+                metadados = {campo: contexto[coluna] for campo, coluna in regra.metadados.items()}
+                metadados['regra'] = regra.codigo
+                alerta['metadados_ff'] = metadados
+            alertas.append(alerta)
+        return alertas
+
+
+class MotorRegras:
+    """Conjunto de regras compiladas, com estatísticas por regra"""
+
+    def __init__(self, nome: str, regras: Sequence[Regra], limiares: Optional[Dict[str, Any]] = None):
+        self.nome = nome
+        self.regras = list(regras)
+        self.limiares = dict(limiares or {})
+        self._lock = threading.Lock()
+        self._compilar()
+        self.zerar_estatisticas()
+        _motores[nome] = self
+
+    def _compilar(self):
+        """Compila as regras com os limiares atuais"""
+        self._compiladas = [RegraCompilada(regra, self.limiares) for regra in self.regras]
+
+    def configurar_limiares(self, **limiares):
+        """Altera limiares e recompila as regras"""
+        self.limiares.update(limiares)
+        self._compilar()
+
+    def limiar(self, nome: str) -> Any:
+        """Valor atual de um limiar"""
+        return self.limiares[nome]
+
+    # ========================================
+    # AVALIAÇÃO
+    # ========================================
+
+    def avaliar(self, tabela: Tabela) -> List[Tuple[int, Dict]]:
+        """
+        Avalia todas as regras sobre a tabela.
+
+        Returns:
+            Pares (linha, alerta) na ordem linha a linha, e dentro de cada
+            linha na ordem de declaração das regras
+        """
+        linhas = []
+        alertas = []
+        for compilada in self._compiladas:
+            inicio = time.perf_counter()
+            posicoes = compilada.posicoes(tabela)
+            disparados = compilada.montar(tabela, posicoes) if len(posicoes) else []
+            decorrido = time.perf_counter() - inicio
+
+            linhas.append(posicoes)
+            alertas.extend(disparados)
+            self._registrar(compilada.regra.codigo, len(tabela), len(disparados), decorrido)
+
+        if not alertas:
+            return []
+        # Alertas já estão agrupados por regra: ordenação estável por linha
+        linhas = np.concatenate(linhas)
+        ordem = np.argsort(linhas, kind='stable')
+        return [(linha, alertas[i]) for linha, i in zip(linhas[ordem].tolist(), ordem.tolist())]
+
+    # ========================================
+    # ESTATÍSTICAS
+    # ========================================
+
+    def _registrar(self, codigo: str, linhas: int, disparos: int, segundos: float):
+        with self._lock:
+            estatistica = self._estatisticas[codigo]
+            estatistica['avaliacoes'] += 1
+            estatistica['linhas'] += linhas
+            estatistica['disparos'] += disparos
+            estatistica['tempo_s'] += segundos
+
+    def zerar_estatisticas(self):
+        """Reinicia os contadores por regra"""
+        with self._lock:
+            self._estatisticas = {
+                regra.codigo: {'avaliacoes': 0, 'linhas': 0, 'disparos': 0, 'tempo_s': 0.0}
+                for regra in self.regras
+            }
+
+    def estatisticas(self) -> List[Dict]:
+        """Contadores por regra, da mais lenta para a mais rápida"""
+        with self._lock:
+            linhas = [
+                {'motor': self.nome, 'regra': codigo, **valores}
+                for codigo, valores in self._estatisticas.items()
+            ]
+        return sorted(linhas, key=lambda e: e['tempo_s'], reverse=True)
+
+
+# Motores registrados (um por conjunto de regras)
+_motores: Dict[str, MotorRegras] = {}
+
+def estatisticas_regras() -> List[Dict]:
+    """Estatísticas de todos os motores registrados, da regra mais lenta à mais rápida"""
+    linhas = [e for motor in list(_motores.values()) for e in motor.estatisticas()]
+    return sorted(linhas, key=lambda e: e['tempo_s'], reverse=True)
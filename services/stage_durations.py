@@ -0,0 +1,182 @@
+"""
+Modelo de Durações por Etapa do Ciclo de Vida
+=============================================
+Tempo de permanência aprendido do histórico de estados dos alertas V2,
+usado pelo motor de risco de ruptura no lugar das constantes TEMPO_MEDIO_*.
+
+Motivação:
+- calcular_risco_ruptura somava tempos fixos por etapa (análise 5d,
+  prorrogação 45d, aprovação 15d, formalização 10d), enquanto o
+  historico_estados de cada alerta registra quanto tempo ele realmente
+  ficou em cada estado
+
+Estratégia:
+- Histograma de faixas geométricas (razão RAZAO_FAIXAS a partir de
+  MENOR_DURACAO_DIAS) por (categoria, tipo, estado, responsável), mantido
+  pelo AlertLifecycleStore a cada transição: a permanência no estado
+  anterior entra na faixa correspondente (quantidade e soma); nada é
+  recalculado a partir do histórico completo
+- Linhas agregadas (TODOS = '*') para os níveis mais gerais: o modelo
+  consulta a chave completa, depois (categoria, tipo, estado) e por fim
+  só o estado, usando o primeiro nível com MIN_AMOSTRAS
+- Média exata (soma/quantidade) e quantis interpolados dentro da faixa
+  (erro relativo limitado pela razão entre faixas)
+- Os mesmos histogramas servem de esboço de quantis para os tempos de
+  resolução (eficiência por gestor/categoria): memória fixa por chave e
+  mescláveis somando as faixas (mesclar_histogramas)
+"""
+
+from typing import Dict, Iterable, Optional, Tuple
+import math
+
+# Faixas: [0, MENOR_DURACAO_DIAS) e depois [MENOR * R^(k-1), MENOR * R^k)
+MENOR_DURACAO_DIAS = 1 / 24
+RAZAO_FAIXAS = 1.1
+
+# Valor das colunas de chave nas linhas agregadas
+TODOS = '*'
+
+# Amostras mínimas para usar um nível do modelo (abaixo disso, nível mais geral)
+MIN_AMOSTRAS = 30
+
+# Medida usada como tempo de etapa (as constantes TEMPO_MEDIO_* são P75)
+MEDIDA_ETAPA = 'p75'
+
+# Chave: (categoria, tipo, estado, responsavel)
+Chave = Tuple[str, str, str, str]
+
+
+def faixa_duracao(dias: Optional[float]) -> Optional[int]:
+    """Índice da faixa de uma duração em dias (registrada como função SQL no store)"""
+    if dias is None:
+        return None
+    if dias < MENOR_DURACAO_DIAS:
+        return 0
+    return 1 + int(math.log(dias / MENOR_DURACAO_DIAS) / math.log(RAZAO_FAIXAS))
+
+
+def limites_faixa(faixa: int) -> Tuple[float, float]:
+    """Intervalo [inferior, superior) de dias coberto por uma faixa"""
+    if faixa <= 0:
+        return (0.0, MENOR_DURACAO_DIAS)
+    return (MENOR_DURACAO_DIAS * RAZAO_FAIXAS ** (faixa - 1), MENOR_DURACAO_DIAS * RAZAO_FAIXAS ** faixa)
+
+
+def quantil_histograma(contagens: Dict[int, int], q: float) -> Optional[float]:
+    """
+    Quantil q (0 a 1) de um histograma {faixa: quantidade}, interpolado
+    linearmente dentro da faixa que contém a posição procurada.
+    """
+    total = sum(contagens.values())
+    if total <= 0:
+        return None
+    alvo = q * total
+    acumulado = 0
+    for faixa in sorted(contagens):
+        quantidade = contagens[faixa]
+        if quantidade <= 0:
+            continue
+        if acumulado + quantidade >= alvo:
+            inferior, superior = limites_faixa(faixa)
+            return inferior + (superior - inferior) * (alvo - acumulado) / quantidade
+        acumulado += quantidade
+    return limites_faixa(max(contagens))[1]
+
+
+def mesclar_histogramas(*histogramas: Dict[int, Tuple[int, float]]) -> Dict[int, Tuple[int, float]]:
+    """Soma faixa a faixa histogramas {faixa: (quantidade, soma)} (ex.: de várias RAJs)"""
+    mesclado: Dict[int, Tuple[int, float]] = {}
+    for histograma in histogramas:
+        for faixa, (quantidade, soma) in histograma.items():
+            atual = mesclado.get(faixa, (0, 0.0))
+            mesclado[faixa] = (atual[0] + quantidade, atual[1] + soma)
+    return mesclado
+
+
+def resumir_histograma(histograma: Dict[int, Tuple[int, float]]) -> Optional[Dict]:
+    """quantidade, media, p50, p75 e p90 (dias) de um histograma, ou None sem amostras"""
+    contagens = {faixa: quantidade for faixa, (quantidade, _) in histograma.items()}
+    quantidade = sum(contagens.values())
+    if quantidade <= 0:
+        return None
+    return {
+        'quantidade': quantidade,
+        'media': sum(soma for _, soma in histograma.values()) / quantidade,
+        'p50': quantil_histograma(contagens, 0.50),
+        'p75': quantil_histograma(contagens, 0.75),
+        'p90': quantil_histograma(contagens, 0.90),
+    }
+
+
+def chaves_agregadas(categoria: str, tipo: str, estado: str, responsavel: str) -> Tuple[Chave, ...]:
+    """Chaves atualizadas por uma permanência, da mais específica à mais geral"""
+    return (
+        (categoria, tipo, estado, responsavel),
+        (categoria, tipo, estado, TODOS),
+        (TODOS, TODOS, estado, TODOS),
+    )
+
+
+class ModeloDuracoes:
+    """
+    Estatísticas de permanência por chave, com consulta em O(1) e
+    recuo para os níveis agregados.
+
+    Construído a partir dos histogramas do store:
+    {chave: {faixa: (quantidade, soma_dias)}}.
+    """
+
+    def __init__(self, histogramas: Dict[Chave, Dict[int, Tuple[int, float]]]):
+        self._histogramas = histogramas
+        self._resumos: Dict[Chave, Dict] = {}
+
+    def resumo(self, chave: Chave) -> Optional[Dict]:
+        """quantidade, media, p50, p75 e p90 (dias) de uma chave, ou None sem amostras"""
+        if chave not in self._resumos:
+            self._resumos[chave] = resumir_histograma(self._histogramas.get(chave) or {})
+        return self._resumos[chave]
+
+    def permanencia(
+        self,
+        estado: str,
+        categoria: Optional[str] = None,
+        tipo: Optional[str] = None,
+        responsavel: Optional[str] = None,
+        medida: str = MEDIDA_ETAPA
+    ) -> Optional[float]:
+        """
+        Medida ('media', 'p50', 'p75' ou 'p90') da permanência no estado, do
+        nível mais específico com MIN_AMOSTRAS; None se nenhum nível tem
+        amostras suficientes.
+        """
+        for chave in chaves_agregadas(categoria or '', tipo or '', estado, responsavel or ''):
+            resumo = self.resumo(chave)
+            if resumo is not None and resumo['quantidade'] >= MIN_AMOSTRAS:
+                return resumo[medida]
+        return None
+
+    def tempo_etapa(
+        self,
+        estados: Iterable[str],
+        padrao: float,
+        categoria: Optional[str] = None,
+        tipo: Optional[str] = None,
+        responsavel: Optional[str] = None
+    ) -> float:
+        """
+        Soma das permanências aprendidas nos estados de uma etapa; se algum
+        deles não tem amostras suficientes (ou a etapa não tem estado
+        próprio no ciclo de vida), usa o valor padrão da etapa.
+        """
+        if not estados:
+            return padrao
+        total = 0.0
+        for estado in estados:
+            dias = self.permanencia(estado, categoria, tipo, responsavel)
+            if dias is None:
+                return padrao
+            total += dias
+        return total
+
+    def chaves(self) -> Iterable[Chave]:
+        return self._histogramas.keys()
@@ -9,7 +9,7 @@ Projeto: SAAB-Tech / Synapse.IA
 
 import json
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime
 
 
@@ -33,6 +33,9 @@ class TagService:
         self.tags_file = Path("data/tags.json")
         self.contract_tags_file = Path("data/contract_tags.json")
         
+        # Contador de escritas no mapeamento contrato -> tags (ver versao_vinculos)
+        self._versao_vinculos = 0
+        
         # Garante que o diretório data existe
         self.tags_file.parent.mkdir(exist_ok=True)
         
@@ -72,6 +75,25 @@ class TagService:
         """Salva mapeamento contrato -> tags"""
         with open(self.contract_tags_file, 'w', encoding='utf-8') as f:
             json.dump(contract_tags, f, ensure_ascii=False, indent=2)
+        self._versao_vinculos += 1
+    
+    def versao_vinculos(self) -> Tuple[int, int]:
+        """
+        Assinatura do mapeamento contrato -> tags.
+        
+        Muda a cada escrita feita por este processo (contador) ou por outro
+        processo (mtime do arquivo). Usada pelo índice de contratos para
+        descartar o índice invertido de tags.
+        """
+        try:
+            mtime = self.contract_tags_file.stat().st_mtime_ns
+        except OSError:
+            mtime = 0
+        return (self._versao_vinculos, mtime)
+    
+    def obter_mapa_tags(self) -> Dict[str, List[str]]:
+        """Retorna o mapeamento completo contrato -> IDs de tags"""
+        return self._carregar_contract_tags()
     
     def obter_todas_tags(self) -> List[Dict]:
         """Retorna todas as tags disponíveis"""
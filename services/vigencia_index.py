@@ -0,0 +1,191 @@
+"""
+Índice de Vigência de Contratos
+===============================
+Índice ordenado sobre a vigência (data_inicio, data_fim) dos contratos,
+para consultas por janela de vencimento e por data de referência.
+
+Motivação:
+- calcular_alertas, prever_rupturas e os gráficos de prazos calculavam (data_fim - hoje).days para todos os
+  contratos, a cada chamada, só para descobrir quem cai nas janelas de
+  60/120/180 dias
+
+Estratégia:
+- Lista de data_fim ordenada: "vencendo entre D1 e D2" é um par de
+  bisect, em O(log n + k)
+- Lista ordenada por data_inicio com árvore de segmentos de máximo de
+  data_fim: "vigentes em D" desce apenas nos ramos que podem conter
+  contratos ainda vigentes, em O(log n + k·log n) no pior caso
+- Índice da carteira completa usa a data_fim consolidada (aditivos de
+  prorrogação aplicados) e é refeito quando muda a versão do repositório
+- Para listas avulsas, o índice é montado sobre a própria lista com as
+  datas informadas
+"""
+
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def para_datetime(valor) -> Optional[datetime]:
+    """Normaliza data_inicio/data_fim (datetime, date ou ISO) em datetime sem fuso"""
+    if isinstance(valor, datetime):
+        return valor.replace(tzinfo=None) if valor.tzinfo else valor
+    if isinstance(valor, date):
+        return datetime(valor.year, valor.month, valor.day)
+    if isinstance(valor, str) and valor:
+        try:
+            return para_datetime(datetime.fromisoformat(valor))
+        except ValueError:
+            return None
+    return None
+
+
+class VigenciaIndex:
+    """Índice (somente leitura) de vigências sobre uma lista de contratos"""
+
+    def __init__(self, contratos: Iterable[Dict], consolidar: bool = False):
+        """
+        Args:
+            contratos: Contratos a indexar (sem data_fim válida ficam de fora)
+            consolidar: Usa a data_fim consolidada com aditivos de prorrogação
+        """
+        entradas = []
+        for contrato in contratos:
+            data_fim = para_datetime(self._data_fim(contrato, consolidar))
+            if data_fim is None:
+                continue
+            data_inicio = para_datetime(contrato.get('data_inicio')) or datetime.min
+            entradas.append((data_fim, data_inicio, contrato))
+
+        # Ordenação por data_fim: janelas de vencimento
+        entradas.sort(key=lambda e: e[0])
+        self._fins = [e[0] for e in entradas]
+        self._por_fim = [(e[0], e[2]) for e in entradas]
+
+        # Ordenação por data_inicio + árvore de máximo de data_fim: vigentes em D
+        entradas.sort(key=lambda e: e[1])
+        self._inicios = [e[1] for e in entradas]
+        self._por_inicio = [(e[0], e[2]) for e in entradas]
+        self._montar_arvore()
+
+    @staticmethod
+    def _data_fim(contrato: Dict, consolidar: bool):
+        """data_fim original ou consolidada com aditivos"""
+        if consolidar and contrato.get('aditivos'):
+            # Importação local para evitar dependência circular
+            from services.contract_service import consolidar_contrato_com_aditivos
+            return consolidar_contrato_com_aditivos(dict(contrato)).get('data_fim')
+        return contrato.get('data_fim')
+
+    def _montar_arvore(self):
+        """Árvore de segmentos (vetor) com o maior data_fim de cada faixa"""
+        tamanho = 1
+        while tamanho < len(self._por_inicio):
+            tamanho *= 2
+        self._tamanho = tamanho
+
+        arvore = [datetime.min] * (2 * tamanho)
+        for i, (data_fim, _) in enumerate(self._por_inicio):
+            arvore[tamanho + i] = data_fim
+        for no in range(tamanho - 1, 0, -1):
+            arvore[no] = max(arvore[2 * no], arvore[2 * no + 1])
+        self._arvore = arvore
+
+    def __len__(self) -> int:
+        return len(self._fins)
+
+    # ========================================
+    # CONSULTAS
+    # ========================================
+
+    def vencendo_entre(
+        self,
+        inicio: Optional[datetime] = None,
+        fim: Optional[datetime] = None,
+        incluir_fim: bool = False
+    ) -> List[Tuple[datetime, Dict]]:
+        """
+        Contratos com data_fim em [inicio, fim) — ou [inicio, fim] com incluir_fim.
+
+        Args:
+            inicio: Limite inferior (None = sem limite, inclui vencidos)
+            fim: Limite superior (None = sem limite)
+            incluir_fim: Inclui contratos que vencem exatamente em fim
+
+        Returns:
+            Pares (data_fim, contrato) ordenados por data_fim
+        """
+        esquerda = bisect_left(self._fins, inicio) if inicio is not None else 0
+        if fim is None:
+            direita = len(self._fins)
+        elif incluir_fim:
+            direita = bisect_right(self._fins, fim)
+        else:
+            direita = bisect_left(self._fins, fim)
+        return self._por_fim[esquerda:direita]
+
+    def vigentes_em(self, data: datetime) -> List[Tuple[datetime, Dict]]:
+        """
+        Contratos vigentes na data (data_inicio <= data <= data_fim).
+
+        Contratos sem data_inicio são considerados vigentes desde sempre.
+
+        Returns:
+            Pares (data_fim, contrato) ordenados por data_inicio
+        """
+        # Candidatos: prefixo com data_inicio <= data
+        limite = bisect_right(self._inicios, data)
+        if limite == 0:
+            return []
+
+        posicoes = []
+        pilha = [(1, 0, self._tamanho)]
+        while pilha:
+            no, lo, hi = pilha.pop()
+            # Poda: faixa fora do prefixo ou sem nenhum contrato ainda vigente
+            if lo >= limite or self._arvore[no] < data:
+                continue
+            if hi - lo == 1:
+                posicoes.append(lo)
+                continue
+            meio = (lo + hi) // 2
+            pilha.append((2 * no + 1, meio, hi))
+            pilha.append((2 * no, lo, meio))
+
+        posicoes.sort()
+        return [self._por_inicio[p] for p in posicoes]
+
+
+# ========================================
+# ÍNDICE DA CARTEIRA
+# ========================================
+
+_vigencia_index = None
+_vigencia_versao = None
+_vigencia_lock = threading.Lock()
+
+def get_vigencia_index() -> VigenciaIndex:
+    """
+    Retorna o índice de vigência da carteira completa (data_fim consolidada).
+
+    Refeito apenas quando muda a versão do ContractRepository.
+    """
+    global _vigencia_index, _vigencia_versao
+    # Importação local para evitar dependência circular
+    from services.contract_repository import get_contract_repository
+
+    repositorio = get_contract_repository()
+    versao = repositorio.versao
+    if _vigencia_index is not None and _vigencia_versao == versao:
+        return _vigencia_index
+
+    with _vigencia_lock:
+        if _vigencia_index is None or _vigencia_versao != versao:
+            _vigencia_index = VigenciaIndex(repositorio.listar(), consolidar=True)
+            _vigencia_versao = versao
+            logger.info(f"Índice de vigência reconstruído: {len(_vigencia_index)} contratos")
+        return _vigencia_index
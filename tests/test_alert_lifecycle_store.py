@@ -0,0 +1,475 @@
+"""
+Testes do Armazenamento SQLite de Alertas V2
+============================================
+"""
+
+import unittest
+import json
+import tempfile
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Adiciona o diretório raiz ao path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from services import alert_lifecycle_store
+from services.alert_lifecycle_store import AlertLifecycleStore
+from services import alert_lifecycle_service as svc
+
+
+class TestAlertLifecycleStore(unittest.TestCase):
+    """Testes para o armazenamento de alertas, histórico e ações em SQLite"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.base = Path(self.tmpdir.name)
+        self.store = AlertLifecycleStore(self.base / "alertas_ciclo_vida.db")
+
+        # Serviço usa o armazenamento temporário
+        self.store_original = alert_lifecycle_store._alert_lifecycle_store
+        alert_lifecycle_store._alert_lifecycle_store = self.store
+
+    def tearDown(self):
+        alert_lifecycle_store._alert_lifecycle_store = self.store_original
+        self.tmpdir.cleanup()
+
+    def _criar(self, contrato_id="CNT001", **extras):
+        parametros = dict(
+            tipo=svc.TIPO_PREVENTIVO,
+            categoria=svc.CATEGORIA_VIGENCIA,
+            titulo="Alerta de teste",
+            descricao="Descrição",
+            contrato_id=contrato_id,
+            contrato_numero="001/2026",
+            responsavel="gestor_a",
+            prazo_resposta_dias=30
+        )
+        parametros.update(extras)
+        return svc.criar_alerta_v2(**parametros)
+
+    def test_roundtrip_preserva_formato_legado(self):
+        """Testa que o alerta lido é igual ao criado"""
+        alerta = self._criar(metadados={"origem": "teste"})
+        self.assertEqual(svc.get_alerta_v2_por_id(alerta["id"]), alerta)
+        self.assertIsNone(svc.get_alerta_v2_por_id("inexistente"))
+
+    def test_filtros_sql(self):
+        """Testa filtros por contrato, estado, tipo e responsável"""
+        a = self._criar("CNT001")
+        b = self._criar("CNT002", tipo=svc.TIPO_CRITICO, criticidade=svc.CRITICIDADE_URGENTE)
+        self._criar("CNT002", responsavel="gestor_b")
+        svc.transicionar_estado(a["id"], svc.ESTADO_EM_ANALISE, "usuario")
+
+        self.assertEqual([x["id"] for x in svc.listar_alertas_v2(estado=svc.ESTADO_EM_ANALISE)], [a["id"]])
+        self.assertEqual(len(svc.listar_alertas_v2(contrato_id="CNT002")), 2)
+        self.assertEqual(
+            [x["id"] for x in svc.listar_alertas_v2(contrato_id="CNT002", tipo=svc.TIPO_CRITICO)],
+            [b["id"]]
+        )
+        self.assertEqual(len(svc.listar_alertas_v2(responsavel="gestor_b")), 1)
+        # Ordenação por criticidade preservada
+        self.assertEqual(svc.listar_alertas_v2()[0]["id"], b["id"])
+
+    def test_transicao_anexa_historico(self):
+        """Testa transição de estado com histórico em tabela própria"""
+        alerta = self._criar()
+        self.assertTrue(svc.transicionar_estado(alerta["id"], svc.ESTADO_RESOLVIDO, "usuario", "ok"))
+        self.assertFalse(svc.transicionar_estado("inexistente", svc.ESTADO_RESOLVIDO, "usuario"))
+
+        atualizado = svc.get_alerta_v2_por_id(alerta["id"])
+        self.assertEqual(atualizado["estado"], svc.ESTADO_RESOLVIDO)
+        self.assertEqual(atualizado["estado_anterior"], svc.ESTADO_NOVO)
+        self.assertEqual(
+            [h["estado"] for h in atualizado["historico_estados"]],
+            [svc.ESTADO_NOVO, svc.ESTADO_RESOLVIDO]
+        )
+        self.assertEqual(atualizado["historico_estados"][1]["observacao"], "ok")
+
+    def test_historico_sob_demanda(self):
+        """Testa que listagens trazem só o snapshot e o histórico é lido à parte"""
+        alerta = self._criar()
+        svc.transicionar_estado(alerta["id"], svc.ESTADO_EM_ANALISE, "usuario")
+
+        listado = svc.listar_alertas_v2()[0]
+        self.assertNotIn("historico_estados", listado)
+        self.assertEqual(listado["estado"], svc.ESTADO_EM_ANALISE)
+        self.assertEqual(
+            [h["estado"] for h in svc.get_historico_estados(alerta["id"])],
+            [svc.ESTADO_NOVO, svc.ESTADO_EM_ANALISE]
+        )
+
+    def test_replay_tempos_por_estado(self):
+        """Testa permanência por estado reproduzindo o log de transições"""
+        alerta = self._criar()
+        inicio = datetime.fromisoformat(alerta["data_criacao"])
+        eventos = [
+            (svc.ESTADO_EM_ANALISE, inicio + timedelta(days=2)),
+            (svc.ESTADO_PROVIDENCIA_EM_CURSO, inicio + timedelta(days=5)),
+            (svc.ESTADO_EM_ANALISE, inicio + timedelta(days=6)),
+        ]
+        for estado, data in eventos:
+            self.store.atualizar_alerta(
+                alerta["id"],
+                lambda dados, estado=estado, data=data: (
+                    dados.update(estado=estado) or {"estado": estado, "data": data.isoformat(), "usuario": "u"}
+                )
+            )
+
+        tempos = svc.calcular_tempos_por_estado(agora=inicio + timedelta(days=10))[alerta["id"]]
+        self.assertAlmostEqual(tempos[svc.ESTADO_NOVO], 2.0)
+        self.assertAlmostEqual(tempos[svc.ESTADO_EM_ANALISE], 7.0)
+        self.assertAlmostEqual(tempos[svc.ESTADO_PROVIDENCIA_EM_CURSO], 1.0)
+
+        # Consumo silencioso usa a permanência real no estado atual
+        from services.bi_alertas_service import calcular_consumo_silencioso
+        consumo = calcular_consumo_silencioso(svc.get_alerta_v2_por_id(alerta["id"]), tempos)
+        self.assertEqual(consumo["dias_no_estado"], 7)
+        self.assertEqual(consumo["consumo_silencioso"], 7 - 5)
+
+    def test_histogramas_de_permanencia(self):
+        """Testa histogramas de permanência mantidos a cada transição"""
+        from services.stage_durations import TODOS, ModeloDuracoes
+
+        inicio = datetime.now() - timedelta(days=30)
+        for i, dias_analise in enumerate((4, 6, 8)):
+            alerta = self._criar(f"CNT00{i}")
+            eventos = [
+                (svc.ESTADO_EM_ANALISE, inicio + timedelta(days=1)),
+                (svc.ESTADO_PROVIDENCIA_EM_CURSO, inicio + timedelta(days=1 + dias_analise)),
+            ]
+            self.store.atualizar_alerta(
+                alerta["id"], lambda dados: dados.update(data_criacao=inicio.isoformat())
+            )
+            self.store._conexao().execute(
+                "UPDATE historico_estados SET data = ? WHERE alerta_id = ?", (inicio.isoformat(), alerta["id"])
+            )
+            for estado, data in eventos:
+                self.store.atualizar_alerta(
+                    alerta["id"],
+                    lambda dados, estado=estado, data=data: (
+                        dados.update(estado=estado) or {"estado": estado, "data": data.isoformat(), "usuario": "u"}
+                    )
+                )
+
+        histogramas = self.store.histogramas_duracoes()
+        chave = (svc.CATEGORIA_VIGENCIA, svc.TIPO_PREVENTIVO, svc.ESTADO_EM_ANALISE, "gestor_a")
+        self.assertEqual(sum(q for q, _ in histogramas[chave].values()), 3)
+        self.assertAlmostEqual(sum(s for _, s in histogramas[chave].values()), 18.0)
+        self.assertIn((TODOS, TODOS, svc.ESTADO_NOVO, TODOS), histogramas)
+
+        modelo = ModeloDuracoes(histogramas)
+        self.assertAlmostEqual(modelo.resumo(chave)["media"], 6.0)
+        self.assertLess(abs(modelo.resumo(chave)["p50"] - 6.0) / 6.0, 0.1)
+        # Abaixo de MIN_AMOSTRAS o modelo não opina e a etapa usa o padrão
+        self.assertIsNone(modelo.permanencia(svc.ESTADO_EM_ANALISE, svc.CATEGORIA_VIGENCIA))
+        self.assertEqual(modelo.tempo_etapa((svc.ESTADO_EM_ANALISE,), 5), 5)
+
+        # A carga a partir do histórico reproduz o que o trigger acumulou
+        self.assertEqual(self.store.reconstruir_duracoes(), 6)
+        recarregados = self.store.histogramas_duracoes()
+        self.assertEqual(recarregados.keys(), histogramas.keys())
+        for k, faixas in histogramas.items():
+            self.assertEqual(recarregados[k].keys(), faixas.keys())
+            for faixa, (quantidade, soma) in faixas.items():
+                self.assertEqual(recarregados[k][faixa][0], quantidade)
+                self.assertAlmostEqual(recarregados[k][faixa][1], soma)
+
+    def test_esbocos_de_resolucao(self):
+        """Testa histogramas de tempo de resolução mantidos a cada resolução"""
+        a = self._criar("CNT001")
+        b = self._criar("CNT002", responsavel="gestor_b", categoria=svc.CATEGORIA_DOCUMENTACAO)
+        self._criar("CNT003")
+        svc.resolver_alertas_lote([a["id"], b["id"]], "gestor", "ok")
+        # Encerrar um alerta já resolvido não conta uma segunda resolução
+        svc.transicionar_estado(a["id"], svc.ESTADO_ENCERRADO, "gestor")
+
+        esbocos = svc.obter_esbocos_resolucao()
+        quantidades = {
+            dimensao: {valor: sum(q for q, _ in faixas.values()) for valor, faixas in por_valor.items()}
+            for dimensao, por_valor in esbocos.items()
+        }
+        self.assertEqual(quantidades["responsavel"], {"gestor_a": 1, "gestor_b": 1})
+        self.assertEqual(quantidades["categoria"], {svc.CATEGORIA_VIGENCIA: 1, svc.CATEGORIA_DOCUMENTACAO: 1})
+        self.assertEqual(quantidades["total"], {"": 2})
+
+        # A carga a partir do histórico reproduz o que o trigger acumulou
+        self.assertEqual(self.store.reconstruir_resolucoes(), 2)
+        self.assertEqual(self.store.esbocos_resolucao().keys(), esbocos.keys())
+        for dimensao, por_valor in self.store.esbocos_resolucao().items():
+            for valor, faixas in por_valor.items():
+                self.assertEqual(
+                    {f: q for f, (q, _) in faixas.items()},
+                    {f: q for f, (q, _) in esbocos[dimensao][valor].items()}
+                )
+
+    def test_reconstrucao_de_snapshots(self):
+        """Testa correção do snapshot a partir do último evento do log"""
+        alerta = self._criar()
+        svc.transicionar_estado(alerta["id"], svc.ESTADO_ESCALONADO, "usuario")
+        # Snapshot divergente (ex.: edição manual do estado)
+        self.store.atualizar_alerta(alerta["id"], lambda dados: dados.update(estado=svc.ESTADO_NOVO))
+
+        self.assertEqual(svc.reconstruir_estados_alertas_v2(), 1)
+        reconstruido = svc.get_alerta_v2_por_id(alerta["id"])
+        self.assertEqual(reconstruido["estado"], svc.ESTADO_ESCALONADO)
+        self.assertEqual(reconstruido["estado_anterior"], svc.ESTADO_NOVO)
+        self.assertEqual(svc.reconstruir_estados_alertas_v2(), 0)
+
+    def test_acoes_e_derivados(self):
+        """Testa ações vinculadas (acoes_ids derivado) e encadeamento"""
+        alerta = self._criar()
+        acao1 = svc.registrar_acao(alerta["id"], svc.ACAO_JUSTIFICATIVA_ADIAMENTO, "u", "motivo")
+        acao2 = svc.registrar_acao(alerta["id"], svc.ACAO_VERIFICACAO_REALIZADA, "u", "feito")
+
+        self.assertEqual([a["id"] for a in svc.get_acoes_por_alerta(alerta["id"])], [acao1["id"], acao2["id"]])
+        self.assertEqual(svc.get_alerta_v2_por_id(alerta["id"])["acoes_ids"], [acao1["id"], acao2["id"]])
+
+        derivado = svc.criar_alerta_derivado(alerta["id"], svc.TIPO_OPERACIONAL, "Derivado", "d", 10)
+        self.assertEqual(derivado["geracao"], 2)
+        self.assertEqual(svc.get_alerta_v2_por_id(alerta["id"])["alertas_derivados"], [derivado["id"]])
+        _, cadeia = svc.get_cadeia_alertas(derivado["id"])
+        self.assertEqual(len(cadeia), 2)
+
+    def test_cadeia_e_subarvore(self):
+        """Testa raiz e subárvore em pré-ordem via consultas recursivas"""
+        raiz = self._criar()
+        a = svc.criar_alerta_derivado(raiz["id"], svc.TIPO_OPERACIONAL, "A", "d", 10)
+        b = svc.criar_alerta_derivado(raiz["id"], svc.TIPO_OPERACIONAL, "B", "d", 10)
+        a1 = svc.criar_alerta_derivado(a["id"], svc.TIPO_ESCALONADO, "A1", "d", 5)
+
+        alerta_raiz, cadeia = svc.get_cadeia_alertas(a1["id"])
+        self.assertEqual(alerta_raiz["id"], raiz["id"])
+        self.assertEqual([x["id"] for x in cadeia], [raiz["id"], a["id"], a1["id"], b["id"]])
+        self.assertEqual(cadeia[0]["alertas_derivados"], [a["id"], b["id"]])
+
+        self.assertEqual([x["id"] for x in svc.get_subarvore_alertas(a["id"])], [a["id"], a1["id"]])
+        self.assertEqual(svc.get_subarvore_alertas("inexistente"), [])
+        self.assertEqual(svc.get_cadeia_alertas("inexistente"), (None, []))
+
+        # Origem inexistente: cadeia quebrada, como no comportamento anterior
+        orfao = self._criar(alerta_origem_id="removido", geracao=2)
+        self.assertEqual(svc.get_cadeia_alertas(orfao["id"]), (None, []))
+
+    def test_estatisticas_agregadas(self):
+        """Testa contagens por GROUP BY e score de risco espelhado em coluna"""
+        a = self._criar(criticidade=svc.CRITICIDADE_URGENTE)
+        self._criar(tipo=svc.TIPO_CRITICO)
+        svc.registrar_acao(a["id"], svc.ACAO_VERIFICACAO_REALIZADA, "u", "feito")
+        score = svc.calcular_score_risco(a["id"])
+
+        stats = svc.get_estatisticas_alertas_v2()
+        self.assertEqual(stats["total_alertas"], 2)
+        self.assertEqual(stats["total_acoes"], 1)
+        self.assertEqual(stats["por_estado"], {svc.ESTADO_NOVO: 2})
+        self.assertEqual(stats["por_tipo"], {svc.TIPO_PREVENTIVO: 1, svc.TIPO_CRITICO: 1})
+        self.assertEqual(stats["risco_medio"], score)
+
+    def test_contadores_materializados(self):
+        """Testa contadores mantidos nas escritas e conferidos pela reconstrução"""
+        a = self._criar(criticidade=svc.CRITICIDADE_URGENTE)
+        b = self._criar(tipo=svc.TIPO_CRITICO)
+        svc.criar_alerta_derivado(a["id"], svc.TIPO_ESCALONADO, "D", "d", 5)
+        svc.registrar_acao(a["id"], svc.ACAO_VERIFICACAO_REALIZADA, "u", "feito")
+        svc.transicionar_estado(b["id"], svc.ESTADO_EM_ANALISE, "u")
+        svc.calcular_scores_risco_lote()
+        with self.assertRaises(RuntimeError):
+            with svc.unidade_de_trabalho():
+                svc.resolver_alertas_lote([a["id"]], "gestor", "ok")
+                raise RuntimeError("desfaz")
+        svc.resolver_alertas_lote([a["id"]], "gestor", "ok")
+        self.store.atualizar_alerta(
+            a["id"],
+            lambda dados: dados.update(data_ultima_atualizacao=(datetime.now() - timedelta(days=60)).isoformat())
+        )
+        self.assertEqual(svc.arquivar_alertas_encerrados(), 1)
+
+        stats = svc.get_estatisticas_alertas_v2()
+        self.assertEqual(stats["total_alertas"], 3)
+        self.assertEqual(stats["total_acoes"], 1)
+        self.assertEqual(stats["por_estado"], self.store.contagens_por("estado"))
+        self.assertEqual(stats["por_tipo"], self.store.contagens_por("tipo"))
+        self.assertEqual(stats["por_criticidade"], self.store.contagens_por("criticidade"))
+        risco = self.store.resumo_risco(limite_alto=alert_lifecycle_store.LIMITE_RISCO_ALTO)
+        self.assertEqual(stats["risco_medio"], round(risco["risco_medio"], 3))
+        self.assertEqual(stats["alertas_risco_alto"], risco["alertas_risco_alto"])
+        self.assertEqual(svc.verificar_contadores_alertas_v2(), [])
+
+        # Divergência (ex.: edição manual do banco) é detectada e corrigida
+        self.store._conexao().execute(
+            "UPDATE contadores_alertas SET quantidade = quantidade + 5 WHERE dimensao = 'total'"
+        )
+        divergencias = svc.verificar_contadores_alertas_v2()
+        self.assertEqual([d["dimensao"] for d in divergencias], ["total"])
+        self.assertEqual(divergencias[0]["recalculado"]["quantidade"], 3)
+        self.assertEqual(svc.get_estatisticas_alertas_v2()["total_alertas"], 3)
+
+    def test_scores_risco_em_lote(self):
+        """Testa que o cálculo em lote coincide com o cálculo individual"""
+        a = self._criar(criticidade=svc.CRITICIDADE_URGENTE)
+        b = self._criar(prazo_resposta_dias=0)
+        c = svc.criar_alerta_derivado(a["id"], svc.TIPO_ESCALONADO, "C", "d", 5, svc.CRITICIDADE_ALTA)
+        for _ in range(3):
+            svc.registrar_acao(a["id"], svc.ACAO_JUSTIFICATIVA_ADIAMENTO, "u", "adiado")
+        svc.registrar_acao(b["id"], svc.ACAO_VERIFICACAO_REALIZADA, "u", "feito")
+
+        individuais = {x["id"]: svc.calcular_score_risco(x["id"]) for x in (a, b, c)}
+        fatores = {x["id"]: svc.get_alerta_v2_por_id(x["id"])["fatores_risco"] for x in (a, b, c)}
+
+        lote = svc.calcular_scores_risco_lote()
+        self.assertEqual(lote, individuais)
+        for alerta_id, score in lote.items():
+            alerta = svc.get_alerta_v2_por_id(alerta_id)
+            self.assertEqual(alerta["score_risco"], score)
+            self.assertEqual(alerta["fatores_risco"], fatores[alerta_id])
+        self.assertEqual(svc.calcular_scores_risco_lote([b["id"]]), {b["id"]: individuais[b["id"]]})
+
+    def test_unidade_de_trabalho(self):
+        """Testa commit único ao fim da unidade e rollback de todas as operações"""
+        alerta = self._criar()
+        outra_conexao = AlertLifecycleStore(self.base / "alertas_ciclo_vida.db")
+
+        with svc.unidade_de_trabalho():
+            svc.registrar_acao(alerta["id"], svc.ACAO_DECISAO_RENOVAR, "u", "renovar")
+            svc.transicionar_estado(alerta["id"], svc.ESTADO_EM_ANALISE, "u")
+            # Leitura dentro da unidade enxerga as próprias gravações
+            self.assertEqual(svc.get_alerta_v2_por_id(alerta["id"])["estado"], svc.ESTADO_EM_ANALISE)
+            # Outras conexões só veem após o commit
+            self.assertEqual(outra_conexao.obter_alerta(alerta["id"])["estado"], svc.ESTADO_NOVO)
+
+        self.assertEqual(outra_conexao.obter_alerta(alerta["id"])["estado"], svc.ESTADO_EM_ANALISE)
+        self.assertEqual(len(outra_conexao.listar_acoes(alerta["id"])), 1)
+
+        with self.assertRaises(RuntimeError):
+            with svc.unidade_de_trabalho():
+                svc.transicionar_estado(alerta["id"], svc.ESTADO_RESOLVIDO, "u")
+                svc.criar_alerta_derivado(alerta["id"], svc.TIPO_OPERACIONAL, "D", "d", 5)
+                raise RuntimeError("falha no meio do lote")
+
+        desfeito = svc.get_alerta_v2_por_id(alerta["id"])
+        self.assertEqual(desfeito["estado"], svc.ESTADO_EM_ANALISE)
+        self.assertEqual(desfeito["alertas_derivados"], [])
+        self.assertEqual(len(svc.listar_alertas_v2()), 1)
+
+    def test_resolver_alertas_lote(self):
+        """Testa resolução de vários alertas em uma única unidade"""
+        ids = [self._criar(f"CNT{i}")["id"] for i in range(3)]
+        self.assertEqual(svc.resolver_alertas_lote(ids[:2] + ["inexistente"], "gestor", "ok"), 2)
+        self.assertEqual(
+            sorted(a["id"] for a in svc.listar_alertas_v2(estado=svc.ESTADO_RESOLVIDO)),
+            sorted(ids[:2])
+        )
+
+    def test_camada_fria_mensal(self):
+        """Testa arquivamento automático de encerrados e consultas na camada fria"""
+        antigo = self._criar("CNT001")
+        recente = self._criar("CNT002")
+        aberto = self._criar("CNT003")
+        derivado = svc.criar_alerta_derivado(antigo["id"], svc.TIPO_OPERACIONAL, "Derivado", "d", 10)
+        svc.resolver_alertas_lote([antigo["id"], recente["id"]], "gestor", "ok")
+
+        encerramento = datetime.now() - timedelta(days=60)
+        self.store.atualizar_alerta(
+            antigo["id"], lambda dados: dados.update(data_ultima_atualizacao=encerramento.isoformat())
+        )
+
+        # Primeira listagem do dia dispara o arquivamento
+        ids_quentes = {a["id"] for a in svc.listar_alertas_v2()}
+        self.assertEqual(ids_quentes, {recente["id"], aberto["id"], derivado["id"]})
+        self.assertEqual(svc.arquivar_alertas_encerrados(), 0)
+
+        # Detalhe, cadeia e estatísticas continuam enxergando o arquivado
+        arquivado = svc.get_alerta_v2_por_id(antigo["id"])
+        self.assertEqual([h["estado"] for h in arquivado["historico_estados"]], [svc.ESTADO_NOVO, svc.ESTADO_RESOLVIDO])
+        raiz, cadeia = svc.get_cadeia_alertas(derivado["id"])
+        self.assertEqual([a["id"] for a in cadeia], [antigo["id"], derivado["id"]])
+        self.assertEqual(svc.get_estatisticas_alertas_v2()["total_alertas"], 4)
+        self.assertFalse(svc.transicionar_estado(antigo["id"], svc.ESTADO_EM_ANALISE, "gestor"))
+
+        # Consultas por intervalo leem só os meses pedidos
+        self.assertEqual(
+            [a["id"] for a in svc.listar_alertas_arquivados(desde=encerramento - timedelta(days=1))],
+            [antigo["id"]]
+        )
+        self.assertEqual(svc.listar_alertas_arquivados(desde=encerramento + timedelta(days=1)), [])
+
+    def test_eficiencia_inclui_camada_fria(self):
+        """Testa que a eficiência por gestor enxerga alertas resolvidos já arquivados"""
+        from services.bi_alertas_service import obter_kpis_dashboard
+
+        ids = [self._criar(f"CNT00{i}")["id"] for i in range(3)]
+        self._criar("CNT009", responsavel="gestor_b")
+        svc.resolver_alertas_lote(ids, "gestor", "ok")
+        encerramento = (datetime.now() - timedelta(days=60)).isoformat()
+        for alerta_id in ids:
+            self.store.atualizar_alerta(alerta_id, lambda dados: dados.update(data_ultima_atualizacao=encerramento))
+        self.assertEqual(svc.arquivar_alertas_encerrados(), 3)
+
+        self.assertEqual(
+            svc.obter_contagens_por_responsavel(),
+            {"gestor_a": {svc.ESTADO_RESOLVIDO: 3}, "gestor_b": {svc.ESTADO_NOVO: 1}}
+        )
+        eficiencia = obter_kpis_dashboard([], svc.listar_alertas_v2())["eficiencia_gestores"]
+        self.assertEqual(eficiencia["gestor_a"]["resolvidos"], 3)
+        self.assertEqual(eficiencia["gestor_a"]["taxa_resolucao"], 100.0)
+        self.assertEqual(eficiencia["gestor_b"]["alertas_ativos"], 1)
+        self.assertEqual(svc.verificar_contadores_alertas_v2(), [])
+
+        # Contagens e tempos descrevem a mesma população (camadas quente e fria)
+        from services.bi_alertas_service import calcular_eficiencia_gestores
+        self.assertEqual(calcular_eficiencia_gestores(), eficiencia)
+        esboco = svc.obter_esbocos_resolucao()["responsavel"]["gestor_a"]
+        self.assertEqual(sum(q for q, _ in esboco.values()), eficiencia["gestor_a"]["resolvidos"])
+        self.assertNotIn("gestor_b", svc.obter_esbocos_resolucao()["responsavel"])
+        self.assertEqual(eficiencia["gestor_b"]["tempo_medio"], 0)
+
+    def test_migracao_de_json(self):
+        """Testa importação única dos JSON legados"""
+        alerta = self._criar()
+        acao = svc.registrar_acao(alerta["id"], svc.ACAO_VERIFICACAO_REALIZADA, "u", "feito")
+        legado = svc.get_alerta_v2_por_id(alerta["id"])
+
+        alertas_json = self.base / "alertas_ciclo_vida.json"
+        acoes_json = self.base / "acoes_alertas.json"
+        alertas_json.write_text(json.dumps([legado], ensure_ascii=False), encoding="utf-8")
+        acoes_json.write_text(json.dumps([acao], ensure_ascii=False), encoding="utf-8")
+
+        novo = AlertLifecycleStore(self.base / "migrado.db")
+        self.assertFalse(novo.migracao_concluida())
+        self.assertEqual(novo.migrar_de_json(alertas_json, acoes_json), 1)
+        self.assertTrue(novo.migracao_concluida())
+        self.assertEqual(novo.migrar_de_json(alertas_json, acoes_json), 0)
+
+        self.assertEqual(novo.obter_alerta(alerta["id"]), legado)
+        self.assertEqual(novo.listar_acoes(alerta["id"]), [acao])
+
+    def test_migracao_forcada_nao_duplica(self):
+        """Testa que reexecutar a migração não duplica camadas, permanências nem resoluções"""
+        ativo = self._criar("CNT001")
+        arquivado = self._criar("CNT002")
+        svc.transicionar_estado(ativo["id"], svc.ESTADO_EM_ANALISE, "gestor")
+        svc.resolver_alertas_lote([arquivado["id"]], "gestor", "ok")
+        encerramento = (datetime.now() - timedelta(days=60)).isoformat()
+        self.store.atualizar_alerta(
+            arquivado["id"], lambda dados: dados.update(data_ultima_atualizacao=encerramento)
+        )
+        self.assertEqual(svc.arquivar_alertas_encerrados(), 1)
+
+        alertas_json = self.base / "alertas_ciclo_vida.json"
+        legados = [svc.get_alerta_v2_por_id(a["id"]) for a in (ativo, arquivado)]
+        alertas_json.write_text(json.dumps(legados, ensure_ascii=False), encoding="utf-8")
+
+        histogramas = self.store.histogramas_duracoes()
+        esbocos = self.store.esbocos_resolucao()
+        self.assertEqual(self.store.migrar_de_json(alertas_json, self.base / "ausente.json", forcar=True), 2)
+
+        self.assertEqual(self.store.total_alertas(), 2)
+        self.assertEqual(self.store.total_alertas(incluir_arquivo=False), 2)
+        self.assertEqual(self.store.histogramas_duracoes(), histogramas)
+        self.assertEqual(self.store.esbocos_resolucao(), esbocos)
+        self.assertEqual(sum(q for q, _ in esbocos["total"][""].values()), 1)
+        self.assertEqual(svc.verificar_contadores_alertas_v2(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+"""
+Testes do Agendador Incremental de Alertas
+==========================================
+"""
+
+import unittest
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Adiciona o diretório raiz ao path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from services.alert_scheduler import AlertScheduler
+
+
+class TestAlertScheduler(unittest.TestCase):
+    """Testes de reavaliação por cruzamento de limites e por alteração"""
+
+    def setUp(self):
+        self.agora = datetime(2026, 3, 1, 9, 0)
+        self.contratos = [
+            {"id": "A", "numero": "001", "data_fim": self.agora + timedelta(days=121, hours=2)},
+            {"id": "B", "numero": "002", "data_fim": self.agora + timedelta(days=300)},
+            {"id": "C", "numero": "003", "data_fim": (self.agora + timedelta(days=61)).isoformat()},
+            {"id": "D", "numero": "004", "status": "critico", "valor": 60_000_000},
+        ]
+        self.scheduler = AlertScheduler(atualizar_dias=False)
+        self.resultado = self.scheduler.avaliar(self.contratos, self.agora, versao=1)
+
+    def _ids(self, alertas):
+        return sorted(a["id"] for a in alertas)
+
+    def test_primeira_avaliacao(self):
+        """Testa que a primeira avaliação reporta todos os alertas como adicionados"""
+        self.assertEqual(
+            self._ids(self.resultado["alertas"]),
+            ["STATUS_CRIT_D", "VALOR_ALTO_D", "VIG_ATEN_C"]
+        )
+        self.assertEqual(self._ids(self.resultado["adicionados"]), self._ids(self.resultado["alertas"]))
+        self.assertEqual(self.resultado["reavaliados"], 4)
+
+    def test_cruzamento_de_limites(self):
+        """Testa entrada na janela de 120 dias e passagem de atenção para crítico"""
+        resultado = self.scheduler.avaliar(None, self.agora + timedelta(days=1, hours=3))
+        self.assertEqual(self._ids(resultado["adicionados"]), ["VIG_ATEN_A", "VIG_CRIT_C"])
+        self.assertEqual(self._ids(resultado["removidos"]), ["VIG_ATEN_C"])
+        self.assertEqual(resultado["reavaliados"], 2)
+
+    def test_sem_mudancas_nao_reavalia(self):
+        """Testa que nada é reavaliado antes do próximo cruzamento"""
+        resultado = self.scheduler.avaliar(self.contratos, self.agora + timedelta(hours=1), versao=1)
+        self.assertEqual(resultado["reavaliados"], 0)
+        self.assertEqual(resultado["adicionados"], [])
+        self.assertEqual(resultado["removidos"], [])
+        self.assertEqual(len(resultado["alertas"]), 3)
+
+    def test_contrato_alterado_e_removido(self):
+        """Testa reavaliação de contrato alterado e limpeza de contrato removido"""
+        contratos = [dict(c) for c in self.contratos if c["id"] != "C"]
+        contratos[1]["pendencias"] = ["Garantia vencida"]
+
+        resultado = self.scheduler.avaliar(contratos, self.agora, versao=2)
+        self.assertEqual(self._ids(resultado["adicionados"]), ["PEND_B"])
+        self.assertEqual(self._ids(resultado["removidos"]), ["VIG_ATEN_C"])
+        self.assertEqual(resultado["reavaliados"], 1)
+
+    def test_atualizacao_diaria_de_dias(self):
+        """Testa que, com atualizar_dias, o alerta acompanha os dias restantes"""
+        scheduler = AlertScheduler()
+        scheduler.avaliar(self.contratos, self.agora, versao=1)
+        resultado = scheduler.avaliar(None, self.agora + timedelta(days=10))
+        alerta = next(a for a in resultado["alertas"] if a["contrato_id"] == "A")
+        self.assertEqual(alerta["dias_restantes"], 111)
+        self.assertIn("VIG_ATEN_A", self._ids(resultado["adicionados"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
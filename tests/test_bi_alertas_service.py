@@ -7,6 +7,8 @@ Data: 09/01/2026
 """
 
 import unittest
+import math
+import tempfile
 from datetime import datetime, timedelta
 import sys
 from pathlib import Path
@@ -20,8 +22,17 @@ from services.bi_alertas_service import (
     calcular_eficiencia_gestores,
     prever_rupturas,
     obter_kpis_dashboard,
-    analisar_tendencia_temporal
+    analisar_tendencia_temporal,
+    calcular_riscos_carteira,
+    calcular_tempos_resolucao,
+    mesclar_esbocos_resolucao,
+    TEMPO_MEDIO_ANALISE,
+    TEMPO_MEDIO_APROVACAO,
+    TEMPO_MEDIO_FORMALIZACAO
 )
+from services import alert_lifecycle_store
+from services.alert_lifecycle_store import AlertLifecycleStore
+from services.stage_durations import TODOS, RAZAO_FAIXAS, ModeloDuracoes, faixa_duracao
 
 
 class TestBIAlertasService(unittest.TestCase):
@@ -31,6 +42,13 @@ class TestBIAlertasService(unittest.TestCase):
         """Configuração antes de cada teste"""
         self.hoje = datetime.now()
         
+        # Modelo de durações, esboços e replay leem um armazenamento temporário vazio
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store_original = alert_lifecycle_store._alert_lifecycle_store
+        alert_lifecycle_store._alert_lifecycle_store = AlertLifecycleStore(
+            Path(self.tmpdir.name) / "alertas_ciclo_vida.db"
+        )
+        
         # Contrato de exemplo
         self.contrato_exemplo = {
             'id': 'CNT_001',
@@ -54,6 +72,11 @@ class TestBIAlertasService(unittest.TestCase):
             'data_ultima_atualizacao': (self.hoje - timedelta(days=1)).isoformat()
         }
     
+    def tearDown(self):
+        """Restaura o armazenamento global"""
+        alert_lifecycle_store._alert_lifecycle_store = self.store_original
+        self.tmpdir.cleanup()
+    
     def test_01_calcular_risco_ruptura_baixo(self):
         """Teste 1: Risco baixo (tempo suficiente)"""
         print("\n🧪 Teste 1: Risco de ruptura baixo")
@@ -302,6 +325,147 @@ class TestBIAlertasService(unittest.TestCase):
         self.assertEqual(kpis['total_contratos'], 0)
         
         print("✓ Funções lidam corretamente com dados vazios")
+    
+    def test_11_motor_risco_vetorizado(self):
+        """Teste 11: Motor vetorizado equivale ao cálculo por contrato"""
+        print("\n🧪 Teste 11: Motor de risco da carteira")
+        
+        estados = ['novo', 'em_analise', 'providencia_em_curso', 'resolvido', 'encerrado']
+        tipos = ['critico', 'atencao', 'info']
+        contratos, alertas_por_contrato = [], {}
+        for i in range(60):
+            data_fim = self.hoje + timedelta(days=(i * 37) % 400 - 40, hours=i % 24)
+            contratos.append({
+                'id': f'CNT_{i:03d}',
+                'numero': f'{i}/2025',
+                'objeto': f'Contrato {i}',
+                # Sem data de fim, string ISO e datetime
+                'data_fim': None if i % 20 == 0 else (data_fim.isoformat() if i % 2 else data_fim)
+            })
+            alertas_por_contrato[f'CNT_{i:03d}'] = [
+                {**self.alerta_exemplo, 'estado': estados[(i + j) % 5], 'tipo': tipos[(i * j) % 3]}
+                for j in range(i % 4)
+            ]
+        
+        riscos = calcular_riscos_carteira(contratos, alertas_por_contrato)
+        for i, contrato in enumerate(contratos):
+            esperado = calcular_risco_ruptura(contrato, alertas_por_contrato[contrato['id']])
+            if 'nivel_risco' not in esperado:
+                self.assertEqual(riscos['nivel_risco'][i], 'indeterminado')
+                continue
+            self.assertEqual(riscos['nivel_risco'][i], esperado['nivel_risco'])
+            self.assertEqual(riscos['tempo_real_restante'][i], esperado['tempo_real_restante'])
+            self.assertEqual(riscos['janela_seguranca'][i], esperado['janela_seguranca'])
+            self.assertEqual(riscos['etapas_pendentes'][i], len(esperado['etapas_pendentes']))
+        
+        # KPIs e previsões saem da mesma passada
+        alertas = [a for lista in alertas_por_contrato.values() for a in lista]
+        for contrato_id, lista in alertas_por_contrato.items():
+            for alerta in lista:
+                alerta['contrato_id'] = contrato_id
+        kpis = obter_kpis_dashboard(contratos, alertas)
+        previsoes = prever_rupturas(contratos, alertas_por_contrato)
+        self.assertEqual(kpis['previsoes_ruptura'], previsoes[:10])
+        self.assertEqual(
+            kpis['contratos_risco_alto'] + kpis['contratos_risco_medio'] + kpis['contratos_ok'],
+            len(contratos)
+        )
+        
+        print(f"✓ {len(contratos)} contratos: motor vetorizado igual ao cálculo individual")
+
+    
+    def test_12_tempos_de_etapa_aprendidos(self):
+        """Teste 12: Tempos de etapa vêm do histórico quando há amostras"""
+        print("\n🧪 Teste 12: Modelo de durações aprendido")
+        
+        def _histograma(dias, quantidade=40):
+            return {faixa_duracao(dias): (quantidade, dias * quantidade)}
+        
+        modelo = ModeloDuracoes({
+            # Análise do gestor específico e prorrogação no nível geral
+            ('Vigência', 'critico', 'em_analise', 'gestor.silva'): _histograma(2.0),
+            (TODOS, TODOS, 'providencia_em_curso', TODOS): _histograma(20.0),
+        })
+        self.assertIsNone(modelo.permanencia('em_analise', 'Vigência', 'critico', 'outro.gestor'))
+        
+        risco = calcular_risco_ruptura(self.contrato_exemplo, [self.alerta_exemplo], modelo)
+        analise = math.ceil(modelo.permanencia('em_analise', 'Vigência', 'critico', 'gestor.silva'))
+        prorrogacao = math.ceil(modelo.permanencia('providencia_em_curso'))
+        self.assertLessEqual(analise, 3)
+        self.assertLessEqual(prorrogacao, 22)
+        # Aprovação sem amostras e formalização (sem estado) mantêm o padrão
+        self.assertEqual(
+            risco['tempo_necessario'],
+            analise + prorrogacao + TEMPO_MEDIO_APROVACAO + TEMPO_MEDIO_FORMALIZACAO
+        )
+        self.assertEqual(risco['etapas_pendentes'][0], f"Análise ({analise}d)")
+        
+        # Outro gestor recua para o padrão da análise
+        outro = {**self.alerta_exemplo, 'responsavel': 'outro.gestor'}
+        self.assertEqual(
+            calcular_risco_ruptura(self.contrato_exemplo, [outro], modelo)['tempo_necessario'],
+            TEMPO_MEDIO_ANALISE + prorrogacao + TEMPO_MEDIO_APROVACAO + TEMPO_MEDIO_FORMALIZACAO
+        )
+        
+        # Motor da carteira usa o mesmo modelo
+        riscos = calcular_riscos_carteira(
+            [self.contrato_exemplo], {'CNT_001': [self.alerta_exemplo, outro]}, modelo=modelo
+        )
+        esperado = calcular_risco_ruptura(self.contrato_exemplo, [self.alerta_exemplo, outro], modelo)
+        self.assertEqual(riscos['tempo_necessario'][0], esperado['tempo_necessario'])
+        self.assertEqual(riscos['nivel_risco'][0], esperado['nivel_risco'])
+        
+        print(f"✓ Tempo necessário aprendido: {risco['tempo_necessario']} dias")
+
+    
+    def test_13_esbocos_de_resolucao(self):
+        """Teste 13: Percentis de resolução a partir de histogramas mescláveis"""
+        print("\n🧪 Teste 13: Esboços de tempo de resolução")
+        
+        tempos = [1 + (i * 7) % 40 for i in range(200)]
+        alertas = [
+            {
+                **self.alerta_exemplo,
+                'id': f'ALT_{i}',
+                'estado': 'resolvido',
+                'data_criacao': (self.hoje - timedelta(days=dias)).isoformat(),
+                'data_ultima_atualizacao': self.hoje.isoformat()
+            }
+            for i, dias in enumerate(tempos)
+        ]
+        
+        stats = calcular_eficiencia_gestores(alertas)['gestor.silva']
+        self.assertEqual(stats['resolvidos'], 200)
+        # Sem lista: dados persistidos (armazenamento temporário vazio)
+        self.assertEqual(calcular_eficiencia_gestores(), {})
+        # Gestor ausente vira 'desconhecido' nas contagens e nos tempos
+        sem_gestor = calcular_eficiencia_gestores([{**alertas[0], 'responsavel': None}])
+        self.assertEqual(list(sem_gestor), ['desconhecido'])
+        self.assertEqual(sem_gestor['desconhecido']['resolvidos'], 1)
+        self.assertGreater(sem_gestor['desconhecido']['tempo_medio'], 0)
+        self.assertAlmostEqual(stats['tempo_medio'], round(sum(tempos) / len(tempos), 1), places=1)
+        # Erro relativo dos percentis limitado pela razão entre faixas
+        ordenados = sorted(tempos)
+        for chave, q in (('p50', 0.50), ('p75', 0.75), ('p90', 0.90)):
+            exato = ordenados[int(q * len(ordenados)) - 1]
+            self.assertLessEqual(abs(stats[chave] - exato) / exato, RAZAO_FAIXAS - 1 + 0.05)
+        
+        # Esboços de duas bases mesclados equivalem a um esboço único
+        def _esboco(valores):
+            histograma = {}
+            for dias in valores:
+                q, soma = histograma.get(faixa_duracao(dias), (0, 0.0))
+                histograma[faixa_duracao(dias)] = (q + 1, soma + dias)
+            return {'categoria': {'Vigência': histograma}}
+        
+        mesclado = mesclar_esbocos_resolucao(_esboco(tempos[:120]), _esboco(tempos[120:]))
+        self.assertEqual(
+            calcular_tempos_resolucao('categoria', mesclado),
+            calcular_tempos_resolucao('categoria', _esboco(tempos))
+        )
+        self.assertEqual(calcular_tempos_resolucao('categoria', mesclado)['Vigência']['quantidade'], 200)
+        
+        print(f"✓ P50/P75/P90: {stats['p50']}/{stats['p75']}/{stats['p90']} dias")
 
 
 def run_tests():
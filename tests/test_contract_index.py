@@ -0,0 +1,142 @@
+"""
+Testes do Índice Secundário de Contratos
+========================================
+"""
+
+import unittest
+import tempfile
+import sys
+from pathlib import Path
+
+# Adiciona o diretório raiz ao path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from services.contract_store import ContractStore
+from services.contract_repository import ContractRepository
+from services.contract_index import ContractIndex
+
+
+class _TagsEmMemoria:
+    """Substituto mínimo do TagService (mapeamento contrato -> tags)"""
+
+    def __init__(self):
+        self.mapa = {}
+        self.versao = 0
+
+    def definir(self, contrato_id, tag_ids):
+        self.mapa[contrato_id] = list(tag_ids)
+        self.versao += 1
+
+    def versao_vinculos(self):
+        return (self.versao, 0)
+
+    def obter_mapa_tags(self):
+        return {k: list(v) for k, v in self.mapa.items()}
+
+
+class TestContractIndex(unittest.TestCase):
+    """Testes para os índices invertidos de contratos"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = ContractStore(Path(self.tmpdir.name) / "contratos.db")
+        self.store.inserir_contratos([
+            self._contrato("CAD001", "Alfa Ltda", "ativo", fiscal_titular="Ana"),
+            self._contrato("CAD002", "Beta SA", "critico", fiscal_titular="Bruno",
+                           fiscais_por_comarca=[
+                               {"comarca": "Sorocaba", "titular": "Carla", "suplente": "Davi"},
+                               {"comarca": "Itu", "titular": "Bruno", "suplente": "Ana"},
+                           ]),
+            self._contrato("CAD003", "Alfa Ltda", "critico", tipo="Obras",
+                           fiscal_titular="Bruno", comarca_detectada="Jundiaí"),
+        ])
+        self.tags = _TagsEmMemoria()
+        self.repo = ContractRepository(self.store)
+        self.indice = ContractIndex(self.repo, self.tags)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _contrato(self, contrato_id, fornecedor, status, tipo="Serviços", **extras):
+        contrato = {
+            "id": contrato_id,
+            "numero": f"{contrato_id}/2025",
+            "tipo": tipo,
+            "fornecedor": fornecedor,
+            "objeto": "Objeto de teste",
+            "vigencia": "01/01/2025 a 31/12/2025",
+            "valor": 1000.0,
+            "status": status,
+            "data_inicio": "2025-01-01T00:00:00",
+            "data_fim": "2025-12-31T00:00:00",
+            "ultima_atualizacao": "2025-01-10T10:00:00"
+        }
+        contrato.update(extras)
+        return contrato
+
+    def test_indice_fiscal_cobre_fiscais_por_comarca(self):
+        """Testa que titulares e suplentes de comarca entram no índice"""
+        self.assertEqual(self.indice.ids("fiscal", "Carla"), {"CAD002"})
+        self.assertEqual(self.indice.ids("fiscal", "Davi"), {"CAD002"})
+        self.assertTrue({"CAD001", "CAD002"} <= self.indice.ids("fiscal", "Ana"))
+
+    def test_filtrar_intersecao(self):
+        """Testa combinação de critérios como interseção"""
+        ids = self.indice.filtrar(fornecedor="Alfa Ltda", status="critico")
+        self.assertEqual(ids, {"CAD003"})
+
+        ids = self.indice.filtrar(fiscal="Bruno", tipo="Obras")
+        self.assertEqual(ids, {"CAD003"})
+
+        self.assertEqual(self.indice.filtrar(fornecedor="Inexistente", status="ativo"), set())
+        self.assertIsNone(self.indice.filtrar())
+
+    def test_comarcas_indexadas(self):
+        """Testa comarcas de fiscais_por_comarca e comarca detectada"""
+        self.assertEqual(self.indice.ids("comarca", "Itu"), {"CAD002"})
+        self.assertEqual(self.indice.ids("comarca", "Jundiaí"), {"CAD003"})
+        self.assertNotIn("(Comarca Única)", self.indice.facetas("comarca"))
+
+    def test_facetas_ordenadas(self):
+        """Testa lista de valores distintos pré-calculada"""
+        fornecedores = self.indice.facetas("fornecedor")
+        self.assertIn("Alfa Ltda", fornecedores)
+        self.assertIn("Beta SA", fornecedores)
+        self.assertEqual(fornecedores, sorted(fornecedores))
+        self.assertEqual(len(fornecedores), len(set(fornecedores)))
+
+    def test_invalidacao_por_escrita_no_store(self):
+        """Testa que novos contratos aparecem após escrita"""
+        self.assertEqual(self.indice.ids("fornecedor", "Gama ME"), set())
+        self.store.inserir_contrato(self._contrato("CAD004", "Gama ME", "ativo"))
+
+        self.assertEqual(self.indice.ids("fornecedor", "Gama ME"), {"CAD004"})
+        self.assertIn("Gama ME", self.indice.facetas("fornecedor"))
+
+    def test_tags_uniao_e_invalidacao(self):
+        """Testa filtro por tags (qualquer uma) e atualização após escrita"""
+        self.assertEqual(self.indice.filtrar(tags=["urgente"]), set())
+
+        self.tags.definir("CAD001", ["urgente"])
+        self.tags.definir("CAD003", ["renovar"])
+        self.tags.definir("INEXISTENTE", ["urgente"])
+
+        self.assertEqual(self.indice.filtrar(tags=["urgente", "renovar"]), {"CAD001", "CAD003"})
+        self.assertEqual(self.indice.filtrar(tags=["urgente"], status="critico"), set())
+
+    def test_contratos_do_fiscal_em_ordem(self):
+        """Testa contratos do fiscal na ordem do repositório"""
+        contratos = self.indice.contratos_do_fiscal("Bruno")
+        ids = [c["id"] for c in contratos]
+        self.assertEqual(set(ids), {"CAD002", "CAD003"})
+        ordem = [c["id"] for c in self.repo.listar() if c["id"] in ids]
+        self.assertEqual(ids, ordem)
+
+    def test_dimensao_invalida(self):
+        """Testa erro para dimensão desconhecida"""
+        with self.assertRaises(ValueError):
+            self.indice.facetas("cor")
+
+
+if __name__ == '__main__':
+    unittest.main()
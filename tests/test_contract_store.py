@@ -0,0 +1,169 @@
+"""
+Testes do Armazenamento SQLite de Contratos
+============================================
+"""
+
+import unittest
+import json
+import tempfile
+import sys
+from pathlib import Path
+
+# Adiciona o diretório raiz ao path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from services.contract_store import ContractStore
+
+
+class TestContractStore(unittest.TestCase):
+    """Testes para o armazenamento de contratos em SQLite"""
+    
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.base = Path(self.tmpdir.name)
+        self.store = ContractStore(self.base / "contratos.db")
+    
+    def tearDown(self):
+        self.tmpdir.cleanup()
+    
+    def _contrato(self, contrato_id, numero="001/2025", **extras):
+        contrato = {
+            "id": contrato_id,
+            "numero": numero,
+            "tipo": "Serviços",
+            "fornecedor": "Fornecedor Teste",
+            "objeto": "Objeto de teste",
+            "vigencia": "01/01/2025 a 31/12/2025",
+            "valor": 1000.0,
+            "status": "ativo",
+            "data_inicio": "2025-01-01T00:00:00",
+            "data_fim": "2025-12-31T00:00:00",
+            "ultima_atualizacao": "2025-01-10T10:00:00",
+            "aditivos": []
+        }
+        contrato.update(extras)
+        return contrato
+    
+    def test_roundtrip_preserva_formato_legado(self):
+        """Testa que o registro lido é igual ao gravado"""
+        fiscais = [
+            {"comarca": "Sorocaba", "titular": "João", "suplente": "Maria"},
+            {"comarca": "Itu", "titular": "Ana", "suplente": "Pedro"}
+        ]
+        original = self._contrato("CAD001", fiscais_por_comarca=fiscais)
+        self.store.inserir_contrato(original)
+        
+        self.assertEqual(self.store.obter_contrato("CAD001"), original)
+    
+    def test_adicionar_aditivo_numera_sequencialmente(self):
+        """Testa reserva de número e atualização do contrato"""
+        self.store.inserir_contrato(self._contrato("CAD001"))
+        
+        primeiro = self.store.adicionar_aditivo("CAD001", lambda n: {"filename": f"A{n}.pdf"})
+        segundo = self.store.adicionar_aditivo("CAD001", lambda n: {"filename": f"A{n}.pdf"})
+        
+        self.assertEqual(primeiro['numero'], 1)
+        self.assertEqual(segundo['numero'], 2)
+        
+        contrato = self.store.obter_contrato("CAD001")
+        self.assertEqual([a['numero'] for a in contrato['aditivos']], [1, 2])
+        self.assertEqual(contrato['total_aditivos'], 2)
+    
+    def test_adicionar_aditivo_monta_fora_da_transacao(self):
+        """Testa que o PDF é gravado sem segurar o lock e que falhas liberam a reserva"""
+        self.store.inserir_contrato(self._contrato("CAD001"))
+        self.store.inserir_contrato(self._contrato("CAD002"))
+        
+        def _montar(n):
+            # Outra sessão consegue escrever (e reservar) enquanto o PDF é gravado
+            outro = self.store.adicionar_aditivo("CAD001", lambda m: {"filename": f"A{m}.pdf"})
+            self.assertEqual(outro['numero'], n + 1)
+            return {"filename": f"A{n}.pdf"}
+        
+        self.assertEqual(self.store.adicionar_aditivo("CAD001", _montar)['numero'], 1)
+        
+        def _falhar(n):
+            raise OSError("disco cheio")
+        
+        with self.assertRaises(OSError):
+            self.store.adicionar_aditivo("CAD002", _falhar)
+        self.assertEqual(self.store.adicionar_aditivo("CAD002", lambda n: {})['numero'], 1)
+        self.assertEqual(
+            [a['numero'] for a in self.store.obter_contrato("CAD001")['aditivos']], [1, 2]
+        )
+    
+    def test_migracao_tolera_numeros_de_aditivo_invalidos(self):
+        """Testa aditivos legados com número ausente, não numérico ou repetido"""
+        aditivos = [
+            {"numero": 2, "tipo": "prazo"},
+            {"numero": None, "tipo": "valor"},
+            {"numero": "2º", "tipo": "prazo"},
+            {"numero": 2, "tipo": "valor"},
+        ]
+        json_path = self.base / "contratos_cadastrados.json"
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump([self._contrato("CAD001", aditivos=aditivos), self._contrato("CAD002")], f)
+        
+        self.assertEqual(self.store.migrar_de_json(json_path), 2)
+        contrato = self.store.obter_contrato("CAD001")
+        self.assertEqual(len(contrato['aditivos']), 4)
+        # Gravados como 2, 3, 4 e 5: o próximo número livre é 6
+        proximo = self.store.adicionar_aditivo("CAD001", lambda n: {})
+        self.assertEqual(proximo['numero'], 6)
+    
+    def test_adicionar_aditivo_contrato_inexistente(self):
+        """Testa aditivo para contrato que não existe"""
+        self.assertIsNone(self.store.adicionar_aditivo("NAO_EXISTE", lambda n: {}))
+    
+    def test_versao_incrementa_a_cada_escrita(self):
+        """Testa contador de versão usado pelo repositório em memória"""
+        versao = self.store.versao()
+        self.store.inserir_contrato(self._contrato("CAD001"))
+        self.assertGreater(self.store.versao(), versao)
+    
+    def test_existe_numero_ignora_maiusculas_e_espacos(self):
+        """Testa checagem de duplicidade pelo número"""
+        self.store.inserir_contrato(self._contrato("CAD001", numero="CT-10/2025"))
+        self.assertTrue(self.store.existe_numero("  ct-10/2025 "))
+        self.assertFalse(self.store.existe_numero("CT-11/2025"))
+    
+    def test_migracao_unica_do_json(self):
+        """Testa migração do JSON legado executada uma única vez"""
+        json_path = self.base / "contratos_cadastrados.json"
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump([self._contrato("CAD001"), self._contrato("CAD002", numero="002/2025")], f)
+        
+        self.assertEqual(self.store.migrar_de_json(json_path), 2)
+        self.assertTrue(self.store.migracao_concluida())
+        self.assertEqual(self.store.migrar_de_json(json_path), 0)
+        self.assertEqual(self.store.total_contratos(), 2)
+    
+    def test_upsert_por_controle_pncp(self):
+        """Testa reimportação: só linhas alteradas são regravadas, ajustes manuais preservados"""
+        campos = ["numero", "valor", "controle_pncp"]
+        original = self._contrato("PNCP_1", controle_pncp="CTRL-1", fiscal_titular="A definir")
+        resultado = self.store.upsert_por_controle_pncp([original], campos)
+        self.assertEqual(resultado, {'inseridos': 1, 'atualizados': 0, 'inalterados': 0})
+        
+        # Ajuste manual após a importação
+        ajustado = self.store.obter_contrato("PNCP_1")
+        ajustado["fiscal_titular"] = "Maria"
+        self.store.inserir_contrato(ajustado)
+        self.store.adicionar_aditivo("PNCP_1", lambda n: {"tipo": "prazo"})
+        
+        versao = self.store.versao()
+        resultado = self.store.upsert_por_controle_pncp([dict(original)], campos)
+        self.assertEqual(resultado['inalterados'], 1)
+        self.assertEqual(self.store.versao(), versao)
+        
+        resultado = self.store.upsert_por_controle_pncp([dict(original, valor=2500.0)], campos)
+        self.assertEqual(resultado['atualizados'], 1)
+        
+        contrato = self.store.obter_contrato("PNCP_1")
+        self.assertEqual(contrato["valor"], 2500.0)
+        self.assertEqual(contrato["fiscal_titular"], "Maria")
+        self.assertEqual(len(contrato["aditivos"]), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+"""
+Testes da Auditoria do Dual Write
+=================================
+"""
+
+import unittest
+import json
+import tempfile
+import sys
+from pathlib import Path
+
+# Adiciona o diretório raiz ao path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from services import dual_write_audit
+from services.dual_write_audit import AuditoriaDualWrite
+
+
+class TestAuditoriaDualWrite(unittest.TestCase):
+    """Testes de registros JSONL, contadores incrementais e leitura pelo fim"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.base = Path(self.tmpdir.name)
+        self.auditoria = AuditoriaDualWrite(self.base / "auditoria.jsonl", self.base / "contadores.json")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_contadores_incrementais(self):
+        """Testa contagem só do trecho novo, persistida entre instâncias"""
+        self.auditoria.registrar("criar_alerta", True, v1_id="A")
+        self.auditoria.registrar("resolucao", False, v1_id="B", erro="x")
+        contadores = self.auditoria.contadores()
+        self.assertEqual((contadores["sucessos"], contadores["falhas"]), (1, 1))
+        self.assertEqual(contadores["por_operacao"]["resolucao"], {"sucessos": 0, "falhas": 1})
+        deslocamento = contadores["deslocamento"]
+        self.assertEqual(deslocamento, (self.base / "auditoria.jsonl").stat().st_size)
+
+        # Outra instância (outro processo) continua do deslocamento salvo
+        outra = AuditoriaDualWrite(self.base / "auditoria.jsonl", self.base / "contadores.json")
+        outra.registrar("criar_alerta", True, v1_id="C")
+        contadores = self.auditoria.contadores()
+        self.assertEqual(contadores["sucessos"], 2)
+        self.assertGreater(contadores["deslocamento"], deslocamento)
+
+        # Linha incompleta no fim só é contada quando terminar
+        with open(self.base / "auditoria.jsonl", "a", encoding="utf-8") as f:
+            f.write('{"operacao": "acao", "sucesso": true')
+        self.assertEqual(self.auditoria.contadores()["sucessos"], 2)
+        with open(self.base / "auditoria.jsonl", "a", encoding="utf-8") as f:
+            f.write('}\n')
+        self.assertEqual(self.auditoria.contadores()["sucessos"], 3)
+
+    def test_arquivo_truncado_recomeca_contagem(self):
+        """Testa recontagem quando o arquivo fica menor que o deslocamento salvo"""
+        for i in range(5):
+            self.auditoria.registrar("criar_alerta", True, v1_id=str(i))
+        self.auditoria.contadores()
+        (self.base / "auditoria.jsonl").write_text(
+            json.dumps({"operacao": "acao", "sucesso": False}) + "\n", encoding="utf-8"
+        )
+        contadores = self.auditoria.contadores()
+        self.assertEqual((contadores["sucessos"], contadores["falhas"]), (0, 1))
+
+    def test_ultimos_registros_pelo_fim(self):
+        """Testa leitura das últimas N linhas atravessando blocos"""
+        self.assertEqual(self.auditoria.ultimos(10), [])
+        for i in range(300):
+            self.auditoria.registrar("criar_alerta", True, v1_id=f"ID_{i:03d}")
+
+        bloco_original = dual_write_audit.BLOCO_LEITURA
+        dual_write_audit.BLOCO_LEITURA = 100
+        try:
+            ultimos = self.auditoria.ultimos(25)
+        finally:
+            dual_write_audit.BLOCO_LEITURA = bloco_original
+        self.assertEqual([r["v1_id"] for r in ultimos], [f"ID_{i:03d}" for i in range(275, 300)])
+        self.assertEqual(len(self.auditoria.ultimos(1000)), 300)
+        self.assertEqual(self.auditoria.ultimos(1)[0]["v1_id"], "ID_299")
+
+
+if __name__ == '__main__':
+    unittest.main()
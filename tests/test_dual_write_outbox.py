@@ -0,0 +1,133 @@
+"""
+Testes da Outbox do Dual Write
+==============================
+"""
+
+import unittest
+import tempfile
+import sys
+import time
+from pathlib import Path
+
+# Adiciona o diretório raiz ao path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from services import dual_write_outbox
+from services.dual_write_outbox import DualWriteOutbox, OutboxWorker, calcular_atraso
+
+
+class TestDualWriteOutbox(unittest.TestCase):
+    """Testes de enfileiramento idempotente, novas tentativas e métricas"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.outbox = DualWriteOutbox(Path(self.tmpdir.name) / "outbox.db")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_enfileiramento_idempotente(self):
+        """Testa que a mesma chave não entra duas vezes, nem após concluída"""
+        self.assertEqual(self.outbox.enfileirar([("k1", "op", {"a": 1}), ("k2", "op", {"a": 2})]), 2)
+        self.assertEqual(self.outbox.enfileirar([("k1", "op", {"a": 1})]), 0)
+
+        lote = self.outbox.reservar_lote()
+        self.assertEqual([i["chave"] for i in lote], ["k1", "k2"])
+        self.assertEqual(lote[0]["payload"], {"a": 1})
+
+        self.outbox.registrar_resultados({i["id"]: None for i in lote})
+        self.assertEqual(self.outbox.enfileirar([("k1", "op", {"a": 1})]), 0)
+        self.assertEqual(self.outbox.reservar_lote(), [])
+
+    def test_atraso_exponencial_e_falha_definitiva(self):
+        """Testa reagendamento com atraso crescente e limite de tentativas"""
+        self.assertEqual([calcular_atraso(n) for n in (1, 2, 3)], [2.0, 4.0, 8.0])
+        self.assertEqual(calcular_atraso(50), dual_write_outbox.ATRASO_MAXIMO_S)
+
+        agora = 1000.0
+        self.outbox.enfileirar([("k", "op", {})], agora=agora)
+        for tentativa in range(1, dual_write_outbox.MAX_TENTATIVAS + 1):
+            lote = self.outbox.reservar_lote(agora=agora)
+            self.assertEqual(len(lote), 1)
+            self.outbox.registrar_resultados({lote[0]["id"]: "erro"}, agora=agora)
+            # Antes do atraso não volta à fila
+            self.assertEqual(self.outbox.reservar_lote(agora=agora), [])
+            agora += calcular_atraso(tentativa)
+
+        metricas = self.outbox.metricas(agora=agora)
+        self.assertEqual((metricas["pendentes"], metricas["falhas"]), (0, 1))
+        self.assertEqual(self.outbox.listar_falhas()[0]["ultimo_erro"], "erro")
+
+        self.assertEqual(self.outbox.reprocessar_falhas(agora=agora), 1)
+        self.assertEqual(len(self.outbox.reservar_lote(agora=agora)), 1)
+
+    def test_reserva_atomica_entre_conexoes(self):
+        """Testa que dois workers (conexões distintas) não recebem a mesma intenção"""
+        outra = DualWriteOutbox(self.outbox.db_path)
+        self.outbox.enfileirar([(f"k{i}", "op", {}) for i in range(5)], agora=100.0)
+
+        primeiro = self.outbox.reservar_lote(limite=3, agora=100.0)
+        segundo = outra.reservar_lote(agora=100.0)
+        self.assertEqual([i["chave"] for i in primeiro], ["k0", "k1", "k2"])
+        self.assertEqual([i["chave"] for i in segundo], ["k3", "k4"])
+        self.assertEqual(outra.reservar_lote(agora=100.0), [])
+        self.assertEqual(self.outbox.metricas(agora=100.0)["em_processamento"], 5)
+
+        # Reserva vencida (worker interrompido) volta a ser elegível
+        self.outbox.registrar_resultados({i["id"]: None for i in segundo}, agora=101.0)
+        prazo = 100.0 + dual_write_outbox.PRAZO_RESERVA_S
+        self.assertEqual(outra.reservar_lote(agora=prazo - 1), [])
+        self.assertEqual([i["chave"] for i in outra.reservar_lote(agora=prazo)], ["k0", "k1", "k2"])
+
+    def test_purga_de_concluidas(self):
+        """Testa remoção das intenções concluídas após o período de retenção"""
+        self.outbox.enfileirar([("a", "op", {}), ("b", "op", {}), ("c", "op", {})], agora=0.0)
+        lote = self.outbox.reservar_lote(agora=0.0)
+        self.outbox.registrar_resultados({lote[0]["id"]: None}, agora=0.0)
+        self.outbox.registrar_resultados({lote[1]["id"]: None}, agora=86400.0)
+        self.outbox.registrar_resultados({lote[2]["id"]: "erro"}, agora=0.0)
+
+        self.assertEqual(self.outbox.purgar_concluidas(dias=1, agora=86400.0 + 1), 1)
+        metricas = self.outbox.metricas()
+        self.assertEqual((metricas["concluidas"], metricas["pendentes"]), (1, 1))
+
+    def test_metricas_de_profundidade_e_atraso(self):
+        """Testa profundidade da fila e atraso da intenção mais antiga"""
+        self.outbox.enfileirar([("a", "op", {})], agora=100.0)
+        self.outbox.enfileirar([("b", "op", {})], agora=160.0)
+        metricas = self.outbox.metricas(agora=200.0)
+        self.assertEqual(metricas["pendentes"], 2)
+        self.assertEqual(metricas["atraso_s"], 100.0)
+
+    def test_worker_drena_em_lotes(self):
+        """Testa drenagem em lotes, falhas parciais e execução em segundo plano"""
+        self.outbox.enfileirar([(f"k{i}", "op", {"i": i}) for i in range(5)])
+        lotes = []
+
+        def processar(lote):
+            lotes.append(len(lote))
+            return {item["id"]: ("falhou" if item["payload"]["i"] == 4 else None) for item in lote}
+
+        worker = OutboxWorker(self.outbox, processar)
+        resumo = worker.drenar(limite=2)
+        self.assertEqual(lotes, [2, 2, 1])
+        self.assertEqual(resumo, {"processadas": 5, "concluidas": 4, "falhas": 1})
+        self.assertEqual(self.outbox.metricas()["pendentes"], 1)
+
+        # Thread daemon drena o que for enfileirado depois
+        worker = OutboxWorker(self.outbox, lambda lote: {item["id"]: None for item in lote}, intervalo_s=0.05)
+        worker.iniciar()
+        try:
+            self.outbox.enfileirar([("novo", "op", {})])
+            worker.acordar()
+            limite = time.time() + 5
+            while self.outbox.metricas()["concluidas"] < 5 and time.time() < limite:
+                time.sleep(0.02)
+            self.assertEqual(self.outbox.metricas()["concluidas"], 5)
+        finally:
+            worker.parar()
+        self.assertFalse(worker.ativo)
+
+
+if __name__ == '__main__':
+    unittest.main()
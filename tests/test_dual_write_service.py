@@ -8,6 +8,7 @@ Data: 09/01/2026
 
 import unittest
 import json
+import tempfile
 from pathlib import Path
 from datetime import datetime
 import sys
@@ -15,6 +16,7 @@ import sys
 # Adicionar diretório raiz ao path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from services import alert_lifecycle_store, dual_write_audit, dual_write_outbox, dual_write_service
 from services.dual_write_service import (
     criar_alerta_dual,
     sincronizar_resolucao,
@@ -25,40 +27,47 @@ from services.dual_write_service import (
     buscar_v1_por_v2,
     obter_estatisticas_mapeamento,
     obter_estatisticas_dual_write,
-    validar_integridade
+    validar_integridade,
+    sincronizar_alertas_lote
 )
 
 
 class TestDualWriteService(unittest.TestCase):
     """Suite de testes do serviço de Dual Write"""
     
-    @classmethod
-    def setUpClass(cls):
-        """Configuração inicial dos testes"""
-        cls.data_dir = Path(__file__).parent.parent / "data"
-        cls.data_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Backup de arquivos existentes
-        cls.mapping_file = cls.data_dir / "dual_write_mapping.json"
-        cls.mapping_backup = cls.data_dir / "dual_write_mapping.json.backup"
-        
-        if cls.mapping_file.exists():
-            cls.mapping_file.rename(cls.mapping_backup)
-    
-    @classmethod
-    def tearDownClass(cls):
-        """Limpeza após todos os testes"""
-        # Restaurar backup
-        if cls.mapping_backup.exists():
-            if cls.mapping_file.exists():
-                cls.mapping_file.unlink()
-            cls.mapping_backup.rename(cls.mapping_file)
-    
     def setUp(self):
-        """Configuração antes de cada teste"""
-        # Limpar mapeamento
-        if self.mapping_file.exists():
-            self.mapping_file.unlink()
+        """Configuração antes de cada teste: auditoria, armazenamento, outbox e arquivos em diretório temporário"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.data_dir = Path(self.tmpdir.name)
+        self.mapping_file = self.data_dir / "dual_write_mapping.json"
+        
+        self.originais = (
+            dual_write_audit._auditoria,
+            alert_lifecycle_store._alert_lifecycle_store,
+            dual_write_outbox._outbox,
+            dual_write_service._indice_mapeamento,
+            dual_write_service.RECONCILIACAO_FILE
+        )
+        dual_write_audit._auditoria = dual_write_audit.AuditoriaDualWrite(
+            self.data_dir / "dual_write_auditoria.jsonl",
+            self.data_dir / "dual_write_auditoria_contadores.json"
+        )
+        self.store = alert_lifecycle_store.AlertLifecycleStore(self.data_dir / "alertas_ciclo_vida.db")
+        alert_lifecycle_store._alert_lifecycle_store = self.store
+        dual_write_outbox._outbox = dual_write_outbox.DualWriteOutbox(self.data_dir / "dual_write_outbox.db")
+        dual_write_service._indice_mapeamento = dual_write_service.IndiceMapeamento(self.mapping_file)
+        dual_write_service.RECONCILIACAO_FILE = self.data_dir / "dual_write_reconciliacao.json"
+    
+    def tearDown(self):
+        """Restaura as instâncias e caminhos originais"""
+        (
+            dual_write_audit._auditoria,
+            alert_lifecycle_store._alert_lifecycle_store,
+            dual_write_outbox._outbox,
+            dual_write_service._indice_mapeamento,
+            dual_write_service.RECONCILIACAO_FILE
+        ) = self.originais
+        self.tmpdir.cleanup()
     
     def test_01_mapeamento_campos_v1_para_v2(self):
         """Teste 1: Mapeamento de campos V1 → V2"""
@@ -288,6 +297,243 @@ class TestDualWriteService(unittest.TestCase):
         
         print(f"✓ Timestamp registrado: {timestamp}")
 
+    def test_11_sincronizacao_em_lote(self):
+        """Teste 11: Sincronização em lote cria só os alertas V2 ausentes"""
+        print("\n🧪 Teste 11: Sincronização em lote")
+        
+        alertas_v1 = [
+            {
+                'id': f'LOTE_{i:03d}',
+                'tipo': 'critico' if i % 2 else 'atencao',
+                'categoria': 'Vigência',
+                'titulo': f'Alerta lote {i}',
+                'descricao': 'Teste de sincronização em lote',
+                'contrato_id': f'CNT_{i}',
+                'contrato_numero': f'{i}/2026'
+            }
+            for i in range(5)
+        ]
+        # ID repetido não gera alerta V2 duplicado
+        alertas_v1.append(dict(alertas_v1[0]))
+        
+        gravacoes = []
+        inserir_original = self.store.inserir_alertas
+        
+        def inserir_contado(alertas):
+            alertas = list(alertas)
+            gravacoes.append(len(alertas))
+            return inserir_original(alertas)
+        
+        self.store.inserir_alertas = inserir_contado
+        resultado = sincronizar_alertas_lote(alertas_v1)
+        self.assertEqual(resultado['criados'], 5)
+        self.assertEqual(gravacoes, [5])
+        
+        v2_id = buscar_v2_por_v1('LOTE_003')
+        self.assertIsNotNone(v2_id)
+        self.assertEqual(buscar_v1_por_v2(v2_id), 'LOTE_003')
+        
+        # Segunda execução: nada a criar, nenhuma gravação
+        resultado = sincronizar_alertas_lote(alertas_v1)
+        self.assertEqual(resultado['criados'], 0)
+        self.assertEqual(resultado['existentes'], 6)
+        self.assertEqual(gravacoes, [5])
+        
+        print("✓ Lote sincronizado com uma única gravação")
+    
+    def test_12_importacao_v1_em_lote(self):
+        """Teste 12: Importação V1 → V2 em lote com simulação e mapeamento"""
+        print("\n🧪 Teste 12: Importação V1 → V2 em lote")
+        
+        from services.alert_lifecycle_service import importar_alertas_v1_para_v2_lote
+        
+        alertas_v1 = [
+            {
+                'id': f'IMP_{i:03d}',
+                'tipo': 'critico' if i % 2 else 'info',
+                'categoria': 'Vigência',
+                'titulo': f'Alerta importado {i}',
+                'contrato_id': f'CNT_{i}',
+                'contrato_numero': f'{i}/2026',
+                'dias_restantes': 3 * i
+            }
+            for i in range(4)
+        ]
+        alertas_v1.append(dict(alertas_v1[1]))
+        registrar_mapeamento('IMP_000', 'V2_EXISTENTE')
+        
+        simulacao = importar_alertas_v1_para_v2_lote(alertas_v1, simular=True)
+        self.assertEqual(
+            [d['acao'] for d in simulacao['diff']],
+            ['existente', 'criar', 'criar', 'criar', 'duplicado']
+        )
+        self.assertEqual(simulacao['diff'][1]['criticidade'], 'alta')
+        self.assertEqual(simulacao['diff'][3]['prazo_resposta_dias'], 9)
+        self.assertEqual(self.store.total_alertas(), 0)
+        self.assertIsNone(buscar_v2_por_v1('IMP_001'))
+        
+        resultado = importar_alertas_v1_para_v2_lote(alertas_v1)
+        self.assertEqual(
+            (resultado['importados'], resultado['existentes'], resultado['duplicados']),
+            (3, 1, 1)
+        )
+        self.assertGreater(resultado['alertas_por_segundo'], 0)
+        self.assertEqual(self.store.total_alertas(), 3)
+        
+        v2_id = buscar_v2_por_v1('IMP_002')
+        self.assertEqual(self.store.obter_alerta(v2_id)['metadados']['id_v1'], 'IMP_002')
+        self.assertEqual(buscar_v1_por_v2(v2_id), 'IMP_002')
+        
+        # Reexecução não duplica
+        self.assertEqual(importar_alertas_v1_para_v2_lote(alertas_v1)['importados'], 0)
+        
+        print("✓ Lote importado com simulação, mapeamento e sem duplicatas")
+    
+    def test_13_indice_mapeamento_em_memoria(self):
+        """Teste 13: Buscas sem releitura e detecção de alteração externa"""
+        print("\n🧪 Teste 13: Índice de mapeamento em memória")
+        
+        from services.dual_write_service import _indice_mapeamento
+        
+        registrar_mapeamento('MEM_V1', 'MEM_V2')
+        leituras = _indice_mapeamento.leituras
+        for _ in range(100):
+            self.assertEqual(buscar_v2_por_v1('MEM_V1'), 'MEM_V2')
+            self.assertEqual(buscar_v1_por_v2('MEM_V2'), 'MEM_V1')
+        registrar_mapeamento('MEM_V1b', 'MEM_V2b')
+        self.assertEqual(_indice_mapeamento.leituras, leituras)
+        
+        # Arquivo gravado por outro processo é relido
+        with open(self.mapping_file, 'r', encoding='utf-8') as f:
+            mapping = json.load(f)
+        mapping['v1_to_v2']['EXT_V1'] = {'v2_id': 'EXT_V2', 'timestamp': '', 'metadados': {}}
+        with open(self.mapping_file, 'w', encoding='utf-8') as f:
+            json.dump(mapping, f)
+        self.assertEqual(buscar_v2_por_v1('EXT_V1'), 'EXT_V2')
+        self.assertEqual(buscar_v2_por_v1('MEM_V1b'), 'MEM_V2b')
+        
+        # Arquivo truncado (gravação interrompida): mantém a cópia em memória
+        with open(self.mapping_file, 'w', encoding='utf-8') as f:
+            f.write('{"v1_to_v2": {"EXT')
+        self.assertEqual(buscar_v2_por_v1('EXT_V1'), 'EXT_V2')
+        
+        # Gravação atômica: nenhum temporário fica no diretório
+        registrar_mapeamento('MEM_V1c', 'MEM_V2c')
+        with open(self.mapping_file, 'r', encoding='utf-8') as f:
+            self.assertIn('MEM_V1c', json.load(f)['v1_to_v2'])
+        self.assertEqual(list(self.data_dir.glob('.dual_write_mapping.json.*.tmp')), [])
+        
+        # Arquivo removido: mapeamento vazio
+        self.mapping_file.unlink()
+        self.assertIsNone(buscar_v2_por_v1('MEM_V1'))
+        
+        print("✓ Buscas em memória e revalidação pelo arquivo")
+    
+    def test_14_outbox_sincronizacao_assincrona(self):
+        """Teste 14: Intenções enfileiradas e executadas pela drenagem da outbox"""
+        print("\n🧪 Teste 14: Outbox do dual write")
+        
+        from services.alert_lifecycle_service import ESTADO_RESOLVIDO
+        from services.dual_write_service import (
+            enfileirar_alertas_lote,
+            enfileirar_resolucao,
+            enfileirar_acao,
+            drenar_outbox,
+            obter_metricas_outbox
+        )
+        
+        alertas_v1 = [
+            {'id': f'OUT_{i}', 'tipo': 'critico', 'categoria': 'Vigência', 'titulo': f'Alerta {i}',
+             'contrato_id': f'CNT_{i}', 'contrato_numero': f'{i}/2026'}
+            for i in range(3)
+        ]
+        
+        self.assertEqual(enfileirar_alertas_lote(alertas_v1 + [dict(alertas_v1[0])]), 3)
+        self.assertTrue(enfileirar_resolucao('OUT_1', 'resolvido', 'gestor'))
+        self.assertFalse(enfileirar_resolucao('OUT_1', 'resolvido', 'gestor'))
+        self.assertTrue(enfileirar_acao({'id': 'ACAO_1', 'alerta_id': 'OUT_2', 'tipo': 'verificacao'}))
+        self.assertTrue(enfileirar_resolucao('SEM_V2', 'x', 'gestor'))
+        
+        # Nada é gravado no V2 até a drenagem
+        self.assertEqual(self.store.total_alertas(), 0)
+        self.assertEqual(obter_metricas_outbox()['pendentes'], 6)
+        
+        resumo = drenar_outbox()
+        self.assertEqual((resumo['concluidas'], resumo['falhas']), (5, 1))
+        self.assertEqual(self.store.total_alertas(), 3)
+        self.assertEqual(self.store.obter_alerta(buscar_v2_por_v1('OUT_1'))['estado'], ESTADO_RESOLVIDO)
+        self.assertEqual(len(self.store.listar_acoes(buscar_v2_por_v1('OUT_2'))), 1)
+        
+        # Falha fica pendente para nova tentativa, com o erro registrado
+        metricas = obter_metricas_outbox()
+        self.assertEqual(metricas['pendentes'], 1)
+        self.assertIn('SEM_V2', dual_write_outbox._outbox.listar_falhas()[0]['ultimo_erro'])
+        
+        # Alertas já mapeados não voltam à fila
+        self.assertEqual(enfileirar_alertas_lote(alertas_v1), 0)
+        
+        print("✓ Outbox drenada com idempotência e nova tentativa de falhas")
+    
+    def test_15_reconciliacao_por_contrato(self):
+        """Teste 15: Checksums por contrato, conferência só do que mudou e reparo"""
+        print("\n🧪 Teste 15: Reconciliação V1 ↔ V2 por contrato")
+        
+        from services.dual_write_service import reconciliar_integridade
+        
+        alertas_v1 = [
+            {'id': f'REC_{i}', 'tipo': 'critico', 'categoria': 'Vigência', 'titulo': f'Alerta {i}',
+             'contrato_id': f'CNT_{i % 3}', 'contrato_numero': f'{i % 3}/2026'}
+            for i in range(9)
+        ]
+        
+        sincronizar_alertas_lote(alertas_v1)
+        resultado = reconciliar_integridade()
+        self.assertTrue(resultado['integridade_ok'])
+        self.assertEqual((resultado['contratos'], resultado['contratos_verificados']), (3, 3))
+        self.assertEqual(resultado['vinculos_v2'], 9)
+        
+        # Nada mudou: nenhum contrato é conferido de novo
+        self.assertEqual(reconciliar_integridade()['contratos_verificados'], 0)
+        
+        # Órfão no CNT_1 e V2 sem mapeamento no CNT_2: só esses contratos são abertos
+        dual_write_service._indice_mapeamento.registrar([
+            ('REC_X', 'V2_INEXISTENTE', {'contrato_id': 'CNT_1'})
+        ])
+        v2_rec_2 = buscar_v2_por_v1('REC_2')
+        dual_write_service._indice_mapeamento.remover(['REC_2'])
+        resultado = reconciliar_integridade()
+        self.assertFalse(resultado['integridade_ok'])
+        self.assertEqual(resultado['contratos_verificados'], 2)
+        divergencias = {d['contrato_id']: d for d in resultado['divergencias']}
+        self.assertEqual(
+            divergencias['CNT_1']['orfaos_no_mapeamento'],
+            [{'v1_id': 'REC_X', 'v2_id': 'V2_INEXISTENTE'}]
+        )
+        self.assertEqual(
+            divergencias['CNT_2']['v2_sem_mapeamento'],
+            [{'v2_id': v2_rec_2, 'v1_id': 'REC_2'}]
+        )
+        self.assertEqual(validar_integridade()['orfaos_no_mapeamento'], 1)
+        
+        # Reparo: órfão removido, vínculo registrado de novo
+        resultado = reconciliar_integridade(reparar=True)
+        self.assertEqual(resultado['reparo']['mapeamentos_removidos'], 1)
+        self.assertEqual(resultado['reparo']['mapeamentos_registrados'], 1)
+        self.assertEqual(buscar_v2_por_v1('REC_2'), v2_rec_2)
+        self.assertIsNone(buscar_v2_por_v1('REC_X'))
+        self.assertTrue(reconciliar_integridade()['integridade_ok'])
+        
+        # Órfão de um alerta V1 calculado é recriado pelo caminho em lote
+        with self.store._transacao() as conn:
+            conn.execute("DELETE FROM alertas_v2 WHERE id = ?", (buscar_v2_por_v1('REC_4'),))
+        resultado = reconciliar_integridade(reparar=True, alertas_v1=alertas_v1)
+        self.assertEqual(resultado['divergencias'][0]['contrato_id'], 'CNT_1')
+        self.assertEqual(resultado['reparo']['alertas_recriados'], 1)
+        self.assertTrue(self.store.obter_alerta(buscar_v2_por_v1('REC_4')))
+        self.assertTrue(reconciliar_integridade()['integridade_ok'])
+        
+        print("✓ Só os contratos alterados são conferidos; divergências reparadas")
+
 
 def run_tests():
     """Executa todos os testes"""
@@ -0,0 +1,89 @@
+"""
+Testes do Importador de Contratos do PNCP
+=========================================
+"""
+
+import unittest
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+# Adiciona o diretório raiz ao path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from scripts.importar_contratos_pncp import converter_lote, extrair_comarcas, extrair_comarca_objeto
+
+
+class TestImportadorPNCP(unittest.TestCase):
+    """Testes para a conversão vetorizada do relatório do PNCP"""
+    
+    def setUp(self):
+        self.agora = datetime(2025, 6, 1, 12, 0)
+        self.df = pd.DataFrame([
+            {
+                "Controle PNCP": "123-1-000001/2024",
+                "Data Publicação PNCP": datetime(2024, 2, 29, 7, 12),
+                "Soma de Valor Total Homologado": 0,
+                "Soma de Valor Total Estimado": 1500.5,
+                "Nº do Processo": "2024/0001",
+                "Objeto da Compra": "Prestação de serviço de limpeza na 10ª RAJ",
+                "Modalidade": "Pregão - Eletrônico",
+                "Amparo Legal": None,
+                "Link Sistema Origem": "https://exemplo",
+            },
+            {
+                "Controle PNCP": "123-1-000002/2024",
+                "Data Publicação PNCP": None,
+                "Soma de Valor Total Homologado": 900,
+                "Soma de Valor Total Estimado": 1000,
+                "Nº do Processo": None,
+                "Objeto da Compra": "Fornecimento de água para a comarca de Sorocaba",
+                "Modalidade": None,
+                "Amparo Legal": "Lei 14.133/2021",
+                "Link Sistema Origem": None,
+            },
+        ])
+    
+    def test_converter_lote(self):
+        """Testa conversão de valores, datas, tipo e identificação"""
+        primeiro, segundo = converter_lote(self.df, self.agora)
+        
+        self.assertEqual(primeiro["id"], "PNCP_123-1-000001_2024")
+        self.assertEqual(primeiro["valor"], 1500.5)
+        self.assertEqual(primeiro["tipo"], "Serviços")
+        self.assertEqual(primeiro["data_inicio"], "2024-02-29T07:12:00")
+        # Ano bissexto: fim estimado cai em 28/02 do ano seguinte
+        self.assertEqual(primeiro["data_fim"], "2025-02-28T00:00:00")
+        self.assertEqual(primeiro["vigencia"], "29/02/2024 a 28/02/2025")
+        self.assertEqual(primeiro["amparo_legal"], "")
+        self.assertEqual(primeiro["aditivos"], [])
+        
+        self.assertEqual(segundo["valor"], 900.0)
+        self.assertEqual(segundo["tipo"], "Fornecimento")
+        self.assertEqual(segundo["numero"], "123-1-000002_2024")
+        self.assertEqual(segundo["data_inicio"], "2025-06-01T12:00:00")
+        self.assertEqual(segundo["modalidade"], "Não especificada")
+    
+    def test_extrair_comarcas_vetorizado(self):
+        """Testa regex vetorizada (RAJ tem prioridade sobre comarca)"""
+        comarcas = extrair_comarcas(pd.Series([
+            "Serviço na RAJ 10 e comarca de Sorocaba",
+            "Fornecimento para a comarca de Itu",
+            "Objeto genérico",
+            None,
+        ]))
+        self.assertEqual(
+            list(comarcas),
+            ["RAJ 10", "Itu", "Não especificada", "Não especificada"]
+        )
+        self.assertEqual(extrair_comarca_objeto("Obras na RAJ 5"), "RAJ 5")
+    
+    def test_lote_vazio(self):
+        """Testa lote sem linhas vigentes"""
+        self.assertEqual(converter_lote(self.df.iloc[0:0]), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
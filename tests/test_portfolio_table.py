@@ -0,0 +1,68 @@
+"""
+Testes da Tabela Colunar da Carteira
+====================================
+"""
+
+import unittest
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Adiciona o diretório raiz ao path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from services.portfolio_table import PortfolioTable
+
+
+class TestPortfolioTable(unittest.TestCase):
+    """Testes para as agregações vetorizadas da carteira"""
+
+    def setUp(self):
+        self.contratos = [
+            {"id": "A", "numero": "001/2025", "tipo": "Serviços", "fornecedor": "Alfa",
+             "status": "ativo", "valor": 100.0,
+             "data_inicio": datetime(2025, 1, 1), "data_fim": datetime(2025, 3, 1)},
+            {"id": "B", "numero": "002/2025", "tipo": "Obras", "fornecedor": "Beta",
+             "status": "critico", "valor": 300.0, "pendencias": ["doc"],
+             "data_inicio": "2025-01-01T00:00:00", "data_fim": "2025-02-10T00:00:00"},
+            {"id": "C", "numero": "003/2025", "tipo": "Serviços", "fornecedor": "Alfa",
+             "status": "atencao", "valor": 250.0,
+             "data_fim": "15/02/2025", "comarca_detectada": "Sorocaba"},
+            {"id": "D", "numero": "004/2025", "valor": 50.0},
+        ]
+        self.tabela = PortfolioTable(self.contratos, versao=1)
+
+    def test_contagens_e_somas(self):
+        """Testa contagem e soma por categoria com bincount"""
+        self.assertEqual(self.tabela.total, 4)
+        self.assertAlmostEqual(self.tabela.valor_total(), 700.0)
+        self.assertEqual(
+            self.tabela.contagem_por("status"),
+            {"ativo": 2, "atencao": 1, "critico": 1}
+        )
+        self.assertEqual(self.tabela.contagem_por("tipo")["Outros"], 1)
+        self.assertAlmostEqual(self.tabela.soma_valor_por("status")["ativo"], 150.0)
+        self.assertEqual(int(self.tabela.pendencias.sum()), 1)
+
+    def test_top_por_valor(self):
+        """Testa ranking de fornecedores por valor somado"""
+        top = self.tabela.top_por_valor("fornecedor", 2)
+        self.assertEqual([t["categoria"] for t in top], ["Alfa", "Beta"])
+        self.assertAlmostEqual(top[0]["valor"], 350.0)
+        self.assertEqual(top[0]["contratos"], 2)
+        self.assertEqual(len(self.tabela.top_por_valor("fornecedor", 10)), 3)
+
+    def test_comarca(self):
+        """Testa coluna de comarca"""
+        self.assertEqual(self.tabela.contagem_por("comarca")["Sorocaba"], 1)
+
+    def test_carteira_vazia(self):
+        """Testa agregações sem contratos"""
+        tabela = PortfolioTable([])
+        self.assertEqual(tabela.total, 0)
+        self.assertEqual(tabela.contagem_por("status"), {})
+        self.assertEqual(tabela.top_por_valor("fornecedor"), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
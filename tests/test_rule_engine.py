@@ -0,0 +1,142 @@
+"""
+Testes do Motor de Regras de Alerta
+===================================
+"""
+
+import unittest
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+# Adiciona o diretório raiz ao path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from services.rule_engine import Limiar, MotorRegras, Regra, Tabela
+from services import alert_service
+from services import ff_alert_rules
+
+
+class TestMotorRegras(unittest.TestCase):
+    """Testes de compilação, avaliação vetorizada e estatísticas"""
+
+    def setUp(self):
+        self.regras = [
+            Regra(
+                codigo='ALTO',
+                tipo='info',
+                categoria='Teste',
+                condicoes=(('valor', '>', Limiar('limite')),),
+                id_modelo='ALTO_{chave}',
+                titulo='Valor {valor:.1f}',
+                descricao='Registro {chave}',
+                campos={'valor': 'valor'},
+            ),
+            Regra(
+                codigo='PAR',
+                tipo='atencao',
+                categoria='Teste',
+                condicoes=(('par', '==', True), ('valor', '>=', 0)),
+                id_modelo='PAR_{chave}',
+                titulo='Par',
+                descricao='Registro {chave} é par',
+                acao_sugerida='verificar',
+            ),
+        ]
+        self.motor = MotorRegras('teste', self.regras, {'limite': 2.5})
+        self.tabela = Tabela(
+            colunas={
+                'chave': np.array(['a', 'b', 'c', 'd'], dtype=object),
+                'valor': np.array([1.0, 3.0, 2.0, 4.0]),
+                'par': np.array([False, True, False, True]),
+            },
+            campos_base={'registro': 'chave'},
+            constantes={'origem': 'teste'},
+        )
+
+    def test_avaliacao_em_ordem_de_linha_e_regra(self):
+        """Testa disparos agrupados por linha, na ordem das regras"""
+        disparos = self.motor.avaliar(self.tabela)
+        self.assertEqual(
+            [(linha, alerta['id']) for linha, alerta in disparos],
+            [(1, 'ALTO_b'), (1, 'PAR_b'), (3, 'ALTO_d'), (3, 'PAR_d')]
+        )
+        alerta = disparos[0][1]
+        self.assertEqual(alerta['titulo'], 'Valor 3.0')
+        self.assertEqual(alerta['registro'], 'b')
+        self.assertEqual(alerta['origem'], 'teste')
+        self.assertNotIn('acao_sugerida', alerta)
+        self.assertEqual(disparos[1][1]['acao_sugerida'], 'verificar')
+
+    def test_limiar_reconfigurado(self):
+        """Testa recompilação ao alterar limiares"""
+        self.motor.configurar_limiares(limite=3.5)
+        ids = [a['id'] for _, a in self.motor.avaliar(self.tabela)]
+        self.assertNotIn('ALTO_b', ids)
+        self.assertIn('ALTO_d', ids)
+
+    def test_estatisticas_por_regra(self):
+        """Testa contadores de avaliações, linhas e disparos por regra"""
+        self.motor.avaliar(self.tabela)
+        self.motor.avaliar(self.tabela)
+        por_regra = {e['regra']: e for e in self.motor.estatisticas()}
+        self.assertEqual(por_regra['ALTO']['avaliacoes'], 2)
+        self.assertEqual(por_regra['ALTO']['linhas'], 8)
+        self.assertEqual(por_regra['PAR']['disparos'], 4)
+        self.assertGreaterEqual(por_regra['PAR']['tempo_s'], 0.0)
+
+    def test_limiar_ausente(self):
+        """Testa erro ao compilar regra com limiar não configurado"""
+        with self.assertRaises(ValueError):
+            MotorRegras('teste_invalido', self.regras, {})
+
+
+class TestRegrasDeclaradas(unittest.TestCase):
+    """Testes das regras de contrato e FF declaradas nos serviços"""
+
+    def test_regras_contrato(self):
+        """Testa alertas de vigência, pendências e valor via motor"""
+        hoje = datetime.now()
+        contratos = [
+            {"id": "A", "numero": "1", "data_fim": hoje - timedelta(days=3, hours=1),
+             "pendencias": ["x", "y", "z"]},
+            {"id": "B", "numero": "2", "valor": 80_000_000},
+        ]
+        por_id = {a['id']: a for a in alert_service.calcular_alertas(contratos)}
+        self.assertEqual(por_id['VIG_VENC_A']['titulo'], 'Contrato VENCIDO há 4 dias')
+        self.assertEqual(por_id['PEND_A']['descricao'], 'Contrato 1: x, y...')
+        self.assertEqual(por_id['PEND_A']['total_pendencias'], 3)
+        self.assertEqual(por_id['VALOR_ALTO_B']['titulo'], 'Contrato de alto valor: R$ 80.0M')
+
+    def test_regras_ff(self):
+        """Testa regras FF sobre registros de um contrato"""
+        hoje = datetime.now()
+        registros = [
+            {"contrato_id": "C1", "nf_numero": "10", "competencia": "01/2026",
+             "status_fluxo": "Pendente de ateste",
+             "nf_data_emissao": (hoje - timedelta(days=10)).strftime('%Y-%m-%d'),
+             "created_at": hoje.strftime('%Y-%m-%d %H:%M:%S'),
+             "incidencia_iss": True, "iss_retido": 0},
+            {"contrato_id": "C1", "nf_numero": "11", "status_fluxo": "Atestado",
+             "data_ateste": (hoje - timedelta(days=40)).strftime('%Y-%m-%d'),
+             "created_at": (hoje - timedelta(days=50)).strftime('%Y-%m-%d %H:%M:%S')},
+        ]
+        original = ff_alert_rules.listar_por_contrato
+        ff_alert_rules.listar_por_contrato = lambda contrato_id: registros
+        try:
+            alertas = ff_alert_rules.compute_ff_alerts_for_contract("C1")
+        finally:
+            ff_alert_rules.listar_por_contrato = original
+
+        regras = [a['metadados_ff']['regra'] for a in alertas]
+        self.assertEqual(
+            regras,
+            ['ATESTE_PENDENTE', 'ISS_INCONSISTENTE', 'PAGAMENTO_ATRASADO', 'STATUS_PARADO']
+        )
+        self.assertEqual(alertas[0]['metadados_ff']['dias_pendente'], 10)
+        self.assertEqual(alertas[3]['metadados_ff']['status_atual'], 'Atestado')
+
+
+if __name__ == '__main__':
+    unittest.main()
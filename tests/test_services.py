@@ -4,6 +4,8 @@ Testes do Módulo de Serviços
 """
 
 import unittest
+import tempfile
+from unittest import mock
 from datetime import datetime
 import sys
 from pathlib import Path
@@ -11,7 +13,10 @@ from pathlib import Path
 # Adiciona o diretório raiz ao path
 sys.path.append(str(Path(__file__).parent.parent))
 
-from services.contract_service import get_contratos_mock, get_contrato_by_id
+from services import contract_service
+from services.contract_service import get_contratos_mock, get_contrato_by_id, consolidar_contrato_com_aditivos
+from services.contract_repository import ContractRepository
+from services.contract_store import ContractStore
 
 
 class TestContractService(unittest.TestCase):
@@ -47,5 +52,152 @@ class TestContractService(unittest.TestCase):
         self.assertIsNone(contrato)
 
 
+
+class TestConsolidacaoAditivos(unittest.TestCase):
+    """Testes para a consolidação memoizada de aditivos"""
+    
+    def setUp(self):
+        contract_service._cache_consolidacao.clear()
+    
+    def _contrato(self, aditivos):
+        return {
+            "id": "CAD_ADIT",
+            "valor": 1000.0,
+            "data_inicio": datetime(2025, 1, 1),
+            "data_fim": datetime(2025, 12, 31),
+            "aditivos": list(aditivos)
+        }
+    
+    def _aditivo(self, numero):
+        return {
+            "numero": numero,
+            "filename": f"CAD_ADIT_ADITIVO_{numero:02d}.pdf",
+            "data_upload": f"2025-0{numero}-01T00:00:00",
+            "tipo_modificacao": ["Prorrogação de Prazo", "Acréscimo de Valor"],
+            "nova_data_fim": f"{2025 + numero}-12-31",
+            "prorrogacao_dias": 365,
+            "valor_acrescimo": 100.0,
+            "percentual_acrescimo": 10.0
+        }
+    
+    def test_consolida_valor_e_prazo(self):
+        """Testa aplicação sequencial dos aditivos"""
+        contrato = consolidar_contrato_com_aditivos(self._contrato([self._aditivo(1), self._aditivo(2)]))
+        self.assertEqual(contrato['valor'], 1200.0)
+        self.assertEqual(contrato['valor_original'], 1000.0)
+        self.assertEqual(contrato['data_fim'], datetime(2027, 12, 31))
+        self.assertEqual(len(contrato['historico_aditivos']), 2)
+        self.assertEqual(contrato['vigencia'], "01/01/2025 a 31/12/2027")
+    
+    def test_novo_aditivo_aplica_somente_delta(self):
+        """Testa que só o aditivo anexado é aplicado sobre o cache"""
+        aditivos = [self._aditivo(1), self._aditivo(2)]
+        consolidar_contrato_com_aditivos(self._contrato(aditivos))
+        
+        aditivos.append(self._aditivo(3))
+        with mock.patch.object(contract_service, '_aplicar_aditivo', wraps=contract_service._aplicar_aditivo) as aplicar:
+            incremental = consolidar_contrato_com_aditivos(self._contrato(aditivos))
+        self.assertEqual(aplicar.call_count, 1)
+        
+        contract_service._cache_consolidacao.clear()
+        completo = consolidar_contrato_com_aditivos(self._contrato(aditivos))
+        self.assertEqual(incremental['valor'], completo['valor'])
+        self.assertEqual(incremental['data_fim'], completo['data_fim'])
+        self.assertEqual(incremental['historico_aditivos'], completo['historico_aditivos'])
+    
+    def test_lista_inalterada_reaproveita_cache(self):
+        """Testa que nenhuma reaplicação ocorre com a mesma lista"""
+        aditivos = [self._aditivo(1)]
+        consolidar_contrato_com_aditivos(self._contrato(aditivos))
+        with mock.patch.object(contract_service, '_aplicar_aditivo') as aplicar:
+            contrato = consolidar_contrato_com_aditivos(self._contrato(aditivos))
+        aplicar.assert_not_called()
+        self.assertEqual(contrato['valor'], 1100.0)
+    
+    def test_aditivo_editado_recalcula(self):
+        """Testa que editar um aditivo existente invalida o cache"""
+        aditivos = [self._aditivo(1)]
+        self.assertEqual(consolidar_contrato_com_aditivos(self._contrato(aditivos))['valor'], 1100.0)
+        
+        editado = dict(aditivos[0], valor_acrescimo=500.0, nova_data_fim="2027-06-30")
+        contrato = consolidar_contrato_com_aditivos(self._contrato([editado]))
+        self.assertEqual(contrato['valor'], 1500.0)
+        self.assertEqual(contrato['data_fim'], datetime(2027, 6, 30))
+        
+        # Prefixo editado e aditivo anexado: recalcula tudo, sem aplicar só o delta
+        contrato = consolidar_contrato_com_aditivos(self._contrato([aditivos[0], self._aditivo(2)]))
+        self.assertEqual(contrato['valor'], 1200.0)
+        self.assertEqual(contrato['data_fim'], datetime(2027, 12, 31))
+    
+    def test_base_alterada_recalcula(self):
+        """Testa recálculo quando o valor original do contrato muda"""
+        aditivos = [self._aditivo(1)]
+        consolidar_contrato_com_aditivos(self._contrato(aditivos))
+        contrato = self._contrato(aditivos)
+        contrato['valor'] = 2000.0
+        self.assertEqual(consolidar_contrato_com_aditivos(contrato)['valor'], 2100.0)
+
+
+class TestContractRepository(unittest.TestCase):
+    """Testes para o repositório de contratos em memória"""
+    
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = ContractStore(Path(self.tmpdir.name) / "contratos.db")
+        self.store.inserir_contrato(self._contrato("CAD001", "2025-01-10T10:00:00"))
+        self.repo = ContractRepository(self.store)
+    
+    def tearDown(self):
+        self.tmpdir.cleanup()
+    
+    def _contrato(self, contrato_id, ultima_atualizacao):
+        return {
+            "id": contrato_id,
+            "numero": f"{contrato_id}/2025",
+            "tipo": "Serviços",
+            "fornecedor": "Fornecedor Teste",
+            "objeto": "Objeto de teste",
+            "vigencia": "01/01/2025 a 31/12/2025",
+            "valor": 1000.0,
+            "status": "ativo",
+            "data_inicio": "2025-01-01T00:00:00",
+            "data_fim": "2025-12-31T00:00:00",
+            "ultima_atualizacao": ultima_atualizacao
+        }
+    
+    def test_carrega_mock_e_cadastrados_com_datas_convertidas(self):
+        """Testa carga combinada e conversão de datas"""
+        contrato = self.repo.obter("CAD001")
+        self.assertIsNotNone(contrato)
+        self.assertIsInstance(contrato['data_fim'], datetime)
+        self.assertIsNotNone(self.repo.obter("CTR001"))
+        self.assertEqual(self.repo.total(), len(get_contratos_mock()) + 1)
+    
+    def test_nao_recarrega_sem_mudanca_na_fonte(self):
+        """Testa que leituras repetidas não relêem o arquivo"""
+        versao = self.repo.versao
+        self.repo.listar()
+        self.repo.obter("CAD001")
+        self.assertEqual(self.repo.versao, versao)
+    
+    def test_recarrega_quando_fonte_muda(self):
+        """Testa recarga após escrita no armazenamento"""
+        versao = self.repo.versao
+        self.store.inserir_contrato(self._contrato("CAD002", "2025-02-10T10:00:00"))
+        self.assertIsNotNone(self.repo.obter("CAD002"))
+        self.assertGreater(self.repo.versao, versao)
+    
+    def test_copias_isolam_cache(self):
+        """Testa que alterações do chamador não contaminam o cache"""
+        contrato = self.repo.obter("CAD001")
+        contrato['valor'] = 0.0
+        self.assertEqual(self.repo.obter("CAD001")['valor'], 1000.0)
+    
+    def test_ordenacao_por_ultima_atualizacao(self):
+        """Testa ordem decrescente de atualização"""
+        datas = [c['ultima_atualizacao'] for c in self.repo.listar()]
+        self.assertEqual(datas, sorted(datas, reverse=True))
+
+
 if __name__ == '__main__':
     unittest.main()
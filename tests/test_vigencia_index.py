@@ -0,0 +1,103 @@
+"""
+Testes do Índice de Vigência
+============================
+"""
+
+import unittest
+import random
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Adiciona o diretório raiz ao path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from services.vigencia_index import VigenciaIndex, para_datetime
+from services import alert_service
+
+
+class TestVigenciaIndex(unittest.TestCase):
+    """Testes das consultas por janela e por data de referência"""
+
+    def setUp(self):
+        rng = random.Random(42)
+        base = datetime(2025, 1, 1)
+        self.contratos = []
+        for i in range(300):
+            inicio = base + timedelta(days=rng.randint(-400, 200), hours=rng.randint(0, 23))
+            fim = inicio + timedelta(days=rng.randint(30, 900))
+            contrato = {"id": f"C{i}", "data_inicio": inicio, "data_fim": fim}
+            if i % 7 == 0:
+                contrato["data_fim"] = fim.isoformat()
+            if i % 11 == 0:
+                del contrato["data_inicio"]
+            self.contratos.append(contrato)
+        self.contratos.append({"id": "SEM_DATA"})
+        self.indice = VigenciaIndex(self.contratos)
+
+    def _fim(self, contrato):
+        return para_datetime(contrato.get("data_fim"))
+
+    def test_vencendo_entre_igual_varredura(self):
+        """Testa janela [inicio, fim) contra varredura linear"""
+        d1, d2 = datetime(2025, 3, 1), datetime(2025, 9, 1)
+        esperado = sorted(
+            c["id"] for c in self.contratos
+            if self._fim(c) and d1 <= self._fim(c) < d2
+        )
+        obtido = [c["id"] for _, c in self.indice.vencendo_entre(d1, d2)]
+        self.assertEqual(sorted(obtido), esperado)
+
+        datas = [d for d, _ in self.indice.vencendo_entre(d1, d2)]
+        self.assertEqual(datas, sorted(datas))
+
+    def test_vencendo_entre_limites(self):
+        """Testa janela aberta (vencidos) e fechada no fim"""
+        d = datetime(2025, 6, 1)
+        vencidos = {c["id"] for _, c in self.indice.vencendo_entre(None, d)}
+        self.assertEqual(vencidos, {c["id"] for c in self.contratos if self._fim(c) and self._fim(c) < d})
+
+        exato = self.indice.vencendo_entre(None, None)[10][0]
+        fechado = self.indice.vencendo_entre(exato, exato, incluir_fim=True)
+        self.assertTrue(fechado)
+        self.assertTrue(all(data == exato for data, _ in fechado))
+        self.assertEqual(self.indice.vencendo_entre(exato, exato), [])
+
+    def test_vigentes_em_igual_varredura(self):
+        """Testa contratos vigentes em várias datas contra varredura linear"""
+        for data in (datetime(2023, 1, 1), datetime(2025, 1, 1), datetime(2026, 6, 15, 12)):
+            esperado = {
+                c["id"] for c in self.contratos
+                if self._fim(c)
+                and (para_datetime(c.get("data_inicio")) or datetime.min) <= data <= self._fim(c)
+            }
+            obtido = {c["id"] for _, c in self.indice.vigentes_em(data)}
+            self.assertEqual(obtido, esperado)
+
+    def test_indice_vazio(self):
+        """Testa consultas sem contratos indexáveis"""
+        indice = VigenciaIndex([{"id": "X"}])
+        self.assertEqual(len(indice), 0)
+        self.assertEqual(indice.vencendo_entre(), [])
+        self.assertEqual(indice.vigentes_em(datetime.now()), [])
+
+    def test_calcular_alertas_janelas(self):
+        """Testa que calcular_alertas classifica as janelas de vigência pelo índice"""
+        hoje = datetime.now()
+        contratos = [
+            {"id": "V1", "numero": "1", "data_fim": hoje + timedelta(days=10, hours=1)},
+            {"id": "V2", "numero": "2", "data_fim": (hoje + timedelta(days=90, hours=1)).isoformat()},
+            {"id": "V3", "numero": "3", "data_fim": hoje - timedelta(days=5)},
+            {"id": "V4", "numero": "4", "data_fim": hoje + timedelta(days=400)},
+        ]
+        alertas = alert_service.calcular_alertas(contratos)
+
+        por_id = {a["id"]: a for a in alertas}
+        self.assertEqual(por_id["VIG_CRIT_V1"]["dias_restantes"], 10)
+        self.assertEqual(por_id["VIG_ATEN_V2"]["dias_restantes"], 90)
+        self.assertIn("VIG_VENC_V3", por_id)
+        self.assertFalse(any(a["contrato_id"] == "V4" for a in alertas))
+
+
+if __name__ == '__main__':
+    unittest.main()